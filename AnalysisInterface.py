@@ -11,6 +11,36 @@
 # Most descriptions directly from arcpy documentation
 ###################################################################################
 import arcpy # import ArcGIS Python bindings
+import JobContext
+import NativeAnalysis # native versions of analysis tools for shapefiles
+import NativeManagement # splits lists of input shapefiles
+from ManagementInterface import IsShapefile # native tools only handle shapefiles
+
+# Option values that leave the overlay tools at their defaults
+Defaults=("#","",None)
+
+################################################
+# Purpose: Whether an overlay can run natively: every input an existing shapefile, the
+#          output a shapefile, and the cluster tolerance left at its default
+# Input: InShapefiles - list of input names
+#        OutShapefile - output name
+#        ClusterTolerance - cluster tolerance as passed to the tool
+# Output: True or False
+def NativeOverlay(InShapefiles,OutShapefile,ClusterTolerance):
+	return(all(IsShapefile(Shapefile) for Shapefile in InShapefiles) and IsShapefile(OutShapefile,False) and
+	       ClusterTolerance in Defaults)
+
+################################################
+# Purpose: JoinAttr for the native overlay tools
+# Input: JoinAttr - as passed to the tool
+# Output: "ALL", "NO_FID" or "ONLY_FID", or None for other values
+def JoinOption(JoinAttr):
+	if JoinAttr in Defaults:
+		return("ALL")
+	if str(JoinAttr).upper() in ("ALL","NO_FID","ONLY_FID"):
+		return(str(JoinAttr).upper())
+	return(None)
+
 ###################################################################################
 # Class to interface with analysis
 ###################################################################################
@@ -19,9 +49,11 @@ class AnalysisInterface: # class to interface with analysis tools
 	###################################################################################
 	# Constructor for the management interface class
 	###################################################################################
-	def __init__(self): # called when the class is created
-		# Set environment to allow file overwrite
-		arcpy.env.overwriteOutput=True
+	def __init__(self,Job=None): # called when the class is created
+		# Job whose environment (file overwrite, scratch workspace) the tools run with
+		if Job is None:
+			Job=JobContext.DefaultJob()
+		self.Job=Job
 
 	###################################################################################
 	# Creates buffer polygons around input features to a specified distance. An
@@ -34,10 +66,19 @@ class AnalysisInterface: # class to interface with analysis tools
 	#         LineEndType: (String): The shape of the buffer at the end of line input features. - not valid for polygon inputs. "ROUND", "FLAT"
 	#         Dissolve: Specifies the dissolve to be performed to remove output buffer overlap. "NONE", "ALL"
 	#         DissolveField: The list of field(s) from the input features on which to dissolve the output buffers.
+	#  Full, flat ended buffers of polyline shapefiles without dissolving are built natively
+	#  (NativeAnalysis.Buffer) where the lines allow it, and by the geoprocessor otherwise.
 	###################################################################################
 	def Buffer(self,TheInShp,TheOutShp,BufferDist,LineSide,LineEndType,Dissolve,DissolveField): 
 		try:
-			arcpy.analysis.Buffer(TheInShp,TheOutShp,BufferDist,LineSide,LineEndType,Dissolve,DissolveField)
+			Distance=NativeAnalysis.LinearDistance(BufferDist)
+			if (IsShapefile(TheInShp) and IsShapefile(TheOutShp,False) and Distance is not None and
+			    str(LineSide).upper()=="FULL" and str(LineEndType).upper()=="FLAT" and
+			    str(Dissolve).upper() in ("NONE","#","")):
+				if NativeAnalysis.Buffer(TheInShp,TheOutShp,Distance):
+					return
+			with self.Job.Geoprocessor():
+				arcpy.analysis.Buffer(TheInShp,TheOutShp,BufferDist,LineSide,LineEndType,Dissolve,DissolveField)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Buffer Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -50,10 +91,16 @@ class AnalysisInterface: # class to interface with analysis tools
 	#         TheOutShp: name and path of the output shapefile
 	#         ClusterTolerance: The minimum distance separating all feature coordinates (nodes and vertices) as
 	#          well as the distance a coordinate can move in X or Y (or both).
+	#  Polygon shapefiles clipped by polygons that do not overlap are clipped natively
+	#  (NativeAnalysis.Clip), anything else by the geoprocessor.
 	###################################################################################
 	def Clip(self,TheInShp,TheClipShp,TheOutShp,ClusterTolerance): 
 		try:
-			arcpy.analysis.Clip(TheInShp,TheClipShp,TheOutShp,ClusterTolerance)
+			if NativeOverlay([TheInShp,TheClipShp],TheOutShp,ClusterTolerance):
+				if NativeAnalysis.Clip(TheInShp,TheClipShp,TheOutShp):
+					return
+			with self.Job.Geoprocessor():
+				arcpy.analysis.Clip(TheInShp,TheClipShp,TheOutShp,ClusterTolerance)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Clip Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -67,10 +114,16 @@ class AnalysisInterface: # class to interface with analysis tools
 	#         TheOutShp: name and path of the output shapefile
 	#         ClusterTolerance: The minimum distance separating all feature coordinates (nodes and vertices) as
 	#          well as the distance a coordinate can move in X or Y (or both).
+	#  Polygon shapefiles erased by polygons that do not overlap are erased natively
+	#  (NativeAnalysis.Erase), anything else by the geoprocessor.
 	###################################################################################
 	def Erase(self,TheInShp,TheEraseShp,TheOutShp,ClusterTolerance): 
 		try:
-			arcpy.analysis.Erase(TheInShp,TheEraseShp,TheOutShp,ClusterTolerance)
+			if NativeOverlay([TheInShp,TheEraseShp],TheOutShp,ClusterTolerance):
+				if NativeAnalysis.Erase(TheInShp,TheEraseShp,TheOutShp):
+					return
+			with self.Job.Geoprocessor():
+				arcpy.analysis.Erase(TheInShp,TheEraseShp,TheOutShp,ClusterTolerance)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Erase Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -89,10 +142,18 @@ class AnalysisInterface: # class to interface with analysis tools
 	#         Rel: Choose if you want additional spatial relationships between the Input Features
 	#           and Identity Features to be written to the output. This only applies when the
 	#           Input Features are lines and the Identity Features are polygons: "NO_RELATIONSHIPS","KEEP_RELATIONSHIPS"
+	#  Polygon shapefiles with identity polygons that do not overlap are split natively
+	#  (NativeAnalysis.Identity), anything else by the geoprocessor.
 	###################################################################################
 	def Identity(self,TheInShp,TheIDShp,TheOutShp,JoinAttr,ClusterTolerance,Rel): 
 		try:
-			arcpy.analysis.Identity(TheInShp,TheIDShp,TheOutShp,JoinAttr,ClusterTolerance,Rel)
+			Join=JoinOption(JoinAttr)
+			if (NativeOverlay([TheInShp,TheIDShp],TheOutShp,ClusterTolerance) and Join is not None and
+			    (Rel in Defaults or str(Rel).upper()=="NO_RELATIONSHIPS")):
+				if NativeAnalysis.Identity(TheInShp,TheIDShp,TheOutShp,Join):
+					return
+			with self.Job.Geoprocessor():
+				arcpy.analysis.Identity(TheInShp,TheIDShp,TheOutShp,JoinAttr,ClusterTolerance,Rel)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Identity Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -109,7 +170,8 @@ class AnalysisInterface: # class to interface with analysis tools
 	###################################################################################
 	def Near(self,TheInShp,TheNearShp,SearchRadius,Location,Angle): 
 		try:
-			arcpy.analysis.Near(TheInShp,TheNearShp,SearchRadius,Location,Angle)
+			with self.Job.Geoprocessor():
+				arcpy.analysis.Near(TheInShp,TheNearShp,SearchRadius,Location,Angle)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Near Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -131,10 +193,18 @@ class AnalysisInterface: # class to interface with analysis tools
         #          analysis. To find the gaps in the output, set this option to NO_GAPS, and a
         #          feature will be created in these areas. To select these features, query the
         #          output feature class based on all the input feature's FID values being equal to -1.
+	#  Polygon shapefiles whose features do not overlap are combined natively
+	#  (NativeAnalysis.Union), anything else by the geoprocessor.
 	###################################################################################
 	def Union(self,TheInShp,TheOutShp,JoinAttr,ClusterTolerance,Gaps): 
 		try:
-			arcpy.analysis.Union(TheInShp,TheOutShp,JoinAttr,ClusterTolerance,Gaps)
+			Join=JoinOption(JoinAttr)
+			if (NativeOverlay(NativeManagement.NameList(TheInShp),TheOutShp,ClusterTolerance) and Join is not None and
+			    (Gaps in Defaults or str(Gaps).upper()=="GAPS")):
+				if NativeAnalysis.Union(TheInShp,TheOutShp,Join):
+					return
+			with self.Job.Geoprocessor():
+				arcpy.analysis.Union(TheInShp,TheOutShp,JoinAttr,ClusterTolerance,Gaps)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Union Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -0,0 +1,700 @@
+#######################################################################
+# ArcpyReplay
+#
+# Purpose: Record the geoprocessor calls of a corridor run and replay them without ArcGIS,
+#          so the scripts' own work (file naming, layer churn, Python loops) can be
+#          profiled on machines without arcpy and compared against the native tools.
+#
+#          Recording wraps the real arcpy: Record puts a recording module in sys.modules
+#          before the script modules import arcpy.  Every toolbox call (arcpy.management,
+#          analysis and cartography, GetCount and SelectLayerByLocation included) and the
+#          arcpy functions the scripts read from (Describe, ListFields, SearchCursor,
+#          GetParameterAsText, Raster, RasterToNumPyArray) is written to CallsFile in the
+#          record folder, one JSON object per line, with its time, its result and copies
+#          of the datasets it created, changed or deleted.  These are found by comparing
+#          the files of every path argument (or of a layer's source) before and after the
+#          call.
+#
+#          Replaying (ReplayModule, or the arcpy package in OfflineArcpy) answers each call
+#          with the recorded call of the same tool and arguments, comparing paths and
+#          layer names by base name (with the job numbers left out), or else the next
+#          unused call of that tool.  It copies the recorded datasets to the replayed
+#          call's paths and waits out the rest of the recorded time (times the scale).
+#          Geometry is not recorded: SearchCursor rows give None for shape fields.
+#          Calls made in pool worker processes (TiledSplitModule) are not recorded.
+#
+# Usage:
+#         Record:  import ArcpyReplay; Recorder=ArcpyReplay.Record(RecordFolder)   (before the script modules)
+#                  ... run ...; Recorder.Close()
+#         Replay:  PYTHONPATH=OfflineArcpy ARCPY_REPLAY=RecordFolder python2 SomeScript.py
+#
+# Command line:
+#         python ArcpyReplay.py record RecordFolder ParametersFile   (JSON object with the RiverCorridorModule parameters)
+#         python ArcpyReplay.py replay RecordFolder OutFolder [--scale s] [--profile StatsFile]
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import threading
+
+# Calls of a recorded run, one JSON object per line
+CallsFile="Calls.json"
+
+# Folders in a record folder: datasets written by the calls, and the run's inputs
+DatasetsFolder="Datasets"
+InputsFolder="Inputs"
+
+# Parameters of the recorded run
+ParametersFile="Parameters.json"
+
+# Toolboxes whose tools are recorded
+Toolboxes=("management","analysis","cartography")
+
+# Tools making layers: the source and layer arguments
+LayerTools={"management.MakeFeatureLayer":(0,1)}
+
+# Properties recorded for Describe, Raster and ListFields
+DescribeProperties=("dataType","shapeType","shapeFieldName","catalogPath","name","baseName","path",
+                    "extension","featureType","hasOID","OIDFieldName")
+ExtentProperties=("XMin","YMin","XMax","YMax")
+SpatialReferenceProperties=("name","factoryCode","type","linearUnitName")
+RasterProperties=("meanCellWidth","meanCellHeight","height","width","noDataValue","bandCount")
+FieldProperties=("name","type","length","precision","scale")
+
+# Parameters of RiverCorridorModule.RiverCorridor that are input datasets
+InputParameters=("TheInPolyFile","TheInPointFile","CenterlinePolyline","DEMRaster")
+
+# str and unicode under Python 2, str under Python 3
+StringTypes=(str,type(u""))
+
+################################################
+# Purpose: Whether an argument names a dataset file: a string ending in an extension
+# Input: Argument - call argument
+# Output: True or False
+def IsDatasetPath(Argument):
+	if not isinstance(Argument,StringTypes):
+		return(False)
+	return(re.match(r"^\.\w{1,8}$",os.path.splitext(Argument)[1]) is not None)
+
+################################################
+# Purpose: Files of a dataset: the file and its sidecars (.shx, .dbf, .prj, .shp.xml, ...)
+# Input: Path - dataset path and name
+# Output: Files - sorted list of paths
+def DatasetFiles(Path):
+	Folder=os.path.dirname(Path) or "."
+	Base=os.path.splitext(os.path.basename(Path))[0]
+	if not os.path.isdir(Folder):
+		return([])
+	Files=[]
+	for Name in os.listdir(Folder):
+		Rest=Name[len(Base):]
+		if (Name[0:len(Base)].lower()==Base.lower() and Rest[0:1]=="." and
+		    ("." not in Rest[1:] or Rest.lower()==".shp.xml")):
+			Files.append(os.path.join(Folder,Name))
+	return(sorted(Files))
+
+################################################
+# Purpose: Names, sizes and modification times of a dataset's files
+# Input: Path - dataset path and name
+# Output: Fingerprint - list of (name, size, time)
+def Fingerprint(Path):
+	Stats=[]
+	for File in DatasetFiles(Path):
+		Stat=os.stat(File)
+		Stats.append((os.path.basename(File),Stat.st_size,Stat.st_mtime))
+	return(Stats)
+
+################################################
+# Purpose: Copy a dataset's files to another dataset path, replacing what is there
+# Input: Files - list of (source file, extension) pairs
+#        Path - target dataset path and name
+def CopyDataset(Files,Path):
+	Base=os.path.splitext(Path)[0]
+	for File in DatasetFiles(Path):
+		os.remove(File)
+	for Source,Extension in Files:
+		shutil.copyfile(Source,Base+Extension)
+
+################################################
+# Purpose: Argument as compared between the recorded and the replayed run: paths by
+#          lower case base name, and names without an extension (layers, which carry the
+#          job number) with their digits left out
+# Input: Argument - call argument
+# Output: Key - JSON value
+def ArgumentKey(Argument):
+	if isinstance(Argument,StringTypes):
+		Name=os.path.basename(Argument.replace("\\","/")).lower()
+		if not IsDatasetPath(Name):
+			Name=re.sub(r"\d+","#",Name)
+		return(Name)
+	if isinstance(Argument,(list,tuple)):
+		return([ArgumentKey(Item) for Item in Argument])
+	return(JSONValue(Argument))
+
+################################################
+# Purpose: Value as written to the calls file: numbers, strings and booleans as they are,
+#          anything else (geometry, arcpy objects) as None
+# Input: Value - any value
+# Output: JSON value
+def JSONValue(Value):
+	if Value is None or isinstance(Value,(bool,int,float)+StringTypes):
+		return(Value)
+	try:
+		# long under Python 2, numpy scalars
+		if float(Value)==int(Value):
+			return(int(Value))
+		return(float(Value))
+	except (TypeError,ValueError,AttributeError):
+		return(None)
+
+################################################
+# Purpose: Properties of an arcpy object that are there
+# Input: Object - arcpy object (Describe, Raster, Field, extent)
+#        Names - property names
+# Output: Properties - dictionary of JSON values
+def ObjectProperties(Object,Names):
+	Properties={}
+	for Name in Names:
+		try:
+			Properties[Name]=JSONValue(getattr(Object,Name))
+		except Exception:
+			pass
+	return(Properties)
+
+###################################################################################
+# Layers made by the calls of a run, shared by recording and replaying
+###################################################################################
+class CallLog:
+
+	###################################################################################
+	# Constructor
+	###################################################################################
+	def __init__(self):
+		self.Layers={}
+		self.Lock=threading.RLock()
+
+	###################################################################################
+	# Dataset a call argument stands for: the source of a layer, the path otherwise
+	# Inputs:
+	#         Argument - call argument
+	###################################################################################
+	def Resolve(self,Argument):
+		while isinstance(Argument,StringTypes) and Argument in self.Layers:
+			Argument=self.Layers[Argument]
+		return(Argument)
+
+	###################################################################################
+	# Note the layers a call makes or deletes
+	# Inputs:
+	#         Tool - toolbox and tool name, e.g. "management.MakeFeatureLayer"
+	#         Arguments - call arguments
+	###################################################################################
+	def UpdateLayers(self,Tool,Arguments):
+		if Tool in LayerTools:
+			Source,Layer=LayerTools[Tool]
+			if len(Arguments)>Layer:
+				self.Layers[Arguments[Layer]]=self.Resolve(Arguments[Source])
+		elif Tool=="management.Delete" and len(Arguments)>0 and Arguments[0] in self.Layers:
+			del self.Layers[Arguments[0]]
+
+	###################################################################################
+	# Datasets of a call's arguments
+	# Inputs:
+	#         Arguments - call arguments
+	# Outputs:
+	#         list of (argument number, dataset path)
+	###################################################################################
+	def ArgumentDatasets(self,Arguments):
+		Datasets=[]
+		for Number,Argument in enumerate(Arguments):
+			Path=self.Resolve(Argument)
+			if IsDatasetPath(Path):
+				Datasets.append((Number,Path))
+		return(Datasets)
+
+###################################################################################
+# Records the arcpy calls of a run to a record folder
+###################################################################################
+class Recorder(CallLog):
+
+	###################################################################################
+	# Constructor
+	# Inputs:
+	#         Folder - record folder (created; an earlier recording in it is replaced)
+	#         Arcpy - the real arcpy module
+	###################################################################################
+	def __init__(self,Folder,Arcpy):
+		CallLog.__init__(self)
+		self.Folder=Folder
+		self.Arcpy=Arcpy
+		self.NumCalls=0
+		if os.path.isdir(os.path.join(Folder,DatasetsFolder)):
+			shutil.rmtree(os.path.join(Folder,DatasetsFolder))
+		os.makedirs(os.path.join(Folder,DatasetsFolder))
+		self.Log=open(os.path.join(Folder,CallsFile),"w")
+
+	###################################################################################
+	# Make a call, and record its time, result and the datasets it wrote
+	# Inputs:
+	#         Tool - name the call is recorded under, e.g. "management.Buffer" or "Describe"
+	#         Function - the arcpy function
+	#         Arguments, Keywords - call arguments
+	#         Encode - function(Result,Entry,Folder) adding the result to the entry and
+	#                  returning what the caller gets
+	###################################################################################
+	def Call(self,Tool,Function,Arguments,Keywords,Encode):
+		Datasets=self.ArgumentDatasets(Arguments)
+		Before=[Fingerprint(Path) for Number,Path in Datasets]
+		StartTime=time.time()
+		Result=Function(*Arguments,**Keywords)
+		Seconds=time.time()-StartTime
+		with self.Lock:
+			Number=self.NumCalls
+			self.NumCalls+=1
+			Entry={"Call":Number,"Tool":Tool,"Key":ArgumentKey(list(Arguments)),"Seconds":Seconds,"Datasets":[]}
+			for (Argument,Path),Old in zip(Datasets,Before):
+				New=Fingerprint(Path)
+				if New==Old:
+					continue
+				if New==[]:
+					Entry["Datasets"].append({"Argument":Argument,"Deleted":True})
+					continue
+				Copy=str(Number)+"_"+str(Argument)
+				os.makedirs(os.path.join(self.Folder,DatasetsFolder,Copy))
+				Base=os.path.splitext(os.path.basename(Path))[0]
+				Extensions=[]
+				for File in DatasetFiles(Path):
+					Extension=os.path.basename(File)[len(Base):]
+					shutil.copyfile(File,os.path.join(self.Folder,DatasetsFolder,Copy,"data"+Extension))
+					Extensions.append(Extension)
+				Entry["Datasets"].append({"Argument":Argument,"Folder":Copy,"Extensions":Extensions})
+			self.UpdateLayers(Tool,Arguments)
+			Result=Encode(Result,Entry,os.path.join(self.Folder,DatasetsFolder))
+			# outputs naming an argument (the output dataset or layer) replay as that argument
+			Entry["OutputArguments"]=dict((str(Output),Arguments.index(Value)) for Output,Value in enumerate(Entry.get("Outputs",[]))
+			                              if isinstance(Value,StringTypes) and Value in Arguments)
+			self.Log.write(json.dumps(Entry,sort_keys=True)+"\n")
+			self.Log.flush()
+		return(Result)
+
+	###################################################################################
+	# Close the calls file
+	###################################################################################
+	def Close(self):
+		self.Log.close()
+
+################################################
+# Purpose: Result encoders, one per recorded kind of call: each adds the result to the
+#          call's entry and returns what the caller gets
+# Input: Result - what the arcpy function returned
+#        Entry - the call's entry
+#        Folder - datasets folder of the recording
+# Output: Result for the caller
+def EncodeTool(Result,Entry,Folder):
+	Outputs=[]
+	try:
+		for Output in range(Result.outputCount):
+			Outputs.append(JSONValue(Result.getOutput(Output)))
+	except Exception:
+		pass
+	Entry["Outputs"]=Outputs
+	return(Result)
+
+def EncodeValue(Result,Entry,Folder):
+	Entry["Value"]=JSONValue(Result)
+	return(Result)
+
+def EncodeDescribe(Result,Entry,Folder):
+	Properties=ObjectProperties(Result,DescribeProperties)
+	for Name,Names in (("extent",ExtentProperties),("spatialReference",SpatialReferenceProperties)):
+		try:
+			Properties[Name]=ObjectProperties(getattr(Result,Name),Names)
+		except Exception:
+			pass
+	Entry["Properties"]=Properties
+	return(Result)
+
+def EncodeRaster(Result,Entry,Folder):
+	Properties=ObjectProperties(Result,RasterProperties)
+	Properties["extent"]=ObjectProperties(Result.extent,ExtentProperties)
+	Entry["Properties"]=Properties
+	return(Result)
+
+def EncodeFields(Result,Entry,Folder):
+	Fields=list(Result)
+	Entry["Fields"]=[ObjectProperties(Field,FieldProperties) for Field in Fields]
+	return(Fields)
+
+def EncodeCursor(Result,Entry,Folder):
+	# the cursor is read through here; the caller gets the recorded rows
+	Rows=[]
+	for Row in Result:
+		Values={}
+		for Name in Entry["Names"]:
+			try:
+				Values[Name]=Row.getValue(Name)
+			except Exception:
+				pass
+		Rows.append(Values)
+	Entry["Rows"]=[dict((Name,JSONValue(Value)) for Name,Value in Values.items()) for Values in Rows]
+	return([RecordedRow(Values) for Values in Rows])
+
+def EncodeArray(Result,Entry,Folder):
+	import numpy
+	Entry["Array"]=str(Entry["Call"])+".npy"
+	numpy.save(os.path.join(Folder,Entry["Array"]),Result)
+	return(Result)
+
+###################################################################################
+# Recording stand-ins for the arcpy module and its toolboxes
+###################################################################################
+class RecordingToolbox:
+
+	def __init__(self,TheRecorder,Name):
+		self.Recorder=TheRecorder
+		self.Name=Name
+
+	def __getattr__(self,Name):
+		Function=getattr(getattr(self.Recorder.Arcpy,self.Name),Name)
+		Tool=self.Name+"."+Name
+		return(lambda *Arguments,**Keywords: self.Recorder.Call(Tool,Function,Arguments,Keywords,EncodeTool))
+
+class RecordingModule:
+
+	Encoders={"Describe":EncodeDescribe,"ListFields":EncodeFields,"GetParameterAsText":EncodeValue,
+	          "Raster":EncodeRaster,"RasterToNumPyArray":EncodeArray}
+
+	def __init__(self,TheRecorder):
+		self.Recorder=TheRecorder
+
+	def __getattr__(self,Name):
+		if Name in Toolboxes:
+			return(RecordingToolbox(self.Recorder,Name))
+		if Name in self.Encoders:
+			Function=getattr(self.Recorder.Arcpy,Name)
+			return(lambda *Arguments,**Keywords: self.Recorder.Call(Name,Function,Arguments,Keywords,self.Encoders[Name]))
+		return(getattr(self.Recorder.Arcpy,Name))
+
+	def SearchCursor(self,Dataset,*Arguments,**Keywords):
+		Function=self.Recorder.Arcpy.SearchCursor
+		# the fields read: those asked for, or every field
+		Fields=Arguments[2] if len(Arguments)>2 else Keywords.get("fields","")
+		if Fields in ("",None):
+			Names=[Field.name for Field in self.Recorder.Arcpy.ListFields(Dataset)]
+		else:
+			Names=[Name.strip() for Name in Fields.split(";")]
+		def EncodeRows(Result,Entry,Folder):
+			Entry["Names"]=Names
+			return(EncodeCursor(Result,Entry,Folder))
+		return(self.Recorder.Call("SearchCursor",Function,(Dataset,)+Arguments,Keywords,EncodeRows))
+
+################################################
+# Purpose: Record the arcpy calls of the rest of the run: puts a recording module in
+#          place of arcpy (call before the script modules are imported)
+# Input: Folder - record folder
+# Output: TheRecorder - Recorder (Close it at the end of the run)
+def Record(Folder):
+	import arcpy
+	TheRecorder=Recorder(Folder,arcpy)
+	sys.modules["arcpy"]=RecordingModule(TheRecorder)
+	return(TheRecorder)
+
+###################################################################################
+# Recorded objects as seen by the scripts
+###################################################################################
+class RecordedObject:
+
+	###################################################################################
+	# Object whose attributes are recorded properties (names are not case sensitive, as
+	#  arcpy's are not)
+	###################################################################################
+	def __init__(self,Properties):
+		self.Properties=dict((Name.lower(),Value) for Name,Value in Properties.items())
+
+	def __getattr__(self,Name):
+		if Name.lower() not in self.__dict__.get("Properties",{}):
+			raise AttributeError(Name+" was not recorded")
+		Value=self.Properties[Name.lower()]
+		if isinstance(Value,dict):
+			return(RecordedObject(Value))
+		return(Value)
+
+class RecordedRow:
+
+	def __init__(self,Values):
+		self.Values=Values
+
+	def getValue(self,Name):
+		return(self.Values.get(Name))
+
+class ReplayResult:
+
+	def __init__(self,Outputs):
+		self.Outputs=Outputs
+		self.outputCount=len(Outputs)
+
+	def getOutput(self,Index):
+		return(self.Outputs[Index])
+
+	def __getitem__(self,Index):
+		return(self.Outputs[Index])
+
+	def __str__(self):
+		return(str(self.Outputs[0]) if self.Outputs!=[] else "")
+
+class ReplayEnvironment:
+
+	# settings that were never set read as None
+	def __getattr__(self,Name):
+		if Name.startswith("__"):
+			raise AttributeError(Name)
+		return(None)
+
+class Point:
+
+	def __init__(self,X=None,Y=None,Z=None,M=None,ID=None):
+		self.X=X
+		self.Y=Y
+		self.Z=Z
+		self.M=M
+		self.ID=ID
+
+###################################################################################
+# Replays a recorded run
+###################################################################################
+class Replayer(CallLog):
+
+	###################################################################################
+	# Constructor
+	# Inputs:
+	#         Folder - record folder ("" for none: every call then fails)
+	#         Scale - factor on the recorded call times (0 to not wait)
+	###################################################################################
+	def __init__(self,Folder,Scale=1.0):
+		CallLog.__init__(self)
+		self.Folder=Folder
+		self.Scale=Scale
+		self.Calls={}
+		if Folder!="":
+			with open(os.path.join(Folder,CallsFile)) as TheFile:
+				for Line in TheFile:
+					if Line.strip()!="":
+						Entry=json.loads(Line)
+						self.Calls.setdefault(Entry["Tool"],[]).append(Entry)
+		self.Used=set()
+		self.Seconds=0.0
+
+	###################################################################################
+	# Recorded call answering a call: the first unused one with the same arguments, or
+	#  else the first unused one of the tool
+	# Inputs:
+	#         Tool - recorded tool name
+	#         Arguments - call arguments
+	###################################################################################
+	def Match(self,Tool,Arguments):
+		Key=ArgumentKey(list(Arguments))
+		Unused=[Entry for Entry in self.Calls.get(Tool,[]) if Entry["Call"] not in self.Used]
+		if Unused==[]:
+			raise RuntimeError("no recorded "+Tool+" call left to replay")
+		Same=[Entry for Entry in Unused if Entry["Key"]==Key]
+		Entry=(Same+Unused)[0]
+		self.Used.add(Entry["Call"])
+		return(Entry)
+
+	###################################################################################
+	# Replay a call: write its recorded datasets to this call's paths and wait out the
+	#  rest of its recorded time
+	# Inputs:
+	#         Tool - recorded tool name
+	#         Arguments - call arguments
+	# Outputs:
+	#         Entry - the recorded call
+	###################################################################################
+	def Call(self,Tool,Arguments):
+		with self.Lock:
+			StartTime=time.time()
+			Entry=self.Match(Tool,Arguments)
+			for Dataset in Entry["Datasets"]:
+				if Dataset["Argument"]>=len(Arguments):
+					continue
+				Path=self.Resolve(Arguments[Dataset["Argument"]])
+				if Dataset.get("Deleted",False):
+					CopyDataset([],Path)
+				else:
+					Copy=os.path.join(self.Folder,DatasetsFolder,Dataset["Folder"])
+					CopyDataset([(os.path.join(Copy,"data"+Extension),Extension) for Extension in Dataset["Extensions"]],Path)
+			self.UpdateLayers(Tool,Arguments)
+			Wait=Entry["Seconds"]*self.Scale-(time.time()-StartTime)
+			if Wait>0:
+				time.sleep(Wait)
+			self.Seconds+=time.time()-StartTime
+		return(Entry)
+
+	###################################################################################
+	# Replayed and unused recorded calls by tool
+	# Outputs:
+	#         Report - multi-line string
+	###################################################################################
+	def Report(self):
+		Lines=["  "+"Tool".ljust(40)+"Replayed".rjust(10)+"Seconds".rjust(10)+"Unused".rjust(8)+"Seconds".rjust(10)]
+		for Tool in sorted(self.Calls):
+			Replayed=[Entry["Seconds"] for Entry in self.Calls[Tool] if Entry["Call"] in self.Used]
+			Unused=[Entry["Seconds"] for Entry in self.Calls[Tool] if Entry["Call"] not in self.Used]
+			Lines.append("  "+Tool.ljust(40)+str(len(Replayed)).rjust(10)+format(sum(Replayed)*self.Scale,".2f").rjust(10)+
+			             str(len(Unused)).rjust(8)+format(sum(Unused)*self.Scale,".2f").rjust(10))
+		return("\n".join(Lines))
+
+###################################################################################
+# Replaying stand-ins for the arcpy module and its toolboxes
+###################################################################################
+class ReplayToolbox:
+
+	def __init__(self,TheReplayer,Name):
+		self.Replayer=TheReplayer
+		self.Name=Name
+
+	def __getattr__(self,Name):
+		if Name.startswith("__"):
+			raise AttributeError(Name)
+		Tool=self.Name+"."+Name
+		def Replay(*Arguments,**Keywords):
+			Entry=self.Replayer.Call(Tool,Arguments)
+			Outputs=list(Entry.get("Outputs",[]))
+			for Output,Argument in Entry.get("OutputArguments",{}).items():
+				if Argument<len(Arguments):
+					Outputs[int(Output)]=Arguments[Argument]
+			return(ReplayResult(Outputs))
+		return(Replay)
+
+class ReplayModule:
+
+	###################################################################################
+	# arcpy stand-in replaying a recorded run
+	# Inputs:
+	#         Folder - record folder ("" for none)
+	#         Scale - factor on the recorded call times (0 to not wait)
+	###################################################################################
+	def __init__(self,Folder,Scale=1.0):
+		self.Replayer=Replayer(Folder,Scale)
+		self.env=ReplayEnvironment()
+		self.Point=Point
+		for Name in Toolboxes:
+			setattr(self,Name,ReplayToolbox(self.Replayer,Name))
+
+	def Describe(self,Dataset):
+		return(RecordedObject(self.Replayer.Call("Describe",[Dataset])["Properties"]))
+
+	def ListFields(self,Dataset,*Arguments):
+		return([RecordedObject(Field) for Field in self.Replayer.Call("ListFields",(Dataset,)+Arguments)["Fields"]])
+
+	def SearchCursor(self,Dataset,*Arguments,**Keywords):
+		return([RecordedRow(Values) for Values in self.Replayer.Call("SearchCursor",(Dataset,)+Arguments)["Rows"]])
+
+	def GetParameterAsText(self,Index):
+		return(self.Replayer.Call("GetParameterAsText",[Index])["Value"])
+
+	def Raster(self,Dataset):
+		return(RecordedObject(self.Replayer.Call("Raster",[Dataset])["Properties"]))
+
+	def RasterToNumPyArray(self,Dataset,*Arguments):
+		import numpy
+		Entry=self.Replayer.Call("RasterToNumPyArray",(Dataset,)+Arguments)
+		return(numpy.load(os.path.join(self.Replayer.Folder,DatasetsFolder,Entry["Array"])))
+
+	# answered from the replayed layers and files, not recorded
+	def Exists(self,Dataset):
+		return(Dataset in self.Replayer.Layers or os.path.exists(Dataset))
+
+	def AddMessage(self,Message):
+		print(Message)
+
+	def AddWarning(self,Message):
+		print(Message)
+
+################################################
+# Purpose: Run RiverCorridorModule.RiverCorridor with job parameters
+# Input: Parameters - dictionary of RiverCorridor parameters (WorkerService.JobArguments)
+# Output: Outputs - RiverCorridor's list of outputs
+def RunCorridor(Parameters):
+	from RiverCorridorModule import RiverCorridor
+	return(RiverCorridor(Parameters["TheInPolyFile"],Parameters["TheInPointFile"],
+	                     Parameters["CenterlinePolyline"],Parameters["TheOutFilePath"],
+	                     Parameters["TheFileName"],float(Parameters["MaxWidth"]),
+	                     float(Parameters["SplitLength"]),Parameters["SimplifyAnswer"],
+	                     Parameters["StartAnswer"],0,None,int(Parameters["TileSegments"]),
+	                     int(Parameters["Workers"]),Parameters["DEMRaster"],int(Parameters["Transects"]),
+	                     int(Parameters["Columnar"])))
+
+################################################
+# Purpose: Command line entry: record a run, or replay one
+# Input: Arguments - command line arguments after the script name
+def Main(Arguments):
+	import argparse
+	import WorkerService
+	Parser=argparse.ArgumentParser(description="Record and replay the geoprocessor calls of a corridor run")
+	Commands=Parser.add_subparsers(dest="Command")
+	RecordCommand=Commands.add_parser("record",help="run a corridor with ArcGIS, recording its arcpy calls")
+	RecordCommand.add_argument("RecordFolder")
+	RecordCommand.add_argument("ParametersFile",help="JSON object with RiverCorridor parameters")
+	ReplayCommand=Commands.add_parser("replay",help="run a recorded corridor again without ArcGIS")
+	ReplayCommand.add_argument("RecordFolder")
+	ReplayCommand.add_argument("OutFolder",help="folder for the replayed run's outputs")
+	ReplayCommand.add_argument("--scale",type=float,default=1.0,help="factor on the recorded call times (0 to not wait)")
+	ReplayCommand.add_argument("--profile",metavar="StatsFile",help="write cProfile statistics of the run")
+	Options=Parser.parse_args(Arguments)
+
+	if Options.Command=="record":
+		with open(Options.ParametersFile) as TheFile:
+			Parameters=WorkerService.JobArguments(json.load(TheFile))
+		# the inputs go with the recording, so the run can be replayed elsewhere
+		Inputs=os.path.join(Options.RecordFolder,InputsFolder)
+		if not os.path.isdir(Inputs):
+			os.makedirs(Inputs)
+		for Name in InputParameters:
+			if IsDatasetPath(Parameters[Name]):
+				Files=[(File,os.path.basename(File)[len(os.path.splitext(os.path.basename(Parameters[Name]))[0]):])
+				       for File in DatasetFiles(Parameters[Name])]
+				CopyDataset(Files,os.path.join(Inputs,os.path.basename(Parameters[Name])))
+		with open(os.path.join(Options.RecordFolder,ParametersFile),"w") as TheFile:
+			json.dump(Parameters,TheFile,indent=1,sort_keys=True)
+		TheRecorder=Record(Options.RecordFolder)
+		StartTime=time.time()
+		try:
+			RunCorridor(Parameters)
+		finally:
+			TheRecorder.Close()
+		print("Recorded "+str(TheRecorder.NumCalls)+" calls in "+format(time.time()-StartTime,".1f")+" s")
+	elif Options.Command=="replay":
+		# defaults for parameters added since the recording
+		with open(os.path.join(Options.RecordFolder,ParametersFile)) as TheFile:
+			Parameters=WorkerService.JobArguments(json.load(TheFile))
+		for Name in InputParameters:
+			if IsDatasetPath(Parameters[Name]):
+				Parameters[Name]=os.path.join(Options.RecordFolder,InputsFolder,os.path.basename(Parameters[Name].replace("\\","/")))
+		if not os.path.isdir(Options.OutFolder):
+			os.makedirs(Options.OutFolder)
+		Parameters["TheOutFilePath"]=os.path.join(Options.OutFolder,"")
+		Stand=ReplayModule(Options.RecordFolder,Options.scale)
+		sys.modules["arcpy"]=Stand
+		StartTime=time.time()
+		if Options.profile is not None:
+			import cProfile
+			Profiler=cProfile.Profile()
+			Profiler.runcall(RunCorridor,Parameters)
+			Profiler.dump_stats(Options.profile)
+		else:
+			RunCorridor(Parameters)
+		Seconds=time.time()-StartTime
+		print("Run "+format(Seconds,".2f")+" s: replayed geoprocessor calls "+format(Stand.Replayer.Seconds,".2f")+
+		      " s, scripts "+format(Seconds-Stand.Replayer.Seconds,".2f")+" s")
+		print(Stand.Replayer.Report())
+	else:
+		Parser.error("record or replay is required")
+
+if __name__=="__main__":
+	Main(sys.argv[1:])
@@ -10,6 +10,7 @@
 # Modified: 2/23/2013
 ###################################################################################
 import arcpy # import ArcGIS Python bindings
+import JobContext
 ###################################################################################
 # Class to interface with cartography
 ###################################################################################
@@ -18,9 +19,11 @@ class CartographyInterface: # class to interface with cartography tools
 	###################################################################################
 	# Constructor for the cartography interface class
 	###################################################################################
-	def __init__(self): # called when the class is created
-		# Set environment to allow file overwrite
-		arcpy.env.overwriteOutput=True  		
+	def __init__(self,Job=None): # called when the class is created
+		# Job whose environment (file overwrite, scratch workspace) the tools run with
+		if Job is None:
+			Job=JobContext.DefaultJob()
+		self.Job=Job
 	###################################################################################
 	# Converts 2 "parallel" lines to a single line in between
 	# Inputs: 
@@ -31,7 +34,8 @@ class CartographyInterface: # class to interface with cartography tools
 	###################################################################################
 	def Centerline(self,InPolyline,OutPolyline,MaxWidth,MinWidth): # parallel lines to centerline
 		try:
-			arcpy.cartography.CollapseDualLinesToCenterline(InPolyline,OutPolyline,MaxWidth,MinWidth)
+			with self.Job.Geoprocessor():
+				arcpy.cartography.CollapseDualLinesToCenterline(InPolyline,OutPolyline,MaxWidth,MinWidth)
 		
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Centerline Failed ("+str(err)+")") #raise "grabs" error for use in higher level	
@@ -47,7 +51,8 @@ class CartographyInterface: # class to interface with cartography tools
 	def SimpleLine(self,InPolyline,OutPolyline,Method,Tolerance): # simplify a polyline shapefile
 		try:
 			# Simplify line with no error checking
-			arcpy.cartography.SimplifyLine(InPolyline,OutPolyline,Method,Tolerance,"#","#","NO_CHECK")
+			with self.Job.Geoprocessor():
+				arcpy.cartography.SimplifyLine(InPolyline,OutPolyline,Method,Tolerance,"#","#","NO_CHECK")
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: SimplifyLine Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 		
@@ -69,7 +74,8 @@ class CartographyInterface: # class to interface with cartography tools
 			if Method=="BEZIER_INTERPOLATION":
 				Tolerance=0
 				Endpoint="#"
-			arcpy.cartography.SmoothLine(InPolyline,OutPolyline,Method,Tolerance,Endpoint,ErrorOpt)
+			with self.Job.Geoprocessor():
+				arcpy.cartography.SmoothLine(InPolyline,OutPolyline,Method,Tolerance,Endpoint,ErrorOpt)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: SmoothLine Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 				
@@ -0,0 +1,295 @@
+#######################################################################
+# ColumnarExport
+#
+# Purpose: Columnar copies of a corridor's outputs for dataframe readers, which otherwise
+#          spend most of their time parsing dBASE rows and shapefile geometry.  Segment
+#          polygons go to GeoParquet (geometry as WKB, with Station, CID and ReachID
+#          columns and the other attributes), in row groups of RowGroupRows segments
+#          sorted by Station, so readers can skip row groups by station and by the bbox
+#          column.  The per station tables (_metrics.dbf, _zonalstats.dbf) go to Arrow IPC
+#          files in record batches, which readers can memory map.
+#
+#          Records are streamed to the writers one row group (record batch) at a time, so
+#          memory use does not grow with the length of the corridor.  Geometry is written
+#          in 2D (Z values are dropped), with counterclockwise outer rings.  The CRS is
+#          written as PROJJSON from the .prj when pyproj is installed, and left unknown
+#          otherwise.
+#
+#          Needs pyarrow (optional: the rest of the scripts run without it).
+#
+# Usage:
+#         ExportSegments(DissShp,TheOutFilePath+TheFileName+"_segmented_diss.parquet",TheFileName)
+#         ExportTable(MetricsTable,TheOutFilePath+TheFileName+"_metrics.arrow")
+#         Files=ExportCorridor([BufferShp,DissShp],[MetricsTable,ZonalTable],TheFileName)
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import json
+import struct
+import numpy
+import ShapefileIO
+
+try:
+	import pyarrow
+	import pyarrow.ipc
+	import pyarrow.parquet
+except ImportError:
+	pyarrow=None
+
+try:
+	import pyproj
+except ImportError:
+	pyproj=None
+
+# Segments per row group, and rows per record batch of the tables
+RowGroupRows=65536
+
+# GeoParquet metadata version written
+GeoParquetVersion="1.1.0"
+
+# Fields written as the Station and CID columns (NEAR_FID is the CID of dissolved segments)
+StationField="STATION"
+CIDFields=("CID","NEAR_FID")
+
+# WKB geometry type codes
+WKBPolygon=3
+WKBMultiPolygon=6
+
+################################################
+# Purpose: Signed areas of rings (negative for clockwise, the shapefile outer rings)
+# Input: Rings - list of (n,2) closed rings
+# Output: Areas - array of signed areas
+def RingAreas(Rings):
+	return(numpy.array([0.5*numpy.sum(Ring[0:-1,0]*Ring[1:,1]-Ring[1:,0]*Ring[0:-1,1]) for Ring in Rings]))
+
+################################################
+# Purpose: Whether a point is inside a ring (even-odd rule)
+# Input: Ring - (n,2) closed ring
+#        X, Y - point coordinates
+# Output: True or False
+def InsideRing(Ring,X,Y):
+	X0,Y0=Ring[0:-1,0],Ring[0:-1,1]
+	X1,Y1=Ring[1:,0],Ring[1:,1]
+	Spans=(Y0>Y)!=(Y1>Y)
+	Crossings=X0[Spans]+(Y-Y0[Spans])*(X1[Spans]-X0[Spans])/(Y1[Spans]-Y0[Spans])
+	return(int(numpy.sum(Crossings>X))%2==1)
+
+################################################
+# Purpose: WKB of a polygon record: a Polygon, or a MultiPolygon when it has several
+#          outer rings.  Holes (counterclockwise in the shapefile) go with the outer ring
+#          containing them; outer rings are written counterclockwise and holes clockwise.
+# Input: Content - record content bytes (shape type onward)
+# Output: WKB - bytes, or None for a null shape
+def PolygonWKB(Content):
+	XY,PartStarts=ShapefileIO.RecordGeometry(Content)
+	if PartStarts==[]:
+		return(None)
+	Bounds=PartStarts+[XY.shape[0]]
+	Rings=[XY[Bounds[Part]:Bounds[Part+1]] for Part in range(len(PartStarts))]
+	Areas=RingAreas(Rings)
+	Outers=[Ring for Ring,Area in zip(Rings,Areas) if Area<=0]
+	Holes=[[] for Ring in Outers]
+	for Ring,Area in zip(Rings,Areas):
+		if Area>0:
+			Containing=[Number for Number,Outer in enumerate(Outers) if InsideRing(Outer,Ring[0,0],Ring[0,1])]
+			if Containing==[]:
+				# a counterclockwise ring on its own is an outer ring drawn the wrong way
+				Outers.append(Ring[::-1])
+				Holes.append([])
+			else:
+				Holes[Containing[-1]].append(Ring)
+	Polygons=[]
+	for Outer,TheHoles in zip(Outers,Holes):
+		Parts=[struct.pack("<BII",1,WKBPolygon,1+len(TheHoles))]
+		for Ring in [Outer]+TheHoles:
+			# reversed: shapefile outer rings are clockwise, WKB outer rings counterclockwise
+			Parts.append(struct.pack("<I",Ring.shape[0])+numpy.ascontiguousarray(Ring[::-1],dtype="<f8").tobytes())
+		Polygons.append(b"".join(Parts))
+	if len(Polygons)==1:
+		return(Polygons[0])
+	return(struct.pack("<BII",1,WKBMultiPolygon,len(Polygons))+b"".join(Polygons))
+
+################################################
+# Purpose: CRS of a shapefile as PROJJSON, from its .prj
+# Input: ShapefileName - shapefile path and name
+# Output: Crs - PROJJSON dictionary, or None when there is no .prj or no pyproj
+def ProjJSON(ShapefileName):
+	PrjFile=ShapefileIO.BaseName(ShapefileName)+".prj"
+	if pyproj is None or not os.path.exists(PrjFile):
+		return(None)
+	with open(PrjFile) as TheFile:
+		return(pyproj.CRS.from_wkt(TheFile.read()).to_json_dict())
+
+################################################
+# Purpose: GeoParquet file metadata for the geometry column
+# Input: Crs - PROJJSON dictionary (None for unknown)
+# Output: Metadata - dictionary
+def GeoMetadata(Crs):
+	Covering={"bbox":{Name:["bbox",Name] for Name in ("xmin","ymin","xmax","ymax")}}
+	return({"version":GeoParquetVersion,"primary_column":"geometry",
+	        "columns":{"geometry":{"encoding":"WKB","geometry_types":["Polygon","MultiPolygon"],
+	                               "crs":Crs,"orientation":"counterclockwise","covering":Covering}}})
+
+################################################
+# Purpose: Arrow array of a column decoded by ShapefileIO (NaN numbers become nulls)
+# Input: Values - NumPy array
+# Output: Array - pyarrow array
+def ArrowArray(Values):
+	if Values.dtype.kind=="U":
+		return(pyarrow.array(Values.tolist(),type=pyarrow.string()))
+	return(pyarrow.array(Values,from_pandas=True))
+
+################################################
+# Purpose: Check that pyarrow is installed
+def RequireArrow():
+	if pyarrow is None:
+		raise RuntimeError("pyarrow is needed for GeoParquet and Arrow output")
+
+###################################################################################
+# Class to write segment polygons to a GeoParquet file one row group at a time
+###################################################################################
+class GeoParquetWriter:
+
+	###################################################################################
+	# Constructor for the GeoParquet writer class
+	# Inputs:
+	#         OutFile - output GeoParquet path and name
+	#         Fields - list of (Name, pyarrow type) of the attribute columns after
+	#                  Station, CID and ReachID
+	#         Crs - PROJJSON dictionary (None for unknown)
+	###################################################################################
+	def __init__(self,OutFile,Fields,Crs):
+		try:
+			RequireArrow()
+			self.Name=OutFile
+			Box=pyarrow.struct([(Name,pyarrow.float64()) for Name in ("xmin","ymin","xmax","ymax")])
+			self.Schema=pyarrow.schema([("Station",pyarrow.float64()),("CID",pyarrow.int64()),
+			                            ("ReachID",pyarrow.string())]+list(Fields)+
+			                           [("bbox",Box),("geometry",pyarrow.binary())],
+			                           metadata={b"geo":json.dumps(GeoMetadata(Crs)).encode("utf-8")})
+			self.Writer=pyarrow.parquet.ParquetWriter(OutFile,self.Schema)
+			self.NumRecords=0
+		except Exception as err:
+			raise RuntimeError("** Error: GeoParquetWriter Failed ("+str(err)+")")
+
+	###################################################################################
+	# Writes one row group, sorted by Station
+	# Inputs:
+	#         Stations - array of stations
+	#         CIDs - array of segment CIDs
+	#         ReachID - reach identifier written on every row
+	#         Attributes - list of NumPy arrays, one per attribute field
+	#         Contents - list of polygon record contents (shape type onward)
+	###################################################################################
+	def WriteRowGroup(self,Stations,CIDs,ReachID,Attributes,Contents):
+		Order=numpy.argsort(Stations,kind="mergesort")
+		Boxes=numpy.array([ShapefileIO.RecordBox(Contents[Row]) or (numpy.nan,)*4 for Row in Order],
+		                  dtype=numpy.float64).reshape(-1,4)
+		Box=pyarrow.StructArray.from_arrays([pyarrow.array(Boxes[:,Column],from_pandas=True) for Column in range(4)],
+		                                    ["xmin","ymin","xmax","ymax"])
+		Columns=[pyarrow.array(numpy.asarray(Stations,dtype=numpy.float64)[Order]),
+		         pyarrow.array(numpy.asarray(CIDs,dtype=numpy.int64)[Order]),
+		         pyarrow.array([ReachID]*Order.shape[0],type=pyarrow.string())]
+		Columns=Columns+[ArrowArray(Values[Order]) for Values in Attributes]
+		Columns=Columns+[Box,pyarrow.array([PolygonWKB(Contents[Row]) for Row in Order],type=pyarrow.binary())]
+		self.Writer.write_table(pyarrow.Table.from_arrays(Columns,schema=self.Schema),row_group_size=max(Order.shape[0],1))
+		self.NumRecords+=Order.shape[0]
+
+	###################################################################################
+	# Writes the file footer and closes the file
+	###################################################################################
+	def Close(self):
+		try:
+			self.Writer.close()
+		except Exception as err:
+			raise RuntimeError("** Error: GeoParquetWriter Close Failed ("+str(err)+")")
+
+################################################
+# Purpose: Write segment polygons to GeoParquet, in row groups sorted by Station
+# Input: SegmentShapefile - segment polygon shapefile (_segmented.shp or _segmented_diss.shp)
+#                           with a Station field and a CID (or NEAR_FID) field
+#        OutFile - output GeoParquet path and name
+#        ReachID - reach identifier written on every row (e.g. TheFileName)
+#        TheRowGroupRows - segments per row group
+# Output: NumRecords - number of segments written
+def ExportSegments(SegmentShapefile,OutFile,ReachID,TheRowGroupRows=RowGroupRows):
+	try:
+		RequireArrow()
+		Reader=ShapefileIO.ShapefileReader(SegmentShapefile)
+		Names=[Field[0] for Field in Reader.Fields]
+		Upper=[Name.upper() for Name in Names]
+		if StationField not in Upper:
+			raise RuntimeError(SegmentShapefile+" has no Station field")
+		Stations=Reader.Column(StationField).astype(numpy.float64)
+		CIDNames=[Name for Name in CIDFields if Name in Upper]
+		if CIDNames!=[]:
+			CIDs=Reader.Column(CIDNames[0])
+			CIDs=numpy.where(numpy.isnan(CIDs),-1,CIDs).astype(numpy.int64) if CIDs.dtype.kind=="f" else CIDs
+		else:
+			CIDs=Reader.Column("FID")
+		# the other attributes follow as they are
+		Others=[Name for Name,Key in zip(Names,Upper) if Key!=StationField and Key not in CIDNames[0:1]]
+		Columns=[Reader.Column(Name) for Name in Others]
+		Fields=[(Name,ArrowArray(Values[0:1]).type) for Name,Values in zip(Others,Columns)]
+
+		# stations in order across the row groups, each sorted again as it is written
+		Order=numpy.argsort(Stations,kind="mergesort")
+		Writer=GeoParquetWriter(OutFile,Fields,ProjJSON(SegmentShapefile))
+		try:
+			for Start in range(0,Order.shape[0],max(int(TheRowGroupRows),1)):
+				Rows=Order[Start:Start+max(int(TheRowGroupRows),1)]
+				Writer.WriteRowGroup(Stations[Rows],CIDs[Rows],ReachID,[Values[Rows] for Values in Columns],
+				                     [Reader.RecordContent(int(Row)) for Row in Rows])
+		finally:
+			Writer.Close()
+		return(Writer.NumRecords)
+	except Exception as err:
+		raise RuntimeError("** Error: ExportSegments Failed ("+str(err)+")")
+
+################################################
+# Purpose: Write a dBASE table to an Arrow IPC file in record batches
+# Input: DbfTable - dBASE table path and name (e.g. _metrics.dbf)
+#        OutFile - output Arrow IPC file path and name
+#        BatchRows - rows per record batch
+# Output: NumRecords - number of rows written
+def ExportTable(DbfTable,OutFile,BatchRows=RowGroupRows):
+	try:
+		RequireArrow()
+		Reader=ShapefileIO.TableReader(DbfTable)
+		Names=[Field[0] for Field in Reader.Fields]
+		Columns=[Reader.Column(Name) for Name in Names]
+		Schema=pyarrow.schema([(Name,ArrowArray(Values[0:1]).type) for Name,Values in zip(Names,Columns)])
+		Sink=pyarrow.OSFile(OutFile,"wb")
+		try:
+			Writer=pyarrow.ipc.new_file(Sink,Schema)
+			for Start in range(0,Reader.NumRecords,max(int(BatchRows),1)):
+				Stop=Start+max(int(BatchRows),1)
+				Writer.write_batch(pyarrow.record_batch([ArrowArray(Values[Start:Stop]) for Values in Columns],schema=Schema))
+			Writer.close()
+		finally:
+			Sink.close()
+		return(Reader.NumRecords)
+	except Exception as err:
+		raise RuntimeError("** Error: ExportTable Failed ("+str(err)+")")
+
+################################################
+# Purpose: Columnar copies of a corridor's outputs, next to them: .parquet for segment
+#          shapefiles and .arrow for tables
+# Input: SegmentShapefiles - list of segment polygon shapefiles ("" entries are skipped)
+#        Tables - list of per station dBASE tables ("" or missing entries are skipped)
+#        ReachID - reach identifier for the segment rows
+# Output: Files - list of the files written
+def ExportCorridor(SegmentShapefiles,Tables,ReachID):
+	Files=[]
+	for SegmentShapefile in SegmentShapefiles:
+		if SegmentShapefile!="":
+			OutFile=ShapefileIO.BaseName(SegmentShapefile)+".parquet"
+			ExportSegments(SegmentShapefile,OutFile,ReachID)
+			Files.append(OutFile)
+	for Table in Tables:
+		if Table!="" and os.path.exists(Table):
+			OutFile=os.path.splitext(Table)[0]+".arrow"
+			ExportTable(Table,OutFile)
+			Files.append(OutFile)
+	return(Files)
@@ -0,0 +1,272 @@
+#######################################################################
+# CornerDetection
+#
+# Purpose: Find the four corner points of a channel polygon (2 sides, 2 ends) from its
+#          outer ring alone, and write them as the corner point shapefile
+#          Polygon2Centerline splits the boundary at, with the same "Id" coding:
+#          0 for DS left, 1 for DS right, 10 for US left, 11 for US right.
+#
+#          Turning angles: the turn of the ring at every vertex is measured between the
+#          chords to the points one Window of ring length before and after it, so
+#          densely digitized corners turn as sharply as single vertices.  The sharpest
+#          convex turns (at least a Window apart) are the candidate corners, and of the
+#          sets of four candidates whose opposite sides pair off into two long sides
+#          and two ends (both sides longer than either end) the one turning most is
+#          used.  The upstream end is the end nearest UpstreamXY when it is given and
+#          otherwise the narrower end (channels widen downstream).
+#
+#          Cross-lines: when lines across the channel at the upstream and downstream
+#          ends are supplied, the corners are instead the outermost points where the
+#          ring meets each line.
+#
+# Usage:
+#         DetectCorners(TheInPolyFile,CornerPoints)
+#         DetectCorners(TheInPolyFile,CornerPoints,UpstreamLine=USLine,DownstreamLine=DSLine)
+#
+# Modified: 10/19/2026
+#######################################################################
+import struct
+import numpy
+import ShapefileIO
+
+# Window (fraction of the mean channel width, twice the area over the perimeter)
+#  the turning angles are measured over
+WindowFraction=0.25
+
+# Sharpest turns tried as corners
+CornerCandidates=8
+
+# Corner point field and the Ids of the corners in ring order (clockwise from the
+#  upstream end of the left side), as written to the corner point shapefile
+CornerFields=[("Id","N",6,0)]
+CornerIds=(10,0,1,11)
+
+################################################
+# Purpose: Outer ring of the single polygon of a shapefile
+# Input: PolygonShapefile - polygon shapefile with 1 feature
+# Output: Ring - (n,2) array of the largest ring, clockwise, without its closing vertex
+def OuterRing(PolygonShapefile):
+	import ShapefileProperties as ShpProp
+	XY,PartOffsets,FeatureParts,ShapeType=ShpProp.GeometryArrays(PolygonShapefile)
+	if ShapeType not in (ShapefileIO.PolygonShape,ShapefileIO.PolygonZShape,ShapefileIO.PolygonMShape):
+		raise RuntimeError(PolygonShapefile+" is not a polygon shapefile")
+	if FeatureParts.shape[0]!=2 or FeatureParts[1]==0:
+		raise RuntimeError(PolygonShapefile+" does not hold exactly 1 polygon")
+	# the ring with the largest area (clockwise rings are positive, holes negative)
+	RingAreas=ShpProp.AreaKernel(XY,PartOffsets,numpy.arange(PartOffsets.shape[0]))
+	Part=int(numpy.argmax(numpy.abs(RingAreas)))
+	Ring=XY[PartOffsets[Part]:PartOffsets[Part+1]]
+	if Ring.shape[0]>1 and (Ring[0]==Ring[-1]).all():
+		Ring=Ring[0:-1]
+	# repeated vertices have no direction
+	Keep=numpy.any(Ring!=numpy.roll(Ring,1,axis=0),axis=1)
+	Ring=Ring[Keep|(numpy.arange(Ring.shape[0])==0)]
+	if RingAreas[Part]<0:
+		Ring=Ring[::-1]
+	if Ring.shape[0]<4:
+		raise RuntimeError(PolygonShapefile+" has fewer than 4 distinct vertices")
+	return(Ring)
+
+################################################
+# Purpose: Distances along a closed ring
+# Input: Ring - (n,2) array without the closing vertex
+# Output: [S, Perimeter] - S (n,) ring distance of each vertex from the first
+def RingStations(Ring):
+	Lengths=numpy.hypot(*(numpy.roll(Ring,-1,axis=0)-Ring).T)
+	S=numpy.concatenate([[0.0],numpy.cumsum(Lengths)[0:-1]])
+	return([S,float(Lengths.sum())])
+
+################################################
+# Purpose: Points at ring distances (wrapping around the ring)
+# Input: Ring - (n,2) array without the closing vertex
+#        S, Perimeter - from RingStations
+#        At - (k,) ring distances
+# Output: Points - (k,2) array
+def RingPoints(Ring,S,Perimeter,At):
+	ClosedS=numpy.append(S,Perimeter)
+	Closed=numpy.vstack([Ring,Ring[0:1]])
+	At=numpy.mod(At,Perimeter)
+	return(numpy.column_stack([numpy.interp(At,ClosedS,Closed[:,0]),numpy.interp(At,ClosedS,Closed[:,1])]))
+
+################################################
+# Purpose: Turn of a clockwise ring at every vertex, measured over a window of ring length
+# Input: Ring - (n,2) clockwise ring without the closing vertex
+#        Window - ring length before and after each vertex the chords reach
+# Output: Turns - (n,) radians, positive for convex (right hand) turns
+def TurningAngles(Ring,Window):
+	S,Perimeter=RingStations(Ring)
+	Before=RingPoints(Ring,S,Perimeter,S-Window)
+	After=RingPoints(Ring,S,Perimeter,S+Window)
+	In=Ring-Before
+	Out=After-Ring
+	Cross=In[:,0]*Out[:,1]-In[:,1]*Out[:,0]
+	Dot=(In*Out).sum(axis=1)
+	return(-numpy.arctan2(Cross,Dot))
+
+################################################
+# Purpose: Candidate corners - the sharpest turns, each the sharpest within a Window
+# Input: Turns - from TurningAngles
+#        S, Perimeter - from RingStations
+#        Window - ring length between candidates
+#        NumCandidates - most candidates returned
+# Output: Candidates - vertex indices, sharpest first
+def TurnCandidates(Turns,S,Perimeter,Window,NumCandidates=CornerCandidates):
+	Candidates=[]
+	Open=Turns>0
+	for Vertex in numpy.argsort(-Turns,kind="mergesort"):
+		if len(Candidates)==NumCandidates or Turns[Vertex]<=0:
+			break
+		if not Open[Vertex]:
+			continue
+		Candidates.append(int(Vertex))
+		# no other candidate within a Window of this one
+		Apart=numpy.abs(S-S[Vertex])
+		Open[numpy.minimum(Apart,Perimeter-Apart)<Window]=False
+	return(Candidates)
+
+################################################
+# Purpose: The four corners of a clockwise ring from its turning angles
+# Input: Ring - (n,2) clockwise ring without the closing vertex
+#        Window - ring length the turning angles are measured over
+# Output: Corners - (4,) vertex indices in ring order, the first starting a side (so the
+#          sides run from corner 0 to 1 and from 2 to 3, the ends from 1 to 2 and 3 to 0)
+def TurningCorners(Ring,Window):
+	import itertools
+	S,Perimeter=RingStations(Ring)
+	Turns=TurningAngles(Ring,Window)
+	Candidates=numpy.sort(TurnCandidates(Turns,S,Perimeter,Window))
+	if Candidates.shape[0]<4:
+		raise RuntimeError("fewer than 4 corners found (try a smaller window)")
+
+	### Every set of 4 candidates in ring order, with the ring length of the 4 sides
+	Sets=Candidates[numpy.array(list(itertools.combinations(range(Candidates.shape[0]),4)))]
+	Starts=S[Sets]
+	Sides=numpy.diff(numpy.column_stack([Starts,Starts[:,0]+Perimeter]),axis=1)
+
+	### The longest pair of opposite sides are the channel sides; the set must have both
+	###  longer than either end, and of those the one turning most is used
+	SecondPair=Sides[:,1]+Sides[:,3]>Sides[:,0]+Sides[:,2]
+	Sets[SecondPair]=numpy.roll(Sets[SecondPair],-1,axis=1)
+	Sides[SecondPair]=numpy.roll(Sides[SecondPair],-1,axis=1)
+	Valid=numpy.minimum(Sides[:,0],Sides[:,2])>numpy.maximum(Sides[:,1],Sides[:,3])
+	if not Valid.any():
+		raise RuntimeError("no 4 corners pair off into 2 sides and 2 ends")
+	Score=numpy.where(Valid,Turns[Sets].sum(axis=1),-numpy.inf)
+	return(Sets[int(numpy.argmax(Score))])
+
+################################################
+# Purpose: Corner points ordered from the upstream end of the left side (see CornerIds)
+# Input: Points - (4,2) corner points in clockwise ring order, corner 0 starting a side
+#        UpstreamXY - (x,y) near the upstream end, or None for the narrower end
+# Output: Points - (4,2) array in CornerIds order
+def OrderCorners(Points,UpstreamXY=None):
+	# ends run from corner 1 to 2 and from 3 to 0
+	Mids=numpy.array([(Points[1]+Points[2])/2.0,(Points[3]+Points[0])/2.0])
+	if UpstreamXY is None:
+		Widths=numpy.hypot(*(Points[[2,0]]-Points[[1,3]]).T)
+		UpstreamEnd=int(numpy.argmin(Widths))
+	else:
+		UpstreamEnd=int(numpy.argmin(numpy.hypot(*(Mids-numpy.asarray(UpstreamXY,dtype=float)).T)))
+	# walking a clockwise ring, the left side runs downstream from the upstream end
+	if UpstreamEnd==0:
+		Points=numpy.roll(Points,-2,axis=0)
+	return(Points)
+
+################################################
+# Purpose: Where a cross-line meets a ring, at the outermost crossings along the line
+# Input: Ring - (n,2) clockwise ring without the closing vertex
+#        S - from RingStations
+#        LineXY - (m,2) cross-line vertices
+# Output: [Points, At] - (2,2) crossing points and (2,) their ring distances
+def CrossLineMeets(Ring,S,LineXY):
+	A0=Ring
+	A1=numpy.roll(Ring,-1,axis=0)
+	B0=LineXY[0:-1]
+	B1=LineXY[1:]
+	# every ring segment against every cross-line segment
+	D=A1-A0
+	E=B1-B0
+	Denominator=D[:,None,0]*E[None,:,1]-D[:,None,1]*E[None,:,0]
+	F=B0[None,:,:]-A0[:,None,:]
+	with numpy.errstate(divide="ignore",invalid="ignore"):
+		T=(F[:,:,0]*E[None,:,1]-F[:,:,1]*E[None,:,0])/Denominator
+		U=(F[:,:,0]*D[:,None,1]-F[:,:,1]*D[:,None,0])/Denominator
+	RingNums,LineNums=numpy.nonzero((T>=0)&(T<1)&(U>=0)&(U<=1))
+	if RingNums.shape[0]<2:
+		raise RuntimeError("a cross-line does not cross the polygon")
+	T=T[RingNums,LineNums]
+	# distance along the cross-line of each crossing
+	LineS=numpy.concatenate([[0.0],numpy.cumsum(numpy.hypot(*E.T))])
+	Along=LineS[LineNums]+U[RingNums,LineNums]*numpy.hypot(*E[LineNums].T)
+	Outer=[int(numpy.argmin(Along)),int(numpy.argmax(Along))]
+	Points=A0[RingNums[Outer]]+T[Outer][:,None]*D[RingNums[Outer]]
+	At=S[RingNums[Outer]]+T[Outer]*numpy.hypot(*D[RingNums[Outer]].T)
+	return([Points,At])
+
+################################################
+# Purpose: The four corners of a clockwise ring where it meets upstream and downstream
+#          cross-lines
+# Input: Ring - (n,2) clockwise ring without the closing vertex
+#        UpstreamXY, DownstreamXY - (m,2) vertices of the cross-lines
+# Output: Points - (4,2) array in CornerIds order
+def CrossLineCorners(Ring,UpstreamXY,DownstreamXY):
+	S,Perimeter=RingStations(Ring)
+	USPoints,USAt=CrossLineMeets(Ring,S,UpstreamXY)
+	DSPoints,DSAt=CrossLineMeets(Ring,S,DownstreamXY)
+	Points=numpy.vstack([USPoints,DSPoints])
+	Upstream=numpy.array([True,True,False,False])
+	Order=numpy.argsort(numpy.concatenate([USAt,DSAt]),kind="mergesort")
+	Points=Points[Order]
+	Upstream=Upstream[Order]
+	# rotate so the ends (the pairs on the same line) are corners 1 to 2 and 3 to 0,
+	#  the upstream one last
+	for Shift in range(4):
+		if (numpy.roll(Upstream,-Shift)==[True,False,False,True]).all():
+			return(numpy.roll(Points,-Shift,axis=0))
+	raise RuntimeError("the cross-lines cross each other inside the polygon")
+
+################################################
+# Purpose: Vertices of the first line in a polyline shapefile
+# Input: LineShapefile - polyline shapefile
+# Output: XY - (m,2) array
+def FirstLine(LineShapefile):
+	Reader=ShapefileIO.ShapefileReader(LineShapefile)
+	for RecordNum in range(Reader.NumRecords):
+		Content=Reader.RecordContent(RecordNum)
+		if struct.unpack("<i",Content[0:4])[0]!=ShapefileIO.NullShape:
+			return(ShapefileIO.RecordGeometry(Content)[0])
+	raise RuntimeError(LineShapefile+" has no lines")
+
+################################################
+# Purpose: Write the corner points of a channel polygon to a point shapefile with an "Id"
+#          field coded as Polygon2Centerline expects
+# Input: PolygonShapefile - polygon shapefile with 1 polygon with ~4 sides (2 sides, 2 ends)
+#        OutPointFile - output point shapefile path and name
+#        Window - ring length turning angles are measured over (0 for WindowFraction of
+#                 the mean channel width)
+#        UpstreamXY - (x,y) near the upstream end (None for the narrower end)
+#        UpstreamLine, DownstreamLine - polyline shapefiles crossing the channel at its
+#                 ends ("" to use the turning angles)
+# Output: OutPointFile
+def DetectCorners(PolygonShapefile,OutPointFile,Window=0,UpstreamXY=None,UpstreamLine="",DownstreamLine=""):
+	try:
+		Ring=OuterRing(PolygonShapefile)
+		if UpstreamLine!="" and DownstreamLine!="":
+			Points=CrossLineCorners(Ring,FirstLine(UpstreamLine),FirstLine(DownstreamLine))
+		else:
+			if Window<=0:
+				import ShapefileProperties as ShpProp
+				Closed=numpy.vstack([Ring,Ring[0:1]])
+				Offsets=numpy.array([0,Closed.shape[0]])
+				Feature=numpy.array([0,1])
+				Width=2*ShpProp.AreaKernel(Closed,Offsets,Feature)[0]/ShpProp.LengthKernel(Closed,Offsets,Feature)[0]
+				Window=WindowFraction*Width
+			Points=OrderCorners(Ring[TurningCorners(Ring,Window)],UpstreamXY)
+
+		Contents=[struct.pack("<i2d",ShapefileIO.PointShape,X,Y) for X,Y in Points]
+		Rows=[ShapefileIO.NewDbfRow(CornerFields,[Id]) for Id in CornerIds]
+		ShapefileIO.WriteRecords(OutPointFile,ShapefileIO.PointShape,Contents,
+		                         ShapefileIO.NewDbfHeader(CornerFields,len(Rows)),Rows,PolygonShapefile)
+		return(OutPointFile)
+	except Exception as err:
+		raise RuntimeError("** Error: DetectCorners Failed ("+str(err)+")")
@@ -0,0 +1,194 @@
+#######################################################################
+# GeometryCore
+#
+# Purpose: Compact in memory geometry for large datasets.  A GeometryArray holds every
+#          vertex of a dataset in one contiguous (n,2) array with part and feature
+#          offsets (the layout of ShapefileProperties.GeometryArrays), instead of lists of
+#          coordinate tuples or arcpy geometries; Feature is a light view of one feature of
+#          it.  Both classes use __slots__, so millions of features cost no per instance
+#          dictionaries.
+#
+#          Quantized coordinates (opt in): vertices are stored as int32 steps of Scale from
+#          a per dataset Origin (the lower left of its extent), 8 bytes a vertex instead of
+#          16, and within Scale/2 of the original coordinates.  A Scale of 0.001 (mm for
+#          projected data) keeps survey precision over extents up to about 2,000 km.
+#
+#          Memory per vertex: ~100 bytes as a tuple of floats in a list, 16 bytes as
+#          doubles, 8 bytes quantized.
+#
+# Usage:
+#         Geometry=ReadGeometry(Shapefile,0.001)
+#         for Feature in Geometry:
+#             Parts=Feature.Parts()
+#         Areas=Geometry.Measures()["Area"]
+#
+# Modified: 10/19/2026
+#######################################################################
+import numpy
+
+# Largest quantized coordinate step count (int32)
+QuantizedLimit=2**31-1
+
+###################################################################################
+# Class holding the geometry of a dataset in flat arrays
+###################################################################################
+class GeometryArray(object):
+	__slots__=("ShapeType","XY","PartOffsets","FeatureParts","Origin","Scale")
+
+	###################################################################################
+	# Constructor for the geometry array class
+	# Inputs:
+	#         ShapeType - shape type code (ShapefileIO)
+	#         XY - (n,2) float64 coordinates, or int32 steps when Scale is given
+	#         PartOffsets - (parts+1,) vertex offsets of the parts
+	#         FeatureParts - (features+1,) part offsets of the features
+	#         Origin - (x,y) of quantized step 0 (None for float coordinates)
+	#         Scale - coordinate step of quantized coordinates (0 for float coordinates)
+	###################################################################################
+	def __init__(self,ShapeType,XY,PartOffsets,FeatureParts,Origin=None,Scale=0):
+		self.ShapeType=ShapeType
+		self.XY=XY
+		self.PartOffsets=PartOffsets
+		self.FeatureParts=FeatureParts
+		self.Origin=Origin
+		self.Scale=Scale
+
+	def __len__(self):
+		return(self.FeatureParts.shape[0]-1)
+
+	def __getitem__(self,FeatureNum):
+		if FeatureNum<0:
+			FeatureNum+=len(self)
+		if FeatureNum<0 or FeatureNum>=len(self):
+			raise IndexError("feature number out of range")
+		return(Feature(self,FeatureNum))
+
+	def __iter__(self):
+		for FeatureNum in range(len(self)):
+			yield Feature(self,FeatureNum)
+
+	###################################################################################
+	# Whether the coordinates are quantized
+	###################################################################################
+	def Quantized(self):
+		return(self.Scale>0)
+
+	###################################################################################
+	# Bytes held by the arrays
+	###################################################################################
+	def NumBytes(self):
+		return(self.XY.nbytes+self.PartOffsets.nbytes+self.FeatureParts.nbytes)
+
+	###################################################################################
+	# Float coordinates of a range of vertices
+	# Inputs:
+	#         First, Last - vertex range (Last excluded; None for all vertices)
+	# Output:
+	#         XY - (k,2) float64 array (a view when the coordinates are not quantized)
+	###################################################################################
+	def Coordinates(self,First=0,Last=None):
+		XY=self.XY[First:Last]
+		if self.Scale>0:
+			return(XY*self.Scale+self.Origin)
+		return(XY)
+
+	###################################################################################
+	# Copy with quantized coordinates
+	# Inputs:
+	#         Scale - coordinate step (e.g. 0.001 for mm in a metre projection)
+	# Output:
+	#         GeometryArray with int32 coordinates, within Scale/2 of these
+	###################################################################################
+	def Quantize(self,Scale):
+		if Scale<=0:
+			raise RuntimeError("quantizing needs a positive scale")
+		XY=self.Coordinates()
+		if XY.shape[0]==0:
+			Origin=numpy.zeros(2)
+		else:
+			Origin=numpy.floor(XY.min(axis=0)/Scale)*Scale
+		Steps=numpy.rint((XY-Origin)/Scale)
+		if Steps.shape[0]>0 and Steps.max()>QuantizedLimit:
+			raise RuntimeError("extent too large to quantize at a scale of "+format(Scale))
+		return(GeometryArray(self.ShapeType,Steps.astype(numpy.int32),self.PartOffsets,self.FeatureParts,Origin,Scale))
+
+	###################################################################################
+	# Copy with float coordinates
+	###################################################################################
+	def Dequantize(self):
+		return(GeometryArray(self.ShapeType,self.Coordinates(),self.PartOffsets,self.FeatureParts))
+
+	###################################################################################
+	# Geometry measures of every feature (ShapefileProperties kernels)
+	# Output:
+	#         dictionary of "Area", "Length", "VertexCount", "Centroid" and "Bounds" arrays
+	###################################################################################
+	def Measures(self):
+		import ShapefileProperties as ShpProp
+		XY=self.Coordinates()
+		return({"Area":ShpProp.AreaKernel(XY,self.PartOffsets,self.FeatureParts,self.ShapeType),
+		        "Length":ShpProp.LengthKernel(XY,self.PartOffsets,self.FeatureParts),
+		        "VertexCount":ShpProp.VertexCountKernel(self.PartOffsets,self.FeatureParts),
+		        "Centroid":ShpProp.CentroidKernel(XY,self.PartOffsets,self.FeatureParts,self.ShapeType),
+		        "Bounds":ShpProp.BoundsKernel(XY,self.PartOffsets,self.FeatureParts)})
+
+###################################################################################
+# Class viewing one feature of a GeometryArray (no coordinates of its own)
+###################################################################################
+class Feature(object):
+	__slots__=("Geometry","FeatureNum")
+
+	def __init__(self,Geometry,FeatureNum):
+		self.Geometry=Geometry
+		self.FeatureNum=FeatureNum
+
+	###################################################################################
+	# Vertex range of the feature in the geometry arrays
+	###################################################################################
+	def VertexRange(self):
+		Offsets=self.Geometry.PartOffsets[self.Geometry.FeatureParts[self.FeatureNum:self.FeatureNum+2]]
+		return(int(Offsets[0]),int(Offsets[1]))
+
+	def NumVertices(self):
+		First,Last=self.VertexRange()
+		return(Last-First)
+
+	def NumParts(self):
+		return(int(self.Geometry.FeatureParts[self.FeatureNum+1]-self.Geometry.FeatureParts[self.FeatureNum]))
+
+	def IsNull(self):
+		return(self.NumParts()==0)
+
+	###################################################################################
+	# Float coordinates of the feature's parts
+	# Output:
+	#         Parts - list of (k,2) arrays, one per part
+	###################################################################################
+	def Parts(self):
+		Geometry=self.Geometry
+		PartNums=range(int(Geometry.FeatureParts[self.FeatureNum]),int(Geometry.FeatureParts[self.FeatureNum+1]))
+		return([Geometry.Coordinates(int(Geometry.PartOffsets[Part]),int(Geometry.PartOffsets[Part+1])) for Part in PartNums])
+
+	###################################################################################
+	# The feature's vertices as a list of (x,y) tuples, as ShapefileProperties.Coordinates
+	#  gives them (all parts together)
+	###################################################################################
+	def Coordinates(self):
+		First,Last=self.VertexRange()
+		return([tuple(Vertex) for Vertex in self.Geometry.Coordinates(First,Last).tolist()])
+
+################################################
+# Purpose: Read the geometry of a shapefile into a GeometryArray
+# Input: Shapefile - shapefile, or a native selection (selected records only)
+#        Scale - coordinate step to quantize to (0 to keep float coordinates)
+# Output: Geometry - GeometryArray
+def ReadGeometry(Shapefile,Scale=0):
+	try:
+		import ShapefileProperties as ShpProp
+		XY,PartOffsets,FeatureParts,ShapeType=ShpProp.GeometryArrays(Shapefile)
+		Geometry=GeometryArray(ShapeType,XY,PartOffsets,FeatureParts)
+		if Scale>0:
+			Geometry=Geometry.Quantize(Scale)
+		return(Geometry)
+	except Exception as err:
+		raise RuntimeError("** Error: ReadGeometry Failed ("+str(err)+")")
@@ -0,0 +1,143 @@
+#######################################################################
+# JobContext
+#
+# Purpose: Isolate one corridor run (a job) from others in the same process.  A job owns
+#          its feature layer names, its scratch workspace and the geoprocessor
+#          environment settings it runs with, so several corridors can be processed at
+#          once from threads or an executor.
+#
+#          The geoprocessor environment (arcpy.env) is global to the process, so calls
+#          into arcpy are made inside Job.Geoprocessor(), which holds a process wide lock,
+#          applies the job's settings and restores the previous ones afterwards.  Native
+#          tools (NativeManagement, SelectionEngine, SpatialIndex) do not need the lock
+#          and run concurrently.
+#
+# Usage:
+#         Job=JobContext("reach12",IntermedOutputFolder)
+#         MgmtInterface=MgmtGIS.ManagementInterface(Job)
+#         MgmtInterface.CreateLayer(Shapefile,Job.LayerName("ID_Layer"))
+#         ...
+#         Job.Release()
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import re
+import shutil
+import tempfile
+import threading
+import itertools
+from contextlib import contextmanager
+
+# Lock held while a job's settings are applied to the process wide geoprocessor
+GeoprocessorLock=threading.RLock()
+
+# Numbers making job ids unique within the process
+JobNumbers=itertools.count(1)
+
+# Settings every job starts with (the interfaces used to set these globally)
+DefaultEnvironment={"overwriteOutput":True}
+
+# Job used by interfaces and modules created without one
+SharedJob=[]
+
+###################################################################################
+# Class holding the layer namespace, scratch workspace and environment of one job
+###################################################################################
+class JobContext:
+
+	###################################################################################
+	# Constructor for the job context class
+	# Inputs:
+	#         JobName - string used in layer names and the scratch folder name ("" for "job")
+	#         ScratchFolder - folder for the job's scratch files ("" creates a temporary
+	#                         folder that Release removes)
+	#         Environment - dictionary of arcpy.env settings for this job, added to the
+	#                       defaults (e.g. {"XYTolerance":"0.001 Meters"})
+	#         ScratchWorkspace - True to use ScratchFolder as arcpy.env.scratchWorkspace,
+	#                            False to keep the caller's scratch workspace
+	###################################################################################
+	def __init__(self,JobName="",ScratchFolder="",Environment=None,ScratchWorkspace=True):
+		if JobName=="":
+			JobName="job"
+		# layer names may only hold letters, digits and underscores
+		self.JobId=re.sub(r"\W","_",JobName)+"_"+str(next(JobNumbers))
+		self.OwnsScratch=ScratchFolder==""
+		if self.OwnsScratch:
+			ScratchFolder=tempfile.mkdtemp(prefix=self.JobId+"_")
+		elif os.path.isdir(ScratchFolder)!=True:
+			os.makedirs(ScratchFolder)
+		self.ScratchFolder=ScratchFolder
+		self.Environment=dict(DefaultEnvironment)
+		if ScratchWorkspace:
+			self.Environment["scratchWorkspace"]=ScratchFolder
+		if Environment is not None:
+			self.Environment.update(Environment)
+		self.Layers=[]
+
+	###################################################################################
+	# Layer name unique to this job - the layer is deleted by Release
+	# Inputs:
+	#         Name - layer name as used by a single job, e.g. "ID_Layer"
+	###################################################################################
+	def LayerName(self,Name):
+		TheLayer=Name+"_"+self.JobId
+		if TheLayer not in self.Layers:
+			self.Layers.append(TheLayer)
+		return(TheLayer)
+
+	###################################################################################
+	# Path for a scratch file of this job
+	# Inputs:
+	#         FileName - file name, e.g. "gaps.shp"
+	###################################################################################
+	def ScratchName(self,FileName):
+		return(os.path.join(self.ScratchFolder,FileName))
+
+	###################################################################################
+	# Context for geoprocessor calls: holds the geoprocessor lock and applies this job's
+	#  environment settings, restoring the previous settings on exit
+	###################################################################################
+	@contextmanager
+	def Geoprocessor(self):
+		import arcpy
+		GeoprocessorLock.acquire()
+		try:
+			Previous={}
+			for Setting in self.Environment:
+				Previous[Setting]=getattr(arcpy.env,Setting)
+				setattr(arcpy.env,Setting,self.Environment[Setting])
+			try:
+				yield
+			finally:
+				for Setting in Previous:
+					setattr(arcpy.env,Setting,Previous[Setting])
+		finally:
+			GeoprocessorLock.release()
+
+	###################################################################################
+	# Deletes the job's layers and its temporary scratch folder
+	###################################################################################
+	def Release(self):
+		try:
+			if self.Layers!=[]:
+				import arcpy
+				with self.Geoprocessor():
+					for TheLayer in self.Layers:
+						if arcpy.Exists(TheLayer):
+							arcpy.management.Delete(TheLayer)
+			self.Layers=[]
+			if self.OwnsScratch and os.path.isdir(self.ScratchFolder):
+				shutil.rmtree(self.ScratchFolder,True)
+		except Exception as err:
+			raise RuntimeError("** Error: Release Failed ("+str(err)+")")
+
+################################################
+# Purpose: Job shared by interfaces and modules created without one, keeping the
+#          single run behaviour of the scripts (including the scratch workspace already
+#          set in arcpy.env)
+# Output: TheJob - JobContext
+def DefaultJob():
+	if SharedJob==[]:
+		SharedJob.append(JobContext("default",tempfile.gettempdir(),ScratchWorkspace=False))
+	return(SharedJob[0])
@@ -0,0 +1,333 @@
+#######################################################################
+# LevelOfDetail
+#
+# Purpose: Level of detail pyramid for boundary and side lines, so stages whose
+#          tolerances are a fraction of MaxWidth can work on a fraction of the
+#          digitized vertices.
+#
+#          Every vertex gets a significance from progressive (Douglas-Peucker)
+#          simplification: the distance from the chord it split, capped by the
+#          significance of the vertex whose split made that chord, so a vertex is only
+#          kept where the one before it in the simplification is.  The splits of every
+#          part run together, one depth of the simplification at a time.  A level
+#          keeps the vertices more significant than its tolerance (part ends always);
+#          tolerances double from level to level.  Each level stores its exact error
+#          bound: the largest distance of a full resolution vertex from the level's
+#          segment covering it (never more than the tolerance).
+#
+#          A pyramid is saved next to its shapefile (<lines>.lod) and rebuilt when the
+#          shapefile changes.  Stages ask for the coarsest level within an error
+#          (Level) and refine locally with the full resolution vertices under the
+#          level's segments (CoveredRange), as NearFeatures does.
+#
+# Usage:
+#         Pyramid=LoadPyramid(FinalBoundaries)
+#         Geometry,Kept=Pyramid.Level(MaxWidth*.01)
+#         WriteLevel(FinalBoundaries,MaxWidth*.005,CoarseBoundaries)
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import numpy
+import ShapefileIO
+import SpatialIndex
+from GeometryCore import GeometryArray
+
+# Pyramid sidecar extension
+PyramidExtension=".lod"
+
+# Ratio of the tolerances of consecutive levels
+LevelRatio=2.0
+
+# Pyramids loaded in this process by shapefile: (stamp, pyramid)
+LoadedPyramids={}
+
+################################################
+# Purpose: Significance of every vertex by progressive Douglas-Peucker simplification
+# Input: XY - (n,2) vertex array
+#        PartOffsets - (parts+1,) vertex offsets of the parts
+# Output: Significance - (n,) array, inf at part ends
+def VertexSignificance(XY,PartOffsets):
+	Significance=numpy.zeros(XY.shape[0])
+	Starts=PartOffsets[0:-1][PartOffsets[1:]>PartOffsets[0:-1]]
+	Ends=PartOffsets[1:][PartOffsets[1:]>PartOffsets[0:-1]]-1
+	Significance[Starts]=numpy.inf
+	Significance[Ends]=numpy.inf
+	Caps=numpy.zeros(Starts.shape[0])+numpy.inf
+
+	### One depth of the simplification of every part at a time
+	Open=Ends-Starts>1
+	Starts,Ends,Caps=Starts[Open],Ends[Open],Caps[Open]
+	while Starts.shape[0]>0:
+		Counts=Ends-Starts-1
+		Vertices=SpatialIndex.ExpandRanges(Starts+1,Counts)
+		Chords=numpy.repeat(numpy.arange(Starts.shape[0]),Counts)
+		Distance=SpatialIndex.PointSegmentDistance(XY[Vertices],XY[Starts][Chords],XY[Ends][Chords])
+		ChordOffsets=numpy.concatenate([[0],numpy.cumsum(Counts)[0:-1]])
+		Largest=numpy.maximum.reduceat(Distance,ChordOffsets)
+		# the first vertex at the largest distance of each chord splits it
+		Candidates=numpy.flatnonzero(Distance==Largest[Chords])
+		First=Candidates[numpy.unique(Chords[Candidates],return_index=True)[1]]
+		Splits=Vertices[First]
+		Significance[Splits]=numpy.minimum(Largest,Caps)
+		Starts,Ends=numpy.concatenate([Starts,Splits]),numpy.concatenate([Splits,Ends])
+		Caps=numpy.concatenate([Significance[Splits],Significance[Splits]])
+		Open=Ends-Starts>1
+		Starts,Ends,Caps=Starts[Open],Ends[Open],Caps[Open]
+	return(Significance)
+
+################################################
+# Purpose: Largest distance of the vertices from the segments of a simplification
+# Input: XY - (n,2) vertex array
+#        Kept - sorted indices of the kept vertices (including every part end)
+# Output: Error - float
+def SimplificationError(XY,Kept):
+	if Kept.shape[0]==XY.shape[0]:
+		return(0.0)
+	Vertices=numpy.arange(XY.shape[0])
+	After=numpy.minimum(numpy.searchsorted(Kept,Vertices,"left"),Kept.shape[0]-1)
+	Before=numpy.maximum(numpy.searchsorted(Kept,Vertices,"right")-1,0)
+	return(float(SpatialIndex.PointSegmentDistance(XY,XY[Kept[Before]],XY[Kept[After]]).max()))
+
+###################################################################################
+# Class holding the pyramid of one line shapefile
+###################################################################################
+class LinePyramid:
+
+	###################################################################################
+	# Constructor for the pyramid class
+	# Inputs:
+	#         Arrays - dictionary of the pyramid arrays (BuildArrays)
+	###################################################################################
+	def __init__(self,Arrays):
+		self.ShapeType=int(Arrays["ShapeType"][0])
+		self.XY=Arrays["XY"]
+		self.PartOffsets=Arrays["PartOffsets"]
+		self.FeatureParts=Arrays["FeatureParts"]
+		self.Significance=Arrays["Significance"]
+		self.Tolerances=Arrays["Tolerances"]
+		self.ErrorBounds=Arrays["ErrorBounds"]
+		self.VertexCounts=Arrays["VertexCounts"]
+
+	###################################################################################
+	# Coarsest level whose error bound is within an error
+	# Inputs:
+	#         MaxError - largest error allowed
+	# Output:
+	#         LevelNum - level number (0 is full resolution)
+	###################################################################################
+	def LevelFor(self,MaxError):
+		Within=numpy.flatnonzero(self.ErrorBounds<=MaxError)
+		if Within.shape[0]==0:
+			# tighter than any level: full resolution
+			return(0)
+		return(int(Within[-1]))
+
+	###################################################################################
+	# Geometry of the coarsest level within an error
+	# Inputs:
+	#         MaxError - largest error allowed
+	# Outputs:
+	#         [Geometry, Kept] - GeometryArray of the level, and the full resolution index
+	#          of each of its vertices
+	###################################################################################
+	def Level(self,MaxError):
+		LevelNum=self.LevelFor(MaxError)
+		Kept=numpy.flatnonzero(self.Significance>self.Tolerances[LevelNum])
+		# every part keeps its ends, so the part offsets carry over by counting
+		PartOffsets=numpy.searchsorted(Kept,self.PartOffsets)
+		return([GeometryArray(self.ShapeType,self.XY[Kept],PartOffsets,self.FeatureParts),Kept])
+
+	###################################################################################
+	# Full resolution vertex ranges under segments of a level
+	# Inputs:
+	#         Kept - full resolution indices of the level's vertices
+	#         Segments - indices into Kept of the segments' start vertices
+	# Output:
+	#         [Firsts, Lasts] - full resolution vertex range of each segment (both ends included)
+	###################################################################################
+	def CoveredRange(self,Kept,Segments):
+		return([Kept[Segments],Kept[Segments+1]])
+
+	###################################################################################
+	# Table of the levels: (LevelNum, Tolerance, ErrorBound, NumVertices)
+	###################################################################################
+	def Levels(self):
+		return([(LevelNum,float(self.Tolerances[LevelNum]),float(self.ErrorBounds[LevelNum]),int(self.VertexCounts[LevelNum]))
+		        for LevelNum in range(self.Tolerances.shape[0])])
+
+################################################
+# Purpose: Build the pyramid arrays of a line or polygon shapefile
+# Input: LineShapefile - polyline or polygon shapefile
+# Output: Arrays - dictionary of arrays for LinePyramid
+def BuildArrays(LineShapefile):
+	import ShapefileProperties as ShpProp
+	XY,PartOffsets,FeatureParts,ShapeType=ShpProp.GeometryArrays(LineShapefile)
+	if ShapeType in ShapefileIO.PointShapes or ShapeType in (ShapefileIO.MultiPointShape,ShapefileIO.MultiPointZShape,ShapefileIO.MultiPointMShape):
+		raise RuntimeError(LineShapefile+" is not a line or polygon shapefile")
+	Significance=VertexSignificance(XY,PartOffsets)
+
+	### Level 0 drops only vertices exactly on their chord; each level doubles the tolerance
+	###  until only part ends are left
+	Tolerances=[0.0]
+	Interior=Significance[numpy.isfinite(Significance)&(Significance>0)]
+	if Interior.shape[0]>0:
+		Tolerance=float(Interior.min())
+		while True:
+			Tolerances.append(Tolerance)
+			if Tolerance>=Interior.max():
+				break
+			Tolerance*=LevelRatio
+	ErrorBounds=[]
+	VertexCounts=[]
+	for Tolerance in Tolerances:
+		Kept=numpy.flatnonzero(Significance>Tolerance)
+		ErrorBounds.append(SimplificationError(XY,Kept))
+		VertexCounts.append(Kept.shape[0])
+	return({"ShapeType":numpy.array([ShapeType]),"XY":XY,"PartOffsets":PartOffsets,"FeatureParts":FeatureParts,
+	        "Significance":Significance,"Tolerances":numpy.array(Tolerances),
+	        "ErrorBounds":numpy.array(ErrorBounds),"VertexCounts":numpy.array(VertexCounts)})
+
+################################################
+# Purpose: Load the pyramid of a shapefile from its sidecar, building (and saving) it
+#          when missing or out of date
+# Input: LineShapefile - polyline or polygon shapefile
+# Output: Pyramid - LinePyramid
+def LoadPyramid(LineShapefile):
+	try:
+		Stamp=SpatialIndex.SourceStamp(LineShapefile)
+		Key=os.path.abspath(ShapefileIO.BaseName(LineShapefile))
+		if Key in LoadedPyramids and LoadedPyramids[Key][0]==Stamp:
+			return(LoadedPyramids[Key][1])
+
+		PyramidFile=ShapefileIO.BaseName(LineShapefile)+PyramidExtension
+		Arrays=None
+		if os.path.isfile(PyramidFile):
+			try:
+				InFile=open(PyramidFile,"rb")
+				try:
+					Saved=numpy.load(InFile)
+					if tuple(Saved["Stamp"])==Stamp:
+						Arrays=dict((Name,Saved[Name]) for Name in Saved.files)
+				finally:
+					InFile.close()
+			except Exception:
+				# unreadable sidecar: rebuild below
+				Arrays=None
+
+		if Arrays is None:
+			Arrays=BuildArrays(LineShapefile)
+			try:
+				OutFile=open(PyramidFile,"wb")
+				try:
+					numpy.savez(OutFile,Stamp=numpy.array(Stamp,dtype=numpy.float64),**Arrays)
+				finally:
+					OutFile.close()
+			except Exception:
+				# read-only folder: keep the pyramid for this process only
+				pass
+
+		Pyramid=LinePyramid(Arrays)
+		LoadedPyramids[Key]=(Stamp,Pyramid)
+		return(Pyramid)
+	except Exception as err:
+		raise RuntimeError("** Error: LoadPyramid Failed ("+str(err)+")")
+
+################################################
+# Purpose: Write the coarsest level within an error as a shapefile (2D, same attributes)
+# Input: LineShapefile - polyline or polygon shapefile
+#        MaxError - largest error allowed
+#        OutShapefile - output shapefile path and name
+# Output: [OutShapefile, ErrorBound] - the error bound of the level written
+def WriteLevel(LineShapefile,MaxError,OutShapefile):
+	try:
+		Pyramid=LoadPyramid(LineShapefile)
+		Geometry,Kept=Pyramid.Level(MaxError)
+		ShapeType={ShapefileIO.PolylineZShape:ShapefileIO.PolylineShape,ShapefileIO.PolylineMShape:ShapefileIO.PolylineShape,
+		           ShapefileIO.PolygonZShape:ShapefileIO.PolygonShape,ShapefileIO.PolygonMShape:ShapefileIO.PolygonShape
+		           }.get(Pyramid.ShapeType,Pyramid.ShapeType)
+		Reader=ShapefileIO.ShapefileReader(LineShapefile)
+		Contents=[]
+		for Feature in Geometry:
+			if Feature.IsNull():
+				Contents.append(numpy.array([ShapefileIO.NullShape],dtype="<i4").tobytes())
+			else:
+				Contents.append(ShapefileIO.PolyContent(ShapeType,Feature.Parts(),[]))
+		Rows=[Reader.DbfRecord(RecordNum).tobytes() for RecordNum in range(Reader.NumRecords)]
+		ShapefileIO.WriteRecords(OutShapefile,ShapeType,Contents,Reader.DbfHeader().tobytes(),Rows,LineShapefile)
+		return([OutShapefile,float(Pyramid.ErrorBounds[Pyramid.LevelFor(MaxError)])])
+	except Exception as err:
+		raise RuntimeError("** Error: WriteLevel Failed ("+str(err)+")")
+
+################################################
+# Purpose: Features of a line shapefile within a distance of the lines of a pyramid,
+#          checked against a coarse level and refined at full resolution only under the
+#          level's segments that are too close to decide
+# Input: InShapefile - line shapefile whose features are checked
+#        NearShapefile - line or polygon shapefile the distance is measured to
+#        Radius - search distance
+# Output: NearFIDs - list of the FIDs of InShapefile features within Radius
+def NearFeatures(InShapefile,NearShapefile,Radius):
+	try:
+		import ShapefileProperties as ShpProp
+		Pyramid=LoadPyramid(NearShapefile)
+		# a level whose error is a fraction of the radius keeps the refinement small
+		Geometry,Kept=Pyramid.Level(Radius/2.0)
+		ErrorBound=float(Pyramid.ErrorBounds[Pyramid.LevelFor(Radius/2.0)])
+		LevelXY=Geometry.XY
+		# the level's segments, as the index of their start vertex
+		Starts=numpy.arange(max(LevelXY.shape[0]-1,0))
+		Ends=numpy.zeros(LevelXY.shape[0],dtype=bool)
+		Ends[Geometry.PartOffsets[1:][Geometry.PartOffsets[1:]>0]-1]=True
+		Starts=Starts[~Ends[0:-1]]
+		FineStarts=numpy.arange(max(Pyramid.XY.shape[0]-1,0))
+		FineEnds=numpy.zeros(Pyramid.XY.shape[0],dtype=bool)
+		FineEnds[Pyramid.PartOffsets[1:][Pyramid.PartOffsets[1:]>0]-1]=True
+		IsFineSegment=~FineEnds[0:-1]
+
+		XY,PartOffsets,FeatureParts,ShapeType=ShpProp.GeometryArrays(InShapefile)
+		NearFIDs=[]
+		for FID in range(FeatureParts.shape[0]-1):
+			A0=[]
+			A1=[]
+			for Part in range(int(FeatureParts[FID]),int(FeatureParts[FID+1])):
+				PartXY=XY[PartOffsets[Part]:PartOffsets[Part+1]]
+				A0.append(PartXY[0:-1])
+				A1.append(PartXY[1:])
+			if A0==[]:
+				continue
+			A0=numpy.vstack(A0)
+			A1=numpy.vstack(A1)
+			if A0.shape[0]==0:
+				continue
+
+			### Coarse distance to the feature of the level segments whose boxes come within
+			###  the radius (and error) of the feature's box
+			Reach=Radius+ErrorBound
+			Low=numpy.minimum(A0,A1).min(axis=0)-Reach
+			High=numpy.maximum(A0,A1).max(axis=0)+Reach
+			Close=Starts[((numpy.maximum(LevelXY[Starts],LevelXY[Starts+1])>=Low)&
+			              (numpy.minimum(LevelXY[Starts],LevelXY[Starts+1])<=High)).all(axis=1)]
+			Coarse=numpy.zeros(Close.shape[0])+numpy.inf
+			Block=max(1,SpatialIndex.PairBlock//max(A0.shape[0],1))
+			for First in range(0,Close.shape[0],Block):
+				Segments=Close[First:First+Block]
+				Coarse[First:First+Block]=SpatialIndex.SegmentDistances(LevelXY[Segments][:,None,:],LevelXY[Segments+1][:,None,:],
+				                                                       A0[None,:,:],A1[None,:,:]).min(axis=1)
+			if (Coarse<=Radius-ErrorBound).any():
+				NearFIDs.append(FID)
+				continue
+
+			### Refine under the level segments that may be within the radius
+			Undecided=Close[Coarse<=Reach]
+			if Undecided.shape[0]==0:
+				continue
+			Firsts,Lasts=Pyramid.CoveredRange(Kept,Undecided)
+			Fine=SpatialIndex.ExpandRanges(Firsts,Lasts-Firsts)
+			Fine=Fine[IsFineSegment[Fine]]
+			Distance=SpatialIndex.SegmentSetDistance(A0,A1,Pyramid.XY[FineStarts[Fine]],Pyramid.XY[FineStarts[Fine]+1])
+			if Distance<=Radius:
+				NearFIDs.append(FID)
+		return(NearFIDs)
+	except Exception as err:
+		raise RuntimeError("** Error: NearFeatures Failed ("+str(err)+")")
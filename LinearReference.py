@@ -0,0 +1,292 @@
+#######################################################################
+# LinearReference
+#
+# Purpose: Locate points on a corridor by station.  A linear referencing index is built
+#          once from the centerline and the segment polygons (_segmented.shp or
+#          _segmented_diss.shp) and saved next to the polygons as <name>.lrindex; it is
+#          rebuilt automatically when either shapefile changes.  Locate then returns the
+#          station, the offset from the centerline and the segment CID for arrays of
+#          points.
+#
+#          The index holds the centerline vertices with their measures and a packed
+#          R-tree (SpatialIndex) over the centerline segments, and the polygon edges with
+#          a packed R-tree over the polygons.  The nearest centerline segment of each point
+#          is found from the segments within a search distance, doubled for the points
+#          with none that close, so the work per point depends on the segments near it
+#          rather than on the length of the corridor.
+#
+#          Station is the distance along the centerline (from its end when FlipLine is 1)
+#          to the point's projection on it, Offset the distance from the centerline,
+#          positive to the left looking along increasing station and negative to the
+#          right, and CID the segment polygon containing the point (CID field, or NEAR_FID
+#          for the dissolved polygons), -1 outside every polygon.  Where polygons overlap
+#          on the inside of bends the one with the Station closest to the point's is used.
+#
+# Usage:
+#         Reference=LoadReference(CenterlinePolyline,DissShp)
+#         Stations,Offsets,CIDs=Reference.Locate(X,Y)
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import numpy
+import ShapefileIO
+import SpatialIndex
+
+# Extension of the sidecar index file
+ReferenceExtension=".lrindex"
+# Number of points located together
+LocateBlock=100000
+# Fields holding the segment number, in order of preference
+CIDFields=("CID","NEAR_FID")
+
+# References already loaded in this process by segment polygon shapefile name
+LoadedReferences={}
+
+###################################################################################
+# Class for a linear referencing index
+###################################################################################
+class LinearReferenceIndex:
+
+	###################################################################################
+	# Constructor - wraps the index arrays (BuildArrays, or loaded from the sidecar)
+	# Inputs:
+	#         Arrays - dictionary of index arrays
+	###################################################################################
+	def __init__(self,Arrays):
+		self.XY=Arrays["XY"]
+		self.Measures=Arrays["Measures"]
+		self.S0=Arrays["S0"]
+		self.S1=Arrays["S1"]
+		self.EdgeOffsets=Arrays["EdgeOffsets"]
+		self.CIDs=Arrays["CIDs"]
+		self.Stations=Arrays["Stations"]
+		self.SearchStart=float(Arrays["SearchStart"][0])
+		self.LineTree=SpatialIndex.TreeFromArrays(Arrays,"Line")
+		self.PolygonTree=SpatialIndex.TreeFromArrays(Arrays,"Polygon")
+
+	###################################################################################
+	# Station, offset and segment CID of points
+	# Inputs:
+	#         X, Y - arrays (or lists) of point coordinates
+	# Outputs:
+	#         [Stations, Offsets, CIDs] - float, float and integer arrays, one entry per point
+	###################################################################################
+	def Locate(self,X,Y):
+		try:
+			Points=numpy.column_stack([numpy.asarray(X,dtype=numpy.float64).ravel(),
+			                           numpy.asarray(Y,dtype=numpy.float64).ravel()])
+			Stations=numpy.empty(Points.shape[0])
+			Offsets=numpy.empty(Points.shape[0])
+			CIDs=numpy.empty(Points.shape[0],dtype=numpy.int64)
+			for Start in range(0,Points.shape[0],LocateBlock):
+				Block=Points[Start:Start+LocateBlock]
+				BlockStations,BlockOffsets=self.Project(Block)
+				Stations[Start:Start+LocateBlock]=BlockStations
+				Offsets[Start:Start+LocateBlock]=BlockOffsets
+				CIDs[Start:Start+LocateBlock]=numpy.where(numpy.isfinite(BlockStations),
+				                                          self.Containing(Block,BlockStations),-1)
+			return([Stations,Offsets,CIDs])
+		except Exception as err:
+			raise RuntimeError("** Error: Locate Failed ("+str(err)+")")
+
+	###################################################################################
+	# Station and signed offset of points on the nearest centerline segment (NaN for
+	#  points with NaN or infinite coordinates)
+	# Inputs:
+	#         Points - (n,2) array
+	###################################################################################
+	def Project(self,Points):
+		Nearest=numpy.zeros(Points.shape[0],dtype=numpy.int64)
+		# a point that is not finite is never within any radius
+		Finite=numpy.isfinite(Points).all(axis=1)
+		Remaining=numpy.flatnonzero(Finite)
+		Radius=self.SearchStart
+		while Remaining.shape[0]>0:
+			Query=Points[Remaining]
+			QueryNums,Segs=self.LineTree.QueryMany(numpy.hstack([Query-Radius,Query+Radius]))
+			Found=numpy.zeros(Remaining.shape[0],dtype=bool)
+			if QueryNums.shape[0]>0:
+				Distances=SpatialIndex.PointSegmentDistance(Query[QueryNums],self.XY[Segs],self.XY[Segs+1])
+				# closest candidate of each point
+				Order=numpy.lexsort((Segs,Distances,QueryNums))
+				First=Order[numpy.unique(QueryNums[Order],return_index=True)[1]]
+				# a segment closer than Radius is always a candidate, so the closest one
+				#  within Radius is the nearest of the whole line
+				Within=First[Distances[First]<=Radius]
+				Nearest[Remaining[QueryNums[Within]]]=Segs[Within]
+				Found[QueryNums[Within]]=True
+			Remaining=Remaining[~Found]
+			Radius=Radius*2.0
+
+		S0=self.XY[Nearest]
+		D=self.XY[Nearest+1]-S0
+		Lengths=numpy.hypot(D[:,0],D[:,1])
+		Safe=numpy.where(Lengths>0,Lengths,1.0)
+		DX=Points[:,0]-S0[:,0]
+		DY=Points[:,1]-S0[:,1]
+		T=numpy.clip(numpy.where(Lengths>0,(DX*D[:,0]+DY*D[:,1])/(Safe*Safe),0.0),0.0,1.0)
+		Stations=self.Measures[Nearest]+T*Lengths
+		Distances=numpy.hypot(S0[:,0]+T*D[:,0]-Points[:,0],S0[:,1]+T*D[:,1]-Points[:,1])
+		# left of the segment direction is positive
+		Side=numpy.where(D[:,0]*DY-D[:,1]*DX<0,-1.0,1.0)
+		Stations[~Finite]=numpy.nan
+		return([Stations,numpy.where(Finite,Side*Distances,numpy.nan)])
+
+	###################################################################################
+	# CID of the segment polygon containing each point (-1 for none)
+	# Inputs:
+	#         Points - (n,2) array
+	#         PointStations - (n,) stations of the points, choosing between overlapping polygons
+	###################################################################################
+	def Containing(self,Points,PointStations):
+		CIDs=numpy.zeros(Points.shape[0],dtype=numpy.int64)-1
+		QueryNums,FIDs=self.PolygonTree.QueryMany(numpy.hstack([Points,Points]))
+		Inside=SpatialIndex.PairsInPolygons(Points[QueryNums],FIDs,self.S0,self.S1,self.EdgeOffsets)
+		QueryNums=QueryNums[Inside]
+		FIDs=FIDs[Inside]
+		if QueryNums.shape[0]==0:
+			return(CIDs)
+		Difference=numpy.abs(self.Stations[FIDs]-PointStations[QueryNums])
+		Difference[numpy.isnan(Difference)]=0.0
+		Order=numpy.lexsort((FIDs,Difference,QueryNums))
+		First=Order[numpy.unique(QueryNums[Order],return_index=True)[1]]
+		CIDs[QueryNums[First]]=self.CIDs[FIDs[First]]
+		return(CIDs)
+
+################################################
+# Purpose: Segment CID and Station of each segment polygon
+# Input: PolygonReader - ShapefileReader of the segment polygons
+# Output: [CIDs, Stations] - integer array from the CID (or NEAR_FID) field, -1 where
+#          blank, and float array from the Station field, NaN when there is none
+def SegmentNumbers(PolygonReader):
+	Fields=[Name.upper() for Name in PolygonReader.FieldNames()]
+	CIDField=[Name for Name in CIDFields if Name in Fields]
+	if CIDField==[]:
+		raise RuntimeError(PolygonReader.Name+" has no "+" or ".join(CIDFields)+" field")
+	CIDs=numpy.asarray(PolygonReader.Column(CIDField[0]),dtype=numpy.float64)
+	CIDs=numpy.where(numpy.isnan(CIDs),-1,CIDs).astype(numpy.int64)
+	if "STATION" in Fields:
+		Stations=numpy.asarray(PolygonReader.Column("Station"),dtype=numpy.float64)
+	else:
+		Stations=numpy.zeros(PolygonReader.NumRecords)+numpy.nan
+	return([CIDs,Stations])
+
+################################################
+# Purpose: Build the index arrays from a centerline and its segment polygons
+# Input: Centerline - polyline shapefile with 1 single part, continuous line
+#        SegmentPolygons - segment polygon shapefile with a CID (or NEAR_FID) field and,
+#                          optionally, a Station field
+#        FlipLine - 0 when stations run from the centerline start, 1 from its end, None
+#                   to take the end nearest the polygon with the lowest station
+# Output: Arrays - dictionary of index arrays
+def BuildArrays(Centerline,SegmentPolygons,FlipLine):
+	### Centerline vertices in the direction stations run
+	LineReader=ShapefileIO.ShapefileReader(Centerline)
+	if LineReader.NumRecords!=1:
+		raise RuntimeError("Centerline is more than 1 feature - stations need 1 continuous line")
+	XY,PartStarts=ShapefileIO.RecordGeometry(LineReader.RecordContent(0))
+	if len(PartStarts)!=1 or XY.shape[0]<2:
+		raise RuntimeError("Centerline needs 1 part with at least 2 vertices")
+
+	### Segment polygons and their numbers
+	PolygonReader=ShapefileIO.ShapefileReader(SegmentPolygons)
+	CIDs,Stations=SegmentNumbers(PolygonReader)
+	Boxes=PolygonReader.Boxes()
+
+	if FlipLine is None:
+		FlipLine=0
+		if PolygonReader.NumRecords>0:
+			Key=numpy.where(numpy.isnan(Stations),CIDs,Stations)
+			Box=Boxes[int(numpy.argmin(Key))]
+			Center=numpy.array([(Box[0]+Box[2])/2.0,(Box[1]+Box[3])/2.0])
+			if numpy.hypot(*(XY[-1]-Center))<numpy.hypot(*(XY[0]-Center)):
+				FlipLine=1
+	if FlipLine==1:
+		XY=XY[::-1]
+	XY=numpy.ascontiguousarray(XY)
+	Measures=numpy.zeros(XY.shape[0])
+	Measures[1:]=numpy.cumsum(numpy.hypot(XY[1:,0]-XY[0:-1,0],XY[1:,1]-XY[0:-1,1]))
+	if Measures[-1]==0:
+		raise RuntimeError("Centerline has no length")
+
+	LineTree=SpatialIndex.PackedRTree(numpy.column_stack([numpy.minimum(XY[0:-1],XY[1:]),
+	                                                      numpy.maximum(XY[0:-1],XY[1:])]))
+	S0,S1,EdgeOffsets=SpatialIndex.PolygonEdges(PolygonReader,range(PolygonReader.NumRecords))
+	PolygonTree=SpatialIndex.PackedRTree(Boxes)
+
+	# first search distance: about half the corridor width
+	Sides=numpy.minimum(Boxes[:,2]-Boxes[:,0],Boxes[:,3]-Boxes[:,1])/2.0
+	Sides=Sides[~numpy.isnan(Sides)&(Sides>0)]
+	if Sides.shape[0]>0:
+		SearchStart=float(numpy.median(Sides))
+	else:
+		SearchStart=float(Measures[-1])/(XY.shape[0]-1)
+
+	Arrays={"XY":XY,"Measures":Measures,"S0":S0,"S1":S1,"EdgeOffsets":EdgeOffsets,
+	        "CIDs":CIDs,"Stations":Stations,"SearchStart":numpy.array([SearchStart])}
+	Arrays.update(SpatialIndex.TreeArrays(LineTree,"Line"))
+	Arrays.update(SpatialIndex.TreeArrays(PolygonTree,"Polygon"))
+	return(Arrays)
+
+################################################
+# Purpose: Load the linear referencing index of a corridor, building and saving it if
+#          it is missing or older than the centerline or the segment polygons
+# Input: Centerline - polyline shapefile with 1 single part, continuous line
+#        SegmentPolygons - segment polygon shapefile (_segmented.shp or _segmented_diss.shp)
+#        FlipLine - 0 when stations run from the centerline start, 1 from its end, None
+#                   to take the end nearest the polygon with the lowest station
+# Output: Reference - LinearReferenceIndex
+def LoadReference(Centerline,SegmentPolygons,FlipLine=None):
+	try:
+		Code=-1.0
+		if FlipLine is not None:
+			Code=float(FlipLine)
+		Stamp=(SpatialIndex.SourceStamp(Centerline)+SpatialIndex.SourceStamp(SegmentPolygons)+(Code,))
+		Source=os.path.abspath(ShapefileIO.BaseName(Centerline))
+		Key=os.path.abspath(ShapefileIO.BaseName(SegmentPolygons))
+		if Key in LoadedReferences and LoadedReferences[Key][0]==(Source,Stamp):
+			return(LoadedReferences[Key][1])
+
+		IndexFile=ShapefileIO.BaseName(SegmentPolygons)+ReferenceExtension
+		Arrays=None
+		if os.path.isfile(IndexFile):
+			try:
+				InFile=open(IndexFile,"rb")
+				try:
+					Saved=numpy.load(InFile)
+					if tuple(Saved["Stamp"])==Stamp and str(Saved["Source"][0])==Source:
+						Arrays=dict((Name,Saved[Name]) for Name in Saved.files)
+				finally:
+					InFile.close()
+			except Exception:
+				# unreadable sidecar: rebuild below
+				Arrays=None
+
+		if Arrays is None:
+			Arrays=BuildArrays(Centerline,SegmentPolygons,FlipLine)
+			try:
+				OutFile=open(IndexFile,"wb")
+				try:
+					numpy.savez(OutFile,Stamp=numpy.array(Stamp,dtype=numpy.float64),
+					            Source=numpy.array([Source]),**Arrays)
+				finally:
+					OutFile.close()
+			except Exception:
+				# read-only folder: keep the index for this process only
+				pass
+
+		Reference=LinearReferenceIndex(Arrays)
+		LoadedReferences[Key]=((Source,Stamp),Reference)
+		return(Reference)
+	except Exception as err:
+		raise RuntimeError("** Error: LoadReference Failed ("+str(err)+")")
+
+################################################
+# Purpose: Station, offset and segment CID of points on a corridor (see LinearReferenceIndex)
+# Input: Centerline - polyline shapefile with 1 single part, continuous line
+#        SegmentPolygons - segment polygon shapefile
+#        X, Y - arrays (or lists) of point coordinates
+# Output: [Stations, Offsets, CIDs] - one entry per point
+def Locate(Centerline,SegmentPolygons,X,Y):
+	return(LoadReference(Centerline,SegmentPolygons).Locate(X,Y))
@@ -11,6 +11,36 @@
 # Most descriptions directly from arcpy documentation
 ###################################################################################
 import arcpy # import ArcGIS Python bindings
+import JobContext
+from SelectionEngine import Selection # native attribute selections
+from SpatialIndex import SelectByLocation # native location selections
+import NativeManagement # native versions of management tools for shapefiles
+import ShapefileIO # shapefile headers
+import os
+
+###################################################################################
+# Checks whether a dataset name is a shapefile (native tools only handle shapefiles)
+# Inputs: 
+#         TheData - dataset or layer name
+#         MustExist - True for inputs, False for outputs
+###################################################################################
+def IsShapefile(TheData,MustExist=True):
+	if not isinstance(TheData,basestring) or TheData[-4:].lower()!=".shp":
+		return(False)
+	return(os.path.isfile(TheData) or not MustExist)
+
+################################################
+# Purpose: Check that existing shapefiles share one shape type and attribute schema,
+#          so their records can be concatenated without the geoprocessor
+# Input: Shapefiles - list of shapefile names
+# Output: True when every name is an existing shapefile with the first one's schema
+def SameSchema(Shapefiles):
+	for Shapefile in Shapefiles:
+		if not IsShapefile(Shapefile):
+			return(False)
+	Schemas=[ShapefileIO.Schema(Shapefile) for Shapefile in Shapefiles]
+	return(all(TheSchema==Schemas[0] for TheSchema in Schemas))
+
 ###################################################################################
 # Class to interface with data management
 ###################################################################################
@@ -19,9 +49,11 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	# Constructor for the management interface class
 	###################################################################################
-	def __init__(self): # called when the class is created
-		# Set environment to allow file overwrite
-		arcpy.env.overwriteOutput=True
+	def __init__(self,Job=None): # called when the class is created
+		# Job whose environment (file overwrite, scratch workspace) the tools run with
+		if Job is None:
+			Job=JobContext.DefaultJob()
+		self.Job=Job
 
 	###################################################################################
 	# Add a field to a shapefile attribute table
@@ -36,7 +68,8 @@ class ManagementInterface: # class to interface with data management tools
 	def AddField(self,InputShapefile,FieldName,FieldType,FieldDigits,FieldDecimal,FieldLength): # add a field to a attribute table
 		try:
 			# Create a list of the field names
-			TheFieldNames = [f.name for f in arcpy.ListFields(InputShapefile)]
+			with self.Job.Geoprocessor():
+				TheFieldNames = [f.name for f in arcpy.ListFields(InputShapefile)]
 			# Check to see if field already exists
 			for Item in TheFieldNames:
 				if FieldName==Item:
@@ -44,15 +77,19 @@ class ManagementInterface: # class to interface with data management tools
 
 			#Call function depending on the type of field
 			if FieldType==('TEXT' or 'BLOB'):
-				arcpy.management.AddField(InputShapefile,FieldName,FieldType,
-				                          "#","#",FieldLength)
+				with self.Job.Geoprocessor():
+					arcpy.management.AddField(InputShapefile,FieldName,FieldType,
+					                          "#","#",FieldLength)
 			elif FieldType==('LONG' or 'SHORT'):
-				arcpy.management.AddField(InputShapefile,FieldName,FieldType,FieldDigits)
+				with self.Job.Geoprocessor():
+					arcpy.management.AddField(InputShapefile,FieldName,FieldType,FieldDigits)
 			elif FieldType==('DATE' or 'RASTER' or 'GUID'):
-				arcpy.management.AddField(InputShapefile,FieldName,FieldType)				
+				with self.Job.Geoprocessor():
+					arcpy.management.AddField(InputShapefile,FieldName,FieldType)				
 			else:
-				arcpy.management.AddField(InputShapefile,FieldName,FieldType,
-				                          FieldDigits,FieldDecimal)				
+				with self.Job.Geoprocessor():
+					arcpy.management.AddField(InputShapefile,FieldName,FieldType,
+					                          FieldDigits,FieldDecimal)				
 
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: AddField Failed ("+str(err)+")") #raise "grabs" error for use in higher level
@@ -60,12 +97,21 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	# Appends multiple input datasets into an existing target dataset.
 	# Inputs: 
-	#         InShapefile - Shapefile name as a string
+	#         InShapefile - Shapefile name as a string, or a Selection (selected records
+	#                       are appended without the geoprocessor, as are shapefiles
+	#                       with the target's schema)
 	#         TargetShapefile - destination shapefile path and name as a string
 	###################################################################################
 	def Append(self,InShapefile,TargetShapefile): # convert polygon to polyline 
 		try:
-			arcpy.management.Append(InShapefile,TargetShapefile)
+			if isinstance(InShapefile,Selection):
+				InShapefile.AppendTo(TargetShapefile)
+			elif (isinstance(InShapefile,(basestring,list)) and
+			      SameSchema([TargetShapefile]+NativeManagement.NameList(InShapefile))):
+				NativeManagement.Append(InShapefile,TargetShapefile)
+			else:
+				with self.Job.Geoprocessor():
+					arcpy.management.Append(InShapefile,TargetShapefile)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Append Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -77,33 +123,57 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def CreateLayer(self,InShapefile,OutLayer): # create feature layer from feature class 
 		try:
-			arcpy.management.MakeFeatureLayer(InShapefile,OutLayer)	
+			with self.Job.Geoprocessor():
+				arcpy.management.MakeFeatureLayer(InShapefile,OutLayer)	
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: CreateLayer Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
+	###################################################################################
+	# Creates a native attribute selection on a shapefile - used in place of a feature
+	#  layer when only attribute selections, counts and copies are needed
+	# Inputs: 
+	#         InShapefile - shapefile path and name
+	# Output: 
+	#         TheSelection: Selection with nothing selected
+	###################################################################################
+	def CreateSelection(self,InShapefile): # create selection bitmap for shapefile
+		try:
+			TheSelection=Selection(InShapefile)
+			return(TheSelection)
+		except Exception, err: # an error occurred
+			raise RuntimeError("** Error: CreateSelection Failed ("+str(err)+")") #raise "grabs" error for use in higher level
+
 	###################################################################################
 	# Copies features from the input feature class or layer to a new feature class.
 	# Inputs: 
-	#         InLayer - Layer name as a string
+	#         InLayer - Layer name as a string, or a Selection
 	#         OutShapefile - copied shapefile path and name as a string
 	###################################################################################
 	def CopyFeatures(self,InLayer,OutShapefile): # convert polygon to polyline 
 		try:
-			arcpy.management.CopyFeatures(InLayer,OutShapefile)
+			if isinstance(InLayer,Selection):
+				InLayer.CopyTo(OutShapefile)
+			else:
+				with self.Job.Geoprocessor():
+					arcpy.management.CopyFeatures(InLayer,OutShapefile)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: CopyFeatures Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
 	###################################################################################
 	# Determines the total number of rows for a feature class, table, layer, or raster.
 	# Inputs: 
-	#         TheTable: the string for the name and path of a feature class, table, layer, or raster
+	#         TheTable: the string for the name and path of a feature class, table, layer, or raster,
+	#                   or a Selection
 	# Output: 
 	#         TheCount: an integer for the number of rows
 	###################################################################################
 	def CountRows(self,TheTable): # count rows 
 		try:
+			if isinstance(TheTable,Selection):
+				return(TheTable.Count())
 			#As is returns arcobject, therefore need int, and getOutput(0)
-			TheCount=int(arcpy.management.GetCount(TheTable).getOutput(0))
+			with self.Job.Geoprocessor():
+				TheCount=int(arcpy.management.GetCount(TheTable).getOutput(0))
 			return(TheCount)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: CountRows Failed ("+str(err)+")") #raise "grabs" error for use in higher level
@@ -115,7 +185,8 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def Delete(self,InData):
 		try:
-			arcpy.management.Delete(InData)
+			with self.Job.Geoprocessor():
+				arcpy.management.Delete(InData)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Delete Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -127,7 +198,8 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def DeleteField(self,InTable,DropField): # create feature layer from feature class 
 		try:
-			arcpy.management.DeleteField(InTable,DropField)	
+			with self.Job.Geoprocessor():
+				arcpy.management.DeleteField(InTable,DropField)	
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: DeleteField Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -142,10 +214,21 @@ class ManagementInterface: # class to interface with data management tools
 	#         Multi - Specifies whether multipart features are allowed in the output feature class: "MULTI_PART", "SINGLE_PART"
 	#         Unsplit - Controls how line features are dissolved: "DISSOLVE_LINES": single feature,
 	#                    "UNSPLIT_LINES": single feature only when lines share a vertex
+	# Output:
+	#         BranchPoints - list of (X,Y) where more than two lines meet and lines could not be
+	#                        merged (polyline shapefiles without statistics are dissolved natively
+	#                        through an end point graph; empty list otherwise)
 	###################################################################################
 	def Dissolve(self,InShapefile,OutShapefile,DissolveField,StatsField,Multi,Unsplit): # merge polylines
 		try:		
-			arcpy.management.Dissolve(InShapefile,OutShapefile,DissolveField,StatsField,Multi,Unsplit)
+			if (IsShapefile(InShapefile) and IsShapefile(OutShapefile,False) and StatsField in ("#","") and
+			    str(Unsplit).upper() in ("UNSPLIT_LINES","DISSOLVE_LINES") and
+			    ShapefileIO.ShapeTypeOf(InShapefile) in (ShapefileIO.PolylineShape,ShapefileIO.PolylineZShape)):
+				BranchPoints=NativeManagement.Dissolve(InShapefile,OutShapefile,DissolveField,Multi,Unsplit)
+				return(BranchPoints)
+			with self.Job.Geoprocessor():
+				arcpy.management.Dissolve(InShapefile,OutShapefile,DissolveField,StatsField,Multi,Unsplit)
+			return([])
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Dissolve Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -157,7 +240,12 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def MergeShapefiles(self,InShapefiles,OutShapefile): 
 		try:
-			arcpy.management.Merge(InShapefiles,OutShapefile,"#")
+			if (isinstance(InShapefiles,(basestring,list)) and IsShapefile(OutShapefile,False) and
+			    SameSchema(NativeManagement.NameList(InShapefiles))):
+				NativeManagement.MergeShapefiles(InShapefiles,OutShapefile)
+				return
+			with self.Job.Geoprocessor():
+				arcpy.management.Merge(InShapefiles,OutShapefile,"#")
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: MergeShapefiles Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -166,14 +254,19 @@ class ManagementInterface: # class to interface with data management tools
 	# Creates a feature class containing singlepart features generated by separating
 	#  multipart input features.
 	# Inputs: 
-	#         InShapefiles - input shapefile path and name as a string
+	#         InShapefiles - input shapefile path and name as a string, or a Selection
 	#         OutShapefile - output shapefile path and name as a string
 	###################################################################################
 	def Multipart2Single(self,InShapefiles,OutShapefile): 
 		try:
-			arcpy.management.MultipartToSinglepart(InShapefiles,OutShapefile)
+			if ((isinstance(InShapefiles,Selection) or IsShapefile(InShapefiles)) and
+			    IsShapefile(OutShapefile,False)):
+				NativeManagement.Multipart2Single(InShapefiles,OutShapefile)
+				return
+			with self.Job.Geoprocessor():
+				arcpy.management.MultipartToSinglepart(InShapefiles,OutShapefile)
 		except Exception, err: # an error occurred (probably in arcGIS)
-			raise RuntimeError("** Error: MergeShapefiles Failed ("+str(err)+")") #raise "grabs" error for use in higher level
+			raise RuntimeError("** Error: Multipart2Single Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
 
 
@@ -188,7 +281,8 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def Points2Line(self,InShapefile,OutShapefile,LineField,SortField): # convert polygon to polyline 
 		try:
-			arcpy.management.PointsToLine(InShapefile,OutShapefile,LineField,SortField)
+			with self.Job.Geoprocessor():
+				arcpy.management.PointsToLine(InShapefile,OutShapefile,LineField,SortField)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Points2Line Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -202,7 +296,8 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def Polygon2Polyline(self,InShapefile,OutShapefile,MinDistance,Attributes): # convert polygon to polyline 
 		try:
-			arcpy.management.FeatureToLine(InShapefile,OutShapefile,MinDistance,Attributes)
+			with self.Job.Geoprocessor():
+				arcpy.management.FeatureToLine(InShapefile,OutShapefile,MinDistance,Attributes)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Polygon2Polyline Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -216,7 +311,8 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def ProjectShapefile(self,InShapefile,OutShapefile,OutCoordinateSys,TransMethod): 
 		try:
-			arcpy.management.Project(InShapefile,OutShapefile,OutCoordinateSys,TransMethod)
+			with self.Job.Geoprocessor():
+				arcpy.management.Project(InShapefile,OutShapefile,OutCoordinateSys,TransMethod)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: ProjectFile Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -235,8 +331,9 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def RandomPts(self,TheFilePath,OutPoints,InPolyline,Extent,PointNumber,PointSpacing,Multi,MultiSize): # create guided random points 
 		try:
-			arcpy.management.CreateRandomPoints(TheFilePath,OutPoints,
-			                                    InPolyline,Extent,PointNumber,PointSpacing,Multi,MultiSize)
+			with self.Job.Geoprocessor():
+				arcpy.management.CreateRandomPoints(TheFilePath,OutPoints,
+				                                    InPolyline,Extent,PointNumber,PointSpacing,Multi,MultiSize)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: RandomPts Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -253,14 +350,16 @@ class ManagementInterface: # class to interface with data management tools
 		try:
 			if isinstance(InParameters,str):
 				#Get the geoprocessing result object
-				PropertyObject=arcpy.management.GetRasterProperties(InRaster,InParameters)
+				with self.Job.Geoprocessor():
+					PropertyObject=arcpy.management.GetRasterProperties(InRaster,InParameters)
 				#Get the value from geoprocessing result object
 				OutValues=PropertyObject.getOutput(0)				
 			else:
 				OutValues=[]
 				for Parameter in InParameters:
 					#Get the geoprocessing result object
-					PropertyObject=arcpy.management.GetRasterProperties(InRaster,Parameter)
+					with self.Job.Geoprocessor():
+						PropertyObject=arcpy.management.GetRasterProperties(InRaster,Parameter)
 					#Get the value from geoprocessing result object
 					OutValues=OutValues+[PropertyObject.getOutput(0)]				
 			return(OutValues)
@@ -270,20 +369,25 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	# Adds, updates, or removes a selection on a layer or table view based on an attribute query.
 	# Inputs: 
-	#         InLayer - Layer name as a string
+	#         InLayer - Layer name as a string, or a Selection (evaluated natively)
 	#         Type - type of selection as string: e.g. "NEW_SELECTION", "ADD_TO_SELECTION"
 	#         SQLexp - SQL statement used to select a subset of records.
 	###################################################################################
 	def SelectUsingAttributes(self,InLayer,Type,SQLexp):  
 		try:
-			arcpy.management.SelectLayerByAttribute(InLayer,Type,SQLexp)
+			if isinstance(InLayer,Selection):
+				InLayer.Select(Type,SQLexp)
+			else:
+				with self.Job.Geoprocessor():
+					arcpy.management.SelectLayerByAttribute(InLayer,Type,SQLexp)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: SelectUsingAttribute Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
 	###################################################################################
 	# Adds, updates, or removes a selection on a layer or table view based on an attribute query.
 	# Inputs: 
-	#         InLayer - Layer name as a string
+	#         InLayer - Layer name as a string, or a Selection (INTERSECT and WITHIN_A_DISTANCE
+	#            are answered natively from the shapefile's packed R-tree)
 	#         Relationship - The spatial relationship to be evaluated. ("INTERSECT" is default)
 	#         SelectFeatures - The features in the Input Feature Layer will be selected based on their relationship 
 	#            to the features from this layer or feature class.
@@ -292,12 +396,18 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def SelectUsingLocation(self,InLayer,Relationship,SelectFeatures,Distance,Type):
 		try:
-			arcpy.management.SelectLayerByLocation(InLayer,Relationship,SelectFeatures,Distance,Type)
+			if isinstance(InLayer,Selection):
+				SelectByLocation(InLayer,Relationship,SelectFeatures,Distance,Type)
+			else:
+				with self.Job.Geoprocessor():
+					arcpy.management.SelectLayerByLocation(InLayer,Relationship,SelectFeatures,Distance,Type)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: SelectUsingAttribute Failed ("+str(err)+")") #raise "grabs" error for use in higher level	
 
 	###################################################################################
 	# Split a line at points
+	#  Shapefile inputs are split natively: points snap to their nearest line segment
+	#  within Radius and each line is cut once at all of its sorted split positions
 	# Inputs: 
 	#        InLine: Input polyline Shapefile
 	#        InPoints: Input point shapefile to split at
@@ -306,7 +416,11 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def SplitLineAtPoints(self,InLine,InPoints,OutShapefile,Radius):
 		try:
-			arcpy.management.SplitLineAtPoint(InLine,InPoints,OutShapefile,Radius)
+			if IsShapefile(InLine) and IsShapefile(InPoints) and IsShapefile(OutShapefile,False):
+				NativeManagement.SplitLineAtPoints(InLine,InPoints,OutShapefile,Radius)
+			else:
+				with self.Job.Geoprocessor():
+					arcpy.management.SplitLineAtPoint(InLine,InPoints,OutShapefile,Radius)
 
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: SplitLineAtPoints Failed ("+str(err)+")") #raise "grabs" error for use in higher level		
@@ -320,7 +434,8 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def Vertices2Points(self,InShapefile,OutShapefile,WhichVertices): # convert polygon to polyline 
 		try:
-			arcpy.management.FeatureVerticesToPoints(InShapefile,OutShapefile,WhichVertices)
+			with self.Job.Geoprocessor():
+				arcpy.management.FeatureVerticesToPoints(InShapefile,OutShapefile,WhichVertices)
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: Vertices2Points Failed ("+str(err)+")") #raise "grabs" error for use in higher level
 
@@ -335,7 +450,8 @@ class ManagementInterface: # class to interface with data management tools
 	###################################################################################
 	def WriteField(self,InShapefile,FieldName,Statement,StatementType): # write to a field in a attribute table
 		try:
-			arcpy.management.CalculateField(InShapefile,FieldName,Statement,StatementType)			
+			with self.Job.Geoprocessor():
+				arcpy.management.CalculateField(InShapefile,FieldName,Statement,StatementType)			
 
 		except Exception, err: # an error occurred (probably in arcGIS)
 			raise RuntimeError("** Error: WriteField Failed ("+str(err)+")") #raise "grabs" error for use in higher level		
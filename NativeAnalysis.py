@@ -0,0 +1,686 @@
+#######################################################################
+# NativeAnalysis
+#
+# Purpose: Native versions of analysis tools used by the scripts, working on
+#          shapefile records directly instead of through the geoprocessor.
+#          AnalysisInterface calls these for shapefile inputs and falls back to the
+#          geoprocessor where they decline an input.
+#
+# Functions:
+#         Buffer - flat ended, full buffers of single part polylines, offset along the
+#                  vertex normals (mitred inside turns, rounded outside), one polygon
+#                  per line, without dissolving
+#         Clip, Erase - polygon features inside or outside non-overlapping polygon clip
+#                       features (PolygonOverlay)
+#         Identity - polygon features split by non-overlapping identity polygons
+#         Union - non-overlapping polygon layers combined with all attributes
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import struct
+import numpy
+import ShapefileIO
+import SpatialIndex
+import PolygonOverlay
+
+# Largest angle (radians) an outside join turns through per arc step; smaller turns
+#  are mitred
+JoinAngle=numpy.pi/36
+
+# Turns closer than this (radians) to doubling back are left to the geoprocessor
+ReverseTolerance=1e-6
+
+# Field the geoprocessor adds to buffer output
+BufferField=("BUFF_DIST","N",19,11)
+
+# Type, length and decimals of the FID_ fields the overlay tools add
+FIDField=("N",10,0)
+
+# Relative difference allowed between a feature's area and the area of its identity pieces
+AreaTolerance=1e-9
+
+################################################
+# Purpose: Parse a buffer distance given as a number or a bare number string
+# Input: BufferDist - distance as passed to the Buffer tool
+# Output: Distance - float, or None when it is not a plain positive number (linear
+#          units and field names are left to the geoprocessor)
+def LinearDistance(BufferDist):
+	try:
+		Distance=float(BufferDist)
+	except (TypeError,ValueError):
+		return(None)
+	if not numpy.isfinite(Distance) or Distance<=0:
+		return(None)
+	return(Distance)
+
+################################################
+# Purpose: Line parts without repeated vertices
+# Input: XY, PartOffsets, FeatureParts - geometry arrays (ShapefileProperties.GeometryArrays)
+# Output: [XY, PartOffsets] of the lines, one part per feature, or None when a feature is
+#          null, multipart or has no length
+def LineParts(XY,PartOffsets,FeatureParts):
+	if not (FeatureParts[1:]-FeatureParts[0:-1]==1).all():
+		return(None)
+	Keep=numpy.ones(XY.shape[0],dtype=bool)
+	Keep[1:]=(XY[1:]!=XY[0:-1]).any(axis=1)
+	Keep[PartOffsets[0:-1]]=True
+	Kept=numpy.concatenate([[0],numpy.cumsum(Keep)])
+	PartOffsets=Kept[PartOffsets]
+	if (PartOffsets[1:]-PartOffsets[0:-1]<2).any():
+		return(None)
+	return([XY[Keep],PartOffsets])
+
+################################################
+# Purpose: Point where two offset lines cross
+# Input: Q0, U0 - point on and unit direction of the first lines (...,2)
+#        Q1, U1 - point on and unit direction of the second lines (...,2)
+# Output: Points - (...,2) crossings
+def LineCrossings(Q0,U0,Q1,U1):
+	Offset=Q1-Q0
+	Along=(Offset[...,0]*U1[...,1]-Offset[...,1]*U1[...,0])/(U0[...,0]*U1[...,1]-U0[...,1]*U1[...,0])
+	return(Q0+Along[...,None]*U0)
+
+################################################
+# Purpose: Drop the offset lines cut out on the inside of tight turns in one part
+#          A run of inside joins is walked with a stack of offset lines; a line whose
+#          junction with the next one falls behind its junction with the previous one
+#          has no length left and is dropped, and its neighbours are joined instead.
+# Input: Q, U - (segments,2) start points and unit directions of the offset lines
+#        Lengths - (segments,) segment lengths
+#        Inner - (vertices,) whether each vertex is an inside join on this side
+#        First, Last - first and last vertex of the part
+#        PrevLine - (vertices,) line joined to each vertex's own line (updated)
+#        Removed - (vertices,) vertices with no junction left (updated)
+# Output: True, or False when a line at the end of a run would be dropped (the rest
+#          of the part then overlaps itself)
+def DropInnerLines(Q,U,Lengths,Inner,First,Last,PrevLine,Removed):
+	Vertex=First+1
+	while Vertex<Last:
+		if not Inner[Vertex]:
+			Vertex+=1
+			continue
+		RunStart=Vertex
+		while Vertex<Last and Inner[Vertex]:
+			Vertex+=1
+		# inside joins RunStart..Vertex-1 join lines RunStart-1..Vertex-1
+		Stack=[RunStart-1]
+		for Line in range(RunStart,Vertex):
+			while True:
+				Top=Stack[-1]
+				Junction=LineCrossings(Q[Top],U[Top],Q[Line],U[Line])
+				if len(Stack)==1:
+					if numpy.dot(Junction-Q[Top],U[Top])<0:
+						return(False)
+					break
+				Previous=LineCrossings(Q[Stack[-2]],U[Stack[-2]],Q[Top],U[Top])
+				if numpy.dot(Junction-Previous,U[Top])>=0:
+					break
+				Stack.pop()
+			Stack.append(Line)
+		Top=Stack[-1]
+		Junction=LineCrossings(Q[Stack[-2]],U[Stack[-2]],Q[Top],U[Top])
+		if numpy.dot(Junction-Q[Top],U[Top])>Lengths[Top]:
+			return(False)
+		Removed[RunStart:Vertex]=True
+		for Previous,Line in zip(Stack[0:-1],Stack[1:]):
+			Removed[Line]=False
+			PrevLine[Line]=Previous
+	return(True)
+
+################################################
+# Purpose: Offset chain of every line on one side
+# Input: XY, PartOffsets - line vertices and part offsets (LineParts)
+#        Distance - buffer distance
+#        Side - 1 for the left side, -1 for the right side
+#        Turn - (vertices,) turn angle at each vertex (0 at the part ends)
+#        Normals - (vertices,2) left normals of the segments before and after each vertex
+#                  (NormalsIn, NormalsOut; the one segment's at the part ends)
+# Output: [Points, ChainOffsets] - (k,2) offset points in line order and (parts+1,)
+#          offsets of each part's chain, or None when a part overlaps itself
+def SideChain(XY,PartOffsets,Distance,Side,Turn,NormalsIn,NormalsOut):
+	NumVertices=XY.shape[0]
+	Offset=Side*Distance
+	SideTurn=Side*Turn
+	Interior=numpy.ones(NumVertices,dtype=bool)
+	Interior[PartOffsets[0:-1]]=False
+	Interior[PartOffsets[1:]-1]=False
+	Inner=Interior&(SideTurn>0)
+	Arc=Interior&(SideTurn<-JoinAngle)
+
+	### Segments (indexed by their start vertex) and their offset lines
+	Direction=numpy.zeros((NumVertices,2))
+	Direction[0:-1]=XY[1:]-XY[0:-1]
+	Lengths=numpy.hypot(Direction[:,0],Direction[:,1])
+	Lengths[PartOffsets[1:]-1]=0
+	Units=Direction/numpy.where(Lengths>0,Lengths,1.0)[:,None]
+	Q=XY+Offset*NormalsOut
+
+	### Inside joins trim both segments; a segment trimmed past its length is dropped
+	Trim=numpy.where(Inner,Distance*numpy.tan(numpy.abs(Turn)/2),0.0)
+	Segments=numpy.flatnonzero(Lengths>0)
+	Over=Trim[Segments]+Trim[Segments+1]>Lengths[Segments]
+	PrevLine=numpy.arange(NumVertices)-1
+	Removed=numpy.zeros(NumVertices,dtype=bool)
+	if Over.any():
+		Segments=Segments[Over]
+		if not (Inner[Segments]&Inner[Segments+1]).all():
+			return(None)
+		Parts=numpy.unique(numpy.searchsorted(PartOffsets,Segments,side="right")-1)
+		for Part in Parts.tolist():
+			if not DropInnerLines(Q,Units,Lengths,Inner,int(PartOffsets[Part]),int(PartOffsets[Part+1])-1,PrevLine,Removed):
+				return(None)
+
+	### Points per vertex: an arc outside wide turns, one point otherwise
+	Steps=numpy.where(Arc,numpy.ceil(numpy.abs(Turn)/JoinAngle-1e-9),0).astype(numpy.int64)
+	Counts=numpy.where(Removed,0,Steps+1)
+	Vertices=numpy.repeat(numpy.arange(NumVertices),Counts)
+	Step=numpy.arange(Vertices.shape[0])-numpy.repeat(numpy.cumsum(Counts)-Counts,Counts)
+	Points=numpy.empty((Vertices.shape[0],2))
+	# mitre points (the offset lines' crossing) and flat end corners
+	Single=Steps[Vertices]==0
+	SingleVertices=Vertices[Single]
+	In=NormalsIn[SingleVertices]
+	Out=NormalsOut[SingleVertices]
+	Mitre=(In+Out)/(1+(In*Out).sum(axis=1))[:,None]
+	Points[Single]=XY[SingleVertices]+Offset*Mitre
+	Joined=numpy.flatnonzero(Single)[PrevLine[SingleVertices]!=SingleVertices-1]
+	if Joined.shape[0]>0:
+		Lines=Vertices[Joined]
+		Previous=PrevLine[Lines]
+		Points[Joined]=LineCrossings(Q[Previous],Units[Previous],Q[Lines],Units[Lines])
+	# arcs around the vertex from the incoming to the outgoing normal
+	ArcPoints=numpy.flatnonzero(~Single)
+	if ArcPoints.shape[0]>0:
+		ArcVertices=Vertices[ArcPoints]
+		Start=numpy.arctan2(Side*NormalsIn[ArcVertices,1],Side*NormalsIn[ArcVertices,0])
+		Angle=Start+Turn[ArcVertices]*Step[ArcPoints]/Steps[ArcVertices]
+		Points[ArcPoints]=XY[ArcVertices]+Distance*numpy.column_stack([numpy.cos(Angle),numpy.sin(Angle)])
+	Kept=numpy.concatenate([[0],numpy.cumsum(Counts)])
+	return([Points,Kept[PartOffsets]])
+
+################################################
+# Purpose: Whether any ring crosses or touches itself away from its neighbouring edges
+# Input: Rings - (k,2) ring points, each ring closed
+#        RingOffsets - (rings+1,) offsets of the rings
+#        Check - (rings,) rings to check
+# Output: True when a checked ring is not simple
+def RingsCross(Rings,RingOffsets,Check):
+	Checked=numpy.flatnonzero(Check)
+	if Checked.shape[0]==0:
+		return(False)
+	Counts=RingOffsets[Checked+1]-RingOffsets[Checked]-1
+	Edges=SpatialIndex.ExpandRanges(RingOffsets[Checked],Counts)
+	EdgeRings=numpy.repeat(numpy.arange(Checked.shape[0]),Counts)
+	E0=Rings[Edges]
+	E1=Rings[Edges+1]
+	A,B=SpatialIndex.PackedRTree(numpy.hstack([numpy.minimum(E0,E1),numpy.maximum(E0,E1)])).QueryMany(
+		numpy.hstack([numpy.minimum(E0,E1),numpy.maximum(E0,E1)]))
+	# neighbouring edges share a point; the first and last edges of a ring are neighbours
+	Last=numpy.cumsum(Counts)-1
+	First=Last-Counts+1
+	Keep=(A<B-1)&(EdgeRings[A]==EdgeRings[B])
+	Keep&=~((A==First[EdgeRings[A]])&(B==Last[EdgeRings[B]]))
+	A,B=A[Keep],B[Keep]
+	return(bool((SpatialIndex.SegmentDistances(E0[A],E1[A],E0[B],E1[B])==0).any()))
+
+################################################
+# Purpose: Flat ended buffer rings of single part lines
+# Input: XY, PartOffsets - line vertices and part offsets (LineParts)
+#        Distance - buffer distance
+# Output: [Rings, RingOffsets] - (k,2) clockwise closed rings, one per part, and their
+#          (parts+1,) offsets, or None when a line doubles back or overlaps itself
+def BufferRings(XY,PartOffsets,Distance):
+	NumVertices=XY.shape[0]
+	Ends=PartOffsets[1:]-1
+	Starts=PartOffsets[0:-1]
+
+	### Left normals of the segments before and after each vertex
+	Direction=XY[1:]-XY[0:-1]
+	Lengths=numpy.hypot(Direction[:,0],Direction[:,1])
+	# (the steps between parts are never used)
+	Normals=numpy.column_stack([-Direction[:,1],Direction[:,0]])/numpy.where(Lengths>0,Lengths,1.0)[:,None]
+	NormalsOut=numpy.zeros((NumVertices,2))
+	NormalsOut[0:-1]=Normals
+	NormalsOut[Ends]=Normals[Ends-1]
+	NormalsIn=numpy.zeros((NumVertices,2))
+	NormalsIn[1:]=Normals
+	NormalsIn[Starts]=NormalsOut[Starts]
+	Turn=numpy.arctan2(NormalsIn[:,0]*NormalsOut[:,1]-NormalsIn[:,1]*NormalsOut[:,0],(NormalsIn*NormalsOut).sum(axis=1))
+	if (numpy.abs(Turn)>numpy.pi-ReverseTolerance).any():
+		return(None)
+
+	### Left chain forward, then the right chain backward, back to the start
+	Chains=[]
+	for Side in (1,-1):
+		Chain=SideChain(XY,PartOffsets,Distance,Side,Turn,NormalsIn,NormalsOut)
+		if Chain is None:
+			return(None)
+		Chains.append(Chain)
+	(Left,LeftOffsets),(Right,RightOffsets)=Chains
+	LeftCounts=LeftOffsets[1:]-LeftOffsets[0:-1]
+	RightCounts=RightOffsets[1:]-RightOffsets[0:-1]
+	RingCounts=LeftCounts+RightCounts+1
+	RingOffsets=numpy.concatenate([[0],numpy.cumsum(RingCounts)])
+	Parts=numpy.repeat(numpy.arange(RingCounts.shape[0]),RingCounts)
+	Position=numpy.arange(Parts.shape[0])-RingOffsets[Parts]
+	OnLeft=Position<LeftCounts[Parts]
+	Index=numpy.where(OnLeft,LeftOffsets[Parts]+Position,Left.shape[0]+RightOffsets[Parts+1]-1-(Position-LeftCounts[Parts]))
+	Closing=Position==RingCounts[Parts]-1
+	Index[Closing]=LeftOffsets[Parts[Closing]]
+	Rings=numpy.vstack([Left,Right])[Index]
+
+	### Lines with turns can still overlap themselves further along
+	if RingsCross(Rings,RingOffsets,Ends-Starts>1):
+		return(None)
+	return([Rings,RingOffsets])
+
+################################################
+# Purpose: dBASE rows of a shapefile as one array (a view of the file bytes)
+# Input: Reader - ShapefileIO.ShapefileReader
+# Output: Rows - (records,record length) uint8 array, deletion flag first
+def DbfRows(Reader):
+	return(numpy.frombuffer(Reader.DbfBytes,dtype=numpy.uint8,count=Reader.NumRecords*Reader.RecordLength,
+	                        offset=Reader.HeaderLength).reshape(Reader.NumRecords,Reader.RecordLength))
+
+################################################
+# Purpose: Field descriptors of a shapefile's dBASE header
+# Input: Reader - ShapefileIO.ShapefileReader
+# Output: Descriptors - (fields,32) uint8 array
+def FieldDescriptors(Reader):
+	Descriptors=numpy.frombuffer(Reader.DbfBytes,dtype=numpy.uint8,count=32*len(Reader.Fields),offset=32)
+	return(Descriptors.reshape(len(Reader.Fields),32))
+
+################################################
+# Purpose: Make field names unique as the geoprocessor does, adding _1, _2, ... to
+#          repeated names (case is ignored; names are cut to 10 characters)
+# Input: Names - list of field names
+# Output: Unique - list of field names
+def UniqueNames(Names):
+	Unique=[]
+	Taken=set()
+	for Name in Names:
+		New=Name[0:10]
+		Count=0
+		while New.upper() in Taken:
+			Count+=1
+			Suffix="_"+str(Count)
+			New=Name[0:10-len(Suffix)]+Suffix
+		Taken.add(New.upper())
+		Unique.append(New)
+	return(Unique)
+
+################################################
+# Purpose: dBASE header for joined field descriptors, with repeated names made unique
+# Input: Descriptors - list of (fields,32) uint8 descriptor arrays, in output order
+#        RowLength - output row length (deletion flag included)
+# Output: Header - dBASE header bytes (for 0 records)
+def JoinedDbfHeader(Descriptors,RowLength):
+	Descriptors=numpy.vstack([numpy.zeros((0,32),dtype=numpy.uint8)]+list(Descriptors))
+	Names=[bytes(bytearray(Row[0:11])).split(b"\x00")[0].decode("latin-1") for Row in Descriptors]
+	for Row,Name in zip(Descriptors,UniqueNames(Names)):
+		Row[0:11]=numpy.frombuffer(Name.encode("latin-1").ljust(11,b"\x00"),dtype=numpy.uint8)
+	Header=bytearray(ShapefileIO.NewDbfHeader([],0)[0:32]+Descriptors.tobytes()+b"\r")
+	struct.pack_into("<HH",Header,8,len(Header),RowLength)
+	return(Header)
+
+################################################
+# Purpose: Descriptor and values of the FID_ field the overlay tools add for a layer
+# Input: Shapefile - layer path and name
+#        FIDs - (records,) feature numbers, -1 where a record has no feature of the layer
+# Output: [Descriptor, Columns] - (1,32) uint8 descriptor and (records,10) uint8 values
+def FIDColumn(Shapefile,FIDs):
+	Field=(("FID_"+os.path.basename(ShapefileIO.BaseName(Shapefile)))[0:10],)+FIDField
+	Descriptor=numpy.frombuffer(ShapefileIO.NewDbfHeader([Field],0)[32:64],dtype=numpy.uint8).reshape(1,32)
+	return([Descriptor,ShapefileIO.NewDbfColumns([Field],[FIDs])])
+
+################################################
+# Purpose: Attribute values of a layer's features, and blanks where a record has no
+#          feature of the layer (numbers 0, text empty, as the geoprocessor writes them)
+# Input: Reader - ShapefileIO.ShapefileReader
+#        FIDs - (records,) feature numbers, -1 for blanks
+# Output: Columns - (records,record length-1) uint8 array (no deletion flag)
+def AttributeColumns(Reader,FIDs):
+	Rows=DbfRows(Reader)[:,1:]
+	if len(Reader.Fields)==0:
+		return(numpy.zeros((FIDs.shape[0],0),dtype=numpy.uint8))
+	Fields=[Field[0:4] for Field in Reader.Fields]
+	Blank=ShapefileIO.NewDbfColumns(Fields,[[0.0] if Field[1] in ("N","F") else [""] for Field in Fields])
+	return(numpy.vstack([Rows,Blank])[numpy.where(FIDs>=0,FIDs,Reader.NumRecords)])
+
+################################################
+# Purpose: Write polygons to a new shapefile, packing every record at once
+#          (ShapefileIO.WriteRecords builds the records one by one)
+# Input: OutShapefile - output shapefile path and name
+#        Rings, RingOffsets - (k,2) closed ring points and (rings+1,) ring offsets
+#        RecordRings - (records+1,) offsets of each record's rings
+#        DbfHeader - dBASE header bytes (field descriptors) for the output
+#        DbfRows - (records,row length) uint8 array of dBASE rows
+#        SidecarSource - shapefile whose .prj/.cpg are copied to the output ("" for none)
+def WritePolygons(OutShapefile,Rings,RingOffsets,RecordRings,DbfHeader,DbfRows,SidecarSource):
+	NumRecords=RecordRings.shape[0]-1
+	NumParts=RecordRings[1:]-RecordRings[0:-1]
+	PointOffsets=RingOffsets[RecordRings]
+	NumPoints=PointOffsets[1:]-PointOffsets[0:-1]
+	Headers=numpy.zeros(NumRecords,dtype=[("RecordNum",">i4"),("ContentWords",">i4"),("Type","<i4"),("Box","<f8",(4,)),
+	                                      ("NumParts","<i4"),("NumPoints","<i4")])
+	Headers["RecordNum"]=numpy.arange(1,NumRecords+1)
+	Headers["ContentWords"]=22+2*NumParts+8*NumPoints
+	Headers["Type"]=ShapefileIO.PolygonShape
+	Headers["NumParts"]=NumParts
+	Headers["NumPoints"]=NumPoints
+	Extent=(0.0,0.0,0.0,0.0)
+	if NumRecords>0:
+		Headers["Box"][:,0:2]=numpy.minimum.reduceat(Rings,PointOffsets[0:-1],axis=0)
+		Headers["Box"][:,2:4]=numpy.maximum.reduceat(Rings,PointOffsets[0:-1],axis=0)
+		Extent=(Rings[:,0].min(),Rings[:,1].min(),Rings[:,0].max(),Rings[:,1].max())
+	# every field is a whole number of 4 byte words: 13 header words, 1 per part, 4 per point
+	Words=13+NumParts+4*NumPoints
+	WordOffsets=numpy.concatenate([[0],numpy.cumsum(Words)]).astype(numpy.int64)
+	Packed=numpy.zeros(int(WordOffsets[-1]),dtype="<u4")
+	Packed[SpatialIndex.ExpandRanges(WordOffsets[0:-1],numpy.repeat(13,NumRecords))]=Headers.view("<u4")
+	PartStarts=RingOffsets[0:-1]-numpy.repeat(PointOffsets[0:-1],NumParts)
+	Packed[SpatialIndex.ExpandRanges(WordOffsets[0:-1]+13,NumParts)]=PartStarts.astype("<i4").view("<u4")
+	Packed[SpatialIndex.ExpandRanges(WordOffsets[0:-1]+13+NumParts,4*NumPoints)]=Rings.astype("<f8").view("<u4").ravel()
+
+	### Main and index files (offsets and lengths in 16-bit words)
+	OutBase=ShapefileIO.BaseName(OutShapefile)
+	ShpFile=open(OutBase+".shp","wb")
+	ShpFile.write(ShapefileIO.FileHeader(ShapefileIO.PolygonShape,50+2*int(WordOffsets[-1]),Extent,(0.0,0.0)))
+	ShpFile.write(Packed.tobytes())
+	ShpFile.close()
+	Index=numpy.column_stack([50+2*WordOffsets[0:-1],Headers["ContentWords"]]).astype(">i4")
+	ShxFile=open(OutBase+".shx","wb")
+	ShxFile.write(ShapefileIO.FileHeader(ShapefileIO.PolygonShape,50+4*NumRecords,Extent,(0.0,0.0)))
+	ShxFile.write(Index.tobytes())
+	ShxFile.close()
+
+	### dBASE file with the record count patched
+	Header=bytearray(DbfHeader)
+	struct.pack_into("<I",Header,4,NumRecords)
+	DbfFile=open(OutBase+".dbf","wb")
+	DbfFile.write(Header)
+	DbfFile.write(numpy.ascontiguousarray(DbfRows).tobytes())
+	DbfFile.write(b"\x1a")
+	DbfFile.close()
+	ShapefileIO.CopySidecars(SidecarSource,OutBase)
+
+################################################
+# Purpose: Flat ended, full buffer of every line, one polygon per line, with the lines'
+#          attributes and the distance in BUFF_DIST (as the geoprocessor writes them)
+# Input: InShapefile - polyline shapefile
+#        OutShapefile - output polygon shapefile
+#        Distance - buffer distance (linear units of the data)
+# Output: True when written, False when the input needs the geoprocessor (multipart,
+#          null or zero length lines, lines doubling back or overlapping their own
+#          buffer, or an existing BUFF_DIST field); nothing is written then
+def Buffer(InShapefile,OutShapefile,Distance):
+	try:
+		import ShapefileProperties as ShpProp
+		Reader=ShapefileIO.ShapefileReader(InShapefile)
+		if Reader.ShapeType not in (ShapefileIO.PolylineShape,ShapefileIO.PolylineZShape,ShapefileIO.PolylineMShape):
+			return(False)
+		if BufferField[0] in [Name.upper() for Name in Reader.FieldNames()]:
+			return(False)
+		if Reader.NumRecords==0:
+			return(False)
+		XY,PartOffsets,FeatureParts,ShapeType=ShpProp.GeometryArrays(InShapefile)
+		Lines=LineParts(XY,PartOffsets,FeatureParts)
+		if Lines is None:
+			return(False)
+		Polygons=BufferRings(Lines[0],Lines[1],float(Distance))
+		if Polygons is None:
+			return(False)
+
+		### Attributes: the input rows with the distance added
+		Descriptors=32+32*len(Reader.Fields)
+		Header=bytearray(Reader.DbfBytes[0:Descriptors]+ShapefileIO.NewDbfHeader([BufferField],0)[32:])
+		struct.pack_into("<HH",Header,8,len(Header),Reader.RecordLength+BufferField[2])
+		Rows=DbfRows(Reader)
+		Added=ShapefileIO.NewDbfColumns([BufferField],[[float(Distance)]])
+		Rows=numpy.hstack([Rows,numpy.repeat(Added,Reader.NumRecords,axis=0)])
+		WritePolygons(OutShapefile,Polygons[0],Polygons[1],numpy.arange(Reader.NumRecords+1),Header,Rows,InShapefile)
+		return(True)
+	except Exception as err:
+		raise RuntimeError("** Error: Buffer Failed ("+str(err)+")")
+
+################################################
+# Purpose: Reader and geometry arrays of a polygon shapefile
+# Input: Shapefile - shapefile path and name
+# Output: [Reader, Geometry] - ShapefileIO.ShapefileReader and (XY, PartOffsets,
+#          FeatureParts) arrays, or None when it is not a 2D polygon shapefile
+def PolygonLayer(Shapefile):
+	import ShapefileProperties as ShpProp
+	Reader=ShapefileIO.ShapefileReader(Shapefile)
+	if Reader.ShapeType!=ShapefileIO.PolygonShape:
+		return(None)
+	XY,PartOffsets,FeatureParts,ShapeType=ShpProp.GeometryArrays(Shapefile)
+	return([Reader,(XY,PartOffsets,FeatureParts)])
+
+################################################
+# Purpose: Gather rings into records
+# Input: Points, RingOffsets - closed rings and their offsets
+#        RingKeys - (rings,) record key of each ring
+#        RecordKeys - (records,) key of each output record, in output order
+# Output: [Points, RingOffsets, RecordRings] - rings in record order, with the (records+1,)
+#          offsets of each record's rings (rings of a key stay in their order)
+def GatherRings(Points,RingOffsets,RingKeys,RecordKeys):
+	Order=numpy.argsort(RingKeys,kind="mergesort")
+	First=numpy.searchsorted(RingKeys[Order],RecordKeys)
+	Last=numpy.searchsorted(RingKeys[Order],RecordKeys,side="right")
+	Rings=Order[SpatialIndex.ExpandRanges(First,Last-First)]
+	Counts=RingOffsets[Rings+1]-RingOffsets[Rings]
+	Gathered=Points[SpatialIndex.ExpandRanges(RingOffsets[Rings],Counts)]
+	return([Gathered,numpy.concatenate([[0],numpy.cumsum(Counts)]).astype(numpy.int64),
+	        numpy.concatenate([[0],numpy.cumsum(Last-First)]).astype(numpy.int64)])
+
+################################################
+# Purpose: Pairs of features whose boxes meet (SpatialIndex.PackedRTree)
+# Input: Boxes - (n,4) boxes of the first features
+#        OtherBoxes - (m,4) boxes of the second features (NaN for null features)
+# Output: [First, Second] - (k,) feature numbers of the pairs
+def BoxPairs(Boxes,OtherBoxes):
+	if Boxes.shape[0]==0 or not numpy.isfinite(OtherBoxes).any():
+		return([numpy.zeros(0,dtype=numpy.int64),numpy.zeros(0,dtype=numpy.int64)])
+	return(SpatialIndex.PackedRTree(OtherBoxes).QueryMany(Boxes))
+
+################################################
+# Purpose: Areas of polygon features (holes taken out)
+# Input: Geometry - (XY, PartOffsets, FeatureParts) polygon geometry arrays
+# Output: [Areas, Perimeters] - (features,) arrays
+def FeatureAreas(Geometry):
+	XY,PartOffsets,FeatureParts=Geometry
+	Areas,Perimeters=PolygonOverlay.RingMeasures(XY,PartOffsets)
+	Features=numpy.repeat(numpy.arange(FeatureParts.shape[0]-1),numpy.diff(FeatureParts))
+	NumFeatures=FeatureParts.shape[0]-1
+	return([-numpy.bincount(Features,Areas,minlength=NumFeatures),numpy.bincount(Features,Perimeters,minlength=NumFeatures)])
+
+################################################
+# Purpose: Polygon features inside (Clip) or outside (Erase) other polygon features,
+#          keeping the input attributes
+# Input: InShapefile - polygon shapefile
+#        ClipShapefile - polygon shapefile of clip features, which must not overlap
+#        OutShapefile - output polygon shapefile
+#        Operation - "INTERSECT" or "DIFFERENCE" (PolygonOverlay.Operations)
+# Output: True when written, False when the inputs need the geoprocessor
+def OverlayLayer(InShapefile,ClipShapefile,OutShapefile,Operation):
+	In=PolygonLayer(InShapefile)
+	Clip=PolygonLayer(ClipShapefile)
+	if In is None or Clip is None:
+		return(False)
+	Overlapping=PolygonOverlay.OverlappingPairs(Clip[1])
+	if Overlapping is None or Overlapping.shape[0]>0:
+		return(False)
+	InBoxes=PolygonOverlay.FeatureBoxes(*In[1])
+	Subjects=numpy.flatnonzero(numpy.isfinite(InBoxes).all(axis=1))
+	Groups,Members=BoxPairs(InBoxes[Subjects],PolygonOverlay.FeatureBoxes(*Clip[1]))
+	Overlay=PolygonOverlay.OverlayGroups(In[1],Clip[1],Subjects,Groups,Members,Operation)
+	if Overlay is None:
+		return(False)
+	Points,RingOffsets,RingGroups=Overlay
+	Records=numpy.unique(RingGroups)
+	Rings=GatherRings(Points,RingOffsets,RingGroups,Records)
+	Reader=In[0]
+	WritePolygons(OutShapefile,Rings[0],Rings[1],Rings[2],JoinedDbfHeader([FieldDescriptors(Reader)],Reader.RecordLength),
+	              DbfRows(Reader)[Subjects[Records]],InShapefile)
+	return(True)
+
+################################################
+# Purpose: Parts of polygon features inside polygon clip features
+# Input: InShapefile - polygon shapefile
+#        ClipShapefile - polygon shapefile of clip features, which must not overlap
+#        OutShapefile - output polygon shapefile, with the input attributes
+# Output: True when written, False when the inputs need the geoprocessor (other shape
+#          types, overlapping clip features, or rings that do not close)
+def Clip(InShapefile,ClipShapefile,OutShapefile):
+	try:
+		return(OverlayLayer(InShapefile,ClipShapefile,OutShapefile,"INTERSECT"))
+	except Exception as err:
+		raise RuntimeError("** Error: Clip Failed ("+str(err)+")")
+
+################################################
+# Purpose: Parts of polygon features outside polygon erase features
+# Input: InShapefile - polygon shapefile
+#        EraseShapefile - polygon shapefile of erase features, which must not overlap
+#        OutShapefile - output polygon shapefile, with the input attributes
+# Output: True when written, False when the inputs need the geoprocessor (as Clip)
+def Erase(InShapefile,EraseShapefile,OutShapefile):
+	try:
+		return(OverlayLayer(InShapefile,EraseShapefile,OutShapefile,"DIFFERENCE"))
+	except Exception as err:
+		raise RuntimeError("** Error: Erase Failed ("+str(err)+")")
+
+################################################
+# Purpose: dBASE header and rows joining the attributes of several layers, as the
+#          overlay tools write them: FID_<layer> and the layer's fields for each layer
+# Input: Layers - list of [Shapefile, Reader, FIDs] (FIDs -1 where a record has no
+#                 feature of the layer)
+#        JoinAttr - "ALL", "NO_FID" or "ONLY_FID"
+# Output: [Header, Rows] - dBASE header bytes and (records,row length) uint8 rows
+def JoinedAttributes(Layers,JoinAttr):
+	Descriptors=[]
+	Columns=[numpy.zeros((Layers[0][2].shape[0],1),dtype=numpy.uint8)+ord(" ")]
+	for Shapefile,Reader,FIDs in Layers:
+		if JoinAttr!="NO_FID":
+			Descriptor,Values=FIDColumn(Shapefile,FIDs)
+			Descriptors.append(Descriptor)
+			Columns.append(Values)
+		if JoinAttr!="ONLY_FID":
+			Descriptors.append(FieldDescriptors(Reader))
+			Columns.append(AttributeColumns(Reader,FIDs))
+	Rows=numpy.hstack(Columns)
+	return([JoinedDbfHeader(Descriptors,Rows.shape[1]),Rows])
+
+################################################
+# Purpose: Split polygon features by identity polygons: the part of each feature in
+#          each identity polygon, with the attributes of both, and the part outside
+#          them all, with blank identity attributes (FID_<identity> -1)
+# Input: InShapefile - polygon shapefile
+#        IDShapefile - polygon shapefile of identity features, which must not overlap
+#        OutShapefile - output polygon shapefile
+#        JoinAttr - "ALL", "NO_FID" or "ONLY_FID"
+# Output: True when written, False when the inputs need the geoprocessor (other shape
+#          types, overlapping identity features, rings that do not close, or pieces
+#          whose areas do not add up to the feature's).  Each feature's part outside
+#          the identity polygons comes first, then its parts in identity FID order.
+def Identity(InShapefile,IDShapefile,OutShapefile,JoinAttr):
+	try:
+		In=PolygonLayer(InShapefile)
+		ID=PolygonLayer(IDShapefile)
+		if In is None or ID is None:
+			return(False)
+		Overlapping=PolygonOverlay.OverlappingPairs(ID[1])
+		if Overlapping is None or Overlapping.shape[0]>0:
+			return(False)
+		InBoxes=PolygonOverlay.FeatureBoxes(*In[1])
+		Subjects=numpy.flatnonzero(numpy.isfinite(InBoxes).all(axis=1))
+		Groups,IDs=BoxPairs(InBoxes[Subjects],PolygonOverlay.FeatureBoxes(*ID[1]))
+		NumPairs=Groups.shape[0]
+		Pieces=PolygonOverlay.OverlayGroups(ID[1],In[1],IDs,numpy.arange(NumPairs),Subjects[Groups],"INTERSECT")
+		Outside=PolygonOverlay.OverlayGroups(In[1],ID[1],Subjects,Groups,IDs,"DIFFERENCE")
+		if Pieces is None or Outside is None:
+			return(False)
+
+		### The pieces of each feature must make up its area
+		PieceAreas=-numpy.bincount(Pieces[2],PolygonOverlay.RingMeasures(Pieces[0],Pieces[1])[0],minlength=NumPairs)
+		OutsideAreas=-numpy.bincount(Outside[2],PolygonOverlay.RingMeasures(Outside[0],Outside[1])[0],minlength=Subjects.shape[0])
+		Covered=OutsideAreas+numpy.bincount(Groups,PieceAreas,minlength=Subjects.shape[0])
+		Areas,Perimeters=FeatureAreas(In[1])
+		Allowed=AreaTolerance*numpy.abs(Areas[Subjects])+PolygonOverlay.SnapTolerance*Perimeters[Subjects]
+		if (numpy.abs(Covered-Areas[Subjects])>Allowed).any():
+			return(False)
+
+		### Records: each feature's outside part, then its pieces by identity feature
+		Points=numpy.vstack([Outside[0],Pieces[0]])
+		RingOffsets=numpy.concatenate([Outside[1][0:-1],Outside[1][-1]+Pieces[1]])
+		RingKeys=numpy.concatenate([Outside[2],Subjects.shape[0]+Pieces[2]])
+		Keys=numpy.concatenate([numpy.unique(Outside[2]),Subjects.shape[0]+numpy.unique(Pieces[2])])
+		InFIDs=numpy.concatenate([Subjects,Subjects[Groups]])[Keys]
+		IDFIDs=numpy.concatenate([numpy.zeros(Subjects.shape[0],dtype=numpy.int64)-1,IDs])[Keys]
+		Order=numpy.lexsort((IDFIDs,InFIDs))
+		Rings=GatherRings(Points,RingOffsets,RingKeys,Keys[Order])
+		Header,Rows=JoinedAttributes([[InShapefile,In[0],InFIDs[Order]],[IDShapefile,ID[0],IDFIDs[Order]]],JoinAttr)
+		WritePolygons(OutShapefile,Rings[0],Rings[1],Rings[2],Header,Rows,InShapefile)
+		return(True)
+	except Exception as err:
+		raise RuntimeError("** Error: Identity Failed ("+str(err)+")")
+
+################################################
+# Purpose: Field of an Identity output holding the identity features' FIDs (-1 for the
+#          parts outside them all): the FID_ field after the input's fields.  It cannot
+#          be named from the identity shapefile: both FID_ names are cut to 10
+#          characters, and a clash is renamed (FID_sandy_ and FID_sand_1).
+# Input: IdentityShapefile - Identity output (JoinAttr "ALL")
+#        InShapefile - the Identity input features
+# Output: FieldName - field name (upper case)
+def IdentityFIDField(IdentityShapefile,InShapefile):
+	Names=[Field[0] for Field in ShapefileIO.Schema(IdentityShapefile)[1]]
+	NumInFields=len(ShapefileIO.Schema(InShapefile)[1])
+	if len(Names)>NumInFields+1 and Names[NumInFields+1].startswith("FID_"):
+		return(Names[NumInFields+1])
+	FIDNames=[Name for Name in Names if Name.startswith("FID_")]
+	if len(FIDNames)<2:
+		raise RuntimeError(IdentityShapefile+" has no FID_ field for the identity features")
+	return(FIDNames[-1])
+
+################################################
+# Purpose: Combine polygon layers whose features do not overlap, with the attributes
+#          of every layer (FID_<layer> -1 and blank fields for the other layers'
+#          features); with nothing overlapping, each feature is copied as it is
+# Input: InShapefiles - list (or ;-separated string) of polygon shapefiles
+#        OutShapefile - output polygon shapefile
+#        JoinAttr - "ALL", "NO_FID" or "ONLY_FID"
+# Output: True when written, False when the inputs need the geoprocessor (other shape
+#          types, or features that overlap)
+def Union(InShapefiles,OutShapefile,JoinAttr):
+	try:
+		import NativeManagement
+		Names=NativeManagement.NameList(InShapefiles)
+		Layers=[PolygonLayer(Name) for Name in Names]
+		if Names==[] or None in Layers:
+			return(False)
+
+		### All features as one geometry, to find overlaps between and within layers
+		XY=numpy.vstack([Layer[1][0] for Layer in Layers])
+		PointStarts=numpy.cumsum([0]+[Layer[1][0].shape[0] for Layer in Layers])
+		PartStarts=numpy.cumsum([0]+[Layer[1][1].shape[0]-1 for Layer in Layers])
+		FeatureStarts=numpy.cumsum([0]+[Layer[1][2].shape[0]-1 for Layer in Layers])
+		PartOffsets=numpy.concatenate([Layer[1][1][0:-1]+Start for Layer,Start in zip(Layers,PointStarts)]+[PointStarts[-1:]])
+		FeatureParts=numpy.concatenate([Layer[1][2][0:-1]+Start for Layer,Start in zip(Layers,PartStarts)]+[PartStarts[-1:]])
+		Geometry=(XY,PartOffsets.astype(numpy.int64),FeatureParts.astype(numpy.int64))
+		Overlapping=PolygonOverlay.OverlappingPairs(Geometry)
+		if Overlapping is None or Overlapping.shape[0]>0:
+			return(False)
+
+		### Every feature with a shape, layer by layer
+		Features=numpy.flatnonzero(numpy.diff(FeatureParts)>0)
+		RingFeatures=numpy.repeat(numpy.arange(FeatureStarts[-1]),numpy.diff(FeatureParts))
+		Rings=GatherRings(XY,Geometry[1],RingFeatures,Features)
+		Joined=[]
+		for Name,Layer,First,Last in zip(Names,Layers,FeatureStarts[0:-1],FeatureStarts[1:]):
+			Joined.append([Name,Layer[0],numpy.where((Features>=First)&(Features<Last),Features-First,-1)])
+		Header,Rows=JoinedAttributes(Joined,JoinAttr)
+		WritePolygons(OutShapefile,Rings[0],Rings[1],Rings[2],Header,Rows,Names[0])
+		return(True)
+	except Exception as err:
+		raise RuntimeError("** Error: Union Failed ("+str(err)+")")
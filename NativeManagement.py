@@ -0,0 +1,544 @@
+#######################################################################
+# NativeManagement
+#
+# Purpose: Native versions of data management tools used by the scripts, working on
+#          shapefile records directly instead of through the geoprocessor.
+#          ManagementInterface calls these for shapefile inputs.
+#
+# Functions:
+#         SplitLineAtPoints - split lines where points snap to them within a radius
+#         Dissolve - merge lines sharing end points into continuous lines
+#         Append, MergeShapefiles - record level concatenation of same-schema shapefiles
+#         Multipart2Single - split multipart features, decoding only multipart records
+#
+# Modified: 10/19/2026
+#######################################################################
+import numpy
+import ShapefileIO
+import SpatialIndex
+
+# Cuts closer than this to each other or to a part end are merged
+SplitTolerance=1e-9
+
+################################################
+# Purpose: Flatten the parts of every record of a line shapefile into one segment table
+# Input: Reader - ShapefileReader for a polyline or polygon shapefile
+# Output: Dictionary of arrays, one entry per segment:
+#          S0, S1 - segment start and end points
+#          Part - index into the part table
+#          Measure - distance along the part to the segment start
+#          Length - segment length
+#        and the part table: PartXY, PartZ (lists of arrays), PartFID, PartNum
+def LineSegments(Reader):
+	Table={"S0":[],"S1":[],"Part":[],"Measure":[],"Length":[],
+	       "PartXY":[],"PartZ":[],"PartFID":[],"PartNum":[]}
+	for FID in range(Reader.NumRecords):
+		Content=Reader.RecordContent(FID)
+		XY,PartStarts=ShapefileIO.RecordGeometry(Content)
+		Z=ShapefileIO.RecordZ(Content)
+		Bounds=PartStarts+[XY.shape[0]]
+		for PartNum in range(len(PartStarts)):
+			PartXY=XY[Bounds[PartNum]:Bounds[PartNum+1]]
+			if PartXY.shape[0]<2:
+				continue
+			Lengths=numpy.sqrt(((PartXY[1:]-PartXY[0:-1])**2).sum(axis=1))
+			Table["S0"].append(PartXY[0:-1])
+			Table["S1"].append(PartXY[1:])
+			Table["Part"].append(numpy.repeat(len(Table["PartXY"]),Lengths.shape[0]))
+			Table["Measure"].append(numpy.cumsum(Lengths)-Lengths)
+			Table["Length"].append(Lengths)
+			Table["PartXY"].append(PartXY)
+			if Z is None:
+				Table["PartZ"].append(None)
+			else:
+				Table["PartZ"].append(Z[Bounds[PartNum]:Bounds[PartNum+1]])
+			Table["PartFID"].append(FID)
+			Table["PartNum"].append(PartNum)
+	for Key in ("S0","S1"):
+		if Table[Key]==[]:
+			Table[Key]=numpy.zeros((0,2))
+		else:
+			Table[Key]=numpy.vstack(Table[Key])
+	for Key in ("Part","Measure","Length"):
+		if Table[Key]==[]:
+			Table[Key]=numpy.zeros(0)
+		else:
+			Table[Key]=numpy.concatenate(Table[Key])
+	Table["Part"]=Table["Part"].astype(numpy.int64)
+	return(Table)
+
+################################################
+# Purpose: Cut one part at sorted measures in a single pass over its vertices
+# Input: PartXY - (n,2) vertex array
+#        PartZ - Z array or None
+#        Cuts - sorted distances along the part, strictly inside (0, length)
+# Output: Pieces - list of [XY, Z] for each piece (Z None when PartZ is None)
+def CutPart(PartXY,PartZ,Cuts):
+	Lengths=numpy.sqrt(((PartXY[1:]-PartXY[0:-1])**2).sum(axis=1))
+	VertexMeasure=numpy.concatenate([[0.0],numpy.cumsum(Lengths)])
+	# segment holding each cut, and position within it
+	Segment=numpy.clip(numpy.searchsorted(VertexMeasure,Cuts,side="right")-1,0,Lengths.shape[0]-1)
+	T=(Cuts-VertexMeasure[Segment])/numpy.where(Lengths[Segment]>0,Lengths[Segment],1.0)
+	CutXY=PartXY[Segment]+T[:,None]*(PartXY[Segment+1]-PartXY[Segment])
+	if PartZ is not None:
+		CutZ=PartZ[Segment]+T*(PartZ[Segment+1]-PartZ[Segment])
+
+	Pieces=[]
+	StartVertex=0
+	StartXY=PartXY[0:1]
+	StartZ=None
+	if PartZ is not None:
+		StartZ=PartZ[0:1]
+	for CutNum in range(len(Cuts)):
+		# vertices strictly after the previous cut up to and including the cut segment start
+		Inner=slice(StartVertex,Segment[CutNum]+1)
+		PieceXY=numpy.vstack([StartXY,PartXY[Inner],CutXY[CutNum:CutNum+1]])
+		PieceZ=None
+		if PartZ is not None:
+			PieceZ=numpy.concatenate([StartZ,PartZ[Inner],CutZ[CutNum:CutNum+1]])
+		Pieces.append(DropRepeats(PieceXY,PieceZ))
+		StartVertex=Segment[CutNum]+1
+		StartXY=CutXY[CutNum:CutNum+1]
+		if PartZ is not None:
+			StartZ=CutZ[CutNum:CutNum+1]
+	PieceXY=numpy.vstack([StartXY,PartXY[StartVertex:]])
+	PieceZ=None
+	if PartZ is not None:
+		PieceZ=numpy.concatenate([StartZ,PartZ[StartVertex:]])
+	Pieces.append(DropRepeats(PieceXY,PieceZ))
+	return(Pieces)
+
+################################################
+# Purpose: Remove consecutive duplicate vertices (a cut landing on a vertex)
+# Input: XY - (n,2) vertex array
+#        Z - Z array or None
+# Output: [XY, Z]
+def DropRepeats(XY,Z):
+	Keep=numpy.ones(XY.shape[0],dtype=bool)
+	Keep[1:]=(numpy.abs(XY[1:]-XY[0:-1])>SplitTolerance).any(axis=1)
+	if Z is None:
+		return([XY[Keep],None])
+	return([XY[Keep],Z[Keep]])
+
+################################################
+# Purpose: Split lines at points.  Each point snaps to its nearest line segment within
+#          Radius (found through a packed R-tree of the segments); the cut positions
+#          are sorted along each line and every line is cut in a single pass.
+#          Output features keep the attributes of the line they came from.
+# Input: InLine - polyline (or polygon outline) shapefile path and name
+#        InPoints - point shapefile path and name to split at
+#        OutShapefile - output polyline shapefile path and name
+#        Radius - search distance for snapping points to lines
+def SplitLineAtPoints(InLine,InPoints,OutShapefile,Radius):
+	try:
+		Lines=ShapefileIO.ShapefileReader(InLine)
+		Points=ShapefileIO.ShapefileReader(InPoints)
+		SearchRadius=max(SpatialIndex.DistanceValue(Radius),SpatialIndex.IntersectTolerance)
+
+		### Segment index
+		Table=LineSegments(Lines)
+		SegmentBoxes=numpy.hstack([numpy.minimum(Table["S0"],Table["S1"]),
+		                           numpy.maximum(Table["S0"],Table["S1"])])
+		Tree=SpatialIndex.PackedRTree(SegmentBoxes)
+
+		### Snap each point to its nearest segment
+		PointXY=[ShapefileIO.RecordGeometry(Points.RecordContent(FID))[0] for FID in range(Points.NumRecords)]
+		if PointXY==[]:
+			PointXY=numpy.zeros((0,2))
+		else:
+			PointXY=numpy.vstack(PointXY)
+		PointNums,Candidates=Tree.QueryMany(numpy.hstack([PointXY-SearchRadius,PointXY+SearchRadius]))
+		S0=Table["S0"][Candidates]
+		D=Table["S1"][Candidates]-S0
+		LengthSq=(D**2).sum(axis=1)
+		T=((PointXY[PointNums]-S0)*D).sum(axis=1)/numpy.where(LengthSq>0,LengthSq,1.0)
+		T=numpy.clip(numpy.where(LengthSq>0,T,0.0),0.0,1.0)
+		Distance=numpy.sqrt(((S0+T[:,None]*D-PointXY[PointNums])**2).sum(axis=1))
+		# nearest candidate per point, if within the radius
+		Order=numpy.lexsort((Distance,PointNums))
+		First=Order[numpy.diff(numpy.concatenate([[-1],PointNums[Order]]))!=0]
+		First=First[Distance[First]<=SearchRadius]
+		CutParts=Table["Part"][Candidates[First]]
+		CutMeasures=Table["Measure"][Candidates[First]]+T[First]*Table["Length"][Candidates[First]]
+
+		### Sort cuts along each part
+		Order=numpy.lexsort((CutMeasures,CutParts))
+		CutParts=CutParts[Order]
+		CutMeasures=CutMeasures[Order]
+		PartBounds=numpy.searchsorted(CutParts,numpy.arange(len(Table["PartXY"])+1))
+
+		### Cut every part and keep the source attributes
+		if Lines.ShapeType in ShapefileIO.ZShapes:
+			OutType=ShapefileIO.PolylineZShape
+		else:
+			OutType=ShapefileIO.PolylineShape
+		Contents=[]
+		DbfRows=[]
+		for PartIndex in range(len(Table["PartXY"])):
+			PartXY=Table["PartXY"][PartIndex]
+			Total=float(numpy.sqrt(((PartXY[1:]-PartXY[0:-1])**2).sum(axis=1)).sum())
+			Cuts=CutMeasures[PartBounds[PartIndex]:PartBounds[PartIndex+1]]
+			# drop cuts at the part ends and repeated cuts
+			Cuts=Cuts[(Cuts>SplitTolerance)&(Cuts<Total-SplitTolerance)]
+			if Cuts.shape[0]>1:
+				Cuts=Cuts[numpy.concatenate([[True],numpy.diff(Cuts)>SplitTolerance])]
+			for PieceXY,PieceZ in CutPart(PartXY,Table["PartZ"][PartIndex],Cuts):
+				if PieceXY.shape[0]<2:
+					continue
+				if PieceZ is None and OutType==ShapefileIO.PolylineZShape:
+					PieceZ=numpy.zeros(PieceXY.shape[0])
+				Contents.append(ShapefileIO.PolyContent(OutType,[PieceXY],[PieceZ]))
+				DbfRows.append(Lines.DbfRecord(Table["PartFID"][PartIndex]))
+
+		ShapefileIO.WriteRecords(OutShapefile,OutType,Contents,Lines.DbfHeader(),DbfRows,InLine)
+	except Exception as err:
+		raise RuntimeError("** Error: SplitLineAtPoints Failed ("+str(err)+")")
+
+###################################################################################
+# Class hashing snapped line end points to graph node numbers
+#  Points within Tolerance of each other share a node: each point is hashed to a
+#  grid cell of size Tolerance and the neighbouring cells are checked
+###################################################################################
+class EndpointNodes:
+
+	def __init__(self,Tolerance):
+		self.Tolerance=Tolerance
+		self.Cells={}
+		self.XY=[]
+
+	###################################################################################
+	# Node number for a point, creating a node if none is within the tolerance
+	# Inputs:
+	#         X, Y - point coordinates
+	#         Group - dissolve value; only points of the same group share nodes
+	###################################################################################
+	def Node(self,X,Y,Group):
+		CellX=int(numpy.floor(X/self.Tolerance))
+		CellY=int(numpy.floor(Y/self.Tolerance))
+		for DX in (0,-1,1):
+			for DY in (0,-1,1):
+				for NodeNum in self.Cells.get((Group,CellX+DX,CellY+DY),()):
+					NodeX,NodeY=self.XY[NodeNum]
+					if (NodeX-X)**2+(NodeY-Y)**2<=self.Tolerance**2:
+						return(NodeNum)
+		NodeNum=len(self.XY)
+		self.XY.append((float(X),float(Y)))
+		self.Cells.setdefault((Group,CellX,CellY),[]).append(NodeNum)
+		return(NodeNum)
+
+################################################
+# Purpose: Merge line parts that share end points into continuous lines by walking
+#          the chains of degree-2 nodes of the end point graph (UNSPLIT_LINES)
+# Input: Reader - ShapefileReader for a polyline shapefile
+#        Groups - list with the dissolve value of each record (lines of different
+#                 values are never joined)
+#        Tolerance - distance within which end points are the same node
+# Output: [Chains, BranchPoints]
+#          Chains - list of [Group, XY, Z, FIDs] for each merged line
+#          BranchPoints - list of (X, Y) where more than two lines meet
+def MergeLineChains(Reader,Groups,Tolerance):
+	Nodes=EndpointNodes(Tolerance)
+	# Edges: one per line part with its end nodes
+	EdgeXY=[]
+	EdgeZ=[]
+	EdgeFID=[]
+	EdgeGroup=[]
+	EdgeEnds=[]
+	Incident={}
+	for FID in range(Reader.NumRecords):
+		Content=Reader.RecordContent(FID)
+		XY,PartStarts=ShapefileIO.RecordGeometry(Content)
+		Z=ShapefileIO.RecordZ(Content)
+		Bounds=PartStarts+[XY.shape[0]]
+		for PartNum in range(len(PartStarts)):
+			PartXY=XY[Bounds[PartNum]:Bounds[PartNum+1]]
+			if PartXY.shape[0]<2:
+				continue
+			StartNode=Nodes.Node(PartXY[0,0],PartXY[0,1],Groups[FID])
+			EndNode=Nodes.Node(PartXY[-1,0],PartXY[-1,1],Groups[FID])
+			EdgeNum=len(EdgeXY)
+			EdgeXY.append(PartXY)
+			if Z is None:
+				EdgeZ.append(None)
+			else:
+				EdgeZ.append(Z[Bounds[PartNum]:Bounds[PartNum+1]])
+			EdgeFID.append(FID)
+			EdgeGroup.append(Groups[FID])
+			EdgeEnds.append((StartNode,EndNode))
+			Incident.setdefault(StartNode,[]).append(EdgeNum)
+			Incident.setdefault(EndNode,[]).append(EdgeNum)
+
+	Visited=numpy.zeros(len(EdgeXY),dtype=bool)
+	Chains=[]
+
+	### Walk from every node that is not a pass-through node, then the closed loops
+	StartNodes=[NodeNum for NodeNum in Incident if len(Incident[NodeNum])!=2]
+	LoopNodes=[NodeNum for NodeNum in Incident if len(Incident[NodeNum])==2]
+	for NodeNum in StartNodes+LoopNodes:
+		for EdgeNum in Incident[NodeNum]:
+			if Visited[EdgeNum]:
+				continue
+			ChainXY=[]
+			ChainZ=[]
+			ChainFIDs=[]
+			Current=NodeNum
+			while True:
+				Visited[EdgeNum]=True
+				StartNode,EndNode=EdgeEnds[EdgeNum]
+				PartXY=EdgeXY[EdgeNum]
+				PartZ=EdgeZ[EdgeNum]
+				# orient the edge to leave the current node
+				if StartNode!=Current:
+					PartXY=PartXY[::-1]
+					if PartZ is not None:
+						PartZ=PartZ[::-1]
+					StartNode,EndNode=EndNode,StartNode
+				# the first vertex repeats the previous edge's last vertex
+				if ChainXY==[]:
+					ChainXY.append(PartXY)
+					ChainZ.append(PartZ)
+				else:
+					ChainXY.append(PartXY[1:])
+					if PartZ is not None:
+						ChainZ.append(PartZ[1:])
+				ChainFIDs.append(EdgeFID[EdgeNum])
+				Current=EndNode
+				if len(Incident[Current])!=2:
+					break
+				Next=[Edge for Edge in Incident[Current] if not Visited[Edge]]
+				if Next==[]:
+					break
+				EdgeNum=Next[0]
+			XY=numpy.vstack(ChainXY)
+			Z=None
+			if ChainZ[0] is not None:
+				Z=numpy.concatenate(ChainZ)
+			Chains.append([EdgeGroup[EdgeNum],XY,Z,ChainFIDs])
+
+	BranchPoints=[Nodes.XY[NodeNum] for NodeNum in StartNodes if len(Incident[NodeNum])>2]
+	return([Chains,BranchPoints])
+
+################################################
+# Purpose: Dissolve line features natively: lines sharing end points are merged into
+#          continuous polylines through an end point graph
+# Input: InShapefile - polyline shapefile path and name
+#        OutShapefile - merged polyline shapefile path and name
+#        DissolveField - field to aggregate on ("#" or "" for all lines together)
+#        Multi - "SINGLE_PART" (one feature per merged line) or "MULTI_PART" (one
+#                feature per dissolve value)
+#        Unsplit - "UNSPLIT_LINES" or "DISSOLVE_LINES" (both merge through the graph;
+#                  DISSOLVE_LINES with MULTI_PART gives one feature per value)
+# Output: BranchPoints - list of (X, Y) where more than two lines meet, which is where
+#          lines could not be merged into a single continuous line
+def Dissolve(InShapefile,OutShapefile,DissolveField,Multi,Unsplit):
+	try:
+		Lines=ShapefileIO.ShapefileReader(InShapefile)
+		if Lines.ShapeType not in (ShapefileIO.PolylineShape,ShapefileIO.PolylineZShape,
+		                           ShapefileIO.PolylineMShape):
+			raise RuntimeError(InShapefile+" is not a polyline shapefile")
+
+		### Output attribute: the dissolve field, or an Id field as the geoprocessor writes
+		if DissolveField in ("#","",None):
+			Groups=[0]*Lines.NumRecords
+			Fields=[("Id","N",6,0)]
+		else:
+			Groups=Lines.Column(DissolveField).tolist()
+			Field=[Field for Field in Lines.Fields if Field[0].upper()==DissolveField.upper()][0]
+			Fields=[(Field[0],Field[1],Field[2],Field[3])]
+
+		Chains,BranchPoints=MergeLineChains(Lines,Groups,SpatialIndex.IntersectTolerance)
+
+		if Lines.ShapeType==ShapefileIO.PolylineZShape:
+			OutType=ShapefileIO.PolylineZShape
+		else:
+			OutType=ShapefileIO.PolylineShape
+
+		### One feature per chain, or one multipart feature per dissolve value
+		Features=[]
+		if Multi=="MULTI_PART":
+			Order=[]
+			ByGroup={}
+			for Chain in Chains:
+				if Chain[0] not in ByGroup:
+					Order.append(Chain[0])
+					ByGroup[Chain[0]]=[]
+				ByGroup[Chain[0]].append(Chain)
+			for Group in Order:
+				Features.append([Group,[Chain[1] for Chain in ByGroup[Group]],[Chain[2] for Chain in ByGroup[Group]]])
+		else:
+			for Chain in Chains:
+				Features.append([Chain[0],[Chain[1]],[Chain[2]]])
+
+		Contents=[]
+		DbfRows=[]
+		for Group,Parts,ZParts in Features:
+			if OutType==ShapefileIO.PolylineZShape:
+				for PartNum in range(len(Parts)):
+					if ZParts[PartNum] is None:
+						ZParts[PartNum]=numpy.zeros(Parts[PartNum].shape[0])
+			Contents.append(ShapefileIO.PolyContent(OutType,Parts,ZParts))
+			DbfRows.append(ShapefileIO.NewDbfRow(Fields,[Group]))
+
+		ShapefileIO.WriteRecords(OutShapefile,OutType,Contents,
+		                         ShapefileIO.NewDbfHeader(Fields,len(Contents)),DbfRows,InShapefile)
+		return(BranchPoints)
+	except Exception as err:
+		raise RuntimeError("** Error: Dissolve Failed ("+str(err)+")")
+
+################################################
+# Purpose: Split a list of dataset names given as a list or separated by semi-colons
+# Input: InShapefiles - list of names or a string of names separated by semi-colons
+# Output: Names - list of names
+def NameList(InShapefiles):
+	if isinstance(InShapefiles,(list,tuple)):
+		return(list(InShapefiles))
+	return([Name.strip() for Name in InShapefiles.split(";") if Name.strip()!=""])
+
+################################################
+# Purpose: Append shapefiles with the target's schema to it.  Record contents and
+#          dBASE rows are copied as memoryview slices; only record headers, .shx
+#          offsets and file headers are written (see ShapefileIO.AppendRecords).
+# Input: InShapefiles - shapefile names as a list or separated by semi-colons
+#        TargetShapefile - existing shapefile path and name
+def Append(InShapefiles,TargetShapefile):
+	try:
+		TargetSchema=ShapefileIO.Schema(TargetShapefile)
+		for InShapefile in NameList(InShapefiles):
+			if ShapefileIO.Schema(InShapefile)!=TargetSchema:
+				raise RuntimeError(InShapefile+" does not have the same schema as "+TargetShapefile)
+			Reader=ShapefileIO.ShapefileReader(InShapefile)
+			ShapefileIO.AppendRecords(TargetShapefile,
+			                          [Reader.RecordContent(FID) for FID in range(Reader.NumRecords)],
+			                          [Reader.DbfRecord(FID) for FID in range(Reader.NumRecords)])
+	except Exception as err:
+		raise RuntimeError("** Error: Append Failed ("+str(err)+")")
+
+################################################
+# Purpose: Merge shapefiles with the same schema into a new shapefile by concatenating
+#          their records (memoryview slices, no geometry decoding)
+# Input: InShapefiles - shapefile names as a list or separated by semi-colons
+#        OutShapefile - output shapefile path and name
+def MergeShapefiles(InShapefiles,OutShapefile):
+	try:
+		Names=NameList(InShapefiles)
+		Readers=[ShapefileIO.ShapefileReader(Name) for Name in Names]
+		for Name in Names[1:]:
+			if ShapefileIO.Schema(Name)!=ShapefileIO.Schema(Names[0]):
+				raise RuntimeError(Name+" does not have the same schema as "+Names[0])
+		Contents=[]
+		DbfRows=[]
+		for Reader in Readers:
+			for FID in range(Reader.NumRecords):
+				Contents.append(Reader.RecordContent(FID))
+				DbfRows.append(Reader.DbfRecord(FID))
+		ShapefileIO.WriteRecords(OutShapefile,Readers[0].ShapeType,Contents,
+		                         Readers[0].DbfHeader(),DbfRows,Names[0])
+	except Exception as err:
+		raise RuntimeError("** Error: MergeShapefiles Failed ("+str(err)+")")
+
+################################################
+# Purpose: Ring orientation by the shoelace sum (shapefile outer rings are clockwise)
+# Input: Ring - (n,2) closed ring vertex array
+# Output: True for a clockwise (outer) ring
+def IsClockwise(Ring):
+	return(float((Ring[0:-1,0]*Ring[1:,1]-Ring[1:,0]*Ring[0:-1,1]).sum())<0)
+
+################################################
+# Purpose: Split multipart features into singlepart features.  Single part records are
+#          copied unchanged; only multipart records are decoded.  Polygon holes stay
+#          with the outer ring that contains them.  An ORIG_FID field holds the FID of
+#          the source feature, as written by the geoprocessor.
+# Input: InShapefile - shapefile path and name, or a Selection (selected records only)
+#        OutShapefile - output shapefile path and name
+def Multipart2Single(InShapefile,OutShapefile):
+	try:
+		if hasattr(InShapefile,"Reader"):
+			Reader=InShapefile.Reader
+			FIDs=InShapefile.FIDs()
+			SourceName=InShapefile.Shapefile
+		else:
+			Reader=ShapefileIO.ShapefileReader(InShapefile)
+			FIDs=range(Reader.NumRecords)
+			SourceName=InShapefile
+
+		### Output fields: the source fields plus ORIG_FID
+		Fields=[(Field[0],Field[1],Field[2],Field[3]) for Field in Reader.Fields]
+		OrigField=[("ORIG_FID","N",9,0)]
+		DbfHeader=ShapefileIO.NewDbfHeader(Fields+OrigField,0)
+		OutType=Reader.ShapeType
+		if OutType in (ShapefileIO.MultiPointShape,ShapefileIO.MultiPointMShape):
+			OutType=ShapefileIO.PointShape
+		elif OutType==ShapefileIO.MultiPointZShape:
+			OutType=ShapefileIO.PointZShape
+
+		Contents=[]
+		DbfRows=[]
+		for FID in FIDs:
+			Content=Reader.RecordContent(FID)
+			# attribute row is the source row with ORIG_FID added
+			Row=Reader.DbfRecord(FID).tobytes()+ShapefileIO.NewDbfRow(OrigField,[FID])[1:]
+			for Piece in SinglePartContents(Content,OutType):
+				Contents.append(Piece)
+				DbfRows.append(Row)
+
+		ShapefileIO.WriteRecords(OutShapefile,OutType,Contents,DbfHeader,DbfRows,SourceName)
+	except Exception as err:
+		raise RuntimeError("** Error: Multipart2Single Failed ("+str(err)+")")
+
+################################################
+# Purpose: Single part record contents for one record content
+# Input: Content - record content
+#        OutType - output shape type
+# Output: Pieces - list of record contents (the input slice itself when already single part)
+def SinglePartContents(Content,OutType):
+	ShapeType=int(numpy.frombuffer(Content,dtype="<i4",count=1)[0])
+	if ShapeType==ShapefileIO.NullShape or ShapeType in ShapefileIO.PointShapes:
+		return([Content])
+	XY,PartStarts=ShapefileIO.RecordGeometry(Content)
+	if ShapeType in (ShapefileIO.MultiPointShape,ShapefileIO.MultiPointZShape,ShapefileIO.MultiPointMShape):
+		Z=ShapefileIO.RecordZ(Content)
+		Pieces=[]
+		for PointNum in range(XY.shape[0]):
+			Piece=numpy.array([OutType],dtype="<i4").tobytes()+XY[PointNum].astype("<f8").tobytes()
+			if OutType==ShapefileIO.PointZShape:
+				# Z and a zero measure
+				Piece=Piece+numpy.array([Z[PointNum],0.0],dtype="<f8").tobytes()
+			Pieces.append(Piece)
+		return(Pieces)
+	if len(PartStarts)<=1:
+		return([Content])
+
+	Z=ShapefileIO.RecordZ(Content)
+	if ShapeType in ShapefileIO.ZShapes:
+		WriteType=ShapeType
+	elif ShapeType in (ShapefileIO.PolygonShape,ShapefileIO.PolygonMShape):
+		WriteType=ShapefileIO.PolygonShape
+	else:
+		WriteType=ShapefileIO.PolylineShape
+	Bounds=PartStarts+[XY.shape[0]]
+	Parts=[XY[Bounds[PartNum]:Bounds[PartNum+1]] for PartNum in range(len(PartStarts))]
+	ZParts=[None]*len(Parts)
+	if Z is not None:
+		ZParts=[Z[Bounds[PartNum]:Bounds[PartNum+1]] for PartNum in range(len(PartStarts))]
+
+	### Lines: every part is a feature
+	if WriteType in (ShapefileIO.PolylineShape,ShapefileIO.PolylineZShape):
+		return([ShapefileIO.PolyContent(WriteType,[Part],[ZPart]) for Part,ZPart in zip(Parts,ZParts)])
+
+	### Polygons: every outer ring with the holes inside it
+	Outer=[PartNum for PartNum in range(len(Parts)) if IsClockwise(Parts[PartNum])]
+	if Outer==[]:
+		return([Content])
+	Members=dict([(PartNum,[PartNum]) for PartNum in Outer])
+	for PartNum in range(len(Parts)):
+		if PartNum in Members:
+			continue
+		Owner=Outer[0]
+		for OuterNum in Outer:
+			Ring=Parts[OuterNum]
+			if SpatialIndex.PointsInPolygon(Parts[PartNum][0:1],Ring[0:-1],Ring[1:])[0]:
+				Owner=OuterNum
+				break
+		Members[Owner].append(PartNum)
+	return([ShapefileIO.PolyContent(WriteType,[Parts[PartNum] for PartNum in Members[OuterNum]],
+	                                [ZParts[PartNum] for PartNum in Members[OuterNum]]) for OuterNum in Outer])
@@ -0,0 +1,21 @@
+#######################################################################
+# arcpy (OfflineArcpy)
+#
+# Purpose: Stand-in for the arcpy package that replays a run recorded with ArcpyReplay, so
+#          the scripts import and run on machines without ArcGIS.  The record folder is
+#          named in ARCPY_REPLAY, and ARCPY_REPLAY_SCALE scales the recorded call times
+#          (0 to not wait).
+#
+# Usage:
+#         PYTHONPATH=OfflineArcpy ARCPY_REPLAY=RecordFolder python2 SomeScript.py
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+import ArcpyReplay
+
+sys.modules[__name__]=ArcpyReplay.ReplayModule(os.environ.get("ARCPY_REPLAY",""),
+                                               float(os.environ.get("ARCPY_REPLAY_SCALE","1")))
@@ -0,0 +1,197 @@
+#######################################################################
+# PointAssignment
+#
+# Purpose: Label every point of a (very large) point shapefile with the segment polygon
+#          that contains it - the native replacement for a spatial join of the points to
+#          the output of RiverCorridorPolygons (_segmented.shp or _segmented_diss.shp).
+#
+#          Points are streamed from the shapefile in chunks of ChunkPoints records, so
+#          memory use does not grow with the number of points.  For each chunk the
+#          candidate polygons of every point come from the packed R-tree of the segment
+#          polygons (SpatialIndex, saved as <polygons>.strtree) and a vectorized crossing
+#          number test over the candidate pairs (SpatialIndex.PairsInPolygons) keeps the
+#          containing ones.  Where polygons overlap (on the inside of bends in
+#          _segmented.shp) the lowest CID is used; points outside every polygon get CID -1
+#          and a blank Station.
+#
+#          AssignPoints writes a copy of the point shapefile with CID and Station fields
+#          added: the .shp and .shx are copied byte for byte and the .dbf rows are
+#          extended chunk by chunk.  AssignChunks yields the labels for callers that
+#          want the arrays instead.
+#
+# Usage:
+#         AssignPoints(LidarPoints,DissShp,LidarPointsLabeled)
+#         for FirstFID,CIDs,Stations in AssignChunks(LidarPoints,DissShp):
+#             ...
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import shutil
+import struct
+import numpy
+import ShapefileIO
+import SpatialIndex
+from LinearReference import SegmentNumbers
+
+# Point records read and labelled together
+ChunkPoints=1000000
+
+# Fields added to the output points
+AssignFields=[("CID","N",10,0),("Station","N",13,2)]
+
+###################################################################################
+# Class holding the segment polygons points are assigned to
+###################################################################################
+class SegmentPolygonIndex:
+
+	###################################################################################
+	# Constructor - reads the polygon edges and loads (or builds) the polygon R-tree
+	# Inputs:
+	#         SegmentPolygons - segment polygon shapefile with a CID (or NEAR_FID) field
+	#                           and, optionally, a Station field
+	###################################################################################
+	def __init__(self,SegmentPolygons):
+		Reader=ShapefileIO.ShapefileReader(SegmentPolygons)
+		if Reader.ShapeType not in (ShapefileIO.PolygonShape,ShapefileIO.PolygonZShape,ShapefileIO.PolygonMShape):
+			raise RuntimeError(SegmentPolygons+" is not a polygon shapefile")
+		self.CIDs,self.Stations=SegmentNumbers(Reader)
+		self.S0,self.S1,self.EdgeOffsets=SpatialIndex.PolygonEdges(Reader,range(Reader.NumRecords))
+		self.Tree=SpatialIndex.LoadIndex(SegmentPolygons,Reader)
+
+	###################################################################################
+	# CID and Station of the polygon containing each point
+	# Inputs:
+	#         Points - (n,2) array (NaN rows for null shapes)
+	# Outputs:
+	#         [CIDs, Stations] - integer array (-1 outside every polygon) and float array
+	#          (NaN outside every polygon)
+	###################################################################################
+	def Assign(self,Points):
+		CIDs=numpy.zeros(Points.shape[0],dtype=numpy.int64)-1
+		Stations=numpy.zeros(Points.shape[0])+numpy.nan
+		# null shapes have NaN coordinates and match no node box
+		QueryNums,FIDs=self.Tree.QueryMany(numpy.hstack([Points,Points]))
+		Inside=SpatialIndex.PairsInPolygons(Points[QueryNums],FIDs,self.S0,self.S1,self.EdgeOffsets)
+		QueryNums=QueryNums[Inside]
+		FIDs=FIDs[Inside]
+		if QueryNums.shape[0]>0:
+			# lowest CID of the polygons containing each point
+			Order=numpy.lexsort((self.CIDs[FIDs],QueryNums))
+			First=Order[numpy.unique(QueryNums[Order],return_index=True)[1]]
+			CIDs[QueryNums[First]]=self.CIDs[FIDs[First]]
+			Stations[QueryNums[First]]=self.Stations[FIDs[First]]
+		return([CIDs,Stations])
+
+################################################
+# Purpose: Read the coordinates of a point shapefile in chunks
+# Input: PointShapefile - point shapefile path and name
+#        ChunkSize - records per chunk
+# Output: generator of (FirstFID, XY) - XY the (k,2) coordinates of records FirstFID
+#          to FirstFID+k-1, NaN for null shapes
+def PointChunks(PointShapefile,ChunkSize=ChunkPoints):
+	Base=ShapefileIO.BaseName(PointShapefile)
+	if ShapefileIO.ShapeTypeOf(PointShapefile) not in ShapefileIO.PointShapes:
+		raise RuntimeError(PointShapefile+" is not a point shapefile")
+	NumRecords=(os.path.getsize(Base+".shx")-100)//8
+	ShxFile=open(Base+".shx","rb")
+	ShpFile=open(Base+".shp","rb")
+	try:
+		for FirstFID in range(0,NumRecords,ChunkSize):
+			Count=min(ChunkSize,NumRecords-FirstFID)
+			ShxFile.seek(100+8*FirstFID)
+			Index=numpy.frombuffer(ShxFile.read(8*Count),dtype=">i4").reshape(Count,2)
+			# byte offsets of the record contents (skip 8 byte record header)
+			Offsets=Index[:,0].astype(numpy.int64)*2+8
+			Lengths=Index[:,1].astype(numpy.int64)*2
+			# the chunk's records are read as one span of the main file
+			SpanStart=int(Offsets.min())
+			SpanEnd=int((Offsets+Lengths).max())
+			ShpFile.seek(SpanStart)
+			Bytes=numpy.frombuffer(ShpFile.read(SpanEnd-SpanStart),dtype=numpy.uint8)
+			Offsets=Offsets-SpanStart
+			Types=Bytes[Offsets[:,None]+numpy.arange(4)].copy().view("<i4").ravel()
+			XY=numpy.zeros((Count,2))+numpy.nan
+			Shapes=Types!=ShapefileIO.NullShape
+			if Shapes.any():
+				XY[Shapes]=Bytes[Offsets[Shapes][:,None]+4+numpy.arange(16)].copy().view("<f8")
+			yield (FirstFID,XY)
+	finally:
+		ShxFile.close()
+		ShpFile.close()
+
+################################################
+# Purpose: Segment polygon labels of a point shapefile, chunk by chunk
+# Input: PointShapefile - point shapefile path and name
+#        SegmentPolygons - segment polygon shapefile
+#        ChunkSize - records per chunk
+# Output: generator of (FirstFID, CIDs, Stations) for consecutive chunks of records
+def AssignChunks(PointShapefile,SegmentPolygons,ChunkSize=ChunkPoints):
+	Polygons=SegmentPolygonIndex(SegmentPolygons)
+	for FirstFID,XY in PointChunks(PointShapefile,ChunkSize):
+		CIDs,Stations=Polygons.Assign(XY)
+		yield (FirstFID,CIDs,Stations)
+
+################################################
+# Purpose: Copy a point shapefile with the CID and Station of the segment polygon
+#          containing each point added
+# Input: PointShapefile - point shapefile path and name
+#        SegmentPolygons - segment polygon shapefile (_segmented.shp or _segmented_diss.shp)
+#        OutShapefile - output point shapefile path and name
+#        ChunkSize - records per chunk
+# Output: NumAssigned - number of points inside a segment polygon
+def AssignPoints(PointShapefile,SegmentPolygons,OutShapefile,ChunkSize=ChunkPoints):
+	try:
+		InBase=ShapefileIO.BaseName(PointShapefile)
+		OutBase=ShapefileIO.BaseName(OutShapefile)
+		if os.path.abspath(InBase)==os.path.abspath(OutBase):
+			raise RuntimeError("output would overwrite the input points")
+
+		### Input dBASE header, checked for the added field names
+		DbfFile=open(InBase+".dbf","rb")
+		NumRecords,HeaderLength,RecordLength=struct.unpack_from("<IHH",DbfFile.read(12),4)
+		DbfFile.seek(0)
+		InHeader=DbfFile.read(HeaderLength)
+		DbfFile.close()
+		Names=[]
+		Position=32
+		while InHeader[Position:Position+1]!=b"\r":
+			Names.append(InHeader[Position:Position+11].split(b"\x00")[0].decode("latin-1").upper())
+			Position+=32
+		if NumRecords!=(os.path.getsize(InBase+".shx")-100)//8:
+			raise RuntimeError(InBase+".dbf and .shx record counts differ")
+		for Field in AssignFields:
+			if Field[0].upper() in Names:
+				raise RuntimeError(PointShapefile+" already has a "+Field[0]+" field")
+
+		### Output header: the input fields plus CID and Station
+		Added=ShapefileIO.NewDbfHeader(AssignFields,0)
+		Header=bytearray(InHeader[0:Position]+Added[32:])
+		struct.pack_into("<HH",Header,8,len(Header),RecordLength+sum(Field[2] for Field in AssignFields))
+
+		### Geometry is unchanged: copy the main and index files
+		for Extension in (".shp",".shx"):
+			shutil.copyfile(InBase+Extension,OutBase+Extension)
+		ShapefileIO.CopySidecars(PointShapefile,OutBase)
+
+		### Attribute rows extended chunk by chunk
+		DbfFile=open(InBase+".dbf","rb")
+		OutFile=open(OutBase+".dbf","wb")
+		try:
+			OutFile.write(Header)
+			NumAssigned=0
+			for FirstFID,CIDs,Stations in AssignChunks(PointShapefile,SegmentPolygons,ChunkSize):
+				DbfFile.seek(HeaderLength+FirstFID*RecordLength)
+				Rows=numpy.frombuffer(DbfFile.read(CIDs.shape[0]*RecordLength),dtype=numpy.uint8)
+				Rows=Rows.reshape(CIDs.shape[0],RecordLength)
+				Outside=CIDs==-1
+				Added=ShapefileIO.NewDbfColumns(AssignFields,[numpy.where(Outside,numpy.nan,CIDs),Stations])
+				OutFile.write(numpy.hstack([Rows,Added]).tobytes())
+				NumAssigned+=int((~Outside).sum())
+			OutFile.write(b"\x1a")
+		finally:
+			OutFile.close()
+			DbfFile.close()
+		return(NumAssigned)
+	except Exception as err:
+		raise RuntimeError("** Error: AssignPoints Failed ("+str(err)+")")
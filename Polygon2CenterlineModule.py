@@ -8,15 +8,22 @@
 # Input: TheInPolyFile - the name of a polygon feature class with 1 polygon
 #        TheInPointFile - the name of a point feature class with the 4 corner points to split the polygon at
 #                ***Must have "Id" field with 0 for DS left, 1 for DS right, 10 for US left, 11 for US right
+#                ("" to detect the corners from the polygon, written to _cornerpoints.shp: see CornerDetection)
 #        TheOutFilePath: the path of the folder to put the output shapefiles in
 #        MaxWidth - numeric value for the largest distance between boundaries
 #        AsArcGISTool: binary specifying if running as a GIS tool (1) or not (0) to control messaging
+#        Job: JobContext owning layer names and geoprocessor settings (None for the shared default)
+#        UpstreamLine, DownstreamLine - polylines across the channel ends the corners are detected at
+#                (only without TheInPointFile; "" to detect the corners from the turning of the boundary)
+#        SimplifyError - largest error of side lines simplified (LevelOfDetail pyramid) to create the
+#                centerline from, written to _finalsidepolylines_lod.shp (0 for the full resolution side lines)
 #
 # Output: _centerlinepolyline.shp:(CenterlinePolyline) - a polyline centered between the two specified boundary sides
 #
-# Returns: [CenterlinePolyline, FlipCenterline] as a list
+# Returns: [CenterlinePolyline, FlipCenterline, FinalBoundaries] as a list - FinalBoundaries (_finalsidepolylines.shp) holds the two side lines
 #
 # Process:
+#         0) Detect the corner points if none are given
 #         1) Convert boundary polygon to polylines 
 #         2) Split polylines using points
 #         3) Ensure polylines are only split at points
@@ -25,7 +32,8 @@
 #
 # Modified: 3/17/2013
 #######################################################################
-def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsArcGISTool):
+def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsArcGISTool,Job=None,
+                       UpstreamLine="",DownstreamLine="",SimplifyError=0):
 	try:
 		import os
 		from math import sqrt
@@ -34,13 +42,18 @@ def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsAr
 		import ManagementInterface as MgmtGIS
 		import ShapefileProperties as ShpProp
 		from SplitLineModule import SplitLine
+		from CornerDetection import DetectCorners
+		from LevelOfDetail import WriteLevel,NearFeatures
 		from MessagingModule import MessageSwitch
+		import JobContext
 
 		### Setup classes, etc.
+		if Job is None:
+			Job=JobContext.DefaultJob()
 		# Create instances of classes
-		AInterface=AnalysisGIS.AnalysisInterface()
-		MgmtInterface=MgmtGIS.ManagementInterface()
-		CartInterface=CartGIS.CartographyInterface()  
+		AInterface=AnalysisGIS.AnalysisInterface(Job)
+		MgmtInterface=MgmtGIS.ManagementInterface(Job)
+		CartInterface=CartGIS.CartographyInterface(Job)  
 
 		# Extract just the polygon file name
 		TheFileName=os.path.basename(TheInPolyFile)
@@ -56,6 +69,26 @@ def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsAr
 			MessageSwitch(AsArcGISTool,message)
 			x=1/0
 
+		# Make sure output folder has ending slash
+		if TheOutFilePath[-1] != u"/" or TheOutFilePath[-2:-1] != u"\\":
+			TheOutFilePath=TheOutFilePath+"/"	
+		# Check to see if out folder exists, if not create it
+		if os.path.isdir(TheOutFilePath)!= True:        
+			os.mkdir(TheOutFilePath)
+	
+		# Create intermediate file folder if it does not exist
+		IntermedOutputFolder=TheOutFilePath+"IntermediateFiles/"
+		if os.path.isdir(IntermedOutputFolder)!= True:
+			os.mkdir(IntermedOutputFolder)
+
+		### Detect the corner points from the polygon if none were given
+		if TheInPointFile=="":
+			# Update user on process
+			message="Detecting corner points of " + TheFileName+ "..."
+			MessageSwitch(AsArcGISTool,message)
+			TheInPointFile=DetectCorners(TheInPolyFile,IntermedOutputFolder+TheFileName+"_cornerpoints.shp",
+			                             0,None,UpstreamLine,DownstreamLine)
+
 		#Determine how many input point features there are
 		NumPoints=MgmtInterface.CountRows(TheInPointFile)
 
@@ -80,18 +113,6 @@ def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsAr
 				MessageSwitch(message,AsArcGISTool)		
 				x=1/0
 		
-		# Make sure output folder has ending slash
-		if TheOutFilePath[-1] != u"/" or TheOutFilePath[-2:-1] != u"\\":
-			TheOutFilePath=TheOutFilePath+"/"	
-		# Check to see if out folder exists, if not create it
-		if os.path.isdir(TheOutFilePath)!= True:        
-			os.mkdir(TheOutFilePath)
-	
-		# Create intermediate file folder if it does not exist
-		IntermedOutputFolder=TheOutFilePath+"IntermediateFiles/"
-		if os.path.isdir(IntermedOutputFolder)!= True:
-			os.mkdir(IntermedOutputFolder)
-
 		### Convert polygon to polyline
 		# Update user on process
 		message="Converting " + TheFileName+ " to polyline..."
@@ -109,85 +130,96 @@ def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsAr
 		### Reconnect lines if separated at more than just corners (more than 4 lines): e.g. end of line fell in middle of boundary
 		# Determine how many polyline features there are
 		NumLines=MgmtInterface.CountRows(BoundaryRawPolyline)
-		# Convert to feature layers
-		MgmtInterface.CreateLayer(TheInPointFile,"Point_Layer")
+		# Create native selection on the corner points
+		PointSelection=MgmtInterface.CreateSelection(TheInPointFile)
 		
 		if NumLines>4:
 			# Convert to feature layers
-			MgmtInterface.CreateLayer(BoundaryRawPolyline,"Polyline_Layer")
+			Polyline_Layer=Job.LayerName("Polyline_Layer")
+			MgmtInterface.CreateLayer(BoundaryRawPolyline,Polyline_Layer)
 			# Create new field in polyline to specify which lines to dissolve
-			MgmtInterface.AddField("Polyline_Layer","Dissolve","SHORT","#","#","#")
+			MgmtInterface.AddField(Polyline_Layer,"Dissolve","SHORT","#","#","#")
 			# Write fid to new field
-			MgmtInterface.WriteField("Polyline_Layer","Dissolve", "[FID]","VB")
+			MgmtInterface.WriteField(Polyline_Layer,"Dissolve", "[FID]","VB")
+			
+			# Native selection on the split lines (after the Dissolve field is written)
+			PolylineSelection=MgmtInterface.CreateSelection(BoundaryRawPolyline)
 			
 			# Select line on left side using points
 			# Select left side points
-			MgmtInterface.SelectUsingAttributes("Point_Layer","NEW_SELECTION","\"Id\" = 0 OR \"Id\" = 10")
+			MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION","\"Id\" = 0 OR \"Id\" = 10")
 			# Select lines which intersects left points
-			MgmtInterface.SelectUsingLocation("Polyline_Layer","INTERSECT","Point_Layer",0,"NEW_SELECTION")
+			MgmtInterface.SelectUsingLocation(PolylineSelection,"INTERSECT",PointSelection,0,"NEW_SELECTION")
 			# Select right side points
-			MgmtInterface.SelectUsingAttributes("Point_Layer","NEW_SELECTION","\"Id\" = 1 OR \"Id\" = 11")
+			MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION","\"Id\" = 1 OR \"Id\" = 11")
 			# Deselect lines which intersect right side points
-			MgmtInterface.SelectUsingLocation("Polyline_Layer","INTERSECT","Point_Layer",0,"REMOVE_FROM_SELECTION")
+			MgmtInterface.SelectUsingLocation(PolylineSelection,"INTERSECT",PointSelection,0,"REMOVE_FROM_SELECTION")
 			
 			# Check to see if more than 1 line - if so write to field for dissolve field calculation
-			NumSelected=MgmtInterface.CountRows("Polyline_Layer")
+			NumSelected=MgmtInterface.CountRows(PolylineSelection)
 			if NumSelected>1:
-				# write consistent ID to Dissolve field
-				MgmtInterface.WriteField("Polyline_Layer","Dissolve",5,"VB")		
+				# Carry the selection over to the layer and write consistent ID to Dissolve field
+				SelectedFIDs=ShpProp.ListFromField(PolylineSelection,"FID")
+				MgmtInterface.SelectUsingAttributes(Polyline_Layer,"NEW_SELECTION",
+				                                    "\"FID\" IN ("+",".join([format(FID) for FID in SelectedFIDs])+")")
+				MgmtInterface.WriteField(Polyline_Layer,"Dissolve",5,"VB")		
 			
 			# Select lines which are on right side using points
 			# Select right side points
-			MgmtInterface.SelectUsingAttributes("Point_Layer","NEW_SELECTION","\"Id\" = 1 OR \"Id\" = 11")
+			MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION","\"Id\" = 1 OR \"Id\" = 11")
 			# Select lines which intersects right points		
-			MgmtInterface.SelectUsingLocation("Polyline_Layer","INTERSECT","Point_Layer",0,"NEW_SELECTION")
+			MgmtInterface.SelectUsingLocation(PolylineSelection,"INTERSECT",PointSelection,0,"NEW_SELECTION")
 			# Select left side points
-			MgmtInterface.SelectUsingAttributes("Point_Layer","NEW_SELECTION","\"Id\" = 0 OR \"Id\" = 10")
+			MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION","\"Id\" = 0 OR \"Id\" = 10")
 			# Deselect lines which intersect left side points
-			MgmtInterface.SelectUsingLocation("Polyline_Layer","INTERSECT","Point_Layer",0,"REMOVE_FROM_SELECTION")
+			MgmtInterface.SelectUsingLocation(PolylineSelection,"INTERSECT",PointSelection,0,"REMOVE_FROM_SELECTION")
 			# check to see if more than 1 line - if so dissolve field calculation
-			NumSelected=MgmtInterface.CountRows("Polyline_Layer")
+			NumSelected=MgmtInterface.CountRows(PolylineSelection)
 			if NumSelected>1:
-				# write consistent ID to Dissolve field
-				MgmtInterface.WriteField("Polyline_Layer","Dissolve",6,"VB")
+				# Carry the selection over to the layer and write consistent ID to Dissolve field
+				SelectedFIDs=ShpProp.ListFromField(PolylineSelection,"FID")
+				MgmtInterface.SelectUsingAttributes(Polyline_Layer,"NEW_SELECTION",
+				                                    "\"FID\" IN ("+",".join([format(FID) for FID in SelectedFIDs])+")")
+				MgmtInterface.WriteField(Polyline_Layer,"Dissolve",6,"VB")
 				
 			# Unselect all
-			MgmtInterface.SelectUsingAttributes("Polyline_Layer","CLEAR_SELECTION","#")
+			MgmtInterface.SelectUsingAttributes(Polyline_Layer,"CLEAR_SELECTION","#")
 			# Name for merged boundary lines
 			MergedBoundaries=IntermedOutputFolder+TheFileName+"_mergedpolyline.shp"
 			# Run dissolve to combine any side lines (don't care if multipart)
-			MgmtInterface.Dissolve("Polyline_Layer",MergedBoundaries,"Dissolve","#",
+			#  - on the shapefile itself (selection cleared) so the lines are merged natively
+			MgmtInterface.Dissolve(BoundaryRawPolyline,MergedBoundaries,"Dissolve","#",
 				               "MULTI_PART","DISSOLVE_Lines")
 		else:
 			MergedBoundaries=BoundaryRawPolyline
 			
 		### Identify side lines from merged shapefile
-		# Convert to feature layer
-		MgmtInterface.CreateLayer(MergedBoundaries,"Boundary_Layer")
+		# Create native selection on the boundary lines
+		BoundarySelection=MgmtInterface.CreateSelection(MergedBoundaries)
 	
 		# Select line on left side using points
 		# Select left side points
-		MgmtInterface.SelectUsingAttributes("Point_Layer","NEW_SELECTION","\"Id\" = 0 OR \"Id\" = 10")
+		MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION","\"Id\" = 0 OR \"Id\" = 10")
 		# Select lines which intersects left points
-		MgmtInterface.SelectUsingLocation("Boundary_Layer","INTERSECT","Point_Layer",0,"NEW_SELECTION")
+		MgmtInterface.SelectUsingLocation(BoundarySelection,"INTERSECT",PointSelection,0,"NEW_SELECTION")
 		# Select right side points
-		MgmtInterface.SelectUsingAttributes("Point_Layer","NEW_SELECTION","\"Id\" = 1 OR \"Id\" = 11")
+		MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION","\"Id\" = 1 OR \"Id\" = 11")
 		# Deselect lines which intersect right side points
-		MgmtInterface.SelectUsingLocation("Boundary_Layer","INTERSECT","Point_Layer",0,"REMOVE_FROM_SELECTION")	
+		MgmtInterface.SelectUsingLocation(BoundarySelection,"INTERSECT",PointSelection,0,"REMOVE_FROM_SELECTION")	
 		# Get the FID of the left side line
-		LeftLineFID=ShpProp.ListFromField("Boundary_Layer","FID")	
+		LeftLineFID=ShpProp.ListFromField(BoundarySelection,"FID")	
 		
 		# Select lines which are on right side using points
 		# Select right side points
-		MgmtInterface.SelectUsingAttributes("Point_Layer","NEW_SELECTION","\"Id\" = 1 OR \"Id\" = 11")
+		MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION","\"Id\" = 1 OR \"Id\" = 11")
 		# Select lines which intersects right points		
-		MgmtInterface.SelectUsingLocation("Boundary_Layer","INTERSECT","Point_Layer",0,"NEW_SELECTION")
+		MgmtInterface.SelectUsingLocation(BoundarySelection,"INTERSECT",PointSelection,0,"NEW_SELECTION")
 		# Select left side points
-		MgmtInterface.SelectUsingAttributes("Point_Layer","NEW_SELECTION","\"Id\" = 0 OR \"Id\" = 10")
+		MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION","\"Id\" = 0 OR \"Id\" = 10")
 		# Deselect lines which intersect left side points
-		MgmtInterface.SelectUsingLocation("Boundary_Layer","INTERSECT","Point_Layer",0,"REMOVE_FROM_SELECTION")
+		MgmtInterface.SelectUsingLocation(BoundarySelection,"INTERSECT",PointSelection,0,"REMOVE_FROM_SELECTION")
 		# Get the FID of the right side line
-		RightLineFID=ShpProp.ListFromField("Boundary_Layer","FID")
+		RightLineFID=ShpProp.ListFromField(BoundarySelection,"FID")
 	
 		### Select 2 side lines to new shapefile
 		# Update user on process
@@ -195,22 +227,22 @@ def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsAr
 		MessageSwitch(AsArcGISTool,message)
 		# Select 2 side lines
 		SQLexp=("\"FID\" = "+format(LeftLineFID[0])+" OR \"FID\" = "+format(RightLineFID[0]))
-		MgmtInterface.SelectUsingAttributes("Boundary_Layer","NEW_SELECTION",SQLexp)
+		MgmtInterface.SelectUsingAttributes(BoundarySelection,"NEW_SELECTION",SQLexp)
 		# Final side boundaries name
 		FinalBoundaries=IntermedOutputFolder+TheFileName+"_finalsidepolylines.shp"
 		# Copy side lines to new shapefile
-		MgmtInterface.CopyFeatures("Boundary_Layer",FinalBoundaries)
+		MgmtInterface.CopyFeatures(BoundarySelection,FinalBoundaries)
 		
 		### Determine US end line midpoint coordinates for later use to check centerline orientation
 		# Switch selection to the end lines
-		MgmtInterface.SelectUsingAttributes("Boundary_Layer","SWITCH_SELECTION","")	
+		MgmtInterface.SelectUsingAttributes(BoundarySelection,"SWITCH_SELECTION","")	
 		# Select US side line by right US point (Point Id=11)
-		MgmtInterface.SelectUsingAttributes("Point_Layer","NEW_SELECTION","\"Id\" = 11")
-		MgmtInterface.SelectUsingLocation("Boundary_Layer","INTERSECT","Point_Layer",1,"SUBSET_SELECTION")
+		MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION","\"Id\" = 11")
+		MgmtInterface.SelectUsingLocation(BoundarySelection,"INTERSECT",PointSelection,1,"SUBSET_SELECTION")
 		# Get US end line FID
-		USEndFID=ShpProp.ListFromField("Boundary_Layer","FID")
+		USEndFID=ShpProp.ListFromField(BoundarySelection,"FID")
 		# Get coordinates for the end line
-		USEndLineCoords=ShpProp.Coordinates("Boundary_Layer")
+		USEndLineCoords=ShpProp.Coordinates(BoundarySelection)
 		# Get rid of top list structure since there's only 1 feature
 		USEndLineCoords=USEndLineCoords[0]
 		# Separate the coordinates for the first and last points
@@ -225,7 +257,12 @@ def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsAr
 		MessageSwitch(AsArcGISTool,message)
 		# centerline name
 		CenterlinePolyline=IntermedOutputFolder+TheFileName+"_centerlinepolyline.shp"
-		CartInterface.Centerline(FinalBoundaries,CenterlinePolyline,MaxWidth*1.2,0)
+		CenterlineBoundaries=FinalBoundaries
+		if SimplifyError>0:
+			# Side lines simplified to within the error (LevelOfDetail pyramid)
+			CenterlineBoundaries=IntermedOutputFolder+TheFileName+"_finalsidepolylines_lod.shp"
+			WriteLevel(FinalBoundaries,SimplifyError,CenterlineBoundaries)
+		CartInterface.Centerline(CenterlineBoundaries,CenterlinePolyline,MaxWidth*1.2,0)
 		# Clean up attribute table
 		MgmtInterface.DeleteField(CenterlinePolyline,"LnType")
 		MgmtInterface.DeleteField(CenterlinePolyline,"LeftLn_FID")
@@ -233,17 +270,9 @@ def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsAr
 	
 		### Check to see if any part of centerline is still on top of boundary line 
 		### by looking for near to boundary
-		AInterface.Near(CenterlinePolyline,FinalBoundaries,MaxWidth*.01,"NO_LOCATION","NO_ANGLE")
-		# Look in added NEAR_FID field for anything other than -1 (-1 means not near)
-		NearFID=ShpProp.ListFromField(CenterlinePolyline,"NEAR_FID")
-		#Create empty list for FIDs
-		OverlapFID=[]
-		#create counter for row
-		i=0
-		for FID in NearFID:
-			if FID <> -1:
-				OverlapFID=OverlapFID+[i]
-			i+=1	
+		# Centerline features within the distance of the full resolution boundary, checked
+		#  against a coarse level of its pyramid and refined only where too close to decide
+		OverlapFID=NearFeatures(CenterlinePolyline,FinalBoundaries,MaxWidth*.01)
 		# if there is feature overlap between centerline and boundary, 
 		#  tell user which features overlap and abort process
 		if len(OverlapFID)>0:
@@ -251,9 +280,6 @@ def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsAr
 			MessageSwitch(message,AsArcGISTool)
 			x=1/0
 	
-		# Clean up attribute table
-		MgmtInterface.DeleteField(CenterlinePolyline,"NEAR_FID")
-		MgmtInterface.DeleteField(CenterlinePolyline,"NEAR_DIST")	
 	
 		### Determine if centerline is oriented appropriately
 		# Get centerline coordinates
@@ -277,7 +303,7 @@ def Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsAr
 		else:
 			FlipCenterline=1
 		
-		return([CenterlinePolyline]+[FlipCenterline])
+		return([CenterlinePolyline]+[FlipCenterline]+[FinalBoundaries])
 
 	#Print out error from Python
 	except Exception, err: # an error occurred (probably in arcGIS)
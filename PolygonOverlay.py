@@ -0,0 +1,492 @@
+#######################################################################
+# PolygonOverlay
+#
+# Purpose: Intersection and difference of polygon features without the geoprocessor,
+#          for the overlay tools in NativeAnalysis (Clip, Erase, Identity, Union).
+#
+#          Each overlay is a set of groups: one subject feature and the clip features it
+#          is overlaid with.  The edges of the subject and the clip edges near it (a
+#          packed R-tree query of the subject's box, SpatialIndex.PackedRTree) are split
+#          where they cross or touch, so only nearby boundary edges are ever tested.
+#          Every split edge is then kept or dropped by whether it lies inside the other
+#          side, as in the Martinez-Rueda algorithm; here the in/out flag comes from a
+#          ray cast through the R-tree instead of a sweep line.  Edges shared by both
+#          sides are kept once where both polygons lie on the same side of them.  The
+#          kept edges are followed around into rings, clockwise outer rings and
+#          counterclockwise holes as in shapefiles.
+#
+#          Clip features within a group are taken as one region and must not overlap
+#          each other (OverlappingPairs checks this).  Coordinates are used as they are:
+#          points closer than SnapTolerance that are not the same point make rings that
+#          do not close, and the overlay then returns None so callers can fall back to
+#          the geoprocessor.
+#
+# Usage:
+#         Result=OverlayGroups(Subject,Clip,GroupSubjects,MemberGroups,MemberClips,"INTERSECT")
+#
+# Modified: 10/19/2026
+#######################################################################
+import numpy
+import SpatialIndex
+from SegmentValidation import RingEdges, RowIds
+
+# Distance within which an edge end lies on another edge
+SnapTolerance=1e-7
+
+# Overlay operations: the subject inside the clip features, or outside them
+Operations=("INTERSECT","DIFFERENCE")
+
+################################################
+# Purpose: Bounding boxes of polygon features
+# Input: XY, PartOffsets, FeatureParts - geometry arrays (ShapefileProperties.GeometryArrays)
+# Output: Boxes - (features,4) Xmin,Ymin,Xmax,Ymax (NaN for null features)
+def FeatureBoxes(XY,PartOffsets,FeatureParts):
+	VertexOffsets=PartOffsets[FeatureParts]
+	Boxes=numpy.empty((FeatureParts.shape[0]-1,4))
+	Boxes[:]=numpy.nan
+	Filled=VertexOffsets[1:]>VertexOffsets[0:-1]
+	if Filled.any():
+		Starts=VertexOffsets[0:-1][Filled]
+		Boxes[Filled,0:2]=numpy.minimum.reduceat(XY,Starts,axis=0)
+		Boxes[Filled,2:4]=numpy.maximum.reduceat(XY,Starts,axis=0)
+	return(Boxes)
+
+################################################
+# Purpose: Boxes of edges, padded
+# Input: E0, E1 - (n,2) edge ends
+#        Pad - distance added on every side
+# Output: Boxes - (n,4) array
+def EdgeBoxes(E0,E1,Pad):
+	return(numpy.hstack([numpy.minimum(E0,E1)-Pad,numpy.maximum(E0,E1)+Pad]))
+
+################################################
+# Purpose: Whether keys are in a sorted key array
+# Input: Sorted - sorted (m,) integer array
+#        Keys - (n,) integer array
+# Output: (n,) boolean array
+def Contains(Sorted,Keys):
+	if Sorted.shape[0]==0:
+		return(numpy.zeros(Keys.shape[0],dtype=bool))
+	Found=numpy.minimum(numpy.searchsorted(Sorted,Keys),Sorted.shape[0]-1)
+	return(Sorted[Found]==Keys)
+
+################################################
+# Purpose: Whether points lie inside any of their group's features (even-odd rule)
+#          Each point casts its ray towards the nearest side of its group's box, so that
+#          the R-tree only returns the edges along that short ray.
+# Input: Points - (n,2) points
+#        PointGroups - (n,) group of each point
+#        E0, E1, EdgeFeatures - edges of all features (RingEdges)
+#        Tree - packed R-tree of the edge boxes (None when there are no edges)
+#        MemberKeys - sorted group*NumFeatures+feature keys of the features in each group
+#        NumFeatures - number of features
+#        GroupBoxes - (groups,4) box of each group's features (infinite for no features)
+# Output: Inside - (n,) boolean array
+def RayInside(Points,PointGroups,E0,E1,EdgeFeatures,Tree,MemberKeys,NumFeatures,GroupBoxes):
+	Inside=numpy.zeros(Points.shape[0],dtype=bool)
+	if Points.shape[0]==0 or Tree is None:
+		return(Inside)
+	Boxes=GroupBoxes[PointGroups]
+	X,Y=Points[:,0],Points[:,1]
+	# distance to the box sides in the +x, -x, +y and -y directions
+	Reach=numpy.column_stack([Boxes[:,2]-X,X-Boxes[:,0],Boxes[:,3]-Y,Y-Boxes[:,1]])
+	Valid=numpy.isfinite(Boxes).all(axis=1)&(Reach.min(axis=1)>=0)
+	Direction=numpy.argmin(numpy.where(Valid[:,None],Reach,0.0),axis=1)
+	Rays=numpy.column_stack([X,Y,X,Y])
+	Rays[Direction==0,2]=Boxes[Direction==0,2]
+	Rays[Direction==1,0]=Boxes[Direction==1,0]
+	Rays[Direction==2,3]=Boxes[Direction==2,3]
+	Rays[Direction==3,1]=Boxes[Direction==3,1]
+	Casting=numpy.flatnonzero(Valid)
+	if Casting.shape[0]==0:
+		return(Inside)
+	Queries,Edges=Tree.QueryMany(Rays[Casting])
+	Queries=Casting[Queries]
+	Member=Contains(MemberKeys,PointGroups[Queries]*NumFeatures+EdgeFeatures[Edges])
+	Queries,Edges=Queries[Member],Edges[Member]
+
+	### Crossings in each ray's frame: along the ray, and across it
+	Rows=numpy.arange(Queries.shape[0])
+	Along=numpy.where(Direction[Queries]<2,0,1)
+	Across=1-Along
+	Sign=numpy.where(Direction[Queries]%2==0,1.0,-1.0)
+	P=Points[Queries]
+	A0,B0=E0[Edges][Rows,Along],E0[Edges][Rows,Across]
+	A1,B1=E1[Edges][Rows,Along],E1[Edges][Rows,Across]
+	PA,PB=P[Rows,Along],P[Rows,Across]
+	Straddle=(B0>PB)!=(B1>PB)
+	Cross=A0+(PB-B0)*(A1-A0)/numpy.where(Straddle,B1-B0,1.0)
+	Hit=Straddle&(Sign*(Cross-PA)>0)
+
+	### Odd crossings of any one feature put the point inside it
+	Keys,Counts=numpy.unique(Queries[Hit]*NumFeatures+EdgeFeatures[Edges[Hit]],return_counts=True)
+	Inside[Keys[Counts%2==1]//NumFeatures]=True
+	return(Inside)
+
+################################################
+# Purpose: Points where pairs of edges must be split: proper crossings, and the ends of
+#          either edge lying on the other away from its ends
+# Input: P0, P1 - (k,2) ends of the first edges of the pairs
+#        Q0, Q1 - (k,2) ends of the second edges
+# Output: [First, FirstPoints, Second, SecondPoints] - pair numbers and split points on
+#          the first edges, and on the second edges
+def PairSplits(P0,P1,Q0,Q1):
+	DP=P1-P0
+	DQ=Q1-Q0
+	LP=numpy.hypot(DP[:,0],DP[:,1])
+	LQ=numpy.hypot(DQ[:,0],DQ[:,1])
+	# signed distances of each edge's ends from the other edge's line
+	O1=(DP[:,0]*(Q0[:,1]-P0[:,1])-DP[:,1]*(Q0[:,0]-P0[:,0]))/LP
+	O2=(DP[:,0]*(Q1[:,1]-P0[:,1])-DP[:,1]*(Q1[:,0]-P0[:,0]))/LP
+	O3=(DQ[:,0]*(P0[:,1]-Q0[:,1])-DQ[:,1]*(P0[:,0]-Q0[:,0]))/LQ
+	O4=(DQ[:,0]*(P1[:,1]-Q0[:,1])-DQ[:,1]*(P1[:,0]-Q0[:,0]))/LQ
+	Clear=numpy.minimum(numpy.minimum(abs(O1),abs(O2)),numpy.minimum(abs(O3),abs(O4)))>SnapTolerance
+	Crossing=numpy.flatnonzero((O1*O2<0)&(O3*O4<0)&Clear)
+	# one crossing point for both edges, so their pieces meet exactly
+	T=O3[Crossing]/(O3[Crossing]-O4[Crossing])
+	X=P0[Crossing]+T[:,None]*DP[Crossing]
+	First=[Crossing]
+	FirstPoints=[X]
+	Second=[Crossing]
+	SecondPoints=[X]
+	for End,Start,Stop,Pairs,Points in ((Q0,P0,P1,First,FirstPoints),(Q1,P0,P1,First,FirstPoints),
+	                                    (P0,Q0,Q1,Second,SecondPoints),(P1,Q0,Q1,Second,SecondPoints)):
+		On=((SpatialIndex.PointSegmentDistance(End,Start,Stop)<=SnapTolerance)&
+		    (numpy.hypot(*(End-Start).T)>SnapTolerance)&(numpy.hypot(*(End-Stop).T)>SnapTolerance))
+		Pairs.append(numpy.flatnonzero(On))
+		Points.append(End[On])
+	return([numpy.concatenate(First),numpy.vstack(FirstPoints),numpy.concatenate(Second),numpy.vstack(SecondPoints)])
+
+################################################
+# Purpose: Split edges at points along them
+# Input: E0, E1 - (n,2) edge ends
+#        Edges - (k,) edge of each split point
+#        Points - (k,2) split points
+# Output: [S0, S1, Sources] - the pieces in order along each edge and the edge of each
+def SplitPieces(E0,E1,Edges,Points):
+	NumEdges=E0.shape[0]
+	D=E1[Edges]-E0[Edges]
+	T=((Points-E0[Edges])*D).sum(axis=1)/(D*D).sum(axis=1)
+	EdgeNums=numpy.concatenate([numpy.arange(NumEdges),numpy.arange(NumEdges),Edges])
+	Along=numpy.concatenate([numpy.zeros(NumEdges),numpy.ones(NumEdges),T])
+	Locations=numpy.vstack([E0,E1,Points])
+	Order=numpy.lexsort((Along,EdgeNums))
+	EdgeNums,Locations=EdgeNums[Order],Locations[Order]
+	Same=EdgeNums[1:]==EdgeNums[0:-1]
+	S0,S1,Sources=Locations[0:-1][Same],Locations[1:][Same],EdgeNums[0:-1][Same]
+	Keep=(S0!=S1).any(axis=1)
+	return([S0[Keep],S1[Keep],Sources[Keep]])
+
+################################################
+# Purpose: Pair the edges into and out of nodes where rings touch
+#          Each incoming edge goes on to the first outgoing edge counterclockwise from
+#          it (looking back along the incoming edge), which keeps the polygon on the
+#          right and separates rings meeting at a point.
+# Input: K0, K1 - (n,2) ends of the kept edges
+#        Starts, Ends - (n,) start and end node of each edge
+#        Nodes - node numbers with more than one edge out
+#        Next - (n,) next edge of each edge (updated)
+# Output: True, or False when the edges cannot be paired
+def PairNodeEdges(K0,K1,Starts,Ends,Nodes,Next):
+	Multi=numpy.zeros(int(max(Starts.max(),Ends.max()))+1,dtype=bool)
+	Multi[Nodes]=True
+	Incoming=numpy.flatnonzero(Multi[Ends])
+	Outgoing=numpy.flatnonzero(Multi[Starts])
+	Incoming=Incoming[numpy.argsort(Ends[Incoming],kind="mergesort")]
+	Outgoing=Outgoing[numpy.argsort(Starts[Outgoing],kind="mergesort")]
+	InFirst=numpy.searchsorted(Ends[Incoming],Nodes)
+	InLast=numpy.searchsorted(Ends[Incoming],Nodes,side="right")
+	OutFirst=numpy.searchsorted(Starts[Outgoing],Nodes)
+	OutLast=numpy.searchsorted(Starts[Outgoing],Nodes,side="right")
+	Back=K0[Incoming]-K1[Incoming]
+	Forward=K1[Outgoing]-K0[Outgoing]
+	BackAngles=numpy.arctan2(Back[:,1],Back[:,0])
+	ForwardAngles=numpy.arctan2(Forward[:,1],Forward[:,0])
+	for i in range(Nodes.shape[0]):
+		InEdges=numpy.arange(InFirst[i],InLast[i])
+		OutEdges=numpy.arange(OutFirst[i],OutLast[i])
+		Turns=numpy.mod(ForwardAngles[OutEdges][None,:]-BackAngles[InEdges][:,None],2*numpy.pi)
+		Turns[Turns==0]=2*numpy.pi
+		Chosen=OutEdges[numpy.argmin(Turns,axis=1)]
+		if numpy.unique(Chosen).shape[0]!=Chosen.shape[0]:
+			return(False)
+		Next[Incoming[InEdges]]=Outgoing[Chosen]
+	return(True)
+
+################################################
+# Purpose: Follow kept edges around into rings
+# Input: K0, K1 - (n,2) ends of the kept edges
+#        Starts, Ends - (n,) start and end node of each edge
+#        Sources - (n,) original edge of each edge (pieces of one edge in a row are
+#                  joined back into one edge)
+# Output: [RingPoints, RingOffsets, RingEdges] - (k,2) closed ring points, (rings+1,)
+#          offsets, and the first kept edge of each ring; None when the edges do not
+#          close into rings
+def TraceRings(K0,K1,Starts,Ends,Sources):
+	NumEdges=K0.shape[0]
+	if NumEdges==0:
+		return([numpy.zeros((0,2)),numpy.zeros(1,dtype=numpy.int64),numpy.zeros(0,dtype=numpy.int64)])
+	NumNodes=int(max(Starts.max(),Ends.max()))+1
+	OutDegree=numpy.bincount(Starts,minlength=NumNodes)
+	if (OutDegree!=numpy.bincount(Ends,minlength=NumNodes)).any():
+		return(None)
+	Next=numpy.zeros(NumEdges,dtype=numpy.int64)-1
+	Order=numpy.argsort(Starts,kind="mergesort")
+	FirstOut=numpy.searchsorted(Starts[Order],numpy.arange(NumNodes))
+	Single=OutDegree[Ends]==1
+	Next[Single]=Order[FirstOut[Ends[Single]]]
+	Nodes=numpy.flatnonzero(OutDegree>1)
+	if Nodes.shape[0]>0 and not PairNodeEdges(K0,K1,Starts,Ends,Nodes,Next):
+		return(None)
+
+	### Walk each cycle once
+	NextList=Next.tolist()
+	SourceList=Sources.tolist()
+	Visited=[False]*NumEdges
+	Indices=[]
+	RingOffsets=[0]
+	RingStarts=[]
+	for First in range(NumEdges):
+		if Visited[First]:
+			continue
+		Ring=[]
+		Edge=First
+		while not Visited[Edge]:
+			Visited[Edge]=True
+			Ring.append(Edge)
+			Edge=NextList[Edge]
+		if Edge!=First:
+			return(None)
+		# ring points: the start of each edge that does not continue the previous edge
+		Points=[Ring[k] for k in range(len(Ring)) if SourceList[Ring[k]]!=SourceList[Ring[k-1]]]
+		if Points==[]:
+			Points=Ring[0:1]
+		Indices.extend(Points+Points[0:1])
+		RingOffsets.append(len(Indices))
+		RingStarts.append(First)
+	return([K0[numpy.array(Indices,dtype=numpy.int64)],numpy.array(RingOffsets,dtype=numpy.int64),
+	        numpy.array(RingStarts,dtype=numpy.int64)])
+
+################################################
+# Purpose: Signed areas and perimeters of closed rings (negative for clockwise)
+# Input: Points, RingOffsets - closed rings and their offsets
+# Output: [Areas, Perimeters] - (rings,) arrays
+def RingMeasures(Points,RingOffsets):
+	if RingOffsets.shape[0]<2:
+		return([numpy.zeros(0),numpy.zeros(0)])
+	Cross=Points[0:-1,0]*Points[1:,1]-Points[1:,0]*Points[0:-1,1]
+	Steps=numpy.hypot(*(Points[1:]-Points[0:-1]).T)
+	# the step from one ring's last point to the next ring's first is not an edge
+	Cross=numpy.append(Cross,0.0)
+	Steps=numpy.append(Steps,0.0)
+	Cross[RingOffsets[1:]-1]=0.0
+	Steps[RingOffsets[1:]-1]=0.0
+	Starts=RingOffsets[0:-1]
+	return([numpy.add.reduceat(Cross,Starts)/2,numpy.add.reduceat(Steps,Starts)])
+
+################################################
+# Purpose: Order rings into polygons: each outer ring followed by its holes
+# Input: Points, RingOffsets - closed rings and their offsets
+#        RingGroups - (rings,) group of each ring
+#        Areas - (rings,) signed ring areas (negative for outer rings)
+# Output: Order - ring numbers in output order, or None when a hole lies in no outer ring
+def NestRings(Points,RingOffsets,RingGroups,Areas):
+	Order=numpy.lexsort((Areas>0,RingGroups))
+	Groups=RingGroups[Order]
+	Bounds=numpy.flatnonzero(numpy.concatenate([[True],Groups[1:]!=Groups[0:-1],[True]]))
+	Nested=[]
+	for First,Last in zip(Bounds[0:-1].tolist(),Bounds[1:].tolist()):
+		Rings=Order[First:Last]
+		Outers=Rings[Areas[Rings]<0]
+		Holes=Rings[Areas[Rings]>0]
+		if Outers.shape[0]==0:
+			return(None)
+		if Outers.shape[0]==1 or Holes.shape[0]==0:
+			Nested.extend(Rings.tolist())
+			continue
+		# each hole goes in the smallest outer ring around the middle of its first edge
+		Owners=[]
+		for Hole in Holes.tolist():
+			Start=RingOffsets[Hole]
+			Point=(Points[Start:Start+1]+Points[Start+1:Start+2])/2
+			Around=[Outer for Outer in Outers.tolist()
+			        if SpatialIndex.PointsInPolygon(Point,Points[RingOffsets[Outer]:RingOffsets[Outer+1]-1],
+			                                        Points[RingOffsets[Outer]+1:RingOffsets[Outer+1]])[0]]
+			if Around==[]:
+				return(None)
+			Owners.append(min(Around,key=lambda Outer:-Areas[Outer]))
+		for Outer in Outers.tolist():
+			Nested.append(Outer)
+			Nested.extend([Hole for Hole,Owner in zip(Holes.tolist(),Owners) if Owner==Outer])
+	return(numpy.array(Nested,dtype=numpy.int64))
+
+################################################
+# Purpose: Overlay each group's subject feature with its clip features
+# Input: Subject - (XY, PartOffsets, FeatureParts) polygon geometry arrays of the subjects
+#        Clip - (XY, PartOffsets, FeatureParts) polygon geometry arrays of the clip features
+#        GroupSubjects - (groups,) subject feature of each group
+#        MemberGroups, MemberClips - (m,) group and clip feature of each group member
+#        Operation - "INTERSECT" (subject inside the members) or "DIFFERENCE" (outside)
+# Output: [Points, RingOffsets, RingGroups] - (k,2) closed ring points, (rings+1,) ring
+#          offsets and (rings,) group of each ring, in group order with each outer ring
+#          followed by its holes (groups with nothing left have no rings); None when the
+#          edges do not close into rings or two clip features run along the same edge
+def OverlayGroups(Subject,Clip,GroupSubjects,MemberGroups,MemberClips,Operation):
+	if Operation not in Operations:
+		raise RuntimeError(Operation+" is not an overlay operation")
+	NumGroups=GroupSubjects.shape[0]
+	NumSubjects=Subject[2].shape[0]-1
+	NumClips=Clip[2].shape[0]-1
+	SE0,SE1,SubjectFeatures=RingEdges(*Subject)
+	CE0,CE1,ClipFeatures=RingEdges(*Clip)
+	SubjectBoxes=FeatureBoxes(*Subject)
+	ClipBoxes=FeatureBoxes(*Clip)
+	MemberKeys=numpy.unique(MemberGroups*NumClips+MemberClips)
+	SubjectKeys=numpy.unique(numpy.arange(NumGroups)*NumSubjects+GroupSubjects)
+	ClipTree=None
+	if CE0.shape[0]>0:
+		ClipTree=SpatialIndex.PackedRTree(EdgeBoxes(CE0,CE1,SnapTolerance))
+	SubjectTree=None
+	if SE0.shape[0]>0:
+		SubjectTree=SpatialIndex.PackedRTree(EdgeBoxes(SE0,SE1,SnapTolerance))
+
+	### Each group's subject edges, and the clip edges of its members near the subject
+	EdgeOffsets=numpy.searchsorted(SubjectFeatures,numpy.arange(NumSubjects+1))
+	Counts=EdgeOffsets[GroupSubjects+1]-EdgeOffsets[GroupSubjects]
+	GroupSE=SpatialIndex.ExpandRanges(EdgeOffsets[GroupSubjects],Counts)
+	GroupSEGroups=numpy.repeat(numpy.arange(NumGroups),Counts)
+	# box of each group's members (infinite for none)
+	MemberBoxes=numpy.column_stack([numpy.repeat(numpy.inf,NumGroups),numpy.repeat(numpy.inf,NumGroups),
+	                                numpy.repeat(-numpy.inf,NumGroups),numpy.repeat(-numpy.inf,NumGroups)])
+	for Column,Reduce in ((0,numpy.minimum),(1,numpy.minimum),(2,numpy.maximum),(3,numpy.maximum)):
+		Values=MemberBoxes[:,Column].copy()
+		Reduce.at(Values,MemberGroups,ClipBoxes[MemberClips,Column])
+		MemberBoxes[:,Column]=Values
+	MemberBoxes[~numpy.isfinite(MemberBoxes).all(axis=1)]=numpy.inf
+	if Operation=="INTERSECT":
+		# subject edges away from the members cannot be inside them
+		Boxes=EdgeBoxes(SE0[GroupSE],SE1[GroupSE],SnapTolerance)
+		Near=((Boxes[:,0]<=MemberBoxes[GroupSEGroups,2])&(Boxes[:,2]>=MemberBoxes[GroupSEGroups,0])&
+		      (Boxes[:,1]<=MemberBoxes[GroupSEGroups,3])&(Boxes[:,3]>=MemberBoxes[GroupSEGroups,1]))
+		GroupSE,GroupSEGroups=GroupSE[Near],GroupSEGroups[Near]
+	GroupCEGroups=numpy.zeros(0,dtype=numpy.int64)
+	GroupCE=numpy.zeros(0,dtype=numpy.int64)
+	if ClipTree is not None:
+		GroupBoxes=SubjectBoxes[GroupSubjects]
+		if Operation=="INTERSECT":
+			GroupBoxes=numpy.hstack([numpy.maximum(GroupBoxes[:,0:2],MemberBoxes[:,0:2]),
+			                         numpy.minimum(GroupBoxes[:,2:4],MemberBoxes[:,2:4])])
+		GroupBoxes=numpy.hstack([GroupBoxes[:,0:2]-SnapTolerance,GroupBoxes[:,2:4]+SnapTolerance])
+		GroupCEGroups,GroupCE=ClipTree.QueryMany(GroupBoxes)
+		Member=Contains(MemberKeys,GroupCEGroups*NumClips+ClipFeatures[GroupCE])
+		GroupCEGroups,GroupCE=GroupCEGroups[Member],GroupCE[Member]
+	A0,A1=SE0[GroupSE],SE1[GroupSE]
+	B0,B1=CE0[GroupCE],CE1[GroupCE]
+
+	### Split both sides where they cross or touch
+	SubjectSplits=[numpy.zeros(0,dtype=numpy.int64),numpy.zeros((0,2))]
+	ClipSplits=[numpy.zeros(0,dtype=numpy.int64),numpy.zeros((0,2))]
+	if GroupCE.shape[0]>0 and GroupSE.shape[0]>0:
+		# candidates from the one tree of clip edges, kept where the clip edge is in the
+		#  subject edge's group (a clip edge can be in many groups)
+		I,Edges=ClipTree.QueryMany(EdgeBoxes(A0,A1,SnapTolerance))
+		GroupKeys=GroupCEGroups*CE0.shape[0]+GroupCE
+		Order=numpy.argsort(GroupKeys,kind="mergesort")
+		Keys=GroupSEGroups[I]*CE0.shape[0]+Edges
+		Found=numpy.minimum(numpy.searchsorted(GroupKeys[Order],Keys),Order.shape[0]-1)
+		Same=GroupKeys[Order][Found]==Keys
+		I,J=I[Same],Order[Found[Same]]
+		First,FirstPoints,Second,SecondPoints=PairSplits(A0[I],A1[I],B0[J],B1[J])
+		SubjectSplits=[I[First],FirstPoints]
+		ClipSplits=[J[Second],SecondPoints]
+	SP0,SP1,SPSources=SplitPieces(A0,A1,SubjectSplits[0],SubjectSplits[1])
+	CP0,CP1,CPSources=SplitPieces(B0,B1,ClipSplits[0],ClipSplits[1])
+	SPGroups=GroupSEGroups[SPSources]
+	CPGroups=GroupCEGroups[CPSources]
+
+	### Nodes: the same point in the same group
+	NumS=SP0.shape[0]
+	NumC=CP0.shape[0]
+	Points=numpy.vstack([SP0,SP1,CP0,CP1])+0.0
+	Nodes=RowIds(numpy.column_stack([numpy.concatenate([SPGroups,SPGroups,CPGroups,CPGroups]),
+	                                 numpy.ascontiguousarray(Points).view(numpy.int64)]))
+	SStart,SEnd=Nodes[0:NumS],Nodes[NumS:2*NumS]
+	CStart,CEnd=Nodes[2*NumS:2*NumS+NumC],Nodes[2*NumS+NumC:]
+	NumNodes=int(Nodes.max())+1 if Nodes.shape[0]>0 else 1
+
+	### Pieces run by both sides, and by two clip features
+	SKeys=SStart*NumNodes+SEnd
+	CKeys=CStart*NumNodes+CEnd
+	CReverse=CEnd*NumNodes+CStart
+	if numpy.unique(CKeys).shape[0]<NumC:
+		return(None)
+	SubjectSame=numpy.isin(SKeys,CKeys)
+	SubjectOpposite=numpy.isin(SKeys,CReverse)
+	ClipShared=numpy.isin(CKeys,SKeys)|numpy.isin(CReverse,SKeys)
+	# between two members: inside their union
+	Internal=numpy.isin(CKeys,CReverse)
+
+	### In/out flags of the other pieces, from their middles
+	Unshared=numpy.flatnonzero(~SubjectSame&~SubjectOpposite)
+	Inside=numpy.zeros(NumS,dtype=bool)
+	Inside[Unshared]=RayInside((SP0[Unshared]+SP1[Unshared])/2,SPGroups[Unshared],CE0,CE1,ClipFeatures,
+	                           ClipTree,MemberKeys,NumClips,MemberBoxes)
+	Free=numpy.flatnonzero(~ClipShared&~Internal)
+	InSubject=numpy.zeros(NumC,dtype=bool)
+	InSubject[Free]=RayInside((CP0[Free]+CP1[Free])/2,CPGroups[Free],SE0,SE1,SubjectFeatures,
+	                          SubjectTree,SubjectKeys,NumSubjects,SubjectBoxes[GroupSubjects])
+
+	### Edges of the result: the subject's inside (or outside) the members, and the
+	###  members' inside the subject (reversed for a difference)
+	Sharing=SubjectSame|SubjectOpposite
+	if Operation=="INTERSECT":
+		KeepS=SubjectSame|(~Sharing&Inside)
+		ClipStart,ClipEnd,ClipFrom,ClipTo=CStart,CEnd,CP0,CP1
+	else:
+		KeepS=~SubjectSame&(SubjectOpposite|(~Sharing&~Inside))
+		ClipStart,ClipEnd,ClipFrom,ClipTo=CEnd,CStart,CP1,CP0
+	KeepC=InSubject
+	K0=numpy.vstack([SP0[KeepS],ClipFrom[KeepC]])
+	K1=numpy.vstack([SP1[KeepS],ClipTo[KeepC]])
+	Starts=numpy.concatenate([SStart[KeepS],ClipStart[KeepC]])
+	Ends=numpy.concatenate([SEnd[KeepS],ClipEnd[KeepC]])
+	Sources=numpy.concatenate([SPSources[KeepS],GroupSE.shape[0]+CPSources[KeepC]])
+	KeptGroups=numpy.concatenate([SPGroups[KeepS],CPGroups[KeepC]])
+	Traced=TraceRings(K0,K1,Starts,Ends,Sources)
+	if Traced is None:
+		return(None)
+	RingPoints,RingOffsets,FirstEdges=Traced
+	RingGroups=KeptGroups[FirstEdges]
+
+	### Drop slivers thinner than the tolerance, and nest the holes
+	Areas,Perimeters=RingMeasures(RingPoints,RingOffsets)
+	Kept=numpy.flatnonzero(numpy.abs(Areas)>SnapTolerance*Perimeters)
+	Counts=RingOffsets[Kept+1]-RingOffsets[Kept]
+	RingPoints=RingPoints[SpatialIndex.ExpandRanges(RingOffsets[Kept],Counts)]
+	RingOffsets=numpy.concatenate([[0],numpy.cumsum(Counts)]).astype(numpy.int64)
+	RingGroups,Areas=RingGroups[Kept],Areas[Kept]
+	if Kept.shape[0]==0:
+		return([RingPoints,RingOffsets,RingGroups])
+	Order=NestRings(RingPoints,RingOffsets,RingGroups,Areas)
+	if Order is None:
+		return(None)
+	Counts=RingOffsets[Order+1]-RingOffsets[Order]
+	RingPoints=RingPoints[SpatialIndex.ExpandRanges(RingOffsets[Order],Counts)]
+	return([RingPoints,numpy.concatenate([[0],numpy.cumsum(Counts)]).astype(numpy.int64),RingGroups[Order]])
+
+################################################
+# Purpose: Pairs of polygon features whose interiors overlap
+# Input: Geometry - (XY, PartOffsets, FeatureParts) polygon geometry arrays
+# Output: Pairs - (k,2) feature numbers (first smaller), or None when the overlay fails
+def OverlappingPairs(Geometry):
+	Boxes=FeatureBoxes(*Geometry)
+	if not numpy.isfinite(Boxes).any():
+		return(numpy.zeros((0,2),dtype=numpy.int64))
+	A,B=SpatialIndex.PackedRTree(Boxes).QueryMany(Boxes)
+	Keep=A<B
+	A,B=A[Keep],B[Keep]
+	Overlay=OverlayGroups(Geometry,Geometry,A,numpy.arange(A.shape[0]),B,"INTERSECT")
+	if Overlay is None:
+		return(None)
+	Groups=numpy.unique(Overlay[2])
+	return(numpy.column_stack([A[Groups],B[Groups]]))
@@ -0,0 +1,261 @@
+#######################################################################
+# RiverCorridorModule
+#
+# Purpose: Create evenly spaced polygons perpendicular to the centerline of a single polygon with ~4 sides
+#          (the processing steps of RiverCorridorPolygons, callable for one corridor by the script,
+#          the worker service and other callers)
+#
+# Created by: Cara Walter
+#
+# Input: TheInPolyFile - the name of a polygon feature class with 1 polygon with ~4 sides ('' to stop after buffering)
+#        TheInPointFile - the name of a point feature class with the 4 corner points to split the polygon at
+#             ***Must have "Id" field with 0 for DS left, 1 for DS right, 10 for US left, 11 for US right
+#        CenterlinePolyline - the name of a centerline polyline when starting from a centerline ('' otherwise)
+#        TheOutFilePath - the path of the folder to put the output shapefiles in
+#        TheFileName - base name used for the output shapefiles
+#        MaxWidth - numeric value for the largest distance between side boundaries segmented will be created perpendicular to
+#        SplitLength - number specifying interval at which to split polygon 
+#        SimplifyAnswer - True to simplify and smooth the centerline before segmenting
+#        StartAnswer - True to start from the boundary polygon, False to start from the centerline
+#        AsArcGISTool - binary specifying if running as a GIS tool (1) or not (0) to control messaging
+#        Job - JobContext for the run (None creates one and releases it at the end)
+#        TileSegments - segments per tile to split and buffer the centerline in parallel tiles
+#                       (TiledSplitModule), 0 to stream them from the centerline one at a time (SegmentStream)
+#                       (negative for RunPlanner to choose them and Workers from the estimated cost)
+#        Workers - number of processes for the tiles (0 for one per processor)
+#        DEMRaster - DEM to summarize elevation and slope per station over (ZonalStatistics), '' for none
+#        Transects - 1 to build the segment polygons between transects that do not cross on tight bends
+#                    (SegmentTransects), 0 for flat ended buffers of each segment
+#        Columnar - 1 to also write the segment polygons as GeoParquet (.parquet, ReachID TheFileName) and the
+#                   per station tables as Arrow IPC (.arrow) next to them (ColumnarExport, needs pyarrow)
+#
+# Returns: [BufferShp, DissShp, ZonalTable, MetricsTable] as a list - DissShp is "" when there was no boundary to fill gaps with,
+#          ZonalTable (_zonalstats.dbf) is "" when there was no DEM, MetricsTable (_metrics.dbf) holds width, area,
+#          sinuosity and curvature per station (SegmentMetrics) - followed by the GeoParquet and Arrow files when Columnar
+#
+# Process: see RiverCorridorPolygons
+#
+# Modified: 10/19/2026
+#######################################################################
+def RiverCorridor(TheInPolyFile,TheInPointFile,CenterlinePolyline,TheOutFilePath,TheFileName,
+                  MaxWidth,SplitLength,SimplifyAnswer,StartAnswer,AsArcGISTool,Job=None,
+                  TileSegments=0,Workers=0,DEMRaster='',Transects=0,Columnar=0):
+	try:
+		import os
+		import AnalysisInterface as AnalysisGIS
+		import CartographyInterface as CartGIS
+		import ManagementInterface as MgmtGIS
+		from NativeAnalysis import IdentityFIDField
+		from Polygon2CenterlineModule import Polygon2Centerline
+		from SegmentStream import StreamSegments, WriteSegments
+		from TiledSplitModule import TiledSplitLine
+		from SegmentTransects import TransectPolygons
+		from ZonalStatistics import ZonalStatistics
+		from SegmentMetrics import CenterlineMetrics
+		from MessagingModule import MessageSwitch
+		from JobContext import JobContext
+
+		### Perform setup and checks
+		# Make sure output folder has ending slash
+		if TheOutFilePath[-1]!= u"/" or TheOutFilePath[-2:-1]!= u"\\":
+			TheOutFilePath=TheOutFilePath+"/"	
+		# Check to see if out folder exists, if not create it
+		if os.path.isdir(TheOutFilePath)!= True:        
+			os.mkdir(TheOutFilePath)
+
+		# Create intermediate file folder if it does not exist
+		IntermedOutputFolder=TheOutFilePath+"IntermediateFiles/"
+		if os.path.isdir(IntermedOutputFolder)!= True:
+			os.mkdir(IntermedOutputFolder)
+
+		# Job owning this run's layer names, scratch workspace and environment settings
+		OwnJob=Job is None
+		if OwnJob:
+			Job=JobContext(TheFileName,IntermedOutputFolder)
+
+		try:
+			# Create instances of classes
+			AInterface=AnalysisGIS.AnalysisInterface(Job)
+			MgmtInterface=MgmtGIS.ManagementInterface(Job)
+			CartInterface=CartGIS.CartographyInterface(Job)
+	
+			if StartAnswer:
+				# Convert polygon to centerline
+				Centerline_Flip=Polygon2Centerline(TheInPolyFile,TheInPointFile,TheOutFilePath,MaxWidth,AsArcGISTool,Job)
+				if Centerline_Flip==[]:
+					message="Polygon2Centerline failed. Script will abort"
+					raise RuntimeError(message)
+	
+				# Extract centerline polyline name and path
+				CenterlinePolyline=Centerline_Flip[0]
+				# Extract centerline orientation indicator
+				FlipCenterline=Centerline_Flip[1]
+				# Side lines the metrics transects cross
+				SideLines=Centerline_Flip[2]
+			else:
+				FlipCenterline=0
+				SideLines=""
+		
+			### Simplify and smooth centerline if user answered yes
+			if SimplifyAnswer:
+				# Update user on process
+				message="Simplifying and smoothing centerline..."
+				MessageSwitch(AsArcGISTool,message)
+		
+				SimpleCenterline=IntermedOutputFolder+TheFileName+"_simplecenterline.shp"
+				CartInterface.SimpleLine(CenterlinePolyline,SimpleCenterline,"BEND_SIMPLIFY",format(MaxWidth*.2))
+				SmoothCenterline=IntermedOutputFolder+TheFileName+"_smoothcenterline.shp"
+				CartInterface.SmoothLine(SimpleCenterline,SmoothCenterline,"PAEK",format(MaxWidth*.2),"#","NO_CHECK")
+			else:
+				SmoothCenterline=CenterlinePolyline
+
+			### Split centerline into specified lengths
+			# Update user on process
+			message="Splitting centerline into segments..."
+			MessageSwitch(AsArcGISTool,message)
+	
+			# Name of buffered shapefile
+			BufferShp=TheOutFilePath+TheFileName+"_segmented.shp"
+			# Name of per station metrics table
+			MetricsTable=TheOutFilePath+TheFileName+"_metrics.dbf"
+
+			if TileSegments<0:
+				# Choose serial or tiled splitting, the tile size and workers from the estimated cost
+				from RunPlanner import PlanRun
+				Plan=PlanRun({"TheInPolyFile":TheInPolyFile,"TheInPointFile":TheInPointFile,
+				              "CenterlinePolyline":SmoothCenterline,"MaxWidth":MaxWidth,"SplitLength":SplitLength,
+				              "StartAnswer":False,"SimplifyAnswer":False,"DEMRaster":DEMRaster,
+				              "Transects":Transects})
+				TileSegments=Plan["TileSegments"]
+				Workers=Plan["Workers"]
+				message="Planned "+Plan["Backend"]+" splitting: "+str(TileSegments)+" segments per tile, "+str(Workers)+" workers"
+				MessageSwitch(AsArcGISTool,message)
+
+			if TileSegments>0:
+				# Split and buffer long centerlines in parallel tiles
+				SegmentedCenterline=TiledSplitLine(SmoothCenterline,IntermedOutputFolder,BufferShp,SplitLength,
+				                                   MaxWidth*.6,AsArcGISTool,FlipCenterline,TileSegments,Workers,
+				                                   SideLines,MetricsTable,Transects)[0]
+			else:
+				# Walk the centerline once, writing each segment and its flat ended buffer 0.6 max width
+				#  to either side as it is cut (memory does not grow with the corridor length)
+				SegmentedCenterline=IntermedOutputFolder+os.path.basename(SmoothCenterline)[0:-4]+"_segmented_line.shp"
+				SegmentPolygons=BufferShp
+				if Transects:
+					# the polygons are built between transects below
+					SegmentPolygons=""
+				WriteSegments(StreamSegments(SmoothCenterline,SplitLength,FlipCenterline),SegmentedCenterline,
+				              SegmentPolygons,MaxWidth*.6,SmoothCenterline)
+
+				# Metrics from the centerline the segments are cut from
+				CenterlineMetrics(SmoothCenterline,FlipCenterline,SplitLength,SideLines,MaxWidth*1.2,MetricsTable)
+
+				if Transects:
+					### Start process of converting centerline to segmented polygons
+					# Update user on process
+					message="Building polygons between transects..."
+					MessageSwitch(AsArcGISTool,message)
+
+					# Polygons between transects 0.6 max width to either side, turned and shortened where they cross
+					#  (flat ended buffers where they still overlap)
+					TransectPolygons(SegmentedCenterline,BufferShp,MaxWidth*.6,Job)
+	
+			# Update user on process
+			message="Segmented polygons created."
+			MessageSwitch(AsArcGISTool,message)
+	
+			SkipBoundary=TheInPolyFile==''
+			DissShp=""
+			if SkipBoundary:
+				message="Processing complete after buffering."
+				MessageSwitch(AsArcGISTool,message)
+			# keep going to fill gaps		
+			else:
+				# Update user on process
+				message="Filling gaps between polygons"
+				MessageSwitch(AsArcGISTool,message)		
+		
+				# Clip buffered polygon to boundary, create polygons in gaps
+				IDPolygons=IntermedOutputFolder+TheFileName+"_segmented_ID.shp"
+				AInterface.Identity(TheInPolyFile,BufferShp,IDPolygons,"ALL","#","#")
+		
+				# Select areas outside every segment polygon: their FID_ field for the segment
+				#  polygons is -1 (the FID order of the pieces is not fixed)
+				IDField=IdentityFIDField(IDPolygons,TheInPolyFile)
+				# Create feature layer for selection
+				ID_Layer=Job.LayerName("ID_Layer")
+				MgmtInterface.CreateLayer(IDPolygons,ID_Layer)
+				Statement="\"" + IDField + "\" = -1"
+				MgmtInterface.SelectUsingAttributes(ID_Layer,"NEW_SELECTION",Statement)
+
+				# Multipart to single to create shapefile with just gap fillers
+				GapsShp=IntermedOutputFolder+TheFileName+"_segmented_gaps.shp"
+				MgmtInterface.Multipart2Single(ID_Layer,GapsShp)		
+		
+				# Create new shapefile with just clipped original polygons
+				MgmtInterface.SelectUsingLocation(ID_Layer,"#","#","#","SWITCH_SELECTION")
+				ClippedShp=IntermedOutputFolder+TheFileName+"_segmented_clipped.shp"
+				MgmtInterface.CopyFeatures(ID_Layer,ClippedShp)
+		
+				# Run Near to associate gaps with normal polygons
+				AInterface.Near(GapsShp,ClippedShp,"#","#","#")
+		
+				# Put Near_FID in original shapefile
+				MgmtInterface.AddField(ClippedShp,"Near_FID","LONG","#","#","#")
+				MgmtInterface.WriteField(ClippedShp,"Near_FID","!FID!","PYTHON")
+		
+				# Merge original and gaps shapefiles
+				#MergedShp=IntermedOutputFolder+TheFileName+"_segmented_merged.shp"
+				#MgmtInterface.MergeShapefiles([ClippedShp,GapsShp],MergedShp)
+		
+				# Union original and gaps shapefiles
+				UnionShp=IntermedOutputFolder+TheFileName+"_segmented_union.shp"
+				AInterface.Union([ClippedShp,GapsShp],UnionShp,"#","#","#")
+
+				# if using union, transfer NEAR_FID_1 to NEAR_FID (after selecting NEAR_FID==0)
+				Union_Layer=Job.LayerName("Union_Layer")
+				MgmtInterface.CreateLayer(UnionShp,Union_Layer)
+				MgmtInterface.SelectUsingAttributes(Union_Layer,"NEW_SELECTION","\"NEAR_FID\"=0")
+				MgmtInterface.WriteField(Union_Layer,"NEAR_FID","!NEAR_FID_1!","PYTHON")
+		
+				# Dissolve by Near_FID field
+				DissShp=TheOutFilePath+TheFileName+"_segmented_diss.shp"
+				MgmtInterface.Dissolve(UnionShp,DissShp,"NEAR_FID","#","SINGLE_PART","#")
+		
+				# Calculate station
+				MgmtInterface.AddField(DissShp,"Station","DOUBLE",10,1,"#")
+				MgmtInterface.WriteField(DissShp,"Station","!Near_FID! * " + str(SplitLength),"PYTHON")
+		
+				# Add select by area then eliminate for random remaining small pieces?
+		
+				message="Processing complete."
+				MessageSwitch(AsArcGISTool,message)		
+
+			### Summarize the DEM under each station's polygons
+			ZonalTable=""
+			if DEMRaster!='':
+				message="Calculating elevation and slope statistics per station..."
+				MessageSwitch(AsArcGISTool,message)
+				ZonalTable=TheOutFilePath+TheFileName+"_zonalstats.dbf"
+				if DissShp!="":
+					ZonalStatistics(DissShp,DEMRaster,ZonalTable,Job=Job)
+				else:
+					ZonalStatistics(BufferShp,DEMRaster,ZonalTable,Job=Job)
+
+			### Columnar copies of the segments and tables for dataframe readers
+			ColumnarFiles=[]
+			if Columnar:
+				message="Writing GeoParquet segments and Arrow tables..."
+				MessageSwitch(AsArcGISTool,message)
+				from ColumnarExport import ExportCorridor
+				ColumnarFiles=ExportCorridor([BufferShp,DissShp],[MetricsTable,ZonalTable],TheFileName)
+
+			return([BufferShp]+[DissShp]+[ZonalTable]+[MetricsTable]+ColumnarFiles)
+		finally:
+			# Remove this run's layers, also when a step failed
+			if OwnJob:
+				Job.Release()
+
+	#Print out error from Python
+	except Exception, err: # an error occurred (probably in arcGIS)
+		raise RuntimeError("** Error: RiverCorridor Failed ("+str(err)+")") #raise "grabs" error for use in higher level
@@ -0,0 +1,340 @@
+#######################################################################
+# RunPlanner
+#
+# Purpose: Estimate the time and memory of a corridor run before it starts, and choose
+#          how to split and buffer it: SegmentStream in this process ("serial"), or
+#          TiledSplitModule tiles in a process pool ("tiled") with the tile size and the
+#          number of worker processes.
+#
+#          The estimate is read from cheap metadata: the record and vertex counts in the
+#          shapefile headers, the corridor length (centerline length, or half the
+#          boundary perimeter less the ends), the segment count (length / SplitLength)
+#          and the corridor area (length * 1.2 MaxWidth, the buffered width) in DEM
+#          cells.  Each stage costs FixedSeconds + SecondsPerUnit * units and
+#          BytesPerUnit * units of memory (CostModel).  The seconds are scaled by the
+#          TimeScale fitted to the run times of finished jobs in a WorkerService queue
+#          (Calibrate), saved to CostFile.
+#
+#          RiverCorridor plans its own run when TileSegments is negative.
+#
+# Command line:
+#         python RunPlanner.py ParametersFile [--dry-run]   (JSON object or list with the RiverCorridorModule parameters)
+#         python RunPlanner.py --calibrate QueueFile
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import sys
+import json
+import math
+import struct
+
+# Stage costs: (FixedSeconds, SecondsPerUnit, BytesPerUnit), starting values that
+#  Calibrate scales to the machine
+CostModel={"Corners":(0.5,2e-6,200.0),            # boundary vertices
+           "Centerline":(20.0,2e-4,400.0),        # boundary vertices (geoprocessor)
+           "Simplify":(5.0,5e-5,200.0),           # boundary vertices (geoprocessor)
+           "StreamSplitBuffer":(0.5,1e-4,0.0),    # segments (SegmentStream, memory does not grow with them)
+           "Transects":(0.5,5e-5,600.0),          # segments (SegmentTransects)
+           "TiledSplitBuffer":(1.0,2e-4,1500.0),  # segments (one tile's worth per worker)
+           "Metrics":(0.2,5e-5,300.0),            # segments
+           "GapFill":(30.0,2e-2,8000.0),          # segments (Identity, Union, Dissolve)
+           "ZonalStatistics":(1.0,5e-8,16.0),     # DEM cells under the corridor
+           "Columnar":(0.5,1e-4,400.0)}           # segments (ColumnarExport)
+
+# Seconds to start a pool worker process, and its memory before any tile
+WorkerSeconds=1.5
+WorkerBytes=80*2**20
+
+# Smallest tile, and tiles aimed for per worker (so slow tiles even out)
+MinTileSegments=200
+TilesPerWorker=4
+
+# Fraction of the physical memory a run may plan to use (DefaultMemory when unknown)
+MemoryFraction=0.5
+DefaultMemory=4*2**30
+
+# Calibrated time scale of the cost model
+CostFile=os.path.join(os.path.dirname(os.path.abspath(__file__)),"RunCosts.json")
+
+################################################
+# Purpose: Record and vertex counts of a shapefile from its record headers
+# Input: Shapefile - shapefile path and name
+# Output: [NumRecords, NumVertices]
+def HeaderCounts(Shapefile):
+	import ShapefileIO
+	Base=ShapefileIO.BaseName(Shapefile)
+	NumRecords=(os.path.getsize(Base+".shx")-100)//8
+	ShapeType=ShapefileIO.ShapeTypeOf(Shapefile)
+	if ShapeType in ShapefileIO.PointShapes:
+		return([NumRecords,NumRecords])
+	ShxFile=open(Base+".shx","rb")
+	ShpFile=open(Base+".shp","rb")
+	try:
+		ShxFile.seek(100)
+		Index=struct.unpack(">"+str(2*NumRecords)+"i",ShxFile.read(8*NumRecords))
+		NumVertices=0
+		for RecordNum in range(NumRecords):
+			# shape type, box, then the part and point counts (multipoints: the point count)
+			ShpFile.seek(2*Index[2*RecordNum]+8)
+			Header=ShpFile.read(44)
+			if len(Header)<44 or struct.unpack_from("<i",Header,0)[0]==ShapefileIO.NullShape:
+				continue
+			if ShapeType in (ShapefileIO.MultiPointShape,ShapefileIO.MultiPointZShape,ShapefileIO.MultiPointMShape):
+				NumVertices+=struct.unpack_from("<i",Header,36)[0]
+			else:
+				NumVertices+=struct.unpack_from("<i",Header,40)[0]
+	finally:
+		ShxFile.close()
+		ShpFile.close()
+	return([NumRecords,NumVertices])
+
+################################################
+# Purpose: Physical memory of this machine
+# Output: Bytes - physical memory in bytes (DefaultMemory when it cannot be read)
+def PhysicalMemory():
+	try:
+		if hasattr(os,"sysconf"):
+			return(int(os.sysconf("SC_PHYS_PAGES"))*int(os.sysconf("SC_PAGE_SIZE")))
+		import ctypes
+		class MemoryStatus(ctypes.Structure):
+			_fields_=[("dwLength",ctypes.c_ulong),("dwMemoryLoad",ctypes.c_ulong),
+			          ("ullTotalPhys",ctypes.c_ulonglong),("ullAvailPhys",ctypes.c_ulonglong),
+			          ("ullTotalPageFile",ctypes.c_ulonglong),("ullAvailPageFile",ctypes.c_ulonglong),
+			          ("ullTotalVirtual",ctypes.c_ulonglong),("ullAvailVirtual",ctypes.c_ulonglong),
+			          ("sullAvailExtendedVirtual",ctypes.c_ulonglong)]
+		Status=MemoryStatus()
+		Status.dwLength=ctypes.sizeof(MemoryStatus)
+		ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(Status))
+		return(int(Status.ullTotalPhys))
+	except Exception:
+		return(DefaultMemory)
+
+################################################
+# Purpose: Calibrated time scale of the cost model
+# Output: TimeScale - multiplier of the modelled seconds (1 before calibration)
+def TimeScale():
+	try:
+		with open(CostFile) as TheFile:
+			return(float(json.load(TheFile)["TimeScale"]))
+	except Exception:
+		return(1.0)
+
+################################################
+# Purpose: Metadata a run is planned from
+# Input: Parameters - dictionary of RiverCorridor parameters (WorkerService.JobParameters)
+# Output: Metadata - dictionary of BoundaryVertices, CenterlineVertices, Length, Segments
+#          and DEMCells
+def RunMetadata(Parameters):
+	import ShapefileProperties as ShpProp
+	MaxWidth=float(Parameters["MaxWidth"])
+	SplitLength=float(Parameters["SplitLength"])
+	Metadata={"BoundaryVertices":0,"CenterlineVertices":0,"DEMCells":0}
+	if Parameters.get("StartAnswer",True):
+		# the centerline runs along the sides: half the perimeter less the two ends
+		Metadata["BoundaryVertices"]=HeaderCounts(Parameters["TheInPolyFile"])[1]
+		Perimeter=sum(ShpProp.GeometryMeasures(Parameters["TheInPolyFile"])["Length"])
+		Metadata["Length"]=max((Perimeter-2*MaxWidth)/2.0,SplitLength)
+		Metadata["CenterlineVertices"]=Metadata["BoundaryVertices"]//2
+	else:
+		Metadata["CenterlineVertices"]=HeaderCounts(Parameters["CenterlinePolyline"])[1]
+		Metadata["Length"]=sum(ShpProp.GeometryMeasures(Parameters["CenterlinePolyline"])["Length"])
+	Metadata["Segments"]=int(math.ceil(Metadata["Length"]/SplitLength))
+	if Parameters.get("DEMRaster","")!="":
+		from ZonalStatistics import OpenRaster
+		TheRaster=OpenRaster(Parameters["DEMRaster"])
+		Metadata["DEMCells"]=int(Metadata["Length"]*MaxWidth*1.2/(TheRaster.CellWidth*TheRaster.CellHeight))
+	return(Metadata)
+
+################################################
+# Purpose: Modelled seconds and bytes of a stage
+# Input: Stage - CostModel key
+#        Units - units of work
+#        Scale - time scale
+# Output: [Seconds, Bytes]
+def StageCost(Stage,Units,Scale):
+	FixedSeconds,SecondsPerUnit,BytesPerUnit=CostModel[Stage]
+	return([Scale*(FixedSeconds+SecondsPerUnit*Units),BytesPerUnit*Units])
+
+################################################
+# Purpose: Tiled split and buffer cost with a given number of workers
+# Input: Segments - number of segments
+#        Workers - number of worker processes
+#        Scale - time scale
+#        TileSegments - segments per tile (0 to size the tiles for the workers)
+# Output: [Seconds, Bytes, TileSegments] - Bytes for all workers together
+def TiledCost(Segments,Workers,Scale,TileSegments=0):
+	if TileSegments<=0:
+		TileSegments=max(MinTileSegments,int(math.ceil(Segments/float(Workers*TilesPerWorker))))
+	NumTiles=int(math.ceil(Segments/float(TileSegments)))
+	Workers=min(Workers,NumTiles)
+	# each worker runs its share of the tiles, after starting up
+	TileSeconds,TileBytes=StageCost("TiledSplitBuffer",TileSegments,Scale)
+	Seconds=Scale*WorkerSeconds*(Workers>1)+TileSeconds*math.ceil(NumTiles/float(Workers))
+	return([Seconds,Workers*(WorkerBytes+TileBytes),TileSegments])
+
+################################################
+# Purpose: Plan a corridor run
+# Input: Parameters - dictionary of RiverCorridor parameters
+#        MemoryBudget - bytes the run may use (0 for MemoryFraction of the physical memory)
+#        Processors - processors available (0 for all of this machine's)
+#        AsGiven - True to cost the TileSegments and Workers of Parameters when they are
+#                  explicit (TileSegments not negative) instead of choosing them
+# Output: Plan - dictionary of Backend ("serial" or "tiled"), TileSegments, Workers,
+#          Stages (list of [Stage, Units, Seconds, Bytes]), Seconds (total), PeakBytes,
+#          MemoryBudget and Metadata
+def PlanRun(Parameters,MemoryBudget=0,Processors=0,AsGiven=False):
+	try:
+		import multiprocessing
+		if MemoryBudget<=0:
+			MemoryBudget=int(MemoryFraction*PhysicalMemory())
+		if Processors<=0:
+			Processors=multiprocessing.cpu_count()
+		Scale=TimeScale()
+		Metadata=RunMetadata(Parameters)
+		Segments=Metadata["Segments"]
+
+		### Stages before and after splitting
+		Before=[]
+		if Parameters.get("StartAnswer",True):
+			if Parameters.get("TheInPointFile","")=="":
+				Before.append(("Corners",Metadata["BoundaryVertices"]))
+			Before.append(("Centerline",Metadata["BoundaryVertices"]))
+		if Parameters.get("SimplifyAnswer",False):
+			Before.append(("Simplify",Metadata["CenterlineVertices"]))
+		After=[("Metrics",Segments)]
+		if Parameters.get("TheInPolyFile","")!="":
+			After.append(("GapFill",Segments))
+		if Metadata["DEMCells"]>0:
+			After.append(("ZonalStatistics",Metadata["DEMCells"]))
+		if Parameters.get("Columnar",0):
+			After.append(("Columnar",Segments))
+
+		### Split and buffer: serial, or the fastest tiling that fits the memory budget
+		Backend="serial"
+		TileSegments=0
+		Workers=1
+		SplitStages=[["StreamSplitBuffer",Segments]+StageCost("StreamSplitBuffer",Segments,Scale)]
+		if Parameters.get("Transects",0):
+			SplitStages.append(["Transects",Segments]+StageCost("Transects",Segments,Scale))
+		BestSeconds=sum(Stage[2] for Stage in SplitStages)
+		GivenTiles=int(Parameters.get("TileSegments",0))
+		if AsGiven and GivenTiles>0:
+			# the tiles and workers the run was given (0 workers is one per processor)
+			Workers=int(Parameters.get("Workers",0)) or Processors
+			Seconds,Bytes,TileSegments=TiledCost(Segments,Workers,Scale,GivenTiles)
+			Backend="tiled"
+			SplitStages=[["TiledSplitBuffer",Segments,Seconds,Bytes]]
+		elif AsGiven and GivenTiles==0:
+			# serial, as given
+			pass
+		elif Segments>=2*MinTileSegments:
+			for TheWorkers in range(1,Processors+1):
+				Seconds,Bytes,TheTileSegments=TiledCost(Segments,TheWorkers,Scale)
+				if Bytes<=MemoryBudget and Seconds<BestSeconds:
+					Backend="tiled"
+					TileSegments=TheTileSegments
+					Workers=TheWorkers
+					BestSeconds=Seconds
+					SplitStages=[["TiledSplitBuffer",Segments,Seconds,Bytes]]
+
+		Stages=[[Stage,Units]+StageCost(Stage,Units,Scale) for Stage,Units in Before]
+		Stages=Stages+SplitStages+[[Stage,Units]+StageCost(Stage,Units,Scale) for Stage,Units in After]
+		return({"Backend":Backend,"TileSegments":TileSegments,"Workers":Workers,"Stages":Stages,
+		        "Seconds":sum(Stage[2] for Stage in Stages),"PeakBytes":max(Stage[3] for Stage in Stages),
+		        "MemoryBudget":MemoryBudget,"Metadata":Metadata})
+	except Exception as err:
+		raise RuntimeError("** Error: PlanRun Failed ("+str(err)+")")
+
+################################################
+# Purpose: Fit the time scale of the cost model to the finished jobs of a queue
+# Input: QueueFile - WorkerService queue file
+# Output: [TimeScale, NumJobs] - also saved to CostFile
+def Calibrate(QueueFile):
+	try:
+		import WorkerService
+		Connection=WorkerService.OpenQueue(QueueFile)
+		try:
+			Rows=Connection.execute("SELECT Parameters,Seconds FROM Jobs WHERE Status='DONE'").fetchall()
+		finally:
+			Connection.close()
+		Modelled=[]
+		Measured=[]
+		for Row in Rows:
+			Parameters=json.loads(Row["Parameters"])
+			try:
+				# modelled at scale 1, as the jobs ran: their own TileSegments and Workers,
+				#  or the planned settings when they planned
+				Plan=PlanRun(Parameters,AsGiven=True)
+			except Exception:
+				# inputs moved or deleted since the job ran
+				continue
+			Modelled.append(Plan["Seconds"]/TimeScale())
+			Measured.append(float(Row["Seconds"]))
+		if Modelled==[]:
+			raise RuntimeError("no finished jobs with readable inputs in "+QueueFile)
+		# least squares scale through the origin
+		Scale=sum(M*S for M,S in zip(Modelled,Measured))/sum(M*M for M in Modelled)
+		with open(CostFile,"w") as TheFile:
+			json.dump({"TimeScale":Scale,"Jobs":len(Modelled)},TheFile)
+		return([Scale,len(Modelled)])
+	except Exception as err:
+		raise RuntimeError("** Error: Calibrate Failed ("+str(err)+")")
+
+################################################
+# Purpose: Readable report of a plan
+# Input: Plan - from PlanRun
+# Output: Report - multi-line string
+def PlanReport(Plan):
+	Metadata=Plan["Metadata"]
+	Lines=["Corridor length "+format(Metadata["Length"],".1f")+", "+str(Metadata["Segments"])+" segments, "+
+	       str(Metadata["BoundaryVertices"])+" boundary vertices, "+str(Metadata["CenterlineVertices"])+
+	       " centerline vertices, "+str(Metadata["DEMCells"])+" DEM cells",
+	       "Backend "+Plan["Backend"]+", TileSegments "+str(Plan["TileSegments"])+", Workers "+str(Plan["Workers"]),
+	       "  "+"Stage".ljust(18)+"Units".rjust(12)+"Seconds".rjust(12)+"MB".rjust(10)]
+	for Stage,Units,Seconds,Bytes in Plan["Stages"]:
+		Lines.append("  "+Stage.ljust(18)+str(Units).rjust(12)+format(Seconds,".1f").rjust(12)+format(Bytes/2.0**20,".1f").rjust(10))
+	Lines.append("Total "+format(Plan["Seconds"],".1f")+" s, peak "+format(Plan["PeakBytes"]/2.0**20,".1f")+
+	             " MB of a "+format(Plan["MemoryBudget"]/2.0**20,".0f")+" MB budget")
+	return("\n".join(Lines))
+
+################################################
+# Purpose: Command line entry: plan (and run) corridors, or calibrate
+# Input: Arguments - command line arguments after the script name
+def Main(Arguments):
+	import argparse
+	Parser=argparse.ArgumentParser(description="Corridor run planner")
+	Parser.add_argument("ParametersFile",nargs="?",help="JSON object or list of objects with RiverCorridor parameters")
+	Parser.add_argument("--dry-run",action="store_true",help="report the plans without running")
+	Parser.add_argument("--calibrate",metavar="QueueFile",help="fit the cost model to a queue's finished jobs")
+	Options=Parser.parse_args(Arguments)
+
+	if Options.calibrate is not None:
+		Scale,NumJobs=Calibrate(Options.calibrate)
+		print("Time scale "+format(Scale,".3f")+" from "+str(NumJobs)+" jobs")
+		return
+	if Options.ParametersFile is None:
+		Parser.error("a parameters file is required")
+	import WorkerService
+	with open(Options.ParametersFile) as TheFile:
+		ParameterList=json.load(TheFile)
+	if isinstance(ParameterList,dict):
+		ParameterList=[ParameterList]
+	for Parameters in ParameterList:
+		Parameters=WorkerService.JobArguments(Parameters)
+		Plan=PlanRun(Parameters)
+		print(Parameters["TheFileName"])
+		print(PlanReport(Plan))
+		if not Options.dry_run:
+			from RiverCorridorModule import RiverCorridor
+			Outputs=RiverCorridor(Parameters["TheInPolyFile"],Parameters["TheInPointFile"],
+			                      Parameters["CenterlinePolyline"],Parameters["TheOutFilePath"],
+			                      Parameters["TheFileName"],float(Parameters["MaxWidth"]),
+			                      float(Parameters["SplitLength"]),Parameters["SimplifyAnswer"],
+			                      Parameters["StartAnswer"],0,None,Plan["TileSegments"],Plan["Workers"],
+			                      Parameters["DEMRaster"],int(Parameters["Transects"]),
+			                      int(Parameters["Columnar"]))
+			print("Outputs: "+", ".join(Output for Output in Outputs if Output!=""))
+
+if __name__=="__main__":
+	Main(sys.argv[1:])
@@ -0,0 +1,285 @@
+#######################################################################
+# SegmentMetrics
+#
+# Purpose: Per station channel metrics computed from the centerline array the segments
+#          are cut from, written as a table next to the segment polygons:
+#
+#          LENGTH - length of the segment along the centerline
+#          WIDTH - length of the transect across the channel at the segment's middle
+#                  station, between the nearest side line crossings to either side of
+#                  the centerline
+#          AREA - shoelace area of the channel between the transects at the segment's
+#                 start and end (the side lines between the transect crossings close it)
+#          SINUOSITY - segment length over the straight distance between its ends
+#          CURVATURE - change of centerline direction within the segment over its length
+#                      (radians per unit length, positive turning left)
+#
+#          Transects are perpendicular to the centerline and cross the side lines through
+#          a packed R-tree (SpatialIndex) over the side line segments, all transects in the
+#          same arrays.  The transects at the centerline ends stop at the side line ends
+#          where they miss them (the centerline runs past them).  WIDTH and AREA are blank
+#          without side lines (starting from a centerline) or where a transect does not
+#          reach one of them.
+#
+# Usage:
+#         Metrics=StationMetrics(XY,SplitLength,SideLineChains(FinalBoundaries),HalfLength)
+#         WriteMetrics(Metrics,TheOutFilePath+TheFileName+"_metrics.dbf")
+#
+# Modified: 10/19/2026
+#######################################################################
+import numpy
+import ShapefileIO
+import SpatialIndex
+
+# Fraction of SplitLength below which a line end is not given its own segment (also the
+#  fraction of a side line segment a transect may miss its end by)
+EndTolerance=1e-9
+
+# Output table fields
+MetricFields=[("CID","N",10,0),("Station","N",13,2),("LENGTH","N",13,3),("WIDTH","N",13,3),
+              ("AREA","N",16,3),("SINUOSITY","N",10,4),("CURVATURE","N",13,7)]
+
+################################################
+# Purpose: Vertex chains of side lines (one per part)
+# Input: SideLines - polyline shapefile with the two side lines ("" for none)
+# Output: Chains - list of (n,2) vertex arrays
+def SideLineChains(SideLines):
+	if SideLines=="":
+		return([])
+	Reader=ShapefileIO.ShapefileReader(SideLines)
+	Chains=[]
+	for FID in range(Reader.NumRecords):
+		Content=Reader.RecordContent(FID)
+		if int(numpy.frombuffer(Content,dtype="<i4",count=1)[0])==ShapefileIO.NullShape:
+			continue
+		XY,PartStarts=ShapefileIO.RecordGeometry(Content)
+		Bounds=list(PartStarts)+[XY.shape[0]]
+		Chains=Chains+[XY[Bounds[i]:Bounds[i+1]] for i in range(len(PartStarts)) if Bounds[i+1]-Bounds[i]>1]
+	return(Chains)
+
+################################################
+# Purpose: Distance along a vertex array to each vertex
+# Input: XY - (n,2) vertex array
+# Output: Measures - (n,) array starting at 0
+def VertexMeasures(XY):
+	Measures=numpy.zeros(XY.shape[0])
+	Measures[1:]=numpy.cumsum(numpy.hypot(XY[1:,0]-XY[0:-1,0],XY[1:,1]-XY[0:-1,1]))
+	return(Measures)
+
+################################################
+# Purpose: Nearest side line crossings of transects to either side of the centerline
+# Input: Points - (k,2) transect centers on the centerline
+#        Normals - (k,2) unit normals pointing left of the centerline
+#        HalfLength - transect length to either side
+#        Chains - side line vertex chains (SideLineChains)
+# Output: [Left, Right] - each a dictionary of per transect arrays: "Offset" (distance from
+#          the centerline, NaN without a crossing), "Chain" (chain number) and "Measure"
+#          (distance along the chain to the crossing)
+def TransectCrossings(Points,Normals,HalfLength,Chains):
+	Sides=[]
+	for Sign in (1.0,-1.0):
+		Sides.append({"Offset":numpy.zeros(Points.shape[0])+numpy.nan,
+		              "Chain":numpy.zeros(Points.shape[0],dtype=numpy.int64)-1,
+		              "Measure":numpy.zeros(Points.shape[0])+numpy.nan})
+	if Chains==[] or Points.shape[0]==0:
+		return(Sides)
+
+	### Side line segments with their chain and the measure of their start
+	S0=numpy.concatenate([Chain[0:-1] for Chain in Chains])
+	S1=numpy.concatenate([Chain[1:] for Chain in Chains])
+	SegmentChains=numpy.concatenate([numpy.zeros(Chain.shape[0]-1,dtype=numpy.int64)+i for i,Chain in enumerate(Chains)])
+	StartMeasures=numpy.concatenate([VertexMeasures(Chain)[0:-1] for Chain in Chains])
+	Tree=SpatialIndex.PackedRTree(numpy.column_stack([numpy.minimum(S0,S1),numpy.maximum(S0,S1)]))
+
+	### Candidate (transect, side segment) pairs from the transect boxes
+	Ends0=Points-Normals*HalfLength
+	Ends1=Points+Normals*HalfLength
+	Transects,Segs=Tree.QueryMany(numpy.column_stack([numpy.minimum(Ends0,Ends1),numpy.maximum(Ends0,Ends1)]))
+	if Transects.shape[0]==0:
+		return(Sides)
+	# Point + S*Normal = S0 + U*(S1-S0)
+	N=Normals[Transects]
+	D=S1[Segs]-S0[Segs]
+	W=S0[Segs]-Points[Transects]
+	Denominator=N[:,0]*D[:,1]-N[:,1]*D[:,0]
+	Safe=numpy.where(Denominator!=0,Denominator,1.0)
+	S=(W[:,0]*D[:,1]-W[:,1]*D[:,0])/Safe
+	U=(W[:,0]*N[:,1]-W[:,1]*N[:,0])/Safe
+	# crossings at side line vertices count for either segment
+	Hit=(Denominator!=0)&(U>=-EndTolerance)&(U<=1+EndTolerance)&(numpy.abs(S)<=HalfLength)&(S!=0)
+
+	for Sign,Side in zip((1.0,-1.0),Sides):
+		Keep=numpy.flatnonzero(Hit&(S*Sign>0))
+		if Keep.shape[0]==0:
+			continue
+		# nearest crossing of each transect on this side
+		Order=Keep[numpy.lexsort((S[Keep]*Sign,Transects[Keep]))]
+		First=Order[numpy.unique(Transects[Order],return_index=True)[1]]
+		Side["Offset"][Transects[First]]=S[First]*Sign
+		Side["Chain"][Transects[First]]=SegmentChains[Segs[First]]
+		Side["Measure"][Transects[First]]=StartMeasures[Segs[First]]+U[First]*numpy.hypot(D[First,0],D[First,1])
+	return(Sides)
+
+################################################
+# Purpose: Shoelace areas of many rings held in flat arrays
+# Input: RingXY - (n,2) vertices of every ring, each ring listed once (not closed)
+#        RingStarts - (rings,) index of each ring's first vertex
+# Output: Areas - (rings,) array
+def ShoelaceAreas(RingXY,RingStarts):
+	if RingStarts.shape[0]==0:
+		return(numpy.zeros(0))
+	Next=numpy.arange(1,RingXY.shape[0]+1)
+	# the last vertex of each ring closes back to its first
+	RingEnds=numpy.append(RingStarts[1:],RingXY.shape[0])-1
+	Next[RingEnds]=RingStarts
+	Terms=RingXY[:,0]*RingXY[Next,1]-RingXY[Next,0]*RingXY[:,1]
+	return(numpy.abs(numpy.add.reduceat(Terms,RingStarts))/2.0)
+
+################################################
+# Purpose: Vertices of a chain between two measures, in the order from one to the other
+# Input: Chain - (n,2) vertex array
+#        Measures - (n,) vertex measures of the chain
+#        From, To - measures along the chain
+# Output: Piece - (k,2) array of the vertices strictly between the measures
+def ChainPiece(Chain,Measures,From,To):
+	Low=int(numpy.searchsorted(Measures,min(From,To),"right"))
+	High=int(numpy.searchsorted(Measures,max(From,To),"left"))
+	Piece=Chain[Low:High]
+	if From>To:
+		Piece=Piece[::-1]
+	return(Piece)
+
+################################################
+# Purpose: Clamp the transects at the centerline ends that miss a side line (the
+#          centerline runs past the side line's end) to that side line's nearest end
+# Input: Side - dictionary of one side from TransectCrossings, for the StationMetrics
+#               transects (segment ends, then middles); updated in place
+#        SideXY - (k,2) crossing points of the side, NaN without one; updated in place
+#        NumSegments - number of segments
+#        Points - (k,2) transect centers
+#        Chains - side line vertex chains
+#        ChainMeasures - vertex measures of each chain
+#        HalfLength - farthest a side line end may be from the centerline end
+# Output: none
+def ClampLineEnds(Side,SideXY,NumSegments,Points,Chains,ChainMeasures,HalfLength):
+	if NumSegments==0:
+		return
+	# each line end with the middle and the other end transect of its segment
+	for End,Neighbours in ((0,[NumSegments+1,1]),(NumSegments,[2*NumSegments,NumSegments-1])):
+		if not numpy.isnan(Side["Offset"][End]):
+			continue
+		Crossed=[Neighbour for Neighbour in Neighbours if Side["Chain"][Neighbour]>=0]
+		if Crossed==[]:
+			continue
+		ChainNum=Side["Chain"][Crossed[0]]
+		Chain=Chains[ChainNum]
+		Distances=numpy.hypot(Chain[[0,-1],0]-Points[End,0],Chain[[0,-1],1]-Points[End,1])
+		Nearest=int(numpy.argmin(Distances))
+		if Distances[Nearest]>HalfLength:
+			continue
+		Vertex=[0,-1][Nearest]
+		SideXY[End]=Chain[Vertex]
+		Side["Chain"][End]=ChainNum
+		Side["Measure"][End]=ChainMeasures[ChainNum][Vertex]
+
+################################################
+# Purpose: Metrics of every segment of a centerline
+# Input: XY - (n,2) centerline vertex array, in the direction stations run
+#        SplitLength - segment length
+#        Chains - side line vertex chains (SideLineChains, [] for none)
+#        HalfLength - transect length to either side of the centerline
+# Output: Metrics - dictionary of per segment arrays keyed by the MetricFields names
+def StationMetrics(XY,SplitLength,Chains,HalfLength):
+	SplitLength=float(SplitLength)
+	Measures=VertexMeasures(XY)
+	LineLength=Measures[-1]
+	NumSegments=int(numpy.ceil(LineLength/SplitLength-EndTolerance))
+	CIDs=numpy.arange(NumSegments)
+	# stations of the segment ends, the last one clipped to the line end
+	Cuts=numpy.minimum(numpy.arange(NumSegments+1)*SplitLength,LineLength)
+	CutXY=numpy.column_stack([numpy.interp(Cuts,Measures,XY[:,0]),numpy.interp(Cuts,Measures,XY[:,1])])
+	Lengths=Cuts[1:]-Cuts[0:-1]
+	Chords=numpy.hypot(CutXY[1:,0]-CutXY[0:-1,0],CutXY[1:,1]-CutXY[0:-1,1])
+	Sinuosity=Lengths/numpy.where(Chords>0,Chords,numpy.nan)
+
+	### Curvature: turning at each interior vertex, summed per segment
+	Headings=numpy.arctan2(XY[1:,1]-XY[0:-1,1],XY[1:,0]-XY[0:-1,0])
+	Turns=numpy.angle(numpy.exp(1j*(Headings[1:]-Headings[0:-1])))
+	VertexSegments=numpy.clip(numpy.searchsorted(Cuts,Measures[1:-1],"right")-1,0,max(NumSegments-1,0))
+	Turning=numpy.bincount(VertexSegments,weights=Turns,minlength=NumSegments)[0:NumSegments]
+	Curvature=Turning/numpy.where(Lengths>0,Lengths,numpy.nan)
+
+	### Transects at the segment ends and middles
+	Stations=numpy.concatenate([Cuts,(Cuts[0:-1]+Cuts[1:])/2.0])
+	Points=numpy.column_stack([numpy.interp(Stations,Measures,XY[:,0]),numpy.interp(Stations,Measures,XY[:,1])])
+	Edges=numpy.clip(numpy.searchsorted(Measures,Stations,"right")-1,0,XY.shape[0]-2)
+	Direction=XY[Edges+1]-XY[Edges]
+	EdgeLengths=numpy.hypot(Direction[:,0],Direction[:,1])
+	EdgeLengths[EdgeLengths==0]=1
+	Normals=numpy.column_stack([-Direction[:,1],Direction[:,0]])/EdgeLengths[:,None]
+	Left,Right=TransectCrossings(Points,Normals,HalfLength,Chains)
+	Widths=(Left["Offset"]+Right["Offset"])[NumSegments+1:]
+
+	### Area between the end transects, closed by the side lines
+	ChainMeasures=[VertexMeasures(Chain) for Chain in Chains]
+	LeftXY=Points+Normals*Left["Offset"][:,None]
+	RightXY=Points-Normals*Right["Offset"][:,None]
+	ClampLineEnds(Left,LeftXY,NumSegments,Points,Chains,ChainMeasures,HalfLength)
+	ClampLineEnds(Right,RightXY,NumSegments,Points,Chains,ChainMeasures,HalfLength)
+	Rings=[]
+	RingSegments=[]
+	for CID in range(NumSegments):
+		Ends=[CID,CID+1]
+		if (numpy.isnan(LeftXY[Ends]).any() or numpy.isnan(RightXY[Ends]).any() or
+		    Left["Chain"][CID]!=Left["Chain"][CID+1] or Right["Chain"][CID]!=Right["Chain"][CID+1]):
+			continue
+		LeftChain=Left["Chain"][CID]
+		RightChain=Right["Chain"][CID]
+		Rings.append(numpy.vstack([LeftXY[CID:CID+1],
+		                           ChainPiece(Chains[LeftChain],ChainMeasures[LeftChain],Left["Measure"][CID],Left["Measure"][CID+1]),
+		                           LeftXY[CID+1:CID+2],RightXY[CID+1:CID+2],
+		                           ChainPiece(Chains[RightChain],ChainMeasures[RightChain],Right["Measure"][CID+1],Right["Measure"][CID]),
+		                           RightXY[CID:CID+1]]))
+		RingSegments.append(CID)
+	Areas=numpy.zeros(NumSegments)+numpy.nan
+	if Rings!=[]:
+		RingStarts=numpy.cumsum([0]+[Ring.shape[0] for Ring in Rings[0:-1]])
+		Areas[RingSegments]=ShoelaceAreas(numpy.vstack(Rings),RingStarts)
+
+	return({"CID":CIDs,"Station":CIDs*SplitLength,"LENGTH":Lengths,"WIDTH":Widths,"AREA":Areas,
+	        "SINUOSITY":Sinuosity,"CURVATURE":Curvature})
+
+################################################
+# Purpose: Write the metrics table
+# Input: Metrics - dictionary from StationMetrics
+#        MetricsTable - output dBASE table path and name
+# Output: NumStations - number of rows written
+def WriteMetrics(Metrics,MetricsTable):
+	Writer=ShapefileIO.TableWriter(MetricsTable,MetricFields)
+	for Row in range(Metrics["CID"].shape[0]):
+		Writer.Write([Metrics[Field[0]][Row] for Field in MetricFields])
+	Writer.Close()
+	return(Writer.NumRecords)
+
+################################################
+# Purpose: Metrics table of a centerline shapefile (for segments made by SplitLineModule)
+# Input: Centerline - polyline shapefile with 1 single part, continuous line
+#        FlipLine - binary specifying whether the start of the centerline aligns with the desired start (0), and it actually the end (1)
+#        SplitLength - segment length
+#        SideLines - polyline shapefile with the two side lines ("" for none)
+#        HalfLength - transect length to either side of the centerline
+#        MetricsTable - output dBASE table path and name
+# Output: NumStations - number of rows written
+def CenterlineMetrics(Centerline,FlipLine,SplitLength,SideLines,HalfLength,MetricsTable):
+	try:
+		Reader=ShapefileIO.ShapefileReader(Centerline)
+		if Reader.NumRecords!=1:
+			raise RuntimeError("Centerline is more than 1 feature - metrics need 1 continuous line")
+		XY,PartStarts=ShapefileIO.RecordGeometry(Reader.RecordContent(0))
+		if len(PartStarts)!=1:
+			raise RuntimeError("Centerline has more than 1 part - metrics need 1 continuous line")
+		if FlipLine==1:
+			XY=XY[::-1]
+		return(WriteMetrics(StationMetrics(XY,SplitLength,SideLineChains(SideLines),HalfLength),MetricsTable))
+	except Exception as err:
+		raise RuntimeError("** Error: CenterlineMetrics Failed ("+str(err)+")")
@@ -0,0 +1,173 @@
+#######################################################################
+# SegmentStream
+#
+# Purpose: Split a centerline into segments as a stream.  StreamSegments walks the line
+#          once, reading its vertices from the shapefile in blocks, and yields one
+#          (CID, Station, SegmentXY) at a time, so memory use does not grow with the
+#          length of the corridor.  Consumers pull from the generator: WriteSegments
+#          writes the segments and their polygons record by record.
+#
+#          CID counts segments from the start of the line (the end when FlipLine is 1),
+#          Station is CID * SplitLength and SegmentXY is the (n,2) array of the
+#          centerline vertices from the segment start to its end, so SegmentXY[[0,-1]] is
+#          the straight segment made by the points to line step of SplitLineModule.  The
+#          last segment ends at the end of the line and may be shorter than SplitLength.
+#
+# Usage:
+#         for CID,Station,SegmentXY in StreamSegments(Centerline,SplitLength,0):
+#             ...
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import struct
+import numpy
+import ShapefileIO
+
+# Vertices read from the file at a time
+BlockVertices=65536
+
+# Fraction of SplitLength below which a line end is not given its own segment
+EndTolerance=1e-9
+
+# Output attribute fields
+SegmentFields=[("CID","N",10,0),("Station","N",13,2)]
+
+################################################
+# Purpose: Read the vertices of one single part line record in blocks
+# Input: ShapefileName - polyline shapefile path and name
+#        RecordNum - zero based record number (FID)
+#        Reverse - True to read from the last vertex to the first
+#        BlockSize - vertices per block
+# Output: generator of (k,2) vertex arrays, in reading order
+def StreamVertices(ShapefileName,RecordNum,Reverse,BlockSize):
+	Base=ShapefileIO.BaseName(ShapefileName)
+	ShxFile=open(Base+".shx","rb")
+	ShxFile.seek(100+8*RecordNum)
+	Entry=ShxFile.read(8)
+	ShxFile.close()
+	if len(Entry)!=8:
+		raise RuntimeError(ShapefileName+" has no record "+str(RecordNum))
+	# content starts after the 8 byte record header
+	Start=struct.unpack(">i",Entry[0:4])[0]*2+8
+	ShpFile=open(Base+".shp","rb")
+	try:
+		ShpFile.seek(Start)
+		Header=ShpFile.read(44)
+		ShapeType=struct.unpack_from("<i",Header,0)[0]
+		if ShapeType not in (ShapefileIO.PolylineShape,ShapefileIO.PolylineZShape,ShapefileIO.PolylineMShape):
+			raise RuntimeError(ShapefileName+" is not a polyline shapefile")
+		NumParts,NumPoints=struct.unpack_from("<2i",Header,36)
+		if NumParts!=1:
+			raise RuntimeError("Input line has more than 1 part - segments need 1 continuous line")
+		VertexStart=Start+44+4*NumParts
+		if Reverse:
+			Blocks=range(NumPoints,0,-BlockSize)
+		else:
+			Blocks=range(0,NumPoints,BlockSize)
+		for First in Blocks:
+			if Reverse:
+				Count=min(BlockSize,First)
+				First=First-Count
+			else:
+				Count=min(BlockSize,NumPoints-First)
+			ShpFile.seek(VertexStart+16*First)
+			Block=numpy.frombuffer(ShpFile.read(16*Count),dtype="<f8").reshape(Count,2)
+			if Reverse:
+				Block=Block[::-1]
+			yield Block
+	finally:
+		ShpFile.close()
+
+################################################
+# Purpose: Split a centerline into segments, one at a time
+# Input: TheInFile - polyline shapefile with 1 single part, continuous line
+#        SplitLength - number specifying interval at which to split input line
+#        FlipLine - binary specifying whether the start of the centerline aligns with the desired start (0), and it actually the end (1)
+#        BlockSize - vertices read from the file at a time
+# Output: generator of (CID, Station, SegmentXY)
+def StreamSegments(TheInFile,SplitLength,FlipLine,BlockSize=BlockVertices):
+	SplitLength=float(SplitLength)
+	NumRecords=(os.path.getsize(ShapefileIO.BaseName(TheInFile)+".shx")-100)//8
+	if NumRecords!=1:
+		raise RuntimeError("Input line is more than 1 feature - segments need 1 continuous line")
+
+	CID=0
+	# measure of the last vertex read and the vertices of the open segment
+	Measure=0.0
+	Previous=None
+	Piece=[]
+	for Block in StreamVertices(TheInFile,0,FlipLine==1,BlockSize):
+		if Previous is None:
+			Previous=Block[0]
+			Piece=[Block[0:1]]
+			Block=Block[1:]
+		Points=numpy.vstack([Previous[None,:],Block])
+		Measures=Measure+numpy.concatenate([[0.0],numpy.cumsum(
+			numpy.hypot(Points[1:,0]-Points[0:-1,0],Points[1:,1]-Points[0:-1,1]))])
+		# next vertex of Points not yet in the open segment (vertices on the last cut
+		# are already its start)
+		Next=max(int(numpy.searchsorted(Measures,CID*SplitLength,"right")),1)
+		while (CID+1)*SplitLength<=Measures[-1]:
+			Cut=(CID+1)*SplitLength
+			End=int(numpy.searchsorted(Measures,Cut,"left"))
+			Fraction=(Cut-Measures[End-1])/max(Measures[End]-Measures[End-1],1e-300)
+			CutPoint=Points[End-1]+Fraction*(Points[End]-Points[End-1])
+			Piece.append(Points[Next:End])
+			Piece.append(CutPoint[None,:])
+			yield (CID,CID*SplitLength,numpy.vstack(Piece))
+			CID+=1
+			Piece=[CutPoint[None,:]]
+			# vertices on the cut are the new segment's start
+			Next=int(numpy.searchsorted(Measures,Cut,"right"))
+		Piece.append(Points[Next:])
+		Measure=Measures[-1]
+		Previous=Points[-1]
+
+	# remainder of the line after the last cut
+	if Previous is not None and Measure-CID*SplitLength>EndTolerance*SplitLength:
+		yield (CID,CID*SplitLength,numpy.vstack(Piece))
+
+################################################
+# Purpose: Flat ended buffer of a segment's straight line (as Buffer with FLAT ends)
+# Input: SegmentXY - (n,2) segment vertices
+#        BufferDistance - distance to buffer to either side
+# Output: Ring - (5,2) clockwise polygon ring
+def SegmentPolygon(SegmentXY,BufferDistance):
+	Start=SegmentXY[0]
+	End=SegmentXY[-1]
+	Direction=End-Start
+	Length=max(float(numpy.hypot(Direction[0],Direction[1])),1e-300)
+	Normal=numpy.array([-Direction[1],Direction[0]])/Length*BufferDistance
+	# start right, start left, end left, end right is clockwise
+	return(numpy.array([Start-Normal,Start+Normal,End+Normal,End-Normal,Start-Normal]))
+
+################################################
+# Purpose: Write streamed segments and their polygons record by record
+# Input: Segments - iterable of (CID, Station, SegmentXY), e.g. StreamSegments
+#        LineShapefile - output segment polyline shapefile path and name
+#        BufferShapefile - output segment polygon shapefile path and name ("" for none)
+#        BufferDistance - distance to buffer to either side of the segments
+#        SidecarSource - shapefile whose .prj/.cpg are copied to the outputs ("" for none)
+# Output: NumSegments - number of segments written
+def WriteSegments(Segments,LineShapefile,BufferShapefile,BufferDistance,SidecarSource):
+	try:
+		DbfHeader=ShapefileIO.NewDbfHeader(SegmentFields,0)
+		LineWriter=ShapefileIO.ShapefileWriter(LineShapefile,ShapefileIO.PolylineShape,DbfHeader,SidecarSource)
+		BufferWriter=None
+		if BufferShapefile!="":
+			BufferWriter=ShapefileIO.ShapefileWriter(BufferShapefile,ShapefileIO.PolygonShape,DbfHeader,SidecarSource)
+		NumSegments=0
+		for CID,Station,SegmentXY in Segments:
+			Row=ShapefileIO.NewDbfRow(SegmentFields,[CID,Station])
+			LineWriter.Write(ShapefileIO.PolyContent(ShapefileIO.PolylineShape,[SegmentXY],[None]),Row)
+			if BufferWriter is not None:
+				Ring=SegmentPolygon(SegmentXY,BufferDistance)
+				BufferWriter.Write(ShapefileIO.PolyContent(ShapefileIO.PolygonShape,[Ring],[None]),Row)
+			NumSegments+=1
+		LineWriter.Close()
+		if BufferWriter is not None:
+			BufferWriter.Close()
+		return(NumSegments)
+	except Exception as err:
+		raise RuntimeError("** Error: WriteSegments Failed ("+str(err)+")")
@@ -0,0 +1,370 @@
+#######################################################################
+# SegmentTransects
+#
+# Purpose: Segment polygons from transects across the centerline, instead of flat ended
+#          buffers of each segment.  On a bend the flat ends of neighbouring buffers are
+#          perpendicular to different segments, so they overlap on the inside of the bend
+#          and leave a wedge on the outside, which the gap fill then has to untangle.
+#
+#          Here the segments share one transect at each segment end, along the bisector of
+#          the two segments meeting there, and segment k's polygon lies between transects
+#          k and k+1, so neighbours share an edge.  On bends tighter than the transect
+#          half length the inside halves of neighbouring transects still cross before
+#          they reach the end: a sweep along the centerline (in station order) finds the
+#          runs of crossing neighbours (within half a turn) and turns each run's inside halves to one pivot,
+#          a fan of wedges around the centre of the bend.  A spatial index check
+#          (SpatialIndex.PackedRTree) then catches halves crossing further apart (tight
+#          loops, necks) and cuts both back to their crossing, and the work stays linear
+#          in the number of segments on any reach.
+#
+#          Between its transects a polygon follows the segment's own vertices, offset to
+#          either side.  The offset sides can still fold over where the centerline bends
+#          more tightly than the buffer distance within a segment, or run into polygons
+#          further along a meander, so every polygon is checked (RingConflicts) and a
+#          segment whose polygon is not simple or overlaps another segment's polygon
+#          gets its flat ended buffer instead.
+#
+# Usage:
+#         Rings,Conflicts=SegmentRings(Points,BufferDistance,SegmentXY,SegmentOffsets)
+#         TransectPolygons(SegmentedLine,BufferShp,BufferDistance,Job)
+#
+# Modified: 10/19/2026
+#######################################################################
+import numpy
+import ShapefileIO
+import SpatialIndex
+
+# Fraction of a transect half by which a crossing must be inside it to count
+CrossTolerance=1e-9
+
+# Rounds of gathering crossing neighbours into fans before giving up
+MaxRounds=50
+
+################################################
+# Purpose: Unit left normals of the transects at the segment ends
+# Input: Points - (n,2) segment end points in station order (n-1 segments)
+# Output: Normals - (n,2) unit normals, along the bisector of the segments meeting at
+#          each interior point and perpendicular to the segment at the line ends
+def TransectNormals(Points):
+	Direction=Points[1:]-Points[0:-1]
+	Lengths=numpy.hypot(Direction[:,0],Direction[:,1])
+	Lengths[Lengths==0]=1
+	Left=numpy.column_stack([-Direction[:,1],Direction[:,0]])/Lengths[:,None]
+	Normals=numpy.zeros(Points.shape)
+	Normals[0]=Left[0]
+	Normals[-1]=Left[-1]
+	Normals[1:-1]=Left[0:-1]+Left[1:]
+	Norms=numpy.hypot(Normals[:,0],Normals[:,1])
+	# a segment doubling back on the last has no bisector: keep its own normal
+	Reversed=Norms<1e-12
+	Normals[1:-1][Reversed[1:-1]]=Left[1:][Reversed[1:-1]]
+	Norms[Reversed]=1
+	return(Normals/Norms[:,None])
+
+################################################
+# Purpose: Where pairs of transect halves cross
+# Input: A0, A1 - (k,2) start (on the centerline) and end of the first halves
+#        B0, B1 - (k,2) start and end of the second halves
+# Output: [Crossing, T, U] - whether each pair crosses inside both halves, and the
+#          fractions along the first and second halves to the crossing
+def HalfCrossings(A0,A1,B0,B1):
+	DA=A1-A0
+	DB=B1-B0
+	Cross=DA[:,0]*DB[:,1]-DA[:,1]*DB[:,0]
+	Safe=numpy.where(Cross!=0,Cross,1.0)
+	Offset=B0-A0
+	T=(Offset[:,0]*DB[:,1]-Offset[:,1]*DB[:,0])/Safe
+	U=(Offset[:,0]*DA[:,1]-Offset[:,1]*DA[:,0])/Safe
+	Crossing=(Cross!=0)&(T>0)&(T<1-CrossTolerance)&(U>0)&(U<1-CrossTolerance)
+	return([Crossing,T,U])
+
+################################################
+# Purpose: Turn the crossing transect halves on one side into fans
+#          A sweep along the centerline tests each half, and the edge from its end to the
+#          next half's end, against the next Window ones; a crossing links every
+#          transect between them, and every run of linked transects (the inside of a
+#          bend) is pointed at one pivot, the mean of the crossings that linked it (the
+#          centre of a circular bend).  Pointing a run at its pivot can make it cross
+#          halves beyond it, which then join the run; this is repeated until nothing
+#          within Window crosses.
+# Input: Points - (n,2) segment end points in station order
+#        Ends - (n,2) ends of the halves on this side
+#        Window - number of following halves each half is tested against
+# Output: Ends - (n,2) ends after pointing the fans at their pivots
+def FanTransects(Points,Ends,Window):
+	Ends=Ends.copy()
+	NumPoints=Points.shape[0]
+	Cover=numpy.zeros(NumPoints,dtype=numpy.int64)
+	Sums=numpy.zeros((NumPoints,3))
+	for Round in range(MaxRounds):
+		Found=False
+		for Gap in range(1,min(Window,NumPoints-1)+1):
+			# halves, and the outer edges joining the ends of neighbouring halves
+			for Starts,Stops,Span in ((Points,Ends,Gap),(Ends[0:-1],Ends[1:],Gap+1)):
+				Crossing,T,U=HalfCrossings(Starts[0:-Gap],Stops[0:-Gap],Starts[Gap:],Stops[Gap:])
+				if Crossing.any():
+					Found=True
+					First=numpy.flatnonzero(Crossing)
+					At=Starts[First]+T[First,None]*(Stops[First]-Starts[First])
+					# links First to First+Span-1, between transects First and First+Span
+					numpy.add.at(Cover,First,1)
+					numpy.add.at(Cover,First+Span,-1)
+					numpy.add.at(Sums,First,numpy.column_stack([At,numpy.ones(First.shape[0])]))
+		if not Found:
+			return(Ends)
+		Linked=numpy.cumsum(Cover)[0:-1]>0
+		# run number of every transect: a new run starts after each unlinked pair
+		Runs=numpy.concatenate([[0],numpy.cumsum(~Linked)])
+		RunSums=numpy.zeros((Runs[-1]+1,3))
+		numpy.add.at(RunSums,Runs,Sums)
+		InFan=RunSums[Runs,2]>0
+		Ends[InFan]=RunSums[Runs[InFan],0:2]/RunSums[Runs[InFan],2:3]
+	raise RuntimeError("transects still cross after "+str(MaxRounds)+" rounds")
+
+################################################
+# Purpose: Shorten transect halves crossing anywhere else (loops and necks)
+#          Candidate pairs come from the boxes of all halves (SpatialIndex.PackedRTree);
+#          both halves of a crossing pair are cut back to the crossing.  Cutting back
+#          cannot make new crossings, so one pass is enough.
+# Input: Points - (n,2) segment end points in station order
+#        Ends - (2n,2) ends of the left halves, then of the right halves
+# Output: Ends - (2n,2) ends after shortening
+def ShortenCrossings(Points,Ends):
+	Transects=numpy.arange(Ends.shape[0])%Points.shape[0]
+	Starts=Points[Transects]
+	Boxes=numpy.hstack([numpy.minimum(Starts,Ends),numpy.maximum(Starts,Ends)])
+	A,B=SpatialIndex.PackedRTree(Boxes).QueryMany(Boxes)
+	# halves of one transect meet at the centerline
+	Keep=(A<B)&(Transects[A]!=Transects[B])
+	A,B=A[Keep],B[Keep]
+	Crossing,T,U=HalfCrossings(Starts[A],Ends[A],Starts[B],Ends[B])
+	Fractions=numpy.ones(Ends.shape[0])
+	numpy.minimum.at(Fractions,A[Crossing],T[Crossing])
+	numpy.minimum.at(Fractions,B[Crossing],U[Crossing])
+	# ends not cut back stay exactly where they were (fan pivots are shared)
+	return(numpy.where(Fractions[:,None]<1,Starts+Fractions[:,None]*(Ends-Starts),Ends))
+
+################################################
+# Purpose: Ends of the transects, turned and shortened so that none cross
+# Input: Points - (n,2) segment end points in station order
+#        HalfLength - length of each transect half
+# Output: [Left, Right] - (n,2) ends of the left and right halves
+def DecrossTransects(Points,HalfLength):
+	Normals=TransectNormals(Points)*HalfLength
+	# a bend's fan spans at most half a turn around a pivot within HalfLength
+	Spacing=numpy.median(numpy.hypot(*(Points[1:]-Points[0:-1]).T))
+	Window=int(numpy.ceil(numpy.pi*HalfLength/max(Spacing,1e-12)))+1
+	Left=FanTransects(Points,Points+Normals,Window)
+	Right=FanTransects(Points,Points-Normals,Window)
+	Ends=ShortenCrossings(Points,numpy.vstack([Left,Right]))
+	return([Ends[0:Points.shape[0]],Ends[Points.shape[0]:]])
+
+################################################
+# Purpose: Segment polygon rings between de-crossed transects, along the segments' vertices
+# Input: Points - (n,2) segment end points in station order
+#        BufferDistance - transect half length (distance to either side of the centerline)
+#        SegmentXY, SegmentOffsets - vertices of every segment, from its start point to its
+#                 end point (segment k is SegmentXY[SegmentOffsets[k]:SegmentOffsets[k+1]]),
+#                 None for straight segments
+# Output: [Rings, RingOffsets] - (m,2) clockwise closed rings, one per segment, and their
+#          (n,) offsets.  The rings pass through the segment ends, where the two halves of
+#          a turned transect meet, and repeated points (fan pivots) are dropped.
+def TransectRings(Points,BufferDistance,SegmentXY=None,SegmentOffsets=None):
+	NumSegments=Points.shape[0]-1
+	if SegmentXY is None:
+		SegmentXY=numpy.column_stack([Points[0:-1],Points[1:]]).reshape(-1,2)
+		SegmentOffsets=numpy.arange(0,2*NumSegments+1,2)
+	Left,Right=DecrossTransects(Points,BufferDistance)
+
+	### Interior vertices offset along their bisectors (segment ends are never interior)
+	InnerCounts=numpy.maximum(SegmentOffsets[1:]-SegmentOffsets[0:-1]-2,0)
+	InnerOffsets=numpy.concatenate([[0],numpy.cumsum(InnerCounts)])
+	Inner=SpatialIndex.ExpandRanges(SegmentOffsets[0:-1]+1,InnerCounts)
+	Normals=TransectNormals(SegmentXY)[Inner]*BufferDistance
+	NumPoints=Points.shape[0]
+	Pool=numpy.vstack([Right,Points,Left,SegmentXY[Inner]+Normals,SegmentXY[Inner]-Normals])
+	LeftInner=3*NumPoints
+	RightInner=LeftInner+Inner.shape[0]
+	# offset vertices behind their segment's start transect or past its end transect (a
+	#  vertex next to a cut, turned less than the transect) are left out
+	InnerSegments=numpy.repeat(numpy.arange(NumSegments),InnerCounts)
+	Dropped=numpy.zeros(Pool.shape[0],dtype=bool)
+	for Sign,Ends,Offset in ((1.0,Left,LeftInner),(-1.0,Right,RightInner)):
+		Side=Pool[Offset:Offset+Inner.shape[0]]
+		for Transect,Behind in ((InnerSegments,1.0),(InnerSegments+1,-1.0)):
+			# transect sides point away from the centerline; crossing them with the segment
+			#  direction is negative on the left side, positive on the right
+			Across=Ends[Transect]-Points[Transect]
+			Cross=Across[:,0]*(Side[:,1]-Points[Transect,1])-Across[:,1]*(Side[:,0]-Points[Transect,0])
+			Dropped[Offset:Offset+Inner.shape[0]]|=Sign*Behind*Cross>0
+
+	### Start right, start, start left, along the left side, end left, end, end right,
+	###  back along the right side (clockwise), without the closing point
+	OpenCounts=6+2*InnerCounts
+	OpenOffsets=numpy.concatenate([[0],numpy.cumsum(OpenCounts)])
+	Ring=numpy.repeat(numpy.arange(NumSegments),OpenCounts)
+	Position=numpy.arange(Ring.shape[0])-OpenOffsets[Ring]
+	K=InnerCounts[Ring]
+	First=InnerOffsets[Ring]
+	Index=numpy.select([Position==0,Position==1,Position==2,Position<3+K,Position==3+K,Position==4+K,Position==5+K],
+	                   [Ring,NumPoints+Ring,2*NumPoints+Ring,LeftInner+First+Position-3,2*NumPoints+Ring+1,
+	                    NumPoints+Ring+1,Ring+1],RightInner+First+K-1-(Position-6-K))
+	Open=Pool[Index]
+	# repeated points, the first one against the last
+	Previous=numpy.arange(Open.shape[0])-1
+	Previous[OpenOffsets[0:-1]]=OpenOffsets[1:]-1
+	Kept=numpy.flatnonzero((Open!=Open[Previous]).any(axis=1)&~Dropped[Index])
+	Counts=numpy.bincount(Ring[Kept],minlength=NumSegments)
+	KeptOffsets=numpy.concatenate([[0],numpy.cumsum(Counts)])
+	RingOffsets=numpy.concatenate([[0],numpy.cumsum(Counts+1)])
+	Rings=numpy.zeros((RingOffsets[-1],2))
+	Rings[SpatialIndex.ExpandRanges(RingOffsets[0:-1],Counts)]=Open[Kept]
+	Rings[RingOffsets[1:]-1]=Open[Kept[numpy.minimum(KeptOffsets[0:-1],Kept.shape[0]-1)]]
+	return([Rings,RingOffsets])
+
+################################################
+# Purpose: Rings that are not simple or overlap another ring
+#          Edge pairs come from the boxes of all edges (SpatialIndex.PackedRTree): edges
+#          of one ring may only meet their neighbours, and edges of different rings may
+#          touch (shared transects, fan pivots) but not cross.  A ring lying wholly
+#          inside another is found from a point inside each ring.
+# Input: Rings, RingOffsets - (m,2) clockwise closed rings and their offsets (TransectRings)
+#        Inside - (rings,2) a point inside each ring (the middle of its segment)
+# Output: Conflicts - (rings,) boolean array
+def RingConflicts(Rings,RingOffsets,Inside):
+	NumRings=RingOffsets.shape[0]-1
+	Counts=RingOffsets[1:]-RingOffsets[0:-1]-1
+	EdgeOffsets=numpy.concatenate([[0],numpy.cumsum(Counts)])
+	Edges=SpatialIndex.ExpandRanges(RingOffsets[0:-1],Counts)
+	EdgeRings=numpy.repeat(numpy.arange(NumRings),Counts)
+	E0=Rings[Edges]
+	E1=Rings[Edges+1]
+
+	### Rings too small or wound the wrong way (clockwise rings have positive area)
+	Areas=0.0-numpy.bincount(EdgeRings,E0[:,0]*E1[:,1]-E1[:,0]*E0[:,1],minlength=NumRings)/2.0
+	Conflicts=(Counts<3)|(Areas<=0)
+
+	Boxes=numpy.hstack([numpy.minimum(E0,E1),numpy.maximum(E0,E1)])
+	A,B=SpatialIndex.PackedRTree(Boxes).QueryMany(Boxes)
+	Keep=A<B
+	A,B=A[Keep],B[Keep]
+	Same=EdgeRings[A]==EdgeRings[B]
+
+	### Edges of one ring meeting away from their neighbours (the first and last edges
+	###  of a ring are neighbours)
+	Neighbours=(B==A+1)|((A==EdgeOffsets[0:-1][EdgeRings[A]])&(B==EdgeOffsets[1:][EdgeRings[B]]-1))
+	SelfA,SelfB=A[Same&~Neighbours],B[Same&~Neighbours]
+	Meet=SpatialIndex.SegmentDistances(E0[SelfA],E1[SelfA],E0[SelfB],E1[SelfB])==0
+	Conflicts[EdgeRings[SelfA[Meet]]]=True
+
+	### Edges of different rings crossing inside both (shared transects are collinear,
+	###  up to rounding)
+	OtherA,OtherB=A[~Same],B[~Same]
+	Crossing,T,U=HalfCrossings(E0[OtherA],E1[OtherA],E0[OtherB],E1[OtherB])
+	DA=E1[OtherA]-E0[OtherA]
+	DB=E1[OtherB]-E0[OtherB]
+	Sines=numpy.abs(DA[:,0]*DB[:,1]-DA[:,1]*DB[:,0])/numpy.maximum(numpy.hypot(DA[:,0],DA[:,1])*numpy.hypot(DB[:,0],DB[:,1]),1e-300)
+	Crossing&=(T>CrossTolerance)&(U>CrossTolerance)&(Sines>CrossTolerance)
+	Conflicts[EdgeRings[OtherA[Crossing]]]=True
+	Conflicts[EdgeRings[OtherB[Crossing]]]=True
+
+	### Rings inside other rings
+	RingBoxes=numpy.hstack([numpy.minimum.reduceat(Rings,RingOffsets[0:-1],axis=0),
+	                        numpy.maximum.reduceat(Rings,RingOffsets[0:-1],axis=0)])
+	Points,Polygons=SpatialIndex.PackedRTree(RingBoxes).QueryMany(numpy.hstack([Inside,Inside]))
+	Keep=Points!=Polygons
+	Points,Polygons=Points[Keep],Polygons[Keep]
+	Within=SpatialIndex.PairsInPolygons(Inside[Points],Polygons,E0,E1,EdgeOffsets)
+	Conflicts[Points[Within]]=True
+	Conflicts[Polygons[Within]]=True
+	return(Conflicts)
+
+################################################
+# Purpose: Point half way along each segment
+# Input: SegmentXY, SegmentOffsets - vertices of every segment (TransectRings)
+# Output: Middles - (segments,2) array
+def SegmentMiddles(SegmentXY,SegmentOffsets):
+	Lengths=numpy.hypot(SegmentXY[1:,0]-SegmentXY[0:-1,0],SegmentXY[1:,1]-SegmentXY[0:-1,1])
+	# no length from one segment's end to the next one's start
+	Lengths[SegmentOffsets[1:-1]-1]=0
+	Measures=numpy.concatenate([[0],numpy.cumsum(Lengths)])
+	Half=(Measures[SegmentOffsets[0:-1]]+Measures[SegmentOffsets[1:]-1])/2.0
+	Vertex=numpy.clip(numpy.searchsorted(Measures,Half,"right")-1,SegmentOffsets[0:-1],SegmentOffsets[1:]-2)
+	Fractions=numpy.clip((Half-Measures[Vertex])/numpy.where(Lengths[Vertex]>0,Lengths[Vertex],1.0),0,1)
+	return(SegmentXY[Vertex]+Fractions[:,None]*(SegmentXY[Vertex+1]-SegmentXY[Vertex]))
+
+################################################
+# Purpose: Transect ring of every segment, and the segments whose ring has to be replaced
+#          by a flat ended buffer
+# Input: Points, BufferDistance, SegmentXY, SegmentOffsets - as for TransectRings
+# Output: [Rings, Conflicts] - list of (k,2) clockwise closed rings, one per segment, and
+#          (segments,) boolean array, True where the ring is not simple or overlaps
+#          another segment's ring
+def SegmentRings(Points,BufferDistance,SegmentXY=None,SegmentOffsets=None):
+	if SegmentXY is None:
+		Middles=(Points[0:-1]+Points[1:])/2.0
+	else:
+		Middles=SegmentMiddles(SegmentXY,SegmentOffsets)
+	Rings,RingOffsets=TransectRings(Points,BufferDistance,SegmentXY,SegmentOffsets)
+	Conflicts=RingConflicts(Rings,RingOffsets,Middles)
+	return([[Rings[RingOffsets[i]:RingOffsets[i+1]] for i in range(RingOffsets.shape[0]-1)],Conflicts])
+
+################################################
+# Purpose: Write segment polygons of a segmented line from de-crossed transects
+# Input: SegmentedLine - segment polyline shapefile, one single part segment per record
+#                        joining end to start in CID order (_segmented_line.shp)
+#        BufferShp - output segment polygon shapefile, with the segments' attributes
+#        BufferDistance - distance to either side of the centerline
+#        Job - JobContext whose scratch folder holds the flat ended buffers replacing
+#              conflicting rings (None for the shared default)
+# Output: BufferShp
+def TransectPolygons(SegmentedLine,BufferShp,BufferDistance,Job=None):
+	try:
+		Reader=ShapefileIO.ShapefileReader(SegmentedLine)
+		if Reader.NumRecords==0:
+			raise RuntimeError(SegmentedLine+" has no segments")
+		# segments in CID order where there is one
+		if "CID" in [Name.upper() for Name in Reader.FieldNames()]:
+			Order=numpy.argsort(Reader.Column("CID"),kind="mergesort")
+		else:
+			Order=numpy.arange(Reader.NumRecords)
+		Segments=[]
+		for RecordNum in Order:
+			XY=ShapefileIO.RecordGeometry(Reader.RecordContent(int(RecordNum)))[0]
+			if XY.shape[0]<2:
+				raise RuntimeError("segment "+str(RecordNum)+" has no line")
+			Segments.append(XY)
+		Starts=numpy.array([XY[0] for XY in Segments])
+		Ends=numpy.array([XY[-1] for XY in Segments])
+		if not numpy.allclose(Starts[1:],Ends[0:-1],rtol=0,atol=SpatialIndex.IntersectTolerance):
+			raise RuntimeError("segments do not join end to start")
+		Points=numpy.vstack([Starts,Ends[-1:]])
+		SegmentOffsets=numpy.concatenate([[0],numpy.cumsum([XY.shape[0] for XY in Segments])])
+		SegmentXY=numpy.vstack(Segments)
+		# each segment ends where the next one starts
+		SegmentXY[SegmentOffsets[1:]-1]=Points[1:]
+		Rings,Conflicts=SegmentRings(Points,float(BufferDistance),SegmentXY,SegmentOffsets)
+		Contents=[None]*Reader.NumRecords
+		for i,RecordNum in enumerate(Order):
+			Contents[RecordNum]=ShapefileIO.PolyContent(ShapefileIO.PolygonShape,[Rings[i]],[None])
+
+		### Flat ended buffers where a ring is not simple or overlaps another
+		if Conflicts.any():
+			import os
+			import AnalysisInterface as AnalysisGIS
+			import JobContext
+			if Job is None:
+				Job=JobContext.DefaultJob()
+			FallbackShp=Job.ScratchName(os.path.basename(ShapefileIO.BaseName(BufferShp))+"_buffer.shp")
+			AnalysisGIS.AnalysisInterface(Job).Buffer(SegmentedLine,FallbackShp,format(BufferDistance),"FULL","FLAT","NONE","#")
+			Fallback=ShapefileIO.ShapefileReader(FallbackShp)
+			if Fallback.NumRecords!=Reader.NumRecords:
+				raise RuntimeError("Buffer of "+SegmentedLine+" does not have one polygon per segment")
+			for RecordNum in Order[Conflicts]:
+				Contents[RecordNum]=Fallback.RecordContent(int(RecordNum))
+
+		ShapefileIO.WriteRecords(BufferShp,ShapefileIO.PolygonShape,Contents,Reader.DbfHeader(),
+		                         [Reader.DbfRecord(RecordNum) for RecordNum in range(Reader.NumRecords)],SegmentedLine)
+		return(BufferShp)
+	except Exception as err:
+		raise RuntimeError("** Error: TransectPolygons Failed ("+str(err)+")")
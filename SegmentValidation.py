@@ -0,0 +1,324 @@
+#######################################################################
+# SegmentValidation
+#
+# Purpose: Quality check of segment polygons (_segmented_diss.shp) before they go on to
+#          other models, written as a point shapefile of errors at their locations:
+#
+#          SELF_INTERSECT - two edges of one polygon cross
+#          OVERLAP - two polygons overlap: their edges cross, a vertex of one lies inside
+#                    the other, or both run along the same edge in the same direction
+#                    (VALUE: number of crossings and vertices found)
+#          GAP - a hole in the union of the polygons (VALUE: its area).  Islands of the
+#                boundary polygon are holes too, and are reported as gaps
+#          STATION_ORDER - Station does not increase with CID
+#          STATION_JUMP - polygons sharing an edge are more than one CID apart
+#                         (VALUE: difference of their stations)
+#
+#          Every edge of every polygon goes into one packed R-tree (SpatialIndex) and the
+#          candidate edge pairs of all edges come from one QueryMany walk, so only edges
+#          whose boxes meet are tested (the R-tree stands in for the sweep line status
+#          of a Bentley-Ottmann sweep: O((n + k) log n) for n edges and k candidate
+#          pairs).  Gaps come from matching edges: edges are split where another
+#          polygon's vertex lies on them, and the edges without an opposite edge in
+#          another polygon are the boundary of the union; its counterclockwise rings
+#          are the holes.  Coordinates closer than Tolerance are the same point.
+#
+# Usage:
+#         Counts=ValidateSegments(DissShp,TheOutFilePath+TheFileName+"_qa.shp")
+#
+# Modified: 10/19/2026
+#######################################################################
+import struct
+import numpy
+import ShapefileIO
+import SpatialIndex
+
+# Error point fields
+ErrorFields=[("TYPE","C",16,0),("FID_A","N",10,0),("FID_B","N",10,0),("STATION_A","N",13,2),
+             ("STATION_B","N",13,2),("VALUE","N",18,4)]
+
+# Error types, in the order they are written
+ErrorTypes=("SELF_INTERSECT","OVERLAP","GAP","STATION_ORDER","STATION_JUMP")
+
+################################################
+# Purpose: Group numbers of the rows of an integer array (equal rows, equal numbers)
+# Input: Rows - (n,k) integer array
+# Output: Ids - (n,) group number of each row
+def RowIds(Rows):
+	Ids=numpy.zeros(Rows.shape[0],dtype=numpy.int64)
+	if Rows.shape[0]==0:
+		return(Ids)
+	Order=numpy.lexsort(Rows.T[::-1])
+	Sorted=Rows[Order]
+	New=(Sorted[1:]!=Sorted[0:-1]).any(axis=1)
+	Ids[Order]=numpy.concatenate([[0],numpy.cumsum(New)])
+	return(Ids)
+
+################################################
+# Purpose: Edges of every ring of polygon geometry arrays
+# Input: XY, PartOffsets, FeatureParts - from ShapefileProperties.GeometryArrays
+# Output: [E0, E1, EdgeFeatures] - (m,2) edge start and end points (zero length edges
+#          left out) and the feature of each edge, in feature order
+def RingEdges(XY,PartOffsets,FeatureParts):
+	Last=numpy.zeros(XY.shape[0],dtype=bool)
+	Last[PartOffsets[1:][PartOffsets[1:]>PartOffsets[0:-1]]-1]=True
+	Starts=numpy.flatnonzero(~Last)
+	Parts=numpy.repeat(numpy.arange(PartOffsets.shape[0]-1),numpy.diff(PartOffsets))
+	Features=numpy.repeat(numpy.arange(FeatureParts.shape[0]-1),numpy.diff(FeatureParts))
+	E0=XY[Starts]
+	E1=XY[Starts+1]
+	Keep=(E0!=E1).any(axis=1)
+	return([E0[Keep],E1[Keep],Features[Parts[Starts[Keep]]]])
+
+################################################
+# Purpose: Proper crossings of the candidate edge pairs (not touching at an end)
+# Input: E0, E1 - edge end points
+#        A, B - edge numbers of the pairs
+#        Tolerance - ends within this distance of the other edge's line touch it
+# Output: [Crossing, Points] - boolean array and the (k,2) crossing points
+def ProperCrossings(E0,E1,A,B,Tolerance):
+	P0,P1,Q0,Q1=E0[A],E1[A],E0[B],E1[B]
+	DP=P1-P0
+	DQ=Q1-Q0
+	LP=numpy.hypot(DP[:,0],DP[:,1])
+	LQ=numpy.hypot(DQ[:,0],DQ[:,1])
+	# signed distances of each edge's ends from the other edge's line
+	O1=(DP[:,0]*(Q0[:,1]-P0[:,1])-DP[:,1]*(Q0[:,0]-P0[:,0]))/LP
+	O2=(DP[:,0]*(Q1[:,1]-P0[:,1])-DP[:,1]*(Q1[:,0]-P0[:,0]))/LP
+	O3=(DQ[:,0]*(P0[:,1]-Q0[:,1])-DQ[:,1]*(P0[:,0]-Q0[:,0]))/LQ
+	O4=(DQ[:,0]*(P1[:,1]-Q0[:,1])-DQ[:,1]*(P1[:,0]-Q0[:,0]))/LQ
+	Clear=numpy.minimum(numpy.minimum(abs(O1),abs(O2)),numpy.minimum(abs(O3),abs(O4)))>Tolerance
+	Crossing=(O1*O2<0)&(O3*O4<0)&Clear
+	T=numpy.where(Crossing,O3/numpy.where(Crossing,O3-O4,1.0),0.0)
+	return([Crossing,P0+T[:,None]*DP])
+
+################################################
+# Purpose: One error row per pair of features
+# Input: Type - error type
+#        FeatureA, FeatureB - feature numbers of the findings
+#        Points - (k,2) location of each finding
+#        Values - (k,) value of each finding, or None to count the findings
+# Output: Errors - list of (Type, FeatureA, FeatureB, X, Y, Value), the first location
+#          of each pair and the sum (or count) of its values
+def PairErrors(Type,FeatureA,FeatureB,Points,Values=None):
+	if FeatureA.shape[0]==0:
+		return([])
+	if Values is None:
+		Values=numpy.ones(FeatureA.shape[0])
+	Low=numpy.minimum(FeatureA,FeatureB)
+	High=numpy.maximum(FeatureA,FeatureB)
+	Ids=RowIds(numpy.column_stack([Low,High]))
+	First=numpy.unique(Ids,return_index=True)[1]
+	Sums=numpy.bincount(Ids,weights=Values)
+	return([(Type,int(Low[Row]),int(High[Row]),float(Points[Row,0]),float(Points[Row,1]),float(Sums[Ids[Row]]))
+	        for Row in First])
+
+################################################
+# Purpose: Vertices of each feature strictly inside another feature
+# Input: XY, PartOffsets, FeatureParts - polygon geometry arrays
+#        E0, E1, EdgeFeatures - from RingEdges
+#        Boxes - (features,4) feature boxes
+#        Tolerance - vertices within this distance of the other feature's edges are on it
+# Output: [Vertices, Features] - vertex numbers and the feature each lies inside
+def VerticesInside(XY,PartOffsets,FeatureParts,E0,E1,EdgeFeatures,Boxes,Tolerance):
+	Tree=SpatialIndex.PackedRTree(Boxes)
+	VertexFeatures=numpy.repeat(numpy.arange(FeatureParts.shape[0]-1),numpy.diff(PartOffsets[FeatureParts]))
+	Vertices,Features=Tree.QueryMany(numpy.hstack([XY,XY]))
+	Other=Features!=VertexFeatures[Vertices]
+	Vertices,Features=Vertices[Other],Features[Other]
+	EdgeOffsets=numpy.searchsorted(EdgeFeatures,numpy.arange(FeatureParts.shape[0]))
+	Inside=SpatialIndex.PairsInPolygons(XY[Vertices],Features,E0,E1,EdgeOffsets)
+	Vertices,Features=Vertices[Inside],Features[Inside]
+	if Vertices.shape[0]==0:
+		return([Vertices,Features])
+	# distance of each vertex from the edges of the feature it is inside
+	Counts=EdgeOffsets[Features+1]-EdgeOffsets[Features]
+	Edges=SpatialIndex.ExpandRanges(EdgeOffsets[Features],Counts)
+	Pairs=numpy.repeat(numpy.arange(Vertices.shape[0]),Counts)
+	Distance=SpatialIndex.PointSegmentDistance(XY[Vertices][Pairs],E0[Edges],E1[Edges])
+	Nearest=numpy.minimum.reduceat(Distance,numpy.concatenate([[0],numpy.cumsum(Counts)[0:-1]]))
+	Clear=Nearest>Tolerance
+	return([Vertices[Clear],Features[Clear]])
+
+################################################
+# Purpose: Split edges where vertices of other edges lie on them
+# Input: E0, E1, EdgeFeatures - from RingEdges
+#        Tree - packed R-tree of the edge boxes
+#        Tolerance - distance within which a vertex is on an edge
+# Output: [S0, S1, SubFeatures] - the split edges and their features
+def SplitEdges(E0,E1,EdgeFeatures,Tree,Tolerance):
+	Points=numpy.vstack([E0,E1])
+	Edges,Candidates=Tree.QueryMany(numpy.hstack([Points-Tolerance,Points+Tolerance]))
+	Near=SpatialIndex.PointSegmentDistance(Points[Edges],E0[Candidates],E1[Candidates])<=Tolerance
+	Edges,Candidates=Edges[Near],Candidates[Near]
+	P=Points[Edges]
+	Interior=((numpy.hypot(*(P-E0[Candidates]).T)>Tolerance)&(numpy.hypot(*(P-E1[Candidates]).T)>Tolerance))
+	P,Candidates=P[Interior],Candidates[Interior]
+	D=E1[Candidates]-E0[Candidates]
+	T=((P-E0[Candidates])*D).sum(axis=1)/(D*D).sum(axis=1)
+
+	### Every edge's end points and split points, in order along it
+	NumEdges=E0.shape[0]
+	EdgeNums=numpy.concatenate([numpy.arange(NumEdges),numpy.arange(NumEdges),Candidates])
+	Along=numpy.concatenate([numpy.zeros(NumEdges),numpy.ones(NumEdges),T])
+	Locations=numpy.vstack([E0,E1,P])
+	Order=numpy.lexsort((Along,EdgeNums))
+	EdgeNums,Locations=EdgeNums[Order],Locations[Order]
+	Same=EdgeNums[1:]==EdgeNums[0:-1]
+	return([Locations[0:-1][Same],Locations[1:][Same],EdgeFeatures[EdgeNums[0:-1][Same]]])
+
+################################################
+# Purpose: Gaps, duplicated edges and neighbours from matching the split edges
+# Input: S0, S1, SubFeatures - from SplitEdges
+#        Tolerance - coordinates closer than this are the same point
+# Output: [GapErrors, SameDirection, Neighbours] - gap error rows, (k,3) array of
+#          feature, feature, edge number of edges two features run along in the same
+#          direction, and (j,3) of feature, neighbour, edge number of shared edges
+def MatchEdges(S0,S1,SubFeatures,Tolerance):
+	Grid0=numpy.round(S0/Tolerance).astype(numpy.int64)
+	Grid1=numpy.round(S1/Tolerance).astype(numpy.int64)
+	Keep=(Grid0!=Grid1).any(axis=1)
+	S0,S1,SubFeatures,Grid0,Grid1=S0[Keep],S1[Keep],SubFeatures[Keep],Grid0[Keep],Grid1[Keep]
+	NumEdges=S0.shape[0]
+	Ids=RowIds(numpy.vstack([numpy.hstack([Grid0,Grid1]),numpy.hstack([Grid1,Grid0])]))
+	Forward,Reverse=Ids[0:NumEdges],Ids[NumEdges:]
+
+	### Edges run by another edge in the opposite direction are shared
+	FeatureOfId=numpy.zeros(Ids.max()+1,dtype=numpy.int64)-1
+	FeatureOfId[Forward]=SubFeatures
+	Neighbour=FeatureOfId[Reverse]
+	Shared=Neighbour>=0
+	Neighbours=numpy.column_stack([SubFeatures[Shared],Neighbour[Shared],numpy.flatnonzero(Shared)])
+
+	### Edges run twice in the same direction by different features
+	Order=numpy.lexsort((SubFeatures,Forward))
+	Repeat=(Forward[Order][1:]==Forward[Order][0:-1])&(SubFeatures[Order][1:]!=SubFeatures[Order][0:-1])
+	SameDirection=numpy.column_stack([SubFeatures[Order][0:-1][Repeat],SubFeatures[Order][1:][Repeat],Order[1:][Repeat]])
+
+	### The unshared edges bound the union: follow them around their rings
+	Free=numpy.flatnonzero(~Shared)
+	GapErrors=[]
+	if Free.shape[0]>0:
+		PointIds=RowIds(numpy.vstack([Grid0[Free],Grid1[Free]]))
+		StartIds,EndIds=PointIds[0:Free.shape[0]],PointIds[Free.shape[0]:]
+		StartEdge=numpy.zeros(PointIds.max()+1,dtype=numpy.int64)-1
+		StartEdge[StartIds]=numpy.arange(Free.shape[0])
+		Next=StartEdge[EndIds]
+		# edges with nothing after them (open chains) point to themselves
+		Ends=Next<0
+		Next=numpy.where(Ends,numpy.arange(Free.shape[0]),Next)
+		# every edge of a ring ends up labelled with the lowest edge number in it
+		Labels=numpy.arange(Free.shape[0])
+		Steps=1
+		while Steps<2*Free.shape[0]:
+			Labels=numpy.minimum(Labels,Labels[Next])
+			Next=Next[Next]
+			Steps*=2
+		# far enough along, every edge has reached a closed ring or the end of a chain
+		Closed=numpy.zeros(Free.shape[0],dtype=bool)
+		Closed[Next]=True
+		Closed&=~Ends
+		A=S0[Free][Closed]
+		B=S1[Free][Closed]
+		Labels=Labels[Closed]
+		Areas=-0.5*numpy.bincount(Labels,weights=A[:,0]*B[:,1]-B[:,0]*A[:,1])
+		Counts=numpy.bincount(Labels)
+		# holes run counterclockwise (negative area, as ShapefileProperties.AreaKernel)
+		for Ring in numpy.flatnonzero((Areas<-Tolerance*Tolerance)&(Counts>0)):
+			X=numpy.bincount(Labels,weights=A[:,0])[Ring]/Counts[Ring]
+			Y=numpy.bincount(Labels,weights=A[:,1])[Ring]/Counts[Ring]
+			GapErrors.append(("GAP",-1,-1,float(X),float(Y),float(-Areas[Ring])))
+	return([GapErrors,SameDirection,Neighbours,S0,S1])
+
+################################################
+# Purpose: Station order errors
+# Input: CIDs, Stations - per feature (LinearReference.SegmentNumbers)
+#        Locations - (features,2) location of each feature
+#        Neighbours - (j,3) feature, neighbour, edge number of shared edges
+#        S0, S1 - the matched edges
+# Output: Errors - error rows
+def StationErrors(CIDs,Stations,Locations,Neighbours,S0,S1):
+	Errors=[]
+	Order=numpy.lexsort((Stations,CIDs))
+	Before,After=Order[0:-1],Order[1:]
+	Wrong=((CIDs[After]>CIDs[Before])&~(Stations[After]>Stations[Before]))|\
+	      ((CIDs[After]==CIDs[Before])&(Stations[After]!=Stations[Before]))
+	for A,B in zip(Before[Wrong],After[Wrong]):
+		Errors.append(("STATION_ORDER",int(A),int(B),float(Locations[B,0]),float(Locations[B,1]),
+		               float(Stations[B]-Stations[A])))
+	Jump=numpy.abs(CIDs[Neighbours[:,0]]-CIDs[Neighbours[:,1]])>1
+	Jump=Neighbours[Jump&(Neighbours[:,0]<Neighbours[:,1])]
+	Middles=(S0[Jump[:,2]]+S1[Jump[:,2]])/2.0
+	# one row per pair, the station difference once
+	Rows=PairErrors("STATION_JUMP",Jump[:,0],Jump[:,1],Middles)
+	for Row in Rows:
+		Errors.append(Row[0:5]+(float(abs(Stations[Row[1]]-Stations[Row[2]])),))
+	return(Errors)
+
+################################################
+# Purpose: Check segment polygons for self-intersections, overlaps, gaps and station order
+# Input: SegmentPolygons - segment polygon shapefile (CID or NEAR_FID and Station fields
+#                          for the station checks)
+#        OutErrors - output point shapefile of the errors ("" for none)
+#        Tolerance - distance within which points are the same
+# Output: Counts - dictionary of the number of errors of each type
+def ValidateSegments(SegmentPolygons,OutErrors="",Tolerance=SpatialIndex.IntersectTolerance):
+	try:
+		import ShapefileProperties as ShpProp
+		Reader=ShapefileIO.ShapefileReader(SegmentPolygons)
+		if Reader.ShapeType not in (ShapefileIO.PolygonShape,ShapefileIO.PolygonZShape,ShapefileIO.PolygonMShape):
+			raise RuntimeError(SegmentPolygons+" is not a polygon shapefile")
+		XY,PartOffsets,FeatureParts,ShapeType=ShpProp.GeometryArrays(SegmentPolygons)
+		E0,E1,EdgeFeatures=RingEdges(XY,PartOffsets,FeatureParts)
+		Errors=[]
+
+		### Candidate pairs of every edge from one R-tree walk
+		Tree=SpatialIndex.PackedRTree(numpy.hstack([numpy.minimum(E0,E1),numpy.maximum(E0,E1)]))
+		A,B=Tree.QueryMany(numpy.hstack([numpy.minimum(E0,E1),numpy.maximum(E0,E1)]))
+		Keep=A<B
+		A,B=A[Keep],B[Keep]
+		Crossing,Points=ProperCrossings(E0,E1,A,B,Tolerance)
+		A,B,Points=A[Crossing],B[Crossing],Points[Crossing]
+		Self=EdgeFeatures[A]==EdgeFeatures[B]
+		Errors+=PairErrors("SELF_INTERSECT",EdgeFeatures[A][Self],EdgeFeatures[B][Self],Points[Self])
+
+		### Overlaps: crossings, vertices inside other polygons and edges run twice
+		Boxes=ShpProp.BoundsKernel(XY,PartOffsets,FeatureParts)
+		Vertices,Containers=VerticesInside(XY,PartOffsets,FeatureParts,E0,E1,EdgeFeatures,Boxes,Tolerance)
+		VertexFeatures=numpy.repeat(numpy.arange(FeatureParts.shape[0]-1),numpy.diff(PartOffsets[FeatureParts]))
+		S0,S1,SubFeatures=SplitEdges(E0,E1,EdgeFeatures,Tree,Tolerance)
+		GapErrors,SameDirection,Neighbours,S0,S1=MatchEdges(S0,S1,SubFeatures,Tolerance)
+		Errors+=PairErrors("OVERLAP",
+		                   numpy.concatenate([EdgeFeatures[A][~Self],VertexFeatures[Vertices],SameDirection[:,0]]),
+		                   numpy.concatenate([EdgeFeatures[B][~Self],Containers,SameDirection[:,1]]),
+		                   numpy.vstack([Points[~Self],XY[Vertices],S0[SameDirection[:,2]]]))
+		Errors+=GapErrors
+
+		### Station order along CID, and across shared edges
+		Fields=[Name.upper() for Name in Reader.FieldNames()]
+		Stations=None
+		if "STATION" in Fields and ("CID" in Fields or "NEAR_FID" in Fields):
+			from LinearReference import SegmentNumbers
+			CIDs,Stations=SegmentNumbers(Reader)
+			Locations=ShpProp.CentroidKernel(XY,PartOffsets,FeatureParts,ShapeType)
+			Errors+=StationErrors(CIDs,Stations,Locations,Neighbours,S0,S1)
+
+		### Error points
+		if OutErrors!="":
+			Contents=[]
+			Rows=[]
+			for Type in ErrorTypes:
+				for Row in [Row for Row in Errors if Row[0]==Type]:
+					StationA=StationB=None
+					if Stations is not None:
+						if Row[1]>=0:
+							StationA=float(Stations[Row[1]])
+						if Row[2]>=0:
+							StationB=float(Stations[Row[2]])
+					Contents.append(struct.pack("<i2d",ShapefileIO.PointShape,Row[3],Row[4]))
+					Rows.append(ShapefileIO.NewDbfRow(ErrorFields,[Row[0],Row[1],Row[2],StationA,StationB,Row[5]]))
+			ShapefileIO.WriteRecords(OutErrors,ShapefileIO.PointShape,Contents,
+			                         ShapefileIO.NewDbfHeader(ErrorFields,len(Rows)),Rows,SegmentPolygons)
+		return(dict((Type,len([Row for Row in Errors if Row[0]==Type])) for Type in ErrorTypes))
+	except Exception as err:
+		raise RuntimeError("** Error: ValidateSegments Failed ("+str(err)+")")
@@ -0,0 +1,306 @@
+#######################################################################
+# SelectionEngine
+#
+# Purpose: Attribute selections on shapefiles without feature layers.  The simple SQL
+#          expressions used by the scripts (e.g. "\"Id\" = 0 OR \"Id\" = 10",
+#          "\"CID\" <> 0") are compiled once to NumPy mask functions over the
+#          attribute columns, and a selection is kept as a boolean bitmap per record.
+#
+# Supported expressions: comparisons (=, <>, !=, <, >, <=, >=) between a field and a
+#          number or quoted string, field IN (...), combined with AND, OR, NOT and
+#          parentheses.  Field names may be bare, "quoted" or [bracketed].
+#
+# Selection types: NEW_SELECTION, ADD_TO_SELECTION, REMOVE_FROM_SELECTION,
+#          SUBSET_SELECTION, SWITCH_SELECTION, CLEAR_SELECTION
+#
+# Modified: 10/19/2026
+#######################################################################
+import re
+import numpy
+import ShapefileIO
+
+# Compiled predicates by expression string, shared by all selections
+CompiledPredicates={}
+
+# Token pattern: strings, quoted/bracketed names, numbers, operators, words
+TokenPattern=re.compile(r"\s*(?:('(?:[^']|'')*')|(\"[^\"]*\")|(\[[^\]]*\])|"
+                        r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|"
+                        r"(<>|!=|<=|>=|=|<|>|\(|\)|,)|([A-Za-z_][A-Za-z0-9_]*))")
+
+# Comparison operators as NumPy ufuncs
+Comparisons={"=":numpy.equal,"<>":numpy.not_equal,"!=":numpy.not_equal,
+             "<":numpy.less,">":numpy.greater,"<=":numpy.less_equal,">=":numpy.greater_equal}
+
+################################################
+# Purpose: Split an expression into (kind, value) tokens
+# Input: SQLexp - SQL where clause as a string
+# Output: Tokens - list of (kind, value) with kind in "STR","NAME","NUM","OP","WORD"
+def Tokenize(SQLexp):
+	Tokens=[]
+	Position=0
+	Text=SQLexp.rstrip()
+	while Position<len(Text):
+		Match=TokenPattern.match(Text,Position)
+		if Match is None or Match.end()==Position:
+			raise RuntimeError("cannot parse expression at: "+Text[Position:])
+		String,Quoted,Bracketed,Number,Operator,Word=Match.groups()
+		if String is not None:
+			Tokens=Tokens+[("STR",String[1:-1].replace("''","'"))]
+		elif Quoted is not None:
+			Tokens=Tokens+[("NAME",Quoted[1:-1])]
+		elif Bracketed is not None:
+			Tokens=Tokens+[("NAME",Bracketed[1:-1])]
+		elif Number is not None:
+			Tokens=Tokens+[("NUM",float(Number))]
+		elif Operator is not None:
+			Tokens=Tokens+[("OP",Operator)]
+		else:
+			Tokens=Tokens+[("WORD",Word)]
+		Position=Match.end()
+	return(Tokens)
+
+###################################################################################
+# Recursive descent parser producing mask functions of a column getter
+#  expr   := term (OR term)*
+#  term   := factor (AND factor)*
+#  factor := NOT factor | ( expr ) | field op literal | field [NOT] IN ( literal, ... )
+###################################################################################
+class PredicateParser:
+
+	def __init__(self,Tokens):
+		self.Tokens=Tokens
+		self.Position=0
+
+	def Peek(self):
+		if self.Position<len(self.Tokens):
+			return(self.Tokens[self.Position])
+		return((None,None))
+
+	def Next(self):
+		Token=self.Peek()
+		self.Position+=1
+		return(Token)
+
+	def IsWord(self,Word):
+		Kind,Value=self.Peek()
+		return(Kind=="WORD" and Value.upper()==Word)
+
+	def Expect(self,Operator):
+		Kind,Value=self.Next()
+		if Kind!="OP" or Value!=Operator:
+			raise RuntimeError("expected "+Operator+" in expression")
+
+	def Parse(self):
+		Predicate=self.Expression()
+		if self.Position!=len(self.Tokens):
+			raise RuntimeError("unexpected "+format(self.Peek()[1])+" in expression")
+		return(Predicate)
+
+	def Expression(self):
+		Terms=[self.Term()]
+		while self.IsWord("OR"):
+			self.Next()
+			Terms=Terms+[self.Term()]
+		if len(Terms)==1:
+			return(Terms[0])
+		return(lambda Column: numpy.logical_or.reduce([Term(Column) for Term in Terms]))
+
+	def Term(self):
+		Factors=[self.Factor()]
+		while self.IsWord("AND"):
+			self.Next()
+			Factors=Factors+[self.Factor()]
+		if len(Factors)==1:
+			return(Factors[0])
+		return(lambda Column: numpy.logical_and.reduce([Factor(Column) for Factor in Factors]))
+
+	def Factor(self):
+		if self.IsWord("NOT"):
+			self.Next()
+			Inner=self.Factor()
+			return(lambda Column: numpy.logical_not(Inner(Column)))
+		Kind,Value=self.Peek()
+		if Kind=="OP" and Value=="(":
+			self.Next()
+			Inner=self.Expression()
+			self.Expect(")")
+			return(Inner)
+		return(self.Comparison())
+
+	def Literal(self):
+		Kind,Value=self.Next()
+		if Kind not in ("NUM","STR"):
+			raise RuntimeError("expected a number or string in expression")
+		return(Value)
+
+	def Comparison(self):
+		Kind,FieldName=self.Next()
+		if Kind not in ("NAME","WORD"):
+			raise RuntimeError("expected a field name in expression")
+		Negate=False
+		if self.IsWord("NOT"):
+			self.Next()
+			Negate=True
+		if self.IsWord("IN"):
+			self.Next()
+			self.Expect("(")
+			Values=[self.Literal()]
+			while self.Peek()==("OP",","):
+				self.Next()
+				Values=Values+[self.Literal()]
+			self.Expect(")")
+			def InMask(Column):
+				Data=Column(FieldName)
+				Mask=numpy.zeros(Data.shape,dtype=bool)
+				for Value in Values:
+					Mask|=(Data==Value)
+				if Negate:
+					return(~Mask)
+				return(Mask)
+			return(InMask)
+		if Negate:
+			raise RuntimeError("NOT must be followed by IN after a field name")
+		Kind,Operator=self.Next()
+		if Kind!="OP" or Operator not in Comparisons:
+			raise RuntimeError("expected a comparison after "+FieldName)
+		Compare=Comparisons[Operator]
+		Value=self.Literal()
+		return(lambda Column: Compare(Column(FieldName),Value))
+
+################################################
+# Purpose: Compile an expression to a mask function, reusing earlier compilations
+# Input: SQLexp - SQL where clause as a string ("", "#" select every record)
+# Output: Predicate - function taking a column getter and returning a boolean array
+def CompilePredicate(SQLexp):
+	try:
+		if SQLexp in CompiledPredicates:
+			return(CompiledPredicates[SQLexp])
+		if SQLexp in ("","#",None):
+			Predicate=None
+		else:
+			Predicate=PredicateParser(Tokenize(SQLexp)).Parse()
+		CompiledPredicates[SQLexp]=Predicate
+		return(Predicate)
+	except Exception as err:
+		raise RuntimeError("** Error: CompilePredicate Failed for "+format(SQLexp)+" ("+str(err)+")")
+
+###################################################################################
+# Class holding a selection on a shapefile as a boolean bitmap
+#  Used in place of a feature layer: ManagementInterface.SelectUsingAttributes,
+#  CountRows and CopyFeatures accept a Selection directly
+###################################################################################
+class Selection:
+
+	###################################################################################
+	# Constructor for the selection class - starts with nothing selected, which like a
+	#  feature layer means tools use every record
+	# Inputs:
+	#         InShapefile - shapefile path and name as a string
+	###################################################################################
+	def __init__(self,InShapefile):
+		self.Shapefile=InShapefile
+		self.Reader=ShapefileIO.ShapefileReader(InShapefile)
+		self.Mask=numpy.zeros(self.Reader.NumRecords,dtype=bool)
+
+	###################################################################################
+	# Boolean mask for an expression over this shapefile's columns
+	# Inputs:
+	#         SQLexp - SQL where clause as a string
+	###################################################################################
+	def Evaluate(self,SQLexp):
+		Predicate=CompilePredicate(SQLexp)
+		if Predicate is None:
+			return(numpy.ones(self.Reader.NumRecords,dtype=bool))
+		Mask=numpy.asarray(Predicate(self.Reader.Column),dtype=bool)
+		# constant expressions apply to every record
+		if Mask.size==1:
+			return(numpy.repeat(Mask.ravel(),self.Reader.NumRecords))
+		return(Mask.copy())
+
+	###################################################################################
+	# Adds, updates, or removes records from the selection
+	# Inputs:
+	#         Type - type of selection as string: e.g. "NEW_SELECTION", "ADD_TO_SELECTION"
+	#         SQLexp - SQL statement used to select a subset of records.
+	###################################################################################
+	def Select(self,Type,SQLexp):
+		if Type=="CLEAR_SELECTION":
+			self.Mask[:]=False
+		elif Type=="SWITCH_SELECTION":
+			self.Mask=~self.Mask
+		else:
+			self.Combine(Type,self.Evaluate(SQLexp))
+
+	###################################################################################
+	# Combines a mask with the current selection
+	# Inputs:
+	#         Type - type of selection as string: e.g. "NEW_SELECTION", "SUBSET_SELECTION"
+	#         Mask - boolean array with one entry per record
+	###################################################################################
+	def Combine(self,Type,Mask):
+		if Type=="NEW_SELECTION":
+			self.Mask=Mask
+		elif Type=="ADD_TO_SELECTION":
+			self.Mask=self.Mask|Mask
+		elif Type=="REMOVE_FROM_SELECTION":
+			self.Mask=self.Mask&~Mask
+		elif Type=="SUBSET_SELECTION":
+			self.Mask=self.Mask&Mask
+		elif Type=="SWITCH_SELECTION":
+			self.Mask=~self.Mask
+		elif Type=="CLEAR_SELECTION":
+			self.Mask=numpy.zeros(self.Reader.NumRecords,dtype=bool)
+		else:
+			raise RuntimeError("Unknown selection type: "+format(Type))
+
+	###################################################################################
+	# Record numbers (FIDs) the tools operate on - the selected records, or every
+	#  record when nothing is selected (as for a feature layer)
+	###################################################################################
+	def FIDs(self):
+		if self.Mask.any():
+			return(numpy.flatnonzero(self.Mask))
+		return(numpy.arange(self.Reader.NumRecords))
+
+	###################################################################################
+	# Number of records the tools operate on
+	###################################################################################
+	def Count(self):
+		if self.Mask.any():
+			return(int(numpy.count_nonzero(self.Mask)))
+		return(self.Reader.NumRecords)
+
+	###################################################################################
+	# Values of a field for the records the tools operate on
+	# Inputs:
+	#         FieldName - string for field name
+	###################################################################################
+	def Values(self,FieldName):
+		return(self.Reader.Column(FieldName)[self.FIDs()])
+
+	###################################################################################
+	# Copies the records the tools operate on to a new shapefile
+	# Inputs:
+	#         OutShapefile - copied shapefile path and name as a string
+	###################################################################################
+	def CopyTo(self,OutShapefile):
+		FIDs=self.FIDs()
+		ShapefileIO.WriteRecords(OutShapefile,self.Reader.ShapeType,
+		                         [self.Reader.RecordContent(FID) for FID in FIDs],
+		                         self.Reader.DbfHeader(),
+		                         [self.Reader.DbfRecord(FID) for FID in FIDs],
+		                         self.Shapefile)
+
+	###################################################################################
+	# Appends the records the tools operate on to an existing shapefile with the same
+	#  attribute fields
+	# Inputs:
+	#         TargetShapefile - destination shapefile path and name as a string
+	###################################################################################
+	def AppendTo(self,TargetShapefile):
+		if ShapefileIO.Schema(TargetShapefile)!=ShapefileIO.Schema(self.Shapefile):
+			raise RuntimeError(TargetShapefile+" does not have the same fields as "+self.Shapefile)
+		FIDs=self.FIDs()
+		ShapefileIO.AppendRecords(TargetShapefile,
+		                          [self.Reader.RecordContent(FID) for FID in FIDs],
+		                          [self.Reader.DbfRecord(FID) for FID in FIDs])
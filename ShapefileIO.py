@@ -0,0 +1,736 @@
+#######################################################################
+# ShapefileIO
+#
+# Purpose: Read and write shapefile records (.shp, .shx, .dbf) directly so that
+#          simple record level operations do not need a geoprocessing round trip
+#
+# Shapefile and dBASE layouts from the ESRI Shapefile Technical Description (July 1998)
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import struct
+import numpy
+
+# Shape type codes from the technical description
+NullShape=0
+PointShape=1
+PolylineShape=3
+PolygonShape=5
+MultiPointShape=8
+PointZShape=11
+PolylineZShape=13
+PolygonZShape=15
+MultiPointZShape=18
+PointMShape=21
+PolylineMShape=23
+PolygonMShape=25
+MultiPointMShape=28
+
+# Shape types whose records hold a single point
+PointShapes=(PointShape,PointZShape,PointMShape)
+# Shape types whose records hold a Z range and array
+ZShapes=(PointZShape,PolylineZShape,PolygonZShape,MultiPointZShape)
+
+# Sidecar files copied alongside a written shapefile
+SidecarExtensions=(".prj",".cpg")
+
+################################################
+# Purpose: Split a shapefile name into the base name used by its sidecar files
+# Input: ShapefileName - shapefile path and name (with or without .shp)
+# Output: BaseName - path and name without extension
+def BaseName(ShapefileName):
+	if ShapefileName[-4:].lower()==".shp":
+		return(ShapefileName[0:-4])
+	return(ShapefileName)
+
+################################################
+# Purpose: Read the shape type from a shapefile header without reading the records
+# Input: ShapefileName - shapefile path and name
+# Output: ShapeType - shape type code
+def ShapeTypeOf(ShapefileName):
+	ShpFile=open(BaseName(ShapefileName)+".shp","rb")
+	Header=ShpFile.read(100)
+	ShpFile.close()
+	return(struct.unpack_from("<i",Header,32)[0])
+
+###################################################################################
+# Class to read the records of a shapefile without arcpy
+#  The three files are read into memory once; record contents and dBASE rows are
+#  handed out as memoryview slices so they can be copied without decoding
+###################################################################################
+class ShapefileReader:
+
+	###################################################################################
+	# Constructor for the shapefile reader class
+	# Inputs:
+	#         ShapefileName - shapefile path and name as a string
+	###################################################################################
+	def __init__(self,ShapefileName):
+		try:
+			self.Name=ShapefileName
+			self.Base=BaseName(ShapefileName)
+
+			### Main file header
+			ShpFile=open(self.Base+".shp","rb")
+			self.ShpBytes=ShpFile.read()
+			ShpFile.close()
+			self.ShpView=memoryview(self.ShpBytes)
+			FileCode=struct.unpack_from(">i",self.ShpBytes,0)[0]
+			if FileCode!=9994:
+				raise RuntimeError(self.Base+".shp is not a shapefile.")
+			self.ShapeType=struct.unpack_from("<i",self.ShpBytes,32)[0]
+			self.Bbox=struct.unpack_from("<4d",self.ShpBytes,36)
+
+			### Record offsets from the index file
+			ShxFile=open(self.Base+".shx","rb")
+			ShxBytes=ShxFile.read()
+			ShxFile.close()
+			# offsets and lengths are big endian 16-bit word counts
+			Index=numpy.frombuffer(ShxBytes,dtype=">i4",offset=100).reshape(-1,2)
+			self.NumRecords=Index.shape[0]
+			# byte offsets of the record contents (skip 8 byte record header)
+			self.Offsets=Index[:,0].astype(numpy.int64)*2+8
+			self.Lengths=Index[:,1].astype(numpy.int64)*2
+
+			### dBASE header and field descriptors
+			if self.ReadDbf(self.Base+".dbf")!=self.NumRecords:
+				raise RuntimeError(self.Base+".dbf and .shx record counts differ.")
+		except Exception as err:
+			raise RuntimeError("** Error: ShapefileReader Failed ("+str(err)+")")
+
+	###################################################################################
+	# Reads the dBASE file: header, field descriptors and rows
+	# Inputs:
+	#         DbfName - dBASE file path and name
+	# Outputs:
+	#         NumDbfRecords - record count from the dBASE header
+	###################################################################################
+	def ReadDbf(self,DbfName):
+		DbfFile=open(DbfName,"rb")
+		self.DbfBytes=DbfFile.read()
+		DbfFile.close()
+		self.DbfView=memoryview(self.DbfBytes)
+		NumDbfRecords,self.HeaderLength,self.RecordLength=struct.unpack_from("<IHH",self.DbfBytes,4)
+		self.Fields=[]
+		# field start positions include the deletion flag byte
+		FieldStart=1
+		Position=32
+		while self.DbfBytes[Position:Position+1]!=b"\r":
+			Name=self.DbfBytes[Position:Position+11].split(b"\x00")[0].decode("latin-1")
+			Type=self.DbfBytes[Position+11:Position+12].decode("latin-1")
+			Length,Decimals=struct.unpack_from("<BB",self.DbfBytes,Position+16)
+			self.Fields=self.Fields+[(Name,Type,Length,Decimals,FieldStart)]
+			FieldStart+=Length
+			Position+=32
+
+		# columns are decoded on first request and kept
+		self.ColumnCache={}
+		return(NumDbfRecords)
+
+	###################################################################################
+	# Record content (shape type onward) as a memoryview slice of the main file
+	# Inputs:
+	#         RecordNum - zero based record number (FID)
+	###################################################################################
+	def RecordContent(self,RecordNum):
+		Start=int(self.Offsets[RecordNum])
+		return(self.ShpView[Start:Start+int(self.Lengths[RecordNum])])
+
+	###################################################################################
+	# dBASE row (deletion flag onward) as a memoryview slice of the dBASE file
+	# Inputs:
+	#         RecordNum - zero based record number (FID)
+	###################################################################################
+	def DbfRecord(self,RecordNum):
+		Start=self.HeaderLength+RecordNum*self.RecordLength
+		return(self.DbfView[Start:Start+self.RecordLength])
+
+	###################################################################################
+	# Bounding boxes of every record as an (n,4) array of Xmin,Ymin,Xmax,Ymax
+	#  Read straight from the record contents; null shapes get NaN boxes
+	###################################################################################
+	def Boxes(self):
+		if "#BOXES" in self.ColumnCache:
+			return(self.ColumnCache["#BOXES"])
+		Bytes=numpy.frombuffer(self.ShpBytes,dtype=numpy.uint8)
+		Types=Bytes[self.Offsets[:,None]+numpy.arange(4)].copy().view("<i4").ravel()
+		Boxes=numpy.empty((self.NumRecords,4),dtype=numpy.float64)
+		Boxes[:]=numpy.nan
+		Points=numpy.zeros(self.NumRecords,dtype=bool)
+		for ShapeType in PointShapes:
+			Points|=(Types==ShapeType)
+		Shapes=(Types!=NullShape)&~Points
+		if Points.any():
+			XY=Bytes[self.Offsets[Points][:,None]+4+numpy.arange(16)].copy().view("<f8")
+			Boxes[Points]=numpy.hstack([XY,XY])
+		if Shapes.any():
+			Boxes[Shapes]=Bytes[self.Offsets[Shapes][:,None]+4+numpy.arange(32)].copy().view("<f8")
+		self.ColumnCache["#BOXES"]=Boxes
+		return(Boxes)
+
+	###################################################################################
+	# dBASE header bytes (file header and field descriptors)
+	###################################################################################
+	def DbfHeader(self):
+		return(self.DbfView[0:self.HeaderLength])
+
+	###################################################################################
+	# List of attribute field names, starting with the implicit FID
+	###################################################################################
+	def FieldNames(self):
+		return(["FID"]+[Field[0] for Field in self.Fields])
+
+	###################################################################################
+	# Attribute field as a NumPy array, one entry per record
+	#  Numeric fields become float64 (int64 when there are no decimals), logical fields
+	#  bool, everything else a stripped unicode array.  FID is the record number.
+	# Inputs:
+	#         FieldName - string for field name (case insensitive, like the geoprocessor)
+	###################################################################################
+	def Column(self,FieldName):
+		Key=FieldName.upper()
+		if Key in self.ColumnCache:
+			return(self.ColumnCache[Key])
+		if Key=="FID":
+			Values=numpy.arange(self.NumRecords,dtype=numpy.int64)
+			self.ColumnCache[Key]=Values
+			return(Values)
+
+		Matches=[Field for Field in self.Fields if Field[0].upper()==Key]
+		if Matches==[]:
+			raise RuntimeError(FieldName+" is not a field in "+self.Name)
+		Name,Type,Length,Decimals,FieldStart=Matches[0]
+
+		# Fixed width rows as a 2D byte array, then cut out the field
+		Rows=numpy.frombuffer(self.DbfBytes,dtype=numpy.uint8,
+		                      count=self.NumRecords*self.RecordLength,
+		                      offset=self.HeaderLength).reshape(self.NumRecords,self.RecordLength)
+		Raw=numpy.ascontiguousarray(Rows[:,FieldStart:FieldStart+Length]).view("S"+str(Length)).ravel()
+		Text=numpy.char.strip(Raw)
+
+		if Type in ("N","F"):
+			# blank or overflowed (*****) entries are treated as missing
+			Missing=(Text==b"")|(numpy.char.find(Text,b"*")>=0)
+			Values=numpy.where(Missing,b"nan",Text).astype(numpy.float64)
+			if Decimals==0 and not Missing.any():
+				Values=Values.astype(numpy.int64)
+		elif Type=="L":
+			Upper=numpy.char.upper(Text)
+			Values=(Upper==b"T")|(Upper==b"Y")
+		else:
+			Values=numpy.char.decode(Text,"latin-1")
+
+		self.ColumnCache[Key]=Values
+		return(Values)
+
+###################################################################################
+# Class to read a stand alone dBASE table (e.g. the per station tables) with the
+#  attribute methods of ShapefileReader (Column, FieldNames, DbfHeader, DbfRecord)
+###################################################################################
+class TableReader(ShapefileReader):
+
+	###################################################################################
+	# Constructor for the table reader class
+	# Inputs:
+	#         TableName - dBASE table path and name (.dbf is added when missing)
+	###################################################################################
+	def __init__(self,TableName):
+		try:
+			if TableName[-4:].lower()!=".dbf":
+				TableName=TableName+".dbf"
+			self.Name=TableName
+			self.Base=TableName[0:-4]
+			self.NumRecords=self.ReadDbf(TableName)
+		except Exception as err:
+			raise RuntimeError("** Error: TableReader Failed ("+str(err)+")")
+
+################################################
+# Purpose: Bounding box of a record content
+# Input: Content - record content bytes (shape type onward)
+# Output: (Xmin,Ymin,Xmax,Ymax) or None for a null shape
+def RecordBox(Content):
+	ShapeType=struct.unpack_from("<i",Content,0)[0]
+	if ShapeType==NullShape:
+		return(None)
+	if ShapeType in PointShapes:
+		X,Y=struct.unpack_from("<2d",Content,4)
+		return((X,Y,X,Y))
+	return(struct.unpack_from("<4d",Content,4))
+
+################################################
+# Purpose: Z range of a record content
+# Input: Content - record content bytes (shape type onward)
+# Output: (Zmin,Zmax) or None if the record does not carry Z values
+def RecordZRange(Content):
+	ShapeType=struct.unpack_from("<i",Content,0)[0]
+	if ShapeType not in ZShapes:
+		return(None)
+	if ShapeType==PointZShape:
+		Z=struct.unpack_from("<d",Content,20)[0]
+		return((Z,Z))
+	if ShapeType==MultiPointZShape:
+		NumPoints=struct.unpack_from("<i",Content,36)[0]
+		return(struct.unpack_from("<2d",Content,40+16*NumPoints))
+	NumParts,NumPoints=struct.unpack_from("<2i",Content,36)
+	return(struct.unpack_from("<2d",Content,44+4*NumParts+16*NumPoints))
+
+################################################
+# Purpose: Combined XY and Z extents of record contents
+# Input: Contents - list of record contents
+# Output: [Extent, ZExtent] - (Xmin,Ymin,Xmax,Ymax) and (Zmin,Zmax), or None for each
+#          when no record has one
+def ContentsExtent(Contents):
+	Boxes=[Box for Box in [RecordBox(Content) for Content in Contents] if Box is not None]
+	Extent=None
+	if Boxes!=[]:
+		BoxArray=numpy.array(Boxes,dtype=numpy.float64)
+		Extent=(BoxArray[:,0].min(),BoxArray[:,1].min(),BoxArray[:,2].max(),BoxArray[:,3].max())
+	ZRanges=[ZRange for ZRange in [RecordZRange(Content) for Content in Contents] if ZRange is not None]
+	ZExtent=None
+	if ZRanges!=[]:
+		ZArray=numpy.array(ZRanges,dtype=numpy.float64)
+		ZExtent=(ZArray[:,0].min(),ZArray[:,1].max())
+	return([Extent,ZExtent])
+
+################################################
+# Purpose: Write record contents and dBASE rows to a new shapefile
+#          Record numbers, record headers and .shx offsets are rebuilt; the record
+#          contents and dBASE rows are written as given
+# Input: OutShapefile - output shapefile path and name
+#        ShapeType - shape type code for the file header
+#        Contents - list of record contents (bytes or memoryview, shape type onward)
+#        DbfHeader - dBASE header bytes (field descriptors) for the output
+#        DbfRows - list of dBASE rows (bytes or memoryview, deletion flag onward)
+#        SidecarSource - shapefile whose .prj/.cpg are copied to the output ("" for none)
+def WriteRecords(OutShapefile,ShapeType,Contents,DbfHeader,DbfRows,SidecarSource):
+	try:
+		if len(Contents)!=len(DbfRows):
+			raise RuntimeError("record and attribute row counts differ.")
+		OutBase=BaseName(OutShapefile)
+
+		### Extents for the file header
+		Extent,ZExtent=ContentsExtent(Contents)
+
+		### Main and index files
+		ShpParts=[]
+		ShxParts=[]
+		# Offset in 16-bit words, starting after the 100 byte header
+		Offset=50
+		RecordNum=1
+		for Content in Contents:
+			ContentWords=len(Content)//2
+			ShpParts.append(struct.pack(">2i",RecordNum,ContentWords))
+			ShpParts.append(Content)
+			ShxParts.append(struct.pack(">2i",Offset,ContentWords))
+			Offset+=4+ContentWords
+			RecordNum+=1
+
+		if Extent is None:
+			Extent=(0.0,0.0,0.0,0.0)
+		if ZExtent is None:
+			ZExtent=(0.0,0.0)
+		ShpFile=open(OutBase+".shp","wb")
+		ShpFile.write(FileHeader(ShapeType,Offset,Extent,ZExtent))
+		for Part in ShpParts:
+			ShpFile.write(Part)
+		ShpFile.close()
+
+		ShxFile=open(OutBase+".shx","wb")
+		ShxFile.write(FileHeader(ShapeType,50+4*len(Contents),Extent,ZExtent))
+		ShxFile.write(b"".join(ShxParts))
+		ShxFile.close()
+
+		### dBASE file: template header with the record count patched
+		Header=bytearray(DbfHeader)
+		struct.pack_into("<I",Header,4,len(DbfRows))
+		DbfFile=open(OutBase+".dbf","wb")
+		DbfFile.write(Header)
+		for Row in DbfRows:
+			DbfFile.write(Row)
+		DbfFile.write(b"\x1a")
+		DbfFile.close()
+
+		### Projection and code page
+		CopySidecars(SidecarSource,OutBase)
+	except Exception as err:
+		raise RuntimeError("** Error: WriteRecords Failed ("+str(err)+")")
+
+################################################
+# Purpose: Copy the projection and code page files of a shapefile
+# Input: SidecarSource - shapefile whose .prj/.cpg are copied ("" for none)
+#        OutBase - output shapefile path and name without extension
+def CopySidecars(SidecarSource,OutBase):
+	if SidecarSource!="":
+		SourceBase=BaseName(SidecarSource)
+		for Extension in SidecarExtensions:
+			if os.path.isfile(SourceBase+Extension):
+				InFile=open(SourceBase+Extension,"rb")
+				OutFile=open(OutBase+Extension,"wb")
+				OutFile.write(InFile.read())
+				InFile.close()
+				OutFile.close()
+
+###################################################################################
+# Class to write a shapefile one record at a time
+#  Records go straight to the three files, so memory use does not grow with the
+#  number of records; the file headers and record count are written by Close
+###################################################################################
+class ShapefileWriter:
+
+	###################################################################################
+	# Constructor for the shapefile writer class
+	# Inputs:
+	#         OutShapefile - output shapefile path and name
+	#         ShapeType - shape type code for the file header
+	#         DbfHeader - dBASE header bytes (field descriptors) for the output
+	#         SidecarSource - shapefile whose .prj/.cpg are copied to the output ("" for none)
+	###################################################################################
+	def __init__(self,OutShapefile,ShapeType,DbfHeader,SidecarSource):
+		try:
+			self.OutBase=BaseName(OutShapefile)
+			self.ShapeType=ShapeType
+			self.SidecarSource=SidecarSource
+			self.NumRecords=0
+			# Offset in 16-bit words, starting after the 100 byte header
+			self.Offset=50
+			self.Extent=None
+			self.ZExtent=None
+			self.ShpFile=open(self.OutBase+".shp","wb")
+			self.ShxFile=open(self.OutBase+".shx","wb")
+			self.DbfFile=open(self.OutBase+".dbf","wb")
+			# headers are written again by Close
+			self.ShpFile.write(b"\x00"*100)
+			self.ShxFile.write(b"\x00"*100)
+			self.DbfFile.write(DbfHeader)
+		except Exception as err:
+			raise RuntimeError("** Error: ShapefileWriter Failed ("+str(err)+")")
+
+	###################################################################################
+	# Writes one record
+	# Inputs:
+	#         Content - record content (bytes or memoryview, shape type onward)
+	#         DbfRow - dBASE row (bytes or memoryview, deletion flag onward)
+	###################################################################################
+	def Write(self,Content,DbfRow):
+		ContentWords=len(Content)//2
+		self.ShpFile.write(struct.pack(">2i",self.NumRecords+1,ContentWords))
+		self.ShpFile.write(Content)
+		self.ShxFile.write(struct.pack(">2i",self.Offset,ContentWords))
+		self.DbfFile.write(DbfRow)
+		self.Offset+=4+ContentWords
+		self.NumRecords+=1
+		Box=RecordBox(Content)
+		if Box is not None:
+			if self.Extent is None:
+				self.Extent=Box
+			else:
+				self.Extent=(min(self.Extent[0],Box[0]),min(self.Extent[1],Box[1]),
+				             max(self.Extent[2],Box[2]),max(self.Extent[3],Box[3]))
+		ZRange=RecordZRange(Content)
+		if ZRange is not None:
+			if self.ZExtent is None:
+				self.ZExtent=ZRange
+			else:
+				self.ZExtent=(min(self.ZExtent[0],ZRange[0]),max(self.ZExtent[1],ZRange[1]))
+
+	###################################################################################
+	# Writes the file headers and record count and closes the files
+	###################################################################################
+	def Close(self):
+		try:
+			Extent=self.Extent
+			if Extent is None:
+				Extent=(0.0,0.0,0.0,0.0)
+			ZExtent=self.ZExtent
+			if ZExtent is None:
+				ZExtent=(0.0,0.0)
+			self.ShpFile.seek(0)
+			self.ShpFile.write(FileHeader(self.ShapeType,self.Offset,Extent,ZExtent))
+			self.ShpFile.close()
+			self.ShxFile.seek(0)
+			self.ShxFile.write(FileHeader(self.ShapeType,50+4*self.NumRecords,Extent,ZExtent))
+			self.ShxFile.close()
+			self.DbfFile.write(b"\x1a")
+			self.DbfFile.seek(4)
+			self.DbfFile.write(struct.pack("<I",self.NumRecords))
+			self.DbfFile.close()
+			CopySidecars(self.SidecarSource,self.OutBase)
+		except Exception as err:
+			raise RuntimeError("** Error: ShapefileWriter Close Failed ("+str(err)+")")
+
+###################################################################################
+# Class to write a stand alone dBASE table one row at a time (e.g. per station
+#  statistics); the record count is written by Close
+###################################################################################
+class TableWriter:
+
+	###################################################################################
+	# Constructor for the table writer class
+	# Inputs:
+	#         OutTable - output table path and name (.dbf is added when missing)
+	#         Fields - list of (Name, Type, Length, Decimals) as for NewDbfHeader
+	###################################################################################
+	def __init__(self,OutTable,Fields):
+		try:
+			if OutTable[-4:].lower()!=".dbf":
+				OutTable=OutTable+".dbf"
+			self.Name=OutTable
+			self.Fields=Fields
+			self.NumRecords=0
+			self.DbfFile=open(OutTable,"wb")
+			self.DbfFile.write(NewDbfHeader(Fields,0))
+		except Exception as err:
+			raise RuntimeError("** Error: TableWriter Failed ("+str(err)+")")
+
+	###################################################################################
+	# Writes one row
+	# Inputs:
+	#         Values - list of values, one per field (None or NaN for a blank number)
+	###################################################################################
+	def Write(self,Values):
+		self.DbfFile.write(NewDbfRow(self.Fields,Values))
+		self.NumRecords+=1
+
+	###################################################################################
+	# Writes the record count and closes the table
+	###################################################################################
+	def Close(self):
+		try:
+			self.DbfFile.write(b"\x1a")
+			self.DbfFile.seek(4)
+			self.DbfFile.write(struct.pack("<I",self.NumRecords))
+			self.DbfFile.close()
+		except Exception as err:
+			raise RuntimeError("** Error: TableWriter Close Failed ("+str(err)+")")
+
+################################################
+# Purpose: Append record contents and dBASE rows to the end of an existing shapefile
+#          in place.  Existing records are not read or rewritten: only the new record
+#          headers, the new .shx entries and the three file headers are written.
+# Input: TargetShapefile - existing shapefile path and name
+#        Contents - list of record contents (bytes or memoryview, shape type onward)
+#        DbfRows - list of dBASE rows matching the target's fields
+def AppendRecords(TargetShapefile,Contents,DbfRows):
+	try:
+		if len(Contents)!=len(DbfRows):
+			raise RuntimeError("record and attribute row counts differ.")
+		TargetBase=BaseName(TargetShapefile)
+
+		### Main and index file headers of the target
+		ShpFile=open(TargetBase+".shp","r+b")
+		Header=ShpFile.read(100)
+		ShapeType=struct.unpack_from("<i",Header,32)[0]
+		FileWords=struct.unpack_from(">i",Header,24)[0]
+		OldExtent=struct.unpack_from("<4d",Header,36)
+		OldZExtent=struct.unpack_from("<2d",Header,68)
+		NumOld=(os.path.getsize(TargetBase+".shx")-100)//8
+
+		# Merge the extents (an empty target has no extent to keep)
+		Extent,ZExtent=ContentsExtent(Contents)
+		if NumOld>0 or Extent is None:
+			if Extent is None:
+				Extent=OldExtent
+			else:
+				Extent=(min(Extent[0],OldExtent[0]),min(Extent[1],OldExtent[1]),
+				        max(Extent[2],OldExtent[2]),max(Extent[3],OldExtent[3]))
+		if NumOld>0 or ZExtent is None:
+			if ZExtent is None:
+				ZExtent=OldZExtent
+			else:
+				ZExtent=(min(ZExtent[0],OldZExtent[0]),max(ZExtent[1],OldZExtent[1]))
+
+		### New records after the existing ones
+		ShxEntries=[]
+		Offset=FileWords
+		ShpFile.seek(FileWords*2)
+		RecordNum=NumOld+1
+		for Content in Contents:
+			ContentWords=len(Content)//2
+			ShpFile.write(struct.pack(">2i",RecordNum,ContentWords))
+			ShpFile.write(Content)
+			ShxEntries.append(struct.pack(">2i",Offset,ContentWords))
+			Offset+=4+ContentWords
+			RecordNum+=1
+		ShpFile.seek(0)
+		ShpFile.write(FileHeader(ShapeType,Offset,Extent,ZExtent))
+		ShpFile.close()
+
+		ShxFile=open(TargetBase+".shx","r+b")
+		ShxFile.seek(100+8*NumOld)
+		ShxFile.write(b"".join(ShxEntries))
+		ShxFile.seek(0)
+		ShxFile.write(FileHeader(ShapeType,50+4*(NumOld+len(Contents)),Extent,ZExtent))
+		ShxFile.close()
+
+		### dBASE rows replace the end of file marker
+		DbfFile=open(TargetBase+".dbf","r+b")
+		DbfHeader=DbfFile.read(32)
+		NumDbfRecords,HeaderLength,RecordLength=struct.unpack_from("<IHH",DbfHeader,4)
+		DbfFile.seek(HeaderLength+NumDbfRecords*RecordLength)
+		for Row in DbfRows:
+			if len(Row)!=RecordLength:
+				raise RuntimeError("attribute rows do not match the fields of "+TargetShapefile)
+			DbfFile.write(Row)
+		DbfFile.write(b"\x1a")
+		DbfFile.truncate()
+		DbfFile.seek(4)
+		DbfFile.write(struct.pack("<I",NumDbfRecords+len(DbfRows)))
+		DbfFile.close()
+	except Exception as err:
+		raise RuntimeError("** Error: AppendRecords Failed ("+str(err)+")")
+
+################################################
+# Purpose: Geometry type and attribute fields of a shapefile, read from the headers only.
+#          Shapefiles with equal schemas can have their records copied between them unchanged.
+# Input: ShapefileName - shapefile path and name
+# Output: [ShapeType, Fields] - Fields as a list of (NAME, Type, Length, Decimals)
+def Schema(ShapefileName):
+	DbfFile=open(BaseName(ShapefileName)+".dbf","rb")
+	Header=DbfFile.read(32)
+	HeaderLength=struct.unpack_from("<H",Header,8)[0]
+	Descriptors=DbfFile.read(HeaderLength-32)
+	DbfFile.close()
+	Fields=[]
+	Position=0
+	while Descriptors[Position:Position+1] not in (b"\r",b""):
+		Name=Descriptors[Position:Position+11].split(b"\x00")[0].decode("latin-1").upper()
+		Type=Descriptors[Position+11:Position+12].decode("latin-1")
+		Length,Decimals=struct.unpack_from("<BB",Descriptors,Position+16)
+		Fields.append((Name,Type,Length,Decimals))
+		Position+=32
+	return([ShapeTypeOf(ShapefileName),Fields])
+
+################################################
+# Purpose: Build the 100 byte header shared by the .shp and .shx files
+# Input: ShapeType - shape type code
+#        FileWords - file length in 16-bit words
+#        Extent - (Xmin,Ymin,Xmax,Ymax)
+#        ZExtent - (Zmin,Zmax)
+# Output: Header - header bytes
+def FileHeader(ShapeType,FileWords,Extent,ZExtent):
+	Header=struct.pack(">7i",9994,0,0,0,0,0,FileWords)
+	Header=Header+struct.pack("<2i",1000,ShapeType)
+	Header=Header+struct.pack("<8d",Extent[0],Extent[1],Extent[2],Extent[3],
+	                          ZExtent[0],ZExtent[1],0.0,0.0)
+	return(Header)
+
+################################################
+# Purpose: Vertices and part starts of a record content, without copying
+# Input: Content - record content bytes (shape type onward)
+# Output: [XY, PartStarts] - XY as an (n,2) float array view, PartStarts as a list of
+#          vertex indices where each part starts (points and multipoints have one part)
+def RecordGeometry(Content):
+	ShapeType=struct.unpack_from("<i",Content,0)[0]
+	if ShapeType==NullShape:
+		return([numpy.zeros((0,2)),[]])
+	if ShapeType in PointShapes:
+		return([numpy.frombuffer(Content,dtype="<f8",count=2,offset=4).reshape(1,2),[0]])
+	if ShapeType in (MultiPointShape,MultiPointZShape,MultiPointMShape):
+		NumPoints=struct.unpack_from("<i",Content,36)[0]
+		return([numpy.frombuffer(Content,dtype="<f8",count=2*NumPoints,offset=40).reshape(NumPoints,2),[0]])
+	NumParts,NumPoints=struct.unpack_from("<2i",Content,36)
+	PartStarts=list(struct.unpack_from("<"+str(NumParts)+"i",Content,44))
+	XY=numpy.frombuffer(Content,dtype="<f8",count=2*NumPoints,offset=44+4*NumParts).reshape(NumPoints,2)
+	return([XY,PartStarts])
+
+################################################
+# Purpose: Z values of a record content
+# Input: Content - record content bytes (shape type onward)
+# Output: Z - float array with one value per vertex, or None if the record has no Z
+def RecordZ(Content):
+	ShapeType=struct.unpack_from("<i",Content,0)[0]
+	if ShapeType not in ZShapes:
+		return(None)
+	if ShapeType==PointZShape:
+		return(numpy.frombuffer(Content,dtype="<f8",count=1,offset=20))
+	if ShapeType==MultiPointZShape:
+		NumPoints=struct.unpack_from("<i",Content,36)[0]
+		return(numpy.frombuffer(Content,dtype="<f8",count=NumPoints,offset=56+16*NumPoints))
+	NumParts,NumPoints=struct.unpack_from("<2i",Content,36)
+	return(numpy.frombuffer(Content,dtype="<f8",count=NumPoints,offset=60+4*NumParts+16*NumPoints))
+
+################################################
+# Purpose: Build a polyline or polygon record content from part vertex arrays
+# Input: ShapeType - shape type code (Z types also write the Z arrays)
+#        Parts - list of (n,2) vertex arrays, one per part
+#        ZParts - list of Z arrays matching Parts (ignored unless a Z type)
+# Output: Content - record content bytes
+def PolyContent(ShapeType,Parts,ZParts):
+	XY=numpy.vstack(Parts).astype("<f8")
+	Counts=[Part.shape[0] for Part in Parts]
+	PartStarts=numpy.cumsum([0]+Counts[0:-1]).astype("<i4")
+	Content=struct.pack("<i4d2i",ShapeType,XY[:,0].min(),XY[:,1].min(),XY[:,0].max(),XY[:,1].max(),
+	                    len(Parts),XY.shape[0])
+	Content=Content+PartStarts.tobytes()+XY.tobytes()
+	if ShapeType in ZShapes:
+		Z=numpy.concatenate(ZParts).astype("<f8")
+		Content=Content+struct.pack("<2d",Z.min(),Z.max())+Z.tobytes()
+	return(Content)
+
+################################################
+# Purpose: Build a dBASE header for new attribute fields
+# Input: Fields - list of (Name, Type, Length, Decimals) e.g. ("Station","N",19,11)
+#        NumRecords - number of rows that will follow
+# Output: Header - dBASE header bytes including the field descriptors
+def NewDbfHeader(Fields,NumRecords):
+	RecordLength=1+sum([Field[2] for Field in Fields])
+	HeaderLength=32+32*len(Fields)+1
+	Header=struct.pack("<BBBBIHH20x",3,95,7,26,NumRecords,HeaderLength,RecordLength)
+	for Name,Type,Length,Decimals in Fields:
+		Header=Header+Name.encode("latin-1")[0:10].ljust(11,b"\x00")+Type.encode("latin-1")
+		Header=Header+b"\x00"*4+struct.pack("<BB",Length,Decimals)+b"\x00"*14
+	return(Header+b"\r")
+
+################################################
+# Purpose: Build a dBASE row for new attribute fields
+# Input: Fields - list of (Name, Type, Length, Decimals) as for NewDbfHeader
+#        Values - list of values, one per field
+# Output: Row - dBASE row bytes (deletion flag onward)
+def NewDbfRow(Fields,Values):
+	Row=b" "
+	for (Name,Type,Length,Decimals),Value in zip(Fields,Values):
+		if Type in ("N","F"):
+			if Value is None or Value!=Value:
+				Text=""
+			elif Decimals==0:
+				Text=str(int(round(Value)))
+			else:
+				Text=("%."+str(Decimals)+"f")%Value
+			if len(Text)>Length:
+				# overflow marker, as written by dBASE
+				Text="*"*Length
+			Text=Text.rjust(Length)
+		else:
+			Text=format(Value).ljust(Length)
+		Row=Row+Text[0:Length].encode("latin-1")
+	return(Row)
+
+################################################
+# Purpose: Build the dBASE bytes of new attribute fields for many rows at once
+#          (formatted as NewDbfRow, without the deletion flag)
+# Input: Fields - list of (Name, Type, Length, Decimals) as for NewDbfHeader
+#        Columns - list of arrays, one per field, each with one value per row
+#                  (NaN for a missing number)
+# Output: Bytes - (rows, total field length) uint8 array, appended to rows with numpy.hstack
+def NewDbfColumns(Fields,Columns):
+	NumRows=len(Columns[0])
+	Pieces=[]
+	for (Name,Type,Length,Decimals),Values in zip(Fields,Columns):
+		if Type in ("N","F"):
+			Values=numpy.asarray(Values,dtype=numpy.float64)
+			Missing=numpy.isnan(Values)
+			Values=numpy.where(Missing,0.0,Values)
+			if Decimals==0:
+				Text=numpy.char.mod("%d",numpy.round(Values).astype(numpy.int64))
+			else:
+				Text=numpy.char.mod("%."+str(Decimals)+"f",Values)
+			Text=numpy.where(Missing,"",Text)
+			# overflow marker, as written by dBASE
+			Text=numpy.where(numpy.char.str_len(Text)>Length,"*"*Length,Text)
+			Text=numpy.char.rjust(Text,Length)
+		else:
+			Text=numpy.char.ljust(numpy.asarray(Values).astype(str),Length)
+		Bytes=numpy.char.encode(Text,"latin-1").astype("S"+str(Length))
+		Pieces.append(Bytes.view(numpy.uint8).reshape(NumRows,Length))
+	return(numpy.hstack(Pieces))
@@ -12,6 +12,11 @@ import arcpy
 # Output: PolyAreas - List of polygon areas
 def Area(PolygonShapefile):
     try:
+        # Shapefiles are measured for all features at once
+        if NativeGeometry(PolygonShapefile):
+            XY,PartOffsets,FeatureParts,ShapeType=GeometryArrays(PolygonShapefile)
+            return(AreaKernel(XY,PartOffsets,FeatureParts,ShapeType).tolist())
+
         # Create search cursor
         rows = arcpy.SearchCursor(PolygonShapefile) 
         
@@ -39,6 +44,10 @@ def Area(PolygonShapefile):
 
 def Coordinates(Shapefile):
     try:
+        # Native selections are read directly from the record contents
+        if hasattr(Shapefile,"Reader"):
+            return(SelectionCoordinates(Shapefile))
+
         # Create search cursor
         rows = arcpy.SearchCursor(Shapefile) 
         
@@ -70,12 +79,277 @@ def Coordinates(Shapefile):
     except Exception as TheError:
         raise RuntimeError("An error has occurred in ShapeProperties Coordinates: "+format(TheError))
 
+############################################
+# Purpose: Extract feature coordinates of a native selection: X, Y, Z
+# Input: TheSelection - SelectionEngine Selection
+# Output: XYZCoords: [Feature[Point[(X,Y,Z)]]] (Z is None when the shapefile has no Z)
+def SelectionCoordinates(TheSelection):
+    try:
+        import ShapefileIO
+        
+        # Create empty list for all features
+        XYZAllFeatures=[]
+        
+        for FID in TheSelection.FIDs():
+            Content=TheSelection.Reader.RecordContent(FID)
+            XY=ShapefileIO.RecordGeometry(Content)[0]
+            Z=ShapefileIO.RecordZ(Content)
+            if Z is None:
+                Z=[None]*XY.shape[0]
+            XYZAllFeatures=XYZAllFeatures+[[(XY[i,0],XY[i,1],Z[i]) for i in range(XY.shape[0])]]
+        return(XYZAllFeatures)
+    #Print out error from Python
+    except Exception as TheError:
+        raise RuntimeError("An error has occurred in ShapeProperties SelectionCoordinates: "+format(TheError))
+
+############################################
+# Purpose: Extract feature coordinates as flat arrays, e.g. to share with worker processes
+#          (SharedGeometry.SharedBlocks.ShareCoordinates)
+# Input: Shapefile - shapefile, or a native selection (selected records only)
+# Output: [XY, Z, Starts]: XY (n,2) array of every vertex, Z (n,) array or None when the
+#         shapefile has no Z, Starts (features+1,) array of each feature's first vertex
+def CoordinateArrays(Shapefile):
+    try:
+        import numpy
+        import ShapefileIO
+
+        if hasattr(Shapefile,"Reader"):
+            Reader=Shapefile.Reader
+            FIDs=Shapefile.FIDs()
+        else:
+            Reader=ShapefileIO.ShapefileReader(Shapefile)
+            FIDs=range(Reader.NumRecords)
+        
+        XYs=[]
+        Zs=[]
+        Starts=[0]
+        for FID in FIDs:
+            Content=Reader.RecordContent(FID)
+            XYs.append(ShapefileIO.RecordGeometry(Content)[0])
+            Zs.append(ShapefileIO.RecordZ(Content))
+            Starts.append(Starts[-1]+XYs[-1].shape[0])
+        
+        XY=numpy.zeros((0,2))
+        if XYs!=[]:
+            XY=numpy.concatenate(XYs)
+        Z=None
+        if Zs!=[] and all(FeatureZ is not None for FeatureZ in Zs):
+            Z=numpy.concatenate(Zs)
+        return([XY,Z,numpy.array(Starts,dtype=numpy.int64)])
+    #Print out error from Python
+    except Exception as TheError:
+        raise RuntimeError("An error has occurred in ShapeProperties CoordinateArrays: "+format(TheError))
+
+############################################
+# Purpose: Decode the geometry of every record at once into flat arrays, straight from the
+#          shapefile bytes (no per record Python objects), for the measure kernels below
+# Input: Shapefile - shapefile, or a native selection (selected records only)
+# Output: [XY, PartOffsets, FeatureParts, ShapeType]: XY (n,2) array of every vertex,
+#         PartOffsets (parts+1,) vertex offsets of the parts, FeatureParts (features+1,)
+#         part offsets of the features (null shapes have no parts; a multipoint is one part)
+def GeometryArrays(Shapefile):
+    try:
+        import numpy
+        import ShapefileIO
+        from SpatialIndex import ExpandRanges
+
+        if hasattr(Shapefile,"Reader"):
+            Reader=Shapefile.Reader
+            FIDs=numpy.asarray(Shapefile.FIDs(),dtype=numpy.int64)
+        else:
+            Reader=ShapefileIO.ShapefileReader(Shapefile)
+            FIDs=numpy.arange(Reader.NumRecords,dtype=numpy.int64)
+
+        Bytes=numpy.frombuffer(Reader.ShpBytes,dtype=numpy.uint8)
+        Offsets=Reader.Offsets[FIDs]
+        Types=Bytes[Offsets[:,None]+numpy.arange(4)].copy().view("<i4").ravel()
+        Shapes=Types!=ShapefileIO.NullShape
+        Int32=lambda Positions: Bytes[Positions[:,None]+numpy.arange(4)].copy().view("<i4").ravel().astype(numpy.int64)
+
+        ### Parts per feature and vertices per part, and where the vertices start
+        NumParts=numpy.zeros(FIDs.shape[0],dtype=numpy.int64)
+        NumParts[Shapes]=1
+        if Reader.ShapeType in ShapefileIO.PointShapes:
+            PartCounts=numpy.ones(int(Shapes.sum()),dtype=numpy.int64)
+            VertexStarts=Offsets[Shapes]+4
+        elif Reader.ShapeType in (ShapefileIO.MultiPointShape,ShapefileIO.MultiPointZShape,ShapefileIO.MultiPointMShape):
+            PartCounts=Int32(Offsets[Shapes]+36)
+            VertexStarts=Offsets[Shapes]+40
+        else:
+            NumParts[Shapes]=Int32(Offsets[Shapes]+36)
+            NumPoints=Int32(Offsets[Shapes]+40)
+            # part start indices of every part, relative to their record's vertices
+            RecordStarts=numpy.repeat(Offsets[Shapes]+44,NumParts[Shapes])
+            PartNums=ExpandRanges(numpy.zeros(NumParts[Shapes].shape[0],dtype=numpy.int64),NumParts[Shapes])
+            PartStarts=Int32(RecordStarts+4*PartNums)
+            PartEnds=numpy.append(PartStarts[1:],0)
+            # the last part of a record ends at its point count
+            LastParts=numpy.cumsum(NumParts[Shapes])-1
+            PartEnds[LastParts]=NumPoints
+            PartCounts=PartEnds-PartStarts
+            VertexStarts=numpy.repeat(Offsets[Shapes]+44+4*NumParts[Shapes],NumParts[Shapes])+16*PartStarts
+
+        ### Vertices: the coordinates of each part are consecutive doubles, read through
+        ###  double views of the file at each possible 2 byte alignment
+        PartOffsets=numpy.concatenate([[0],numpy.cumsum(PartCounts)]).astype(numpy.int64)
+        XY=numpy.zeros((int(PartOffsets[-1]),2))
+        Flat=XY.reshape(-1)
+        Doubles=ExpandRanges(numpy.zeros(PartCounts.shape[0],dtype=numpy.int64),2*PartCounts)
+        Positions=numpy.repeat(VertexStarts,2*PartCounts)+8*Doubles
+        for Alignment in (0,2,4,6):
+            Aligned=(Positions%8)==Alignment
+            if Aligned.any():
+                View=numpy.frombuffer(Reader.ShpBytes,dtype="<f8",offset=Alignment,
+                                      count=(len(Reader.ShpBytes)-Alignment)//8)
+                Flat[Aligned]=View[(Positions[Aligned]-Alignment)//8]
+        FeatureParts=numpy.concatenate([[0],numpy.cumsum(NumParts)]).astype(numpy.int64)
+        return([XY,PartOffsets,FeatureParts,Reader.ShapeType])
+    #Print out error from Python
+    except Exception as TheError:
+        raise RuntimeError("An error has occurred in ShapeProperties GeometryArrays: "+format(TheError))
+
+############################################
+# Purpose: Sums of consecutive ranges of an array, 0 for empty ranges (np.add.reduceat)
+# Input: Values - (n,) array
+#        RangeOffsets - (ranges+1,) offsets into Values, the last one n
+# Output: Sums - (ranges,) array
+def RangeSums(Values,RangeOffsets):
+    import numpy
+    Sums=numpy.zeros(RangeOffsets.shape[0]-1)
+    NonEmpty=RangeOffsets[1:]>RangeOffsets[0:-1]
+    if NonEmpty.any():
+        Sums[NonEmpty]=numpy.add.reduceat(Values,RangeOffsets[0:-1][NonEmpty])
+    return(Sums)
+
+############################################
+# Purpose: Per vertex terms of the segments from each vertex to the next in its part
+#          (0 at the last vertex of each part)
+# Input: XY, PartOffsets - from GeometryArrays
+# Output: [DX, DY, Cross] - segment deltas and x_i*y_i+1 - x_i+1*y_i, each (n,)
+def SegmentTerms(XY,PartOffsets):
+    import numpy
+    Next=numpy.minimum(numpy.arange(1,XY.shape[0]+1),max(XY.shape[0]-1,0))
+    Last=numpy.zeros(XY.shape[0],dtype=bool)
+    Last[PartOffsets[1:][PartOffsets[1:]>PartOffsets[0:-1]]-1]=True
+    Next[Last]=numpy.flatnonzero(Last)
+    DX=XY[Next,0]-XY[:,0]
+    DY=XY[Next,1]-XY[:,1]
+    Cross=XY[:,0]*XY[Next,1]-XY[Next,0]*XY[:,1]
+    return([DX,DY,Cross])
+
+############################################
+# Purpose: Polygon areas by the shoelace formula, for all features at once
+#          (clockwise outer rings count positive and counterclockwise holes negative,
+#          as in shapefiles)
+# Input: XY, PartOffsets, FeatureParts - from GeometryArrays
+#        ShapeType - shape type code; other than polygons have zero area (None: parts are rings)
+# Output: Areas - (features,) array
+def AreaKernel(XY,PartOffsets,FeatureParts,ShapeType=None):
+    import numpy
+    import ShapefileIO
+    if ShapeType is not None and ShapeType not in (ShapefileIO.PolygonShape,ShapefileIO.PolygonZShape,ShapefileIO.PolygonMShape):
+        return(numpy.zeros(FeatureParts.shape[0]-1))
+    DX,DY,Cross=SegmentTerms(XY,PartOffsets)
+    return(0.0-RangeSums(RangeSums(Cross,PartOffsets)/2.0,FeatureParts))
+
+############################################
+# Purpose: Line lengths (polygon perimeters), for all features at once
+# Input: XY, PartOffsets, FeatureParts - from GeometryArrays
+# Output: Lengths - (features,) array
+def LengthKernel(XY,PartOffsets,FeatureParts):
+    import numpy
+    DX,DY,Cross=SegmentTerms(XY,PartOffsets)
+    return(RangeSums(RangeSums(numpy.hypot(DX,DY),PartOffsets),FeatureParts))
+
+############################################
+# Purpose: Vertex counts, for all features at once
+# Input: PartOffsets, FeatureParts - from GeometryArrays
+# Output: Counts - (features,) integer array
+def VertexCountKernel(PartOffsets,FeatureParts):
+    import numpy
+    return(numpy.diff(PartOffsets[FeatureParts]))
+
+############################################
+# Purpose: Bounding boxes, for all features at once
+# Input: XY, PartOffsets, FeatureParts - from GeometryArrays
+# Output: Boxes - (features,4) array of Xmin,Ymin,Xmax,Ymax (NaN for null shapes)
+def BoundsKernel(XY,PartOffsets,FeatureParts):
+    import numpy
+    VertexOffsets=PartOffsets[FeatureParts]
+    Boxes=numpy.zeros((FeatureParts.shape[0]-1,4))+numpy.nan
+    NonEmpty=VertexOffsets[1:]>VertexOffsets[0:-1]
+    if NonEmpty.any():
+        Starts=VertexOffsets[0:-1][NonEmpty]
+        Boxes[NonEmpty,0:2]=numpy.minimum.reduceat(XY,Starts,axis=0)
+        Boxes[NonEmpty,2:4]=numpy.maximum.reduceat(XY,Starts,axis=0)
+    return(Boxes)
+
+############################################
+# Purpose: Centroids, for all features at once: area weighted for polygons, length
+#          weighted for lines, the vertex mean for points and degenerate shapes
+# Input: XY, PartOffsets, FeatureParts - from GeometryArrays
+#        ShapeType - shape type code
+# Output: Centroids - (features,2) array (NaN for null shapes)
+def CentroidKernel(XY,PartOffsets,FeatureParts,ShapeType):
+    import numpy
+    import ShapefileIO
+    DX,DY,Cross=SegmentTerms(XY,PartOffsets)
+    VertexOffsets=PartOffsets[FeatureParts]
+    Counts=numpy.diff(VertexOffsets).astype(numpy.float64)
+    Counts[Counts==0]=numpy.nan
+    Centroids=numpy.column_stack([RangeSums(XY[:,0],VertexOffsets)/Counts,RangeSums(XY[:,1],VertexOffsets)/Counts])
+    if ShapeType in (ShapefileIO.PolygonShape,ShapefileIO.PolygonZShape,ShapefileIO.PolygonMShape):
+        # sum of each edge's triangle with the origin, weighted by its signed area
+        Weights=Cross
+        MidX=(2*XY[:,0]+DX)/3.0
+        MidY=(2*XY[:,1]+DY)/3.0
+    elif ShapeType in (ShapefileIO.PolylineShape,ShapefileIO.PolylineZShape,ShapefileIO.PolylineMShape):
+        Weights=numpy.hypot(DX,DY)
+        MidX=XY[:,0]+DX/2.0
+        MidY=XY[:,1]+DY/2.0
+    else:
+        return(Centroids)
+    Total=RangeSums(Weights,VertexOffsets)
+    Weighted=Total!=0
+    Centroids[Weighted,0]=RangeSums(Weights*MidX,VertexOffsets)[Weighted]/Total[Weighted]
+    Centroids[Weighted,1]=RangeSums(Weights*MidY,VertexOffsets)[Weighted]/Total[Weighted]
+    return(Centroids)
+
+############################################
+# Purpose: All geometry measures of a shapefile from one decode of its records
+# Input: Shapefile - shapefile, or a native selection (selected records only)
+# Output: Measures - dictionary of (features,) arrays: "Area", "Length", "VertexCount",
+#         "Centroid" (features,2) and "Bounds" (features,4)
+def GeometryMeasures(Shapefile):
+    XY,PartOffsets,FeatureParts,ShapeType=GeometryArrays(Shapefile)
+    return({"Area":AreaKernel(XY,PartOffsets,FeatureParts,ShapeType),
+            "Length":LengthKernel(XY,PartOffsets,FeatureParts),
+            "VertexCount":VertexCountKernel(PartOffsets,FeatureParts),
+            "Centroid":CentroidKernel(XY,PartOffsets,FeatureParts,ShapeType),
+            "Bounds":BoundsKernel(XY,PartOffsets,FeatureParts)})
+
+############################################
+# Purpose: Whether a dataset can be measured natively (a shapefile or a native selection,
+#          not a geodatabase feature class or a layer name)
+# Input: Shapefile - dataset
+# Output: True or False
+def NativeGeometry(Shapefile):
+    import os
+    if hasattr(Shapefile,"Reader"):
+        return(True)
+    return(hasattr(Shapefile,"lower") and Shapefile[-4:].lower()==".shp" and os.path.isfile(Shapefile))
+
 ############################################
 # Purpose: Extract feature line lengths
 # Input: PolyShapefile - Polyline or polygon shapefile
 # Output: PolyLengths - List of polyline lengths
 def Length(PolyShapefile):
     try:
+        # Shapefiles are measured for all features at once
+        if NativeGeometry(PolyShapefile):
+            XY,PartOffsets,FeatureParts,ShapeType=GeometryArrays(PolyShapefile)
+            return(LengthKernel(XY,PartOffsets,FeatureParts).tolist())
+
         # Create search cursor
         rows = arcpy.SearchCursor(PolyShapefile)
         
@@ -102,6 +376,10 @@ def Length(PolyShapefile):
 # Output: TheList - List of field entries
 def ListFromField(TheShapefile,TheField):
     try:
+        # Native selections hold their attribute columns
+        if hasattr(TheShapefile,"Reader"):
+            return(TheShapefile.Values(TheField).tolist())
+
         # Create search cursor
         rows = arcpy.SearchCursor(TheShapefile,"","",TheField)
         
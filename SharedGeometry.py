@@ -0,0 +1,201 @@
+#######################################################################
+# SharedGeometry
+#
+# Purpose: Share coordinate arrays with pool worker processes without pickling them.
+#          An array is copied once into a shared block and workers are handed a small
+#          descriptor (block name, dtype, shape) from which they attach a NumPy view of
+#          the same memory.
+#
+#          Blocks are multiprocessing.shared_memory blocks where the interpreter has
+#          them (Python 3.8 on); otherwise (Python 2.7 with ArcGIS) they are memory
+#          mapped scratch files, which the workers map the same way.
+#
+#          The process that shares arrays owns the blocks: SharedBlocks.Release unlinks
+#          them, and RunPool releases them when its pool has shut down.  Workers keep the
+#          blocks they attached until they exit.
+#
+# Usage:
+#         Blocks=SharedBlocks()
+#         XYDescriptor,ZDescriptor,StartsDescriptor=Blocks.ShareCoordinates(Shapefile)
+#         Results=RunPool(Function,[(XYDescriptor,First,Last) ...],Workers,Blocks)
+#         # in Function: XY=AttachArray(XYDescriptor)
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import tempfile
+import itertools
+import numpy
+
+try:
+	from multiprocessing import shared_memory
+except ImportError:
+	shared_memory=None
+
+# Numbers making block names unique within the process
+BlockNumbers=itertools.count(1)
+
+# Blocks attached in this process by name: [block handle, array]
+AttachedBlocks={}
+
+###################################################################################
+# Class holding the shared blocks created by one process
+###################################################################################
+class SharedBlocks:
+
+	###################################################################################
+	# Constructor for the shared blocks class
+	# Inputs:
+	#         ScratchFolder - folder for memory mapped blocks when shared memory is not
+	#                         available ("" for the temporary folder)
+	###################################################################################
+	def __init__(self,ScratchFolder=""):
+		if ScratchFolder=="":
+			ScratchFolder=tempfile.gettempdir()
+		self.ScratchFolder=ScratchFolder
+		self.Blocks=[]
+
+	###################################################################################
+	# Copies an array into a new shared block
+	# Inputs:
+	#         Array - NumPy array
+	# Output:
+	#         Descriptor - (Kind, Name, dtype string, shape) to pass to AttachArray
+	###################################################################################
+	def Share(self,Array):
+		try:
+			Array=numpy.ascontiguousarray(Array)
+			Name="geom_"+str(os.getpid())+"_"+str(next(BlockNumbers))
+			# zero length blocks are not allowed
+			Size=max(Array.nbytes,1)
+			if shared_memory is not None:
+				Block=shared_memory.SharedMemory(name=Name,create=True,size=Size)
+				View=numpy.ndarray(Array.shape,dtype=Array.dtype,buffer=Block.buf)
+				View[...]=Array
+				Descriptor=("SHM",Block.name,Array.dtype.str,Array.shape)
+			else:
+				Path=os.path.join(self.ScratchFolder,Name+".bin")
+				Block=numpy.memmap(Path,dtype=numpy.uint8,mode="w+",shape=(Size,))
+				View=numpy.ndarray(Array.shape,dtype=Array.dtype,buffer=Block)
+				View[...]=Array
+				Block.flush()
+				Descriptor=("MAP",Path,Array.dtype.str,Array.shape)
+			self.Blocks.append((Descriptor,Block))
+			return(Descriptor)
+		except Exception as err:
+			raise RuntimeError("** Error: Share Failed ("+str(err)+")")
+
+	###################################################################################
+	# Shares the coordinates of a shapefile (ShapefileProperties.CoordinateArrays)
+	# Inputs:
+	#         Shapefile - shapefile, or a native selection
+	# Output:
+	#         [XYDescriptor, ZDescriptor, StartsDescriptor] - ZDescriptor is None when the
+	#          shapefile has no Z
+	###################################################################################
+	def ShareCoordinates(self,Shapefile):
+		import ShapefileProperties as ShpProp
+		XY,Z,Starts=ShpProp.CoordinateArrays(Shapefile)
+		ZDescriptor=None
+		if Z is not None:
+			ZDescriptor=self.Share(Z)
+		return([self.Share(XY),ZDescriptor,self.Share(Starts)])
+
+	###################################################################################
+	# Unlinks the blocks created here - call once the workers using them have finished
+	#  A mapped file can only be removed (on Windows) once every map of it is closed, and
+	#  a map only closes once no array uses it: the arrays on a block (this process's
+	#  own attachment included) are dropped before its maps are closed.  Blocks that
+	#  cannot be removed are reported after trying the rest.
+	###################################################################################
+	def Release(self):
+		Blocks=self.Blocks
+		self.Blocks=[]
+		Failed=[]
+		while Blocks!=[]:
+			Descriptor,Block=Blocks.pop()
+			Attached=AttachedBlocks.pop(Descriptor[1],None)
+			try:
+				if Descriptor[0]=="SHM":
+					Maps=[Block]
+					if Attached is not None:
+						Maps.append(Attached[0])
+				else:
+					Maps=[Block._mmap]
+					if Attached is not None:
+						Maps.append(Attached[0]._mmap)
+				Block=None
+				Attached=None
+				for Map in Maps:
+					if Map is not None:
+						Map.close()
+				if Descriptor[0]=="SHM":
+					Maps[0].unlink()
+				else:
+					os.remove(Descriptor[1])
+			except Exception as err:
+				Failed.append(Descriptor[1]+": "+str(err))
+		if Failed!=[]:
+			raise RuntimeError("** Error: Release Failed ("+"; ".join(Failed)+")")
+
+################################################
+# Purpose: Attach a NumPy view of a shared block, without copying
+# Input: Descriptor - descriptor from SharedBlocks.Share
+# Output: Array - read only array on the shared memory
+def AttachArray(Descriptor):
+	Kind,Name,DType,Shape=Descriptor
+	if Name not in AttachedBlocks:
+		if Kind=="SHM":
+			Block=AttachSharedMemory(Name)
+			Buffer=Block.buf
+		else:
+			Block=numpy.memmap(Name,dtype=numpy.uint8,mode="r")
+			Buffer=Block
+		Array=numpy.ndarray(tuple(Shape),dtype=numpy.dtype(DType),buffer=Buffer)
+		Array.flags.writeable=False
+		AttachedBlocks[Name]=[Block,Array]
+	return(AttachedBlocks[Name][1])
+
+################################################
+# Purpose: Attach an existing shared memory block without the worker taking ownership
+#          (the creating process unlinks it)
+# Input: Name - block name
+# Output: Block - SharedMemory
+def AttachSharedMemory(Name):
+	try:
+		# Python 3.13 on
+		return(shared_memory.SharedMemory(name=Name,track=False))
+	except TypeError:
+		Block=shared_memory.SharedMemory(name=Name)
+		# spawned workers have their own resource tracker, which would unlink the
+		#  block when the worker exits
+		import multiprocessing
+		if multiprocessing.get_start_method()!="fork":
+			from multiprocessing import resource_tracker
+			resource_tracker.unregister(Block._name,"shared_memory")
+		return(Block)
+
+################################################
+# Purpose: Run tasks in a process pool and release the shared blocks when it shuts down
+# Input: Function - module level function taking one task
+#        Tasks - list of tasks (holding descriptors rather than arrays)
+#        Workers - number of processes (0 for one per processor)
+#        Blocks - SharedBlocks used by the tasks
+# Output: Results - list of Function results, one per task
+def RunPool(Function,Tasks,Workers,Blocks):
+	import multiprocessing
+	try:
+		if Workers==0:
+			Workers=multiprocessing.cpu_count()
+		Workers=min(Workers,len(Tasks))
+		if Workers<=1:
+			return([Function(Task) for Task in Tasks])
+		Pool=multiprocessing.Pool(Workers)
+		try:
+			Results=Pool.map(Function,Tasks)
+		finally:
+			Pool.close()
+			Pool.join()
+		return(Results)
+	finally:
+		Blocks.Release()
@@ -0,0 +1,487 @@
+#######################################################################
+# SpatialIndex
+#
+# Purpose: Packed Sort-Tile-Recursive (STR) R-tree over the record bounding boxes of a
+#          shapefile, and native INTERSECT / WITHIN_A_DISTANCE location selections
+#          built on it.
+#
+# The tree is built once per dataset and saved next to the shapefile as
+#  <name>.strtree.  The sidecar stores the .shp modification time and size, and is
+#  rebuilt automatically when either changes.
+#
+# Tree layout: level 0 holds the record boxes in STR order with their FIDs; each
+#  higher level holds node boxes with the start and count of their children in the
+#  level below.  Children of a node are consecutive, so a query walks the levels
+#  with array operations only.
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import math
+import numpy
+import ShapefileIO
+
+# Maximum number of children per node
+NodeCapacity=16
+# Extension of the sidecar index file
+IndexExtension=".strtree"
+# Distance at which features are considered to intersect (XY tolerance)
+IntersectTolerance=0.001
+# Largest number of segment pairs compared at once
+PairBlock=2000000
+# Number of query boxes walked through the tree together
+QueryBlock=20000
+
+# Indexes already loaded in this process by shapefile name
+LoadedIndexes={}
+
+################################################
+# Purpose: Order boxes by Sort-Tile-Recursive packing
+# Input: Boxes - (n,4) array of Xmin,Ymin,Xmax,Ymax
+#        Capacity - entries per node
+# Output: Order - index array putting the boxes in packing order, so that each
+#          consecutive run of Capacity entries forms one node
+def STROrder(Boxes,Capacity):
+	NumBoxes=Boxes.shape[0]
+	NumNodes=int(math.ceil(NumBoxes/float(Capacity)))
+	CenterX=(Boxes[:,0]+Boxes[:,2])/2.0
+	CenterY=(Boxes[:,1]+Boxes[:,3])/2.0
+	# slices in proportion to the extent's width over height, so that nodes of long
+	# east-west datasets (a river corridor) come out square rather than as strips
+	Width=float(CenterX.max()-CenterX.min()) if NumBoxes>0 else 0.0
+	Height=float(CenterY.max()-CenterY.min()) if NumBoxes>0 else 0.0
+	Aspect=Width/Height if Height>0 else float(NumNodes)
+	NumSlices=int(math.ceil(math.sqrt(NumNodes*min(max(Aspect,1.0/NumNodes),float(NumNodes)))))
+	NumSlices=min(max(NumSlices,1),max(NumNodes,1))
+	# each vertical slice holds a whole number of nodes
+	SliceSize=int(math.ceil(NumNodes/float(NumSlices)))*Capacity
+	Order=numpy.argsort(CenterX,kind="mergesort")
+	SliceId=numpy.arange(NumBoxes)//SliceSize
+	# within each slice sort by y
+	return(Order[numpy.lexsort((CenterY[Order],SliceId))])
+
+################################################
+# Purpose: Boxes enclosing consecutive runs of entries
+# Input: Boxes - (n,4) array in packing order
+#        Starts - first entry of each run
+# Output: NodeBoxes - (len(Starts),4) array
+def GroupBoxes(Boxes,Starts):
+	NodeBoxes=numpy.empty((len(Starts),4),dtype=numpy.float64)
+	NodeBoxes[:,0]=numpy.minimum.reduceat(Boxes[:,0],Starts)
+	NodeBoxes[:,1]=numpy.minimum.reduceat(Boxes[:,1],Starts)
+	NodeBoxes[:,2]=numpy.maximum.reduceat(Boxes[:,2],Starts)
+	NodeBoxes[:,3]=numpy.maximum.reduceat(Boxes[:,3],Starts)
+	return(NodeBoxes)
+
+################################################
+# Purpose: Indices start..start+count-1 for several ranges at once
+# Input: Starts, Counts - integer arrays
+# Output: Indices - concatenated ranges
+def ExpandRanges(Starts,Counts):
+	Total=int(Counts.sum())
+	if Total==0:
+		return(numpy.zeros(0,dtype=numpy.int64))
+	Offsets=numpy.repeat(Starts-numpy.cumsum(Counts)+Counts,Counts)
+	return(Offsets+numpy.arange(Total))
+
+###################################################################################
+# Class for a packed STR R-tree
+###################################################################################
+class PackedRTree:
+
+	###################################################################################
+	# Constructor - builds the tree from record boxes, or wraps loaded level arrays
+	# Inputs:
+	#         Boxes - (n,4) array of record boxes (NaN boxes are left out), or None
+	#         Levels - list of level dictionaries when loading a saved tree
+	###################################################################################
+	def __init__(self,Boxes,Levels=None):
+		if Levels is not None:
+			self.Levels=Levels
+			return
+		Ids=numpy.flatnonzero(~numpy.isnan(Boxes).any(axis=1))
+		Boxes=Boxes[Ids]
+		if len(Ids)==0:
+			self.Levels=[{"Boxes":numpy.zeros((0,4)),"Ids":Ids}]
+			return
+		Order=STROrder(Boxes,NodeCapacity)
+		self.Levels=[{"Boxes":Boxes[Order],"Ids":Ids[Order]}]
+		while self.Levels[-1]["Boxes"].shape[0]>1:
+			Below=self.Levels[-1]
+			Starts=numpy.arange(0,Below["Boxes"].shape[0],NodeCapacity)
+			Counts=numpy.diff(numpy.append(Starts,Below["Boxes"].shape[0]))
+			Level={"Boxes":GroupBoxes(Below["Boxes"],Starts),"Start":Starts,"Count":Counts}
+			# pack the new level too, carrying the child ranges along
+			if Level["Boxes"].shape[0]>1:
+				Order=STROrder(Level["Boxes"],NodeCapacity)
+				Level={"Boxes":Level["Boxes"][Order],"Start":Starts[Order],"Count":Counts[Order]}
+			self.Levels=self.Levels+[Level]
+
+	###################################################################################
+	# FIDs of the records whose boxes intersect a query box
+	# Inputs:
+	#         Box - (Xmin,Ymin,Xmax,Ymax)
+	###################################################################################
+	def Query(self,Box):
+		Xmin,Ymin,Xmax,Ymax=Box
+		Nodes=numpy.arange(self.Levels[-1]["Boxes"].shape[0])
+		for LevelNum in range(len(self.Levels)-1,-1,-1):
+			Level=self.Levels[LevelNum]
+			NodeBoxes=Level["Boxes"][Nodes]
+			Hit=Nodes[(NodeBoxes[:,0]<=Xmax)&(NodeBoxes[:,2]>=Xmin)&
+			          (NodeBoxes[:,1]<=Ymax)&(NodeBoxes[:,3]>=Ymin)]
+			if LevelNum==0:
+				return(Level["Ids"][Hit])
+			Nodes=ExpandRanges(Level["Start"][Hit],Level["Count"][Hit])
+
+	###################################################################################
+	# All (query, FID) pairs whose boxes intersect, for many query boxes at once
+	#  The levels are walked with every query in the same arrays
+	# Inputs:
+	#         QueryBoxes - (n,4) array of Xmin,Ymin,Xmax,Ymax
+	# Outputs:
+	#         [QueryNums, FIDs] - matching integer arrays
+	###################################################################################
+	def QueryMany(self,QueryBoxes):
+		QueryNums=[]
+		FIDs=[]
+		for Start in range(0,QueryBoxes.shape[0],QueryBlock):
+			Boxes=QueryBoxes[Start:Start+QueryBlock]
+			NumTop=self.Levels[-1]["Boxes"].shape[0]
+			Queries=numpy.repeat(numpy.arange(Boxes.shape[0]),NumTop)
+			Nodes=numpy.tile(numpy.arange(NumTop),Boxes.shape[0])
+			for LevelNum in range(len(self.Levels)-1,-1,-1):
+				Level=self.Levels[LevelNum]
+				NodeBoxes=Level["Boxes"][Nodes]
+				QueryBox=Boxes[Queries]
+				Hit=((NodeBoxes[:,0]<=QueryBox[:,2])&(NodeBoxes[:,2]>=QueryBox[:,0])&
+				     (NodeBoxes[:,1]<=QueryBox[:,3])&(NodeBoxes[:,3]>=QueryBox[:,1]))
+				Queries=Queries[Hit]
+				Nodes=Nodes[Hit]
+				if LevelNum==0:
+					QueryNums.append(Queries+Start)
+					FIDs.append(Level["Ids"][Nodes])
+				else:
+					Counts=Level["Count"][Nodes]
+					Nodes=ExpandRanges(Level["Start"][Nodes],Counts)
+					Queries=numpy.repeat(Queries,Counts)
+		if QueryNums==[]:
+			return([numpy.zeros(0,dtype=numpy.int64),numpy.zeros(0,dtype=numpy.int64)])
+		return([numpy.concatenate(QueryNums),numpy.concatenate(FIDs)])
+
+	###################################################################################
+	# Saves the tree with the source file stamp
+	# Inputs:
+	#         IndexFile - sidecar path and name
+	#         Stamp - (modification time, size) of the source .shp
+	###################################################################################
+	def Save(self,IndexFile,Stamp):
+		Arrays=TreeArrays(self,"")
+		Arrays["Stamp"]=numpy.array(Stamp,dtype=numpy.float64)
+		OutFile=open(IndexFile,"wb")
+		numpy.savez(OutFile,**Arrays)
+		OutFile.close()
+
+################################################
+# Purpose: Level arrays of a tree by name, for saving in an .npz file
+# Input: Tree - PackedRTree
+#        Prefix - string put before each array name (several trees can share a file)
+# Output: Arrays - dictionary of name to array
+def TreeArrays(Tree,Prefix):
+	Arrays={Prefix+"NumLevels":numpy.array([len(Tree.Levels)])}
+	for LevelNum in range(len(Tree.Levels)):
+		for Key in Tree.Levels[LevelNum]:
+			Arrays[Prefix+Key+str(LevelNum)]=Tree.Levels[LevelNum][Key]
+	return(Arrays)
+
+################################################
+# Purpose: Tree from saved level arrays (TreeArrays)
+# Input: Saved - loaded .npz file or dictionary of arrays
+#        Prefix - string before each array name
+# Output: Tree - PackedRTree
+def TreeFromArrays(Saved,Prefix):
+	Levels=[]
+	for LevelNum in range(int(Saved[Prefix+"NumLevels"][0])):
+		if LevelNum==0:
+			Keys=("Boxes","Ids")
+		else:
+			Keys=("Boxes","Start","Count")
+		Levels=Levels+[dict([(Name,Saved[Prefix+Name+str(LevelNum)]) for Name in Keys])]
+	return(PackedRTree(None,Levels))
+
+################################################
+# Purpose: Modification time and size of a shapefile's main file
+# Input: ShapefileName - shapefile path and name
+# Output: (mtime, size)
+def SourceStamp(ShapefileName):
+	Status=os.stat(ShapefileIO.BaseName(ShapefileName)+".shp")
+	return((Status.st_mtime,float(Status.st_size)))
+
+################################################
+# Purpose: Load the sidecar index of a shapefile, building and saving it if it is
+#          missing or older than the shapefile
+# Input: ShapefileName - shapefile path and name
+#        Reader - ShapefileReader for the shapefile ("" to open one when needed)
+# Output: Tree - PackedRTree
+def LoadIndex(ShapefileName,Reader):
+	try:
+		Stamp=SourceStamp(ShapefileName)
+		Key=os.path.abspath(ShapefileIO.BaseName(ShapefileName))
+		if Key in LoadedIndexes and LoadedIndexes[Key][0]==Stamp:
+			return(LoadedIndexes[Key][1])
+
+		IndexFile=ShapefileIO.BaseName(ShapefileName)+IndexExtension
+		Tree=None
+		if os.path.isfile(IndexFile):
+			try:
+				InFile=open(IndexFile,"rb")
+				try:
+					Saved=numpy.load(InFile)
+					if tuple(Saved["Stamp"])==Stamp:
+						Tree=TreeFromArrays(Saved,"")
+				finally:
+					InFile.close()
+			except Exception:
+				# unreadable sidecar: rebuild below
+				Tree=None
+
+		if Tree is None:
+			if Reader=="":
+				Reader=ShapefileIO.ShapefileReader(ShapefileName)
+			Tree=PackedRTree(Reader.Boxes())
+			try:
+				Tree.Save(IndexFile,Stamp)
+			except Exception:
+				# read-only folder: keep the tree for this process only
+				pass
+
+		LoadedIndexes[Key]=(Stamp,Tree)
+		return(Tree)
+	except Exception as err:
+		raise RuntimeError("** Error: LoadIndex Failed ("+str(err)+")")
+
+################################################
+# Purpose: Segment end points of a geometry (points become zero length segments)
+# Input: XY - (n,2) vertex array
+#        PartStarts - list of vertex indices where parts start
+#        ShapeType - shape type code
+# Output: [Starts, Ends] - (m,2) arrays
+def Segments(XY,PartStarts,ShapeType):
+	if ShapeType in ShapefileIO.PointShapes or ShapeType in (ShapefileIO.MultiPointShape,
+	                                                          ShapefileIO.MultiPointZShape,
+	                                                          ShapefileIO.MultiPointMShape):
+		return([XY,XY])
+	# drop the segments joining the end of one part to the start of the next
+	Keep=numpy.ones(max(XY.shape[0]-1,0),dtype=bool)
+	for PartStart in PartStarts[1:]:
+		Keep[PartStart-1]=False
+	return([XY[0:-1][Keep],XY[1:][Keep]])
+
+################################################
+# Purpose: Distances between segments (broadcasting)
+# Input: P0, P1 - start and end points of the first segments (...,2)
+#        Q0, Q1 - start and end points of the second segments (...,2)
+# Output: Distance - array of distances (0 where segments cross)
+def SegmentDistances(P0,P1,Q0,Q1):
+	# proper or touching crossings from orientation tests
+	DP=P1-P0
+	DQ=Q1-Q0
+	O1=DP[...,0]*(Q0[...,1]-P0[...,1])-DP[...,1]*(Q0[...,0]-P0[...,0])
+	O2=DP[...,0]*(Q1[...,1]-P0[...,1])-DP[...,1]*(Q1[...,0]-P0[...,0])
+	O3=DQ[...,0]*(P0[...,1]-Q0[...,1])-DQ[...,1]*(P0[...,0]-Q0[...,0])
+	O4=DQ[...,0]*(P1[...,1]-Q0[...,1])-DQ[...,1]*(P1[...,0]-Q0[...,0])
+	# collinear pairs are left to the end point distances
+	Crossing=(O1*O2<=0)&(O3*O4<=0)&~((O1==0)&(O2==0))&~((O3==0)&(O4==0))
+	Distance=numpy.minimum(
+		numpy.minimum(PointSegmentDistance(Q0,P0,P1),PointSegmentDistance(Q1,P0,P1)),
+		numpy.minimum(PointSegmentDistance(P0,Q0,Q1),PointSegmentDistance(P1,Q0,Q1)))
+	return(numpy.where(Crossing,0.0,Distance))
+
+################################################
+# Purpose: Smallest distance between two sets of segments
+# Input: A0, A1 - (n,2) start and end points of the first set
+#        B0, B1 - (m,2) start and end points of the second set
+# Output: Distance - float (0 where any segments cross)
+def SegmentSetDistance(A0,A1,B0,B1):
+	if A0.shape[0]==0 or B0.shape[0]==0:
+		return(numpy.inf)
+	Best=numpy.inf
+	Block=max(1,PairBlock//B0.shape[0])
+	for Start in range(0,A0.shape[0],Block):
+		Distance=SegmentDistances(A0[Start:Start+Block,None,:],A1[Start:Start+Block,None,:],B0[None,:,:],B1[None,:,:])
+		Best=min(Best,float(Distance.min()))
+		if Best==0.0:
+			return(0.0)
+	return(Best)
+
+################################################
+# Purpose: Distance from points to segments (broadcasting)
+# Input: P - points (...,2)
+#        S0, S1 - segment start and end points (...,2)
+# Output: Distance - array of distances
+def PointSegmentDistance(P,S0,S1):
+	D=S1-S0
+	LengthSq=D[...,0]**2+D[...,1]**2
+	Safe=numpy.where(LengthSq>0,LengthSq,1.0)
+	T=((P[...,0]-S0[...,0])*D[...,0]+(P[...,1]-S0[...,1])*D[...,1])/Safe
+	T=numpy.clip(numpy.where(LengthSq>0,T,0.0),0.0,1.0)
+	DX=S0[...,0]+T*D[...,0]-P[...,0]
+	DY=S0[...,1]+T*D[...,1]-P[...,1]
+	return(numpy.sqrt(DX**2+DY**2))
+
+################################################
+# Purpose: Crossing number point in polygon test for many points
+# Input: Points - (n,2) array
+#        S0, S1 - (m,2) polygon edge start and end points (all rings)
+# Output: Inside - boolean array, True for points inside (even-odd rule)
+def PointsInPolygon(Points,S0,S1):
+	Inside=numpy.zeros(Points.shape[0],dtype=bool)
+	if S0.shape[0]==0:
+		return(Inside)
+	Block=max(1,PairBlock//S0.shape[0])
+	for Start in range(0,Points.shape[0],Block):
+		PX=Points[Start:Start+Block,0][:,None]
+		PY=Points[Start:Start+Block,1][:,None]
+		Straddle=(S0[None,:,1]>PY)!=(S1[None,:,1]>PY)
+		DY=numpy.where(Straddle,S1[None,:,1]-S0[None,:,1],1.0)
+		XCross=S0[None,:,0]+(PY-S0[None,:,1])*(S1[None,:,0]-S0[None,:,0])/DY
+		Crossings=(Straddle&(PX<XCross)).sum(axis=1)
+		Inside[Start:Start+Block]=(Crossings%2)==1
+	return(Inside)
+
+################################################
+# Purpose: Edges of polygon records as flat arrays
+# Input: Reader - ShapefileReader of a polygon shapefile
+#        FIDs - record numbers
+# Output: [S0, S1, EdgeOffsets] - (m,2) edge start and end points of every ring, and
+#          (len(FIDs)+1,) offsets: the edges of FIDs[i] are EdgeOffsets[i]:EdgeOffsets[i+1]
+def PolygonEdges(Reader,FIDs):
+	Starts=[]
+	Ends=[]
+	EdgeOffsets=[0]
+	for FID in FIDs:
+		Content=Reader.RecordContent(FID)
+		ShapeType=int(numpy.frombuffer(Content,dtype="<i4",count=1)[0])
+		if ShapeType==ShapefileIO.NullShape:
+			EdgeOffsets.append(EdgeOffsets[-1])
+			continue
+		XY,PartStarts=ShapefileIO.RecordGeometry(Content)
+		S0,S1=Segments(XY,PartStarts,ShapeType)
+		Starts.append(S0)
+		Ends.append(S1)
+		EdgeOffsets.append(EdgeOffsets[-1]+S0.shape[0])
+	if Starts==[]:
+		return([numpy.zeros((0,2)),numpy.zeros((0,2)),numpy.array(EdgeOffsets,dtype=numpy.int64)])
+	return([numpy.concatenate(Starts),numpy.concatenate(Ends),numpy.array(EdgeOffsets,dtype=numpy.int64)])
+
+################################################
+# Purpose: Crossing number test for many (point, polygon) pairs at once, e.g. the
+#          candidate pairs from PackedRTree.QueryMany.  Each pair is expanded over the
+#          edges of its polygon and the crossings are counted per pair.
+# Input: Points - (k,2) array, the point of each pair
+#        Polygons - (k,) polygon number of each pair (position in EdgeOffsets)
+#        S0, S1, EdgeOffsets - polygon edges from PolygonEdges
+# Output: Inside - (k,) boolean array, True where the point is inside its polygon (even-odd rule)
+def PairsInPolygons(Points,Polygons,S0,S1,EdgeOffsets):
+	Inside=numpy.zeros(Points.shape[0],dtype=bool)
+	if Points.shape[0]==0:
+		return(Inside)
+	Counts=(EdgeOffsets[1:]-EdgeOffsets[0:-1])[Polygons]
+	# blocks of pairs expanding to about PairBlock edges
+	Ends=numpy.cumsum(Counts)
+	Cuts=numpy.searchsorted(Ends,numpy.arange(PairBlock,int(Ends[-1]),PairBlock),"left")+1
+	Bounds=numpy.unique(numpy.concatenate([[0],Cuts,[Points.shape[0]]]))
+	for First,Last in zip(Bounds[0:-1],Bounds[1:]):
+		BlockCounts=Counts[First:Last]
+		Edges=ExpandRanges(EdgeOffsets[Polygons[First:Last]],BlockCounts)
+		Pairs=numpy.repeat(numpy.arange(Last-First),BlockCounts)
+		PX=Points[First:Last,0][Pairs]
+		PY=Points[First:Last,1][Pairs]
+		E0=S0[Edges]
+		E1=S1[Edges]
+		Straddle=(E0[:,1]>PY)!=(E1[:,1]>PY)
+		DY=numpy.where(Straddle,E1[:,1]-E0[:,1],1.0)
+		XCross=E0[:,0]+(PY-E0[:,1])*(E1[:,0]-E0[:,0])/DY
+		Crossings=numpy.bincount(Pairs[Straddle&(PX<XCross)],minlength=Last-First)
+		Inside[First:Last]=(Crossings%2)==1
+	return(Inside)
+
+################################################
+# Purpose: Distance between two record contents (0 when they intersect, including a
+#          geometry lying inside a polygon)
+# Input: ContentA, ContentB - record contents
+# Output: Distance - float
+def FeatureDistance(ContentA,ContentB):
+	Geometries=[]
+	for Content in (ContentA,ContentB):
+		ShapeType=int(numpy.frombuffer(Content,dtype="<i4",count=1)[0])
+		XY,PartStarts=ShapefileIO.RecordGeometry(Content)
+		Geometries=Geometries+[(ShapeType,XY,PartStarts,Segments(XY,PartStarts,ShapeType))]
+	(TypeA,XYA,PartsA,(A0,A1)),(TypeB,XYB,PartsB,(B0,B1))=Geometries
+	Distance=SegmentSetDistance(A0,A1,B0,B1)
+	if Distance==0.0:
+		return(0.0)
+	# no boundary contact: one may still lie wholly inside the other polygon
+	Polygons=(ShapefileIO.PolygonShape,ShapefileIO.PolygonZShape,ShapefileIO.PolygonMShape)
+	if TypeA in Polygons and XYB.shape[0]>0 and PointsInPolygon(XYB[PartsB],A0,A1).any():
+		return(0.0)
+	if TypeB in Polygons and XYA.shape[0]>0 and PointsInPolygon(XYA[PartsA],B0,B1).any():
+		return(0.0)
+	return(Distance)
+
+################################################
+# Purpose: Number from a distance parameter ("#", "", 10, "10 Meters")
+# Input: Distance - search distance parameter
+# Output: Value - float
+def DistanceValue(Distance):
+	if Distance in ("#","",None):
+		return(0.0)
+	if isinstance(Distance,(int,float)):
+		return(float(Distance))
+	return(float(str(Distance).split()[0]))
+
+################################################
+# Purpose: Select records of a Selection by their location relative to other features,
+#          using the packed R-tree of the selection's shapefile
+# Input: InSelection - Selection to update
+#        Relationship - "INTERSECT" or "WITHIN_A_DISTANCE" ("#" with SWITCH/CLEAR_SELECTION)
+#        SelectFeatures - Selection (its selected records are used) or shapefile path and name
+#        Distance - search distance
+#        Type - type of selection as string: e.g. "NEW_SELECTION", "ADD_TO_SELECTION"
+def SelectByLocation(InSelection,Relationship,SelectFeatures,Distance,Type):
+	try:
+		if Type in ("SWITCH_SELECTION","CLEAR_SELECTION"):
+			InSelection.Select(Type,"")
+			return
+		if Relationship not in ("INTERSECT","WITHIN_A_DISTANCE"):
+			raise RuntimeError("Relationship "+format(Relationship)+" is not supported natively")
+
+		SearchDistance=DistanceValue(Distance)
+		if Relationship=="INTERSECT":
+			SearchDistance=max(SearchDistance,IntersectTolerance)
+
+		# Features to select by: the selected records of a Selection, or a whole shapefile
+		if hasattr(SelectFeatures,"Reader"):
+			SelectReader=SelectFeatures.Reader
+			SelectFIDs=SelectFeatures.FIDs()
+		else:
+			SelectReader=ShapefileIO.ShapefileReader(SelectFeatures)
+			SelectFIDs=numpy.arange(SelectReader.NumRecords)
+
+		Tree=LoadIndex(InSelection.Shapefile,InSelection.Reader)
+		SelectBoxes=SelectReader.Boxes()
+		Mask=numpy.zeros(InSelection.Reader.NumRecords,dtype=bool)
+		for SelectFID in SelectFIDs:
+			Box=SelectBoxes[SelectFID]
+			if numpy.isnan(Box).any():
+				continue
+			Candidates=Tree.Query((Box[0]-SearchDistance,Box[1]-SearchDistance,
+			                       Box[2]+SearchDistance,Box[3]+SearchDistance))
+			SelectContent=SelectReader.RecordContent(SelectFID)
+			for FID in Candidates:
+				if not Mask[FID] and FeatureDistance(InSelection.Reader.RecordContent(FID),
+				                                    SelectContent)<=SearchDistance:
+					Mask[FID]=True
+		InSelection.Combine(Type,Mask)
+	except Exception as err:
+		raise RuntimeError("** Error: SelectByLocation Failed ("+str(err)+")")
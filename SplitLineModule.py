@@ -14,6 +14,7 @@
 #        SplitLength: number specifying interval at which to split input line
 #        AsArcGISTool: binary specifying if running as a GIS tool (1) or not (0) to control messaging
 #        FlipLine: binary specifying whether the start of the centerline aligns with the desired start (0), and it actually the end (1)
+#        Job: JobContext owning layer names and geoprocessor settings (None for the shared default)
 #
 # Outputs (name same as input shapefile with suffix): 
 #        _single.shp (PolylineSingle): shapefile with polylines merged if input had more than one polyline
@@ -35,7 +36,7 @@
 #
 # Modified: 3/18/2013
 #######################################################################
-def SplitLine(TheInFile,TheOutFilePath,SplitLength,AsArcGISTool,FlipLine):
+def SplitLine(TheInFile,TheOutFilePath,SplitLength,AsArcGISTool,FlipLine,Job=None):
 	try:
 		import os
 		import ManagementInterface as MgmtGIS
@@ -44,7 +45,7 @@ def SplitLine(TheInFile,TheOutFilePath,SplitLength,AsArcGISTool,FlipLine):
 
 		'''Setup classes and file output'''
 		#Create instance of management class
-		MgmtInterface=MgmtGIS.ManagementInterface() 
+		MgmtInterface=MgmtGIS.ManagementInterface(Job) 
 			
 		# Extract just the file name
 		TheFileName=os.path.basename(TheInFile)		
@@ -60,11 +61,12 @@ def SplitLine(TheInFile,TheOutFilePath,SplitLength,AsArcGISTool,FlipLine):
 		NumFeatures=MgmtInterface.CountRows(TheInFile)
 		#Merge input line into 1 feature if multiple features or 
 		# rename previous variable to match new name
+		BranchPoints=[]
 		if NumFeatures>1:
 			PolylineSingle=TheOutFilePath+TheFileName[0:-4]+"_single.shp"
 			# Merge lines only if they will be single part and therefore continuous
-			MgmtInterface.Dissolve(TheInFile,PolylineSingle,"#","#",
-			                       "SINGLE_PART","UNSPLIT_LINES")
+			BranchPoints=MgmtInterface.Dissolve(TheInFile,PolylineSingle,"#","#",
+			                                    "SINGLE_PART","UNSPLIT_LINES")
 		else:
 			PolylineSingle=TheInFile
 	
@@ -74,8 +76,13 @@ def SplitLine(TheInFile,TheOutFilePath,SplitLength,AsArcGISTool,FlipLine):
 		# Create error to exit out if input line still more than 1 feature
 		if NumFeaturesSingle>1:
 			message="Error: Input line is more than 1 feature and not continuous"
-			MessageSwitch(message,AsArcGISTool)
-			x=1/0
+			if BranchPoints!=[]:
+				message=message+"\n  Lines branch at (X, Y): "+", ".join(
+					["("+format(X)+", "+format(Y)+")" for X,Y in BranchPoints])
+			else:
+				message=message+"\n  Lines do not share end points"
+			MessageSwitch(AsArcGISTool,message)
+			raise RuntimeError(message)
 	
 		'''Create evenly spaced points along input polyline at SplitLength distance'''
 		# Update user on process
@@ -111,16 +118,16 @@ def SplitLine(TheInFile,TheOutFilePath,SplitLength,AsArcGISTool,FlipLine):
 		
 		# Select all but the first point and copy to new shapefile - 
 		#   duplicate points will be end points for each line segment
-		# Create feature layer
-		MgmtInterface.CreateLayer(TheOutFilePath+PointName,"Point_layer")
+		# Create native selection (in place of a feature layer)
+		PointSelection=MgmtInterface.CreateSelection(TheOutFilePath+PointName)
 		# Define selection
 		SQLstatement="\"CID\" <> 0"
 		#Run select tool to a get new selection of all points with a CID not equal to 0
-		MgmtInterface.SelectUsingAttributes("Point_layer","NEW_SELECTION",SQLstatement)
+		MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION",SQLstatement)
 		#Output shapefile name
 		PointNameCopy=TheOutFilePath+TheFileName[0:-4]+"_copy_points.shp"
 		#Run copy tool through class
-		MgmtInterface.CopyFeatures("Point_layer",PointNameCopy)
+		MgmtInterface.CopyFeatures(PointSelection,PointNameCopy)
 	
 		#Subtract 1 from CID value to treat duplicate points as "end" for each segment
 		MgmtInterface.WriteField(PointNameCopy,"CID","[CID] - 1","VB") 
@@ -134,9 +141,9 @@ def SplitLine(TheInFile,TheOutFilePath,SplitLength,AsArcGISTool,FlipLine):
 		#  (don't need 2 last points as do not need 1 to be start point)
 		# Run select tool through class to exclude last point
 		SQLstatement2="\"CID\" <> "+format(PointNumber-1)
-		MgmtInterface.SelectUsingAttributes("Point_layer","NEW_SELECTION",SQLstatement2)
+		MgmtInterface.SelectUsingAttributes(PointSelection,"NEW_SELECTION",SQLstatement2)
 		# append original to copy
-		MgmtInterface.Append("Point_layer",PointNameCopy)
+		MgmtInterface.Append(PointSelection,PointNameCopy)
 		
 		'''Create line segments from points and add station (distance from start) 
 		to attribute table'''
@@ -154,9 +161,6 @@ def SplitLine(TheInFile,TheOutFilePath,SplitLength,AsArcGISTool,FlipLine):
 		MgmtInterface.AddField(LineSegmented,"Station","DOUBLE",10,2,"#")
 		MgmtInterface.WriteField(LineSegmented,"Station","!shape.length! * !CID!","PYTHON")
 	
-		# Clean up feature layer
-		MgmtInterface.Delete("Point_layer")
-		
 		# Update user on process
 		message="Split Line completed."
 		MessageSwitch(AsArcGISTool,message)			
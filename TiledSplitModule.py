@@ -0,0 +1,226 @@
+#######################################################################
+# TiledSplitModule
+#
+# Purpose: Split a long centerline into segments and buffer them into segment polygons in
+#          tiles processed in parallel, for corridors too long for a single core.
+#
+#          The centerline is cut into tiles at stations that are multiples of SplitLength
+#          (TileSegments segments per tile).  Each tile reads the centerline vertices
+#          from the last vertex before its start to the first vertex after its end, so
+#          neighbouring tiles overlap and every segment end point can be placed from
+#          within one tile.  The centerline is shared with the pool (SharedGeometry)
+#          and tiles only carry their vertex range.  Tiles are processed in a process pool; each returns its
+#          segments keyed by CID (the segment number along the whole line) and the
+#          results are stitched in CID order, checking that every CID appears once.
+#          Station is CID * SplitLength, so stations run on across tile seams.
+#
+#          Segments are straight lines between the points at each SplitLength (as made by
+#          the points to line step of SplitLineModule) and the polygons are their flat
+#          ended full buffers, or (Transects) lie between transects at the segment ends
+#          made once the tiles are stitched (SegmentTransects), as the fans on tight bends
+#          can reach across tile seams; a segment whose transect polygon is not simple or
+#          overlaps another keeps its flat ended buffer.  The last segment ends at the end
+#          of the line and may be shorter than SplitLength.
+#
+# Input:
+#        TheInFile: polyline shapefile with 1 single part, continuous line
+#        TheOutFilePath: the path of the folder to put the segmented line shapefile in
+#        BufferShp: output segment polygon shapefile path and name
+#        SplitLength: number specifying interval at which to split input line
+#        BufferDistance: distance to buffer to either side of the segments
+#        AsArcGISTool: binary specifying if running as a GIS tool (1) or not (0) to control messaging
+#        FlipLine: binary specifying whether the start of the centerline aligns with the desired start (0), and it actually the end (1)
+#        TileSegments: number of segments per tile
+#        Workers: number of processes (0 for one per processor, 1 to run in this process)
+#        SideLines: polyline shapefile with the two side lines for the metrics table ("" for none)
+#        MetricsTable: per station metrics table (SegmentMetrics) computed from the same centerline
+#                      array, "" for none
+#        Transects: 1 for polygons between de-crossed transects (SegmentTransects), 0 for flat
+#                   ended buffers
+#
+# Outputs (name same as input shapefile with suffix):
+#        _segmented_line.shp (LineSegmented): the split polylines, with CID and Station fields
+#        BufferShp: the segment polygons, with CID and Station fields
+#        MetricsTable: width, area, sinuosity and curvature per station, when given
+#
+# Returns: [LineSegmented, BufferShp] as a list
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import sys
+import numpy
+import ShapefileIO
+import SharedGeometry
+import SegmentMetrics
+import SegmentTransects
+
+# Output attribute fields
+SegmentFields=[("CID","N",10,0),("Station","N",13,2)]
+
+# Fraction of SplitLength below which a line end is not given its own segment
+EndTolerance=1e-9
+
+################################################
+# Purpose: Distance along a vertex array to each vertex
+# Input: XY - (n,2) vertex array
+# Output: Measures - (n,) array starting at 0
+def VertexMeasures(XY):
+	Measures=numpy.zeros(XY.shape[0])
+	Measures[1:]=numpy.cumsum(numpy.hypot(XY[1:,0]-XY[0:-1,0],XY[1:,1]-XY[0:-1,1]))
+	return(Measures)
+
+################################################
+# Purpose: Cut the tile tasks for a line
+# Input: XY - (n,2) centerline vertex array, in the direction stations run
+#        XYDescriptor - SharedGeometry descriptor of XY, which the tiles read from
+#        SplitLength - segment length
+#        TileSegments - segments per tile
+#        BufferDistance - distance to buffer to either side of the segments
+# Output: Tasks - list of (FirstCID, LastCID, XYDescriptor, First, Last, TileStart, SplitLength,
+#          BufferDistance), vertices First to Last covering stations FirstCID*SplitLength to
+#          LastCID*SplitLength (or the line end) and TileStart the station of vertex First
+def TileTasks(XY,XYDescriptor,SplitLength,TileSegments,BufferDistance):
+	Measures=VertexMeasures(XY)
+	LineLength=Measures[-1]
+	NumSegments=int(numpy.ceil(LineLength/SplitLength-EndTolerance))
+	Tasks=[]
+	for FirstCID in range(0,NumSegments,TileSegments):
+		LastCID=min(FirstCID+TileSegments,NumSegments)
+		# vertices from the last one at or before the tile start to the first at or after its end
+		First=max(int(numpy.searchsorted(Measures,FirstCID*SplitLength,"right"))-1,0)
+		Last=min(int(numpy.searchsorted(Measures,min(LastCID*SplitLength,LineLength),"left")),XY.shape[0]-1)
+		Tasks.append((FirstCID,LastCID,XYDescriptor,First,Last,Measures[First],SplitLength,BufferDistance))
+	return(Tasks)
+
+################################################
+# Purpose: Segments and segment polygons of one tile (run in the process pool)
+# Input: Task - tile task from TileTasks
+# Output: [CIDs, Starts, Ends, Rings] - CIDs (n,), segment start and end points (n,2)
+#          and clockwise polygon rings (n,5,2)
+def TileSegments(Task):
+	FirstCID,LastCID,XYDescriptor,First,Last,TileStart,SplitLength,BufferDistance=Task
+	# the tile's vertices are a view of the shared centerline
+	TileXY=SharedGeometry.AttachArray(XYDescriptor)[First:Last+1]
+	Measures=VertexMeasures(TileXY)+TileStart
+	CIDs=numpy.arange(FirstCID,LastCID)
+	# stations of the segment ends, the last one clipped to the tile (line) end
+	Stations=numpy.minimum(numpy.arange(FirstCID,LastCID+1)*SplitLength,Measures[-1])
+	Points=numpy.column_stack([numpy.interp(Stations,Measures,TileXY[:,0]),
+	                           numpy.interp(Stations,Measures,TileXY[:,1])])
+	Starts=Points[0:-1]
+	Ends=Points[1:]
+
+	### Flat ended buffers: rectangles along each segment
+	Direction=Ends-Starts
+	Lengths=numpy.hypot(Direction[:,0],Direction[:,1])
+	Lengths[Lengths==0]=1
+	Normal=numpy.column_stack([-Direction[:,1],Direction[:,0]])/Lengths[:,None]*BufferDistance
+	# start right, start left, end left, end right is clockwise
+	Rings=numpy.array([Starts-Normal,Starts+Normal,Ends+Normal,Ends-Normal,Starts-Normal]).transpose(1,0,2)
+	return([CIDs,Starts,Ends,Rings])
+
+################################################
+# Purpose: Run tile tasks, in a process pool when there is more than one worker
+# Input: Tasks - list of tile tasks
+#        Workers - number of processes (0 for one per processor)
+#        Blocks - SharedGeometry.SharedBlocks holding the centerline, released when done
+# Output: Results - list of TileSegments results, one per task
+def RunTiles(Tasks,Workers,Blocks):
+	import multiprocessing
+	# inside ArcGIS the executable is the application, so start plain interpreters
+	if os.path.basename(sys.executable).lower() not in ("python.exe","pythonw.exe","python"):
+		Interpreter=os.path.join(sys.exec_prefix,"python.exe")
+		if os.path.isfile(Interpreter):
+			multiprocessing.set_executable(Interpreter)
+	return(SharedGeometry.RunPool(TileSegments,Tasks,Workers,Blocks))
+
+################################################
+# Purpose: Stitch tile results in CID order, checking the seams
+# Input: Results - list of TileSegments results
+#        NumSegments - number of segments along the whole line
+# Output: [CIDs, Starts, Ends, Rings] for the whole line
+def StitchTiles(Results,NumSegments):
+	CIDs=numpy.concatenate([Result[0] for Result in Results])
+	Order=numpy.argsort(CIDs,kind="mergesort")
+	CIDs=CIDs[Order]
+	if CIDs.shape[0]!=NumSegments or (CIDs!=numpy.arange(NumSegments)).any():
+		raise RuntimeError("tiles do not cover the segments once each - check TileSegments")
+	Starts=numpy.concatenate([Result[1] for Result in Results])[Order]
+	Ends=numpy.concatenate([Result[2] for Result in Results])[Order]
+	Rings=numpy.concatenate([Result[3] for Result in Results])[Order]
+	# seams: each segment starts where the previous one ended
+	if NumSegments>1 and not numpy.allclose(Starts[1:],Ends[0:-1]):
+		raise RuntimeError("segment ends do not meet at tile seams")
+	return([CIDs,Starts,Ends,Rings])
+
+################################################
+# Purpose: Split a centerline into segments and segment polygons tile by tile
+# Input: see module header
+# Output: [LineSegmented, BufferShp] - segmented line and segment polygon shapefiles
+def TiledSplitLine(TheInFile,TheOutFilePath,BufferShp,SplitLength,BufferDistance,AsArcGISTool,
+                   FlipLine,TileSegments,Workers,SideLines="",MetricsTable="",Transects=0):
+	try:
+		from MessagingModule import MessageSwitch
+
+		# Extract just the file name
+		TheFileName=os.path.basename(TheInFile)
+
+		# check to see if out folder exists, if not create it
+		if os.path.isdir(TheOutFilePath)!= True:
+			os.mkdir(TheOutFilePath)
+
+		### Read the centerline: one single part line
+		Reader=ShapefileIO.ShapefileReader(TheInFile)
+		if Reader.NumRecords!=1:
+			raise RuntimeError("Input line is more than 1 feature - tiles need 1 continuous line")
+		XY,PartStarts=ShapefileIO.RecordGeometry(Reader.RecordContent(0))
+		if len(PartStarts)!=1:
+			raise RuntimeError("Input line has more than 1 part - tiles need 1 continuous line")
+		if FlipLine==1:
+			# Centerline start is at end of desired output line
+			XY=XY[::-1]
+
+		### Share the centerline with the tiles, cut into tiles and run them
+		Blocks=SharedGeometry.SharedBlocks(TheOutFilePath)
+		XYDescriptor=Blocks.Share(XY)
+		Tasks=TileTasks(XY,XYDescriptor,float(SplitLength),int(TileSegments),float(BufferDistance))
+		message=("Splitting and buffering "+TheFileName+" in "+str(len(Tasks))+
+		         " tiles of "+str(TileSegments)+" segments...")
+		MessageSwitch(AsArcGISTool,message)
+		if Tasks==[]:
+			Blocks.Release()
+			raise RuntimeError("Input line has no length")
+		Results=RunTiles(Tasks,Workers,Blocks)
+		NumSegments=Tasks[-1][1]
+		CIDs,Starts,Ends,Rings=StitchTiles(Results,NumSegments)
+		if Transects:
+			TransectRings,Conflicts=SegmentTransects.SegmentRings(numpy.vstack([Starts,Ends[-1:]]),float(BufferDistance))
+			Rings=[Rings[i] if Conflicts[i] else TransectRings[i] for i in range(NumSegments)]
+
+		### Write the segments and segment polygons in CID order
+		Rows=[ShapefileIO.NewDbfRow(SegmentFields,[CID,CID*SplitLength]) for CID in CIDs]
+		DbfHeader=ShapefileIO.NewDbfHeader(SegmentFields,0)
+		LineSegmented=TheOutFilePath+TheFileName[0:-4]+"_segmented_line.shp"
+		ShapefileIO.WriteRecords(LineSegmented,ShapefileIO.PolylineShape,
+		                         [ShapefileIO.PolyContent(ShapefileIO.PolylineShape,[numpy.vstack([Starts[i],Ends[i]])],[None])
+		                          for i in range(NumSegments)],DbfHeader,Rows,TheInFile)
+		ShapefileIO.WriteRecords(BufferShp,ShapefileIO.PolygonShape,
+		                         [ShapefileIO.PolyContent(ShapefileIO.PolygonShape,[Rings[i]],[None])
+		                          for i in range(NumSegments)],DbfHeader,Rows,TheInFile)
+
+		### Metrics from the centerline array already in memory
+		if MetricsTable!="":
+			# transects as wide as the centerline search (1.2 * MaxWidth)
+			SegmentMetrics.WriteMetrics(SegmentMetrics.StationMetrics(XY,SplitLength,SegmentMetrics.SideLineChains(SideLines),
+			                                                          2*float(BufferDistance)),MetricsTable)
+
+		# Update user on process
+		message="Tiled Split Line completed."
+		MessageSwitch(AsArcGISTool,message)
+
+		return([LineSegmented]+[BufferShp])
+
+	#Print out error from Python
+	except Exception as TheError:
+		raise RuntimeError("An error has occurred in TiledSplitLine: "+format(TheError))
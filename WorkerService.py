@@ -0,0 +1,397 @@
+#######################################################################
+# WorkerService
+#
+# Purpose: Resident worker for queues of corridor jobs.  Jobs are rows of a SQLite queue
+#          table; a worker process imports arcpy and the script modules once, keeps
+#          their caches (compiled selections, loaded spatial indexes) warm and runs
+#          RiverCorridorModule.RiverCorridor for each job it claims, writing the
+#          status, timing and outputs back to the job's row.  Several workers can share
+#          one queue file.
+#
+# Client API:
+#         JobId=SubmitJob(QueueFile,Parameters) - queue one corridor (Parameters as for RiverCorridor)
+#         JobIds=SubmitJobs(QueueFile,ParameterList) - queue many corridors in one transaction
+#         JobStatus(QueueFile,JobId) - dictionary with the job's row
+#         QueueCounts(QueueFile) - number of jobs by status
+#         RequeueJobs(QueueFile,JobIds) - put running or failed jobs back in the queue
+#
+# Command line:
+#         python WorkerService.py work QueueFile [--poll seconds] [--max-jobs n] [--exit-when-empty]
+#         python WorkerService.py submit QueueFile ParametersFile (JSON object or list of objects) [--dry-run]
+#         python WorkerService.py status QueueFile [JobId]
+#         python WorkerService.py requeue QueueFile JobId [JobId ...]
+#
+# Job status: QUEUED, RUNNING, DONE, FAILED.  A worker beats a heartbeat into its running
+#          job's row from a separate process (long geoprocessing tools do not release the
+#          interpreter lock, so a thread would stop beating); a RUNNING job without one
+#          for LeaseSeconds (its worker crashed or was killed) is put back in the queue
+#          by the next worker claiming a job.
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+
+# Seconds a connection waits for another worker's write lock
+LockTimeout=60
+
+# Seconds between the heartbeats of a running job, and without one before it is requeued
+HeartbeatSeconds=30
+LeaseSeconds=600
+
+# Parameters of RiverCorridorModule.RiverCorridor and their defaults
+JobParameters=[("TheInPolyFile",""),("TheInPointFile",""),("CenterlinePolyline",""),
+               ("TheOutFilePath",None),("TheFileName",""),("MaxWidth",None),
+               ("SplitLength",None),("SimplifyAnswer",False),("StartAnswer",True),
+               ("TileSegments",0),("Workers",0),("DEMRaster",""),
+               ("Transects",0),("Columnar",0)]
+
+QueueTable='''CREATE TABLE IF NOT EXISTS Jobs (
+	JobId INTEGER PRIMARY KEY AUTOINCREMENT,
+	Parameters TEXT NOT NULL,
+	Status TEXT NOT NULL DEFAULT 'QUEUED',
+	Worker TEXT,
+	Submitted REAL,
+	Started REAL,
+	Finished REAL,
+	Seconds REAL,
+	Outputs TEXT,
+	Error TEXT,
+	Heartbeat REAL)'''
+
+QueueIndex="CREATE INDEX IF NOT EXISTS JobsByStatus ON Jobs (Status, JobId)"
+
+################################################
+# Purpose: Open a queue file, creating the queue table if needed
+# Input: QueueFile - SQLite database path and name
+# Output: Connection - sqlite3 connection in autocommit mode
+def OpenQueue(QueueFile):
+	Connection=sqlite3.connect(QueueFile,timeout=LockTimeout,isolation_level=None)
+	Connection.row_factory=sqlite3.Row
+	Connection.execute(QueueTable)
+	Connection.execute(QueueIndex)
+	# queues made before heartbeats
+	if "Heartbeat" not in [Row[1] for Row in Connection.execute("PRAGMA table_info(Jobs)")]:
+		try:
+			Connection.execute("ALTER TABLE Jobs ADD COLUMN Heartbeat REAL")
+		except sqlite3.OperationalError:
+			# another worker added it first
+			pass
+	return(Connection)
+
+################################################
+# Purpose: Check job parameters and fill in defaults
+# Input: Parameters - dictionary of RiverCorridor parameters
+# Output: TheParameters - dictionary with every parameter
+def JobArguments(Parameters):
+	Unknown=[Name for Name in Parameters if Name not in dict(JobParameters)]
+	if Unknown!=[]:
+		raise RuntimeError("unknown job parameters: "+", ".join(Unknown))
+	TheParameters={}
+	for Name,Default in JobParameters:
+		Value=Parameters.get(Name,Default)
+		if Value is None:
+			raise RuntimeError("job parameter "+Name+" is required")
+		TheParameters[Name]=Value
+	if TheParameters["TheFileName"]=="":
+		# base name of the starting shapefile, as the script uses
+		if TheParameters["StartAnswer"]:
+			TheFileName=os.path.basename(TheParameters["TheInPolyFile"])
+		else:
+			TheFileName=os.path.basename(TheParameters["CenterlinePolyline"])
+		if TheFileName[-4:].lower()==".shp":
+			TheFileName=TheFileName[0:-4]
+		TheParameters["TheFileName"]=TheFileName
+	return(TheParameters)
+
+################################################
+# Purpose: Queue corridor jobs
+# Input: QueueFile - SQLite database path and name
+#        ParameterList - list of dictionaries of RiverCorridor parameters
+# Output: JobIds - list of the new jobs' ids
+def SubmitJobs(QueueFile,ParameterList):
+	try:
+		Rows=[json.dumps(JobArguments(Parameters),sort_keys=True) for Parameters in ParameterList]
+		Connection=OpenQueue(QueueFile)
+		try:
+			Connection.execute("BEGIN IMMEDIATE")
+			JobIds=[]
+			for Row in Rows:
+				Cursor=Connection.execute("INSERT INTO Jobs (Parameters,Submitted) VALUES (?,?)",(Row,time.time()))
+				JobIds.append(Cursor.lastrowid)
+			Connection.execute("COMMIT")
+		finally:
+			Connection.close()
+		return(JobIds)
+	except Exception as err:
+		raise RuntimeError("** Error: SubmitJobs Failed ("+str(err)+")")
+
+################################################
+# Purpose: Queue one corridor job
+# Input: QueueFile - SQLite database path and name
+#        Parameters - dictionary of RiverCorridor parameters
+# Output: JobId - the new job's id
+def SubmitJob(QueueFile,Parameters):
+	return(SubmitJobs(QueueFile,[Parameters])[0])
+
+################################################
+# Purpose: Read a job's row
+# Input: QueueFile - SQLite database path and name
+#        JobId - job id
+# Output: TheStatus - dictionary of the row's columns (Parameters and Outputs decoded)
+def JobStatus(QueueFile,JobId):
+	try:
+		Connection=OpenQueue(QueueFile)
+		try:
+			Row=Connection.execute("SELECT * FROM Jobs WHERE JobId=?",(JobId,)).fetchone()
+		finally:
+			Connection.close()
+		if Row is None:
+			raise RuntimeError("no job "+format(JobId))
+		TheStatus=dict(zip(Row.keys(),tuple(Row)))
+		for Column in ("Parameters","Outputs"):
+			if TheStatus[Column] is not None:
+				TheStatus[Column]=json.loads(TheStatus[Column])
+		return(TheStatus)
+	except Exception as err:
+		raise RuntimeError("** Error: JobStatus Failed ("+str(err)+")")
+
+################################################
+# Purpose: Count the jobs in a queue by status
+# Input: QueueFile - SQLite database path and name
+# Output: Counts - dictionary of status to number of jobs
+def QueueCounts(QueueFile):
+	Connection=OpenQueue(QueueFile)
+	try:
+		Rows=Connection.execute("SELECT Status,COUNT(*) FROM Jobs GROUP BY Status").fetchall()
+	finally:
+		Connection.close()
+	return(dict((Row[0],Row[1]) for Row in Rows))
+
+################################################
+# Purpose: Put jobs back in the queue (running jobs whose worker died, or failed jobs
+#          to try again)
+# Input: QueueFile - SQLite database path and name
+#        JobIds - list of job ids
+# Output: NumJobs - number of jobs requeued (QUEUED and DONE jobs are left as they are)
+def RequeueJobs(QueueFile,JobIds):
+	try:
+		Connection=OpenQueue(QueueFile)
+		try:
+			Connection.execute("BEGIN IMMEDIATE")
+			NumJobs=0
+			for JobId in JobIds:
+				NumJobs+=Connection.execute("UPDATE Jobs SET Status='QUEUED',Worker=NULL,Started=NULL,Heartbeat=NULL "
+				                            "WHERE JobId=? AND Status IN ('RUNNING','FAILED')",(JobId,)).rowcount
+			Connection.execute("COMMIT")
+		finally:
+			Connection.close()
+		return(NumJobs)
+	except Exception as err:
+		raise RuntimeError("** Error: RequeueJobs Failed ("+str(err)+")")
+
+################################################
+# Purpose: Claim the oldest queued job for a worker, first requeueing running jobs
+#          whose heartbeat stopped more than LeaseSeconds ago
+# Input: Connection - queue connection
+#        Worker - worker name
+# Output: [JobId, Parameters], or [] when the queue is empty
+def ClaimJob(Connection,Worker):
+	# the write lock makes the select and update one step across workers
+	Connection.execute("BEGIN IMMEDIATE")
+	try:
+		Connection.execute("UPDATE Jobs SET Status='QUEUED',Worker=NULL,Started=NULL,Heartbeat=NULL "
+		                   "WHERE Status='RUNNING' AND COALESCE(Heartbeat,Started,0)<?",(time.time()-LeaseSeconds,))
+		Row=Connection.execute("SELECT JobId,Parameters FROM Jobs WHERE Status='QUEUED' "
+		                       "ORDER BY JobId LIMIT 1").fetchone()
+		if Row is None:
+			Connection.execute("COMMIT")
+			return([])
+		Now=time.time()
+		Connection.execute("UPDATE Jobs SET Status='RUNNING',Worker=?,Started=?,Heartbeat=? WHERE JobId=?",
+		                   (Worker,Now,Now,Row[0]))
+		Connection.execute("COMMIT")
+	except Exception:
+		Connection.execute("ROLLBACK")
+		raise
+	return([Row[0],json.loads(Row[1])])
+
+################################################
+# Purpose: Record a finished job
+# Input: Connection - queue connection
+#        JobId - job id
+#        Status - "DONE" or "FAILED"
+#        Seconds - run time in seconds
+#        Outputs - list of output shapefiles (None on failure)
+#        Error - error message ("" on success)
+#        Worker - worker name: the job is only recorded while this worker holds it
+#                 (None to record it regardless)
+def FinishJob(Connection,JobId,Status,Seconds,Outputs,Error,Worker=None):
+	Connection.execute("UPDATE Jobs SET Status=?,Finished=?,Seconds=?,Outputs=?,Error=? WHERE JobId=? "
+	                   "AND (? IS NULL OR Worker=?)",
+	                   (Status,time.time(),Seconds,json.dumps(Outputs),Error,JobId,Worker,Worker))
+
+################################################
+# Purpose: Beat a running job's heartbeat into the queue until the worker closes its end
+#          of the pipe or dies (run in the heartbeat process)
+# Input: QueueFile - SQLite database path and name
+#        JobId - the running job's id
+#        Reader - the heartbeat's end of the pipe
+#        Writer - the worker's end, closed here so only the worker holds it
+def BeatJob(QueueFile,JobId,Reader,Writer):
+	Writer.close()
+	Connection=OpenQueue(QueueFile)
+	try:
+		while True:
+			try:
+				# nothing is ever sent: the pipe only becomes readable when it is closed
+				if Reader.poll(HeartbeatSeconds):
+					break
+			except (EOFError,IOError):
+				break
+			try:
+				Connection.execute("UPDATE Jobs SET Heartbeat=? WHERE JobId=? AND Status='RUNNING'",
+				                   (time.time(),JobId))
+			except sqlite3.Error:
+				# a missed beat (queue locked) is made up by the next
+				pass
+	finally:
+		Connection.close()
+
+###################################################################################
+# Process beating a running job's heartbeat into the queue until stopped.  The beats
+#  come from their own interpreter, so a geoprocessing tool holding the job process's
+#  interpreter lock for longer than LeaseSeconds does not stop them.
+###################################################################################
+class Heartbeat:
+
+	###################################################################################
+	# Constructor: starts the heartbeat process
+	# Inputs:
+	#         QueueFile - SQLite database path and name
+	#         JobId - the running job's id
+	###################################################################################
+	def __init__(self,QueueFile,JobId):
+		import multiprocessing
+		Reader,self.Writer=multiprocessing.Pipe(False)
+		self.Process=multiprocessing.Process(target=BeatJob,args=(QueueFile,JobId,Reader,self.Writer))
+		self.Process.daemon=True
+		self.Process.start()
+		Reader.close()
+
+	###################################################################################
+	# Stops the beats and waits for the heartbeat process to exit
+	###################################################################################
+	def Stop(self):
+		self.Writer.close()
+		self.Process.join()
+
+################################################
+# Purpose: Run queued jobs in this process until stopped
+# Input: QueueFile - SQLite database path and name
+#        PollSeconds - seconds to wait before checking an empty queue again
+#        MaxJobs - number of jobs to run before returning (0 for no limit)
+#        ExitWhenEmpty - True to return when the queue is empty
+# Output: NumJobs - number of jobs run
+def RunWorker(QueueFile,PollSeconds=5,MaxJobs=0,ExitWhenEmpty=False):
+	# imports (arcpy included) are paid once for every job the worker runs
+	from RiverCorridorModule import RiverCorridor
+	from JobContext import JobContext
+
+	Worker=socket.gethostname()+":"+str(os.getpid())
+	Connection=OpenQueue(QueueFile)
+	NumJobs=0
+	try:
+		while MaxJobs==0 or NumJobs<MaxJobs:
+			Claimed=ClaimJob(Connection,Worker)
+			if Claimed==[]:
+				if ExitWhenEmpty:
+					break
+				time.sleep(PollSeconds)
+				continue
+			JobId,Parameters=Claimed
+			StartTime=time.time()
+			Job=None
+			Beat=Heartbeat(QueueFile,JobId)
+			try:
+				Job=JobContext("job"+str(JobId))
+				Outputs=RiverCorridor(Parameters["TheInPolyFile"],Parameters["TheInPointFile"],
+				                      Parameters["CenterlinePolyline"],Parameters["TheOutFilePath"],
+				                      Parameters["TheFileName"],float(Parameters["MaxWidth"]),
+				                      float(Parameters["SplitLength"]),Parameters["SimplifyAnswer"],
+				                      Parameters["StartAnswer"],0,Job,
+				                      int(Parameters["TileSegments"]),int(Parameters["Workers"]),
+				                      Parameters["DEMRaster"],int(Parameters["Transects"]),
+				                      int(Parameters["Columnar"]))
+				FinishJob(Connection,JobId,"DONE",time.time()-StartTime,Outputs,"",Worker)
+			except Exception as err:
+				FinishJob(Connection,JobId,"FAILED",time.time()-StartTime,None,format(err),Worker)
+			finally:
+				Beat.Stop()
+			if Job is not None:
+				try:
+					Job.Release()
+				except Exception:
+					pass
+			NumJobs+=1
+	finally:
+		Connection.close()
+	return(NumJobs)
+
+################################################
+# Purpose: Command line entry: work, submit and status
+# Input: Arguments - command line arguments after the script name
+def Main(Arguments):
+	import argparse
+	Parser=argparse.ArgumentParser(description="Corridor job queue worker and client")
+	Commands=Parser.add_subparsers(dest="Command")
+	Work=Commands.add_parser("work",help="run queued jobs")
+	Work.add_argument("QueueFile")
+	Work.add_argument("--poll",type=float,default=5,help="seconds between checks of an empty queue")
+	Work.add_argument("--max-jobs",type=int,default=0,help="jobs to run before exiting (0 for no limit)")
+	Work.add_argument("--exit-when-empty",action="store_true")
+	Submit=Commands.add_parser("submit",help="queue jobs from a JSON file")
+	Submit.add_argument("QueueFile")
+	Submit.add_argument("ParametersFile",help="JSON object or list of objects with RiverCorridor parameters")
+	Submit.add_argument("--dry-run",action="store_true",help="report the jobs' run plans (RunPlanner) without queueing them")
+	Status=Commands.add_parser("status",help="show a job, or the counts by status")
+	Status.add_argument("QueueFile")
+	Status.add_argument("JobId",type=int,nargs="?")
+	Requeue=Commands.add_parser("requeue",help="put running (worker died) or failed jobs back in the queue")
+	Requeue.add_argument("QueueFile")
+	Requeue.add_argument("JobIds",type=int,nargs="+")
+	Options=Parser.parse_args(Arguments)
+
+	if Options.Command=="work":
+		NumJobs=RunWorker(Options.QueueFile,Options.poll,Options.max_jobs,Options.exit_when_empty)
+		print("Ran "+str(NumJobs)+" jobs")
+	elif Options.Command=="submit":
+		with open(Options.ParametersFile) as TheFile:
+			ParameterList=json.load(TheFile)
+		if isinstance(ParameterList,dict):
+			ParameterList=[ParameterList]
+		if Options.dry_run:
+			from RunPlanner import PlanRun,PlanReport
+			for Parameters in ParameterList:
+				Parameters=JobArguments(Parameters)
+				print(Parameters["TheFileName"])
+				print(PlanReport(PlanRun(Parameters)))
+			return
+		JobIds=SubmitJobs(Options.QueueFile,ParameterList)
+		print("Queued jobs "+", ".join(str(JobId) for JobId in JobIds))
+	elif Options.Command=="requeue":
+		print("Requeued "+str(RequeueJobs(Options.QueueFile,Options.JobIds))+" jobs")
+	elif Options.Command=="status":
+		if Options.JobId is None:
+			print(json.dumps(QueueCounts(Options.QueueFile),sort_keys=True))
+		else:
+			print(json.dumps(JobStatus(Options.QueueFile,Options.JobId),indent=1,sort_keys=True))
+	else:
+		Parser.error("a command (work, submit, status or requeue) is required")
+
+if __name__=="__main__":
+	Main(sys.argv[1:])
@@ -0,0 +1,367 @@
+#######################################################################
+# ZonalStatistics
+#
+# Purpose: Elevation and slope statistics of a DEM under each segment polygon, written
+#          as a table with one row per station (mean, min, max and percentiles of the
+#          cells whose centers fall inside the station's polygons).
+#
+#          Only the raster window under each polygon's bounding box is read.  ESRI
+#          binary grids (.flt, or single band .bil, with their .hdr) are memory mapped;
+#          other rasters are read through the geoprocessor (arcpy.RasterToNumPyArray) in
+#          windows.  Windows are assembled from square blocks of BlockCells cells kept in
+#          a least recently used cache, and the polygons are processed in station order,
+#          so the blocks shared by neighbouring segments are read once.  Each polygon is
+#          rasterized in NumPy by an even-odd scanline fill at the cell centers, and rows
+#          are written to the table as each station is finished.
+#
+#          Slope is in degrees by the 3x3 method of the Slope tool, from a window one
+#          cell wider than the polygon's; it is blank next to NoData cells and at the
+#          raster edge.  The DEM must be in the coordinate system of the polygons, with
+#          Z in the XY units (or give ZFactor).
+#
+# Usage:
+#         ZonalStatistics(DissShp,DEM,TheOutFilePath+TheFileName+"_zonalstats.dbf")
+#
+# Output table fields: CID, Station, CELLS, then ELEV_ and SLOPE_ MEAN, MIN, MAX and
+#                      P<percentile> for each of Percentiles
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import math
+import numpy
+from collections import OrderedDict
+import ShapefileIO
+import SpatialIndex
+from LinearReference import SegmentNumbers
+
+# Size (cells) of the square raster blocks read and cached
+BlockCells=256
+# Number of raster blocks kept in the cache
+CacheBlocks=64
+# Percentiles reported for each statistic
+Percentiles=(10,50,90)
+
+###################################################################################
+# Class for an ESRI binary grid (.flt float grid or single band .bil), memory mapped
+###################################################################################
+class BinaryRaster:
+
+	###################################################################################
+	# Constructor - reads the .hdr and maps the cells
+	# Inputs:
+	#         RasterFile - .flt or .bil file path and name
+	###################################################################################
+	def __init__(self,RasterFile):
+		Header={}
+		HdrFile=open(os.path.splitext(RasterFile)[0]+".hdr","r")
+		for Line in HdrFile:
+			Words=Line.split()
+			if len(Words)>=2:
+				Header[Words[0].lower()]=Words[1]
+		HdrFile.close()
+
+		self.NumRows=int(Header["nrows"])
+		self.NumCols=int(Header["ncols"])
+		if "ulxmap" in Header:
+			# BIL header: center of the upper left cell
+			self.CellWidth=float(Header.get("xdim",1))
+			self.CellHeight=float(Header.get("ydim",1))
+			self.XMin=float(Header["ulxmap"])-self.CellWidth/2.0
+			self.YMax=float(Header["ulymap"])+self.CellHeight/2.0
+		else:
+			# float grid header: lower left corner or center
+			self.CellWidth=self.CellHeight=float(Header["cellsize"])
+			if "xllcenter" in Header:
+				self.XMin=float(Header["xllcenter"])-self.CellWidth/2.0
+				YMin=float(Header["yllcenter"])-self.CellHeight/2.0
+			else:
+				self.XMin=float(Header["xllcorner"])
+				YMin=float(Header["yllcorner"])
+			self.YMax=YMin+self.NumRows*self.CellHeight
+		self.NoData=None
+		for Key in ("nodata_value","nodata"):
+			if Key in Header:
+				self.NoData=float(Header[Key])
+
+		Order="<"
+		if Header.get("byteorder","LSBFIRST").upper() in ("M","MSBFIRST"):
+			Order=">"
+		if RasterFile[-4:].lower()==".flt":
+			DataType=Order+"f4"
+		else:
+			if int(Header.get("nbands",1))!=1:
+				raise RuntimeError(RasterFile+" has more than 1 band")
+			Bits=int(Header.get("nbits",8))
+			Kind={"FLOAT":"f","SIGNEDINT":"i"}.get(Header.get("pixeltype","UNSIGNEDINT").upper(),"u")
+			DataType=Order+Kind+str(Bits//8)
+		self.Data=numpy.memmap(RasterFile,dtype=DataType,mode="r",offset=int(Header.get("skipbytes",0)),
+		                       shape=(self.NumRows,self.NumCols))
+
+	###################################################################################
+	# Cells of a window inside the raster as float64, NaN for NoData
+	# Inputs:
+	#         Row, Col - upper left cell of the window
+	#         Rows, Cols - window size in cells
+	###################################################################################
+	def ReadWindow(self,Row,Col,Rows,Cols):
+		Cells=numpy.array(self.Data[Row:Row+Rows,Col:Col+Cols],dtype=numpy.float64)
+		if self.NoData is not None:
+			Cells[Cells==self.NoData]=numpy.nan
+		return(Cells)
+
+###################################################################################
+# Class for any raster the geoprocessor reads, read in windows
+###################################################################################
+class GeoprocessorRaster:
+
+	###################################################################################
+	# Constructor - reads the raster properties
+	# Inputs:
+	#         InRaster - raster path and name as a string
+	#         Job - JobContext the geoprocessor calls run in
+	###################################################################################
+	def __init__(self,InRaster,Job):
+		import arcpy
+		self.InRaster=InRaster
+		self.Job=Job
+		with Job.Geoprocessor():
+			TheRaster=arcpy.Raster(InRaster)
+			self.XMin=float(TheRaster.extent.XMin)
+			self.YMax=float(TheRaster.extent.YMax)
+			self.CellWidth=float(TheRaster.meanCellWidth)
+			self.CellHeight=float(TheRaster.meanCellHeight)
+			self.NumRows=int(TheRaster.height)
+			self.NumCols=int(TheRaster.width)
+			self.NoData=TheRaster.noDataValue
+
+	###################################################################################
+	# Cells of a window inside the raster as float64, NaN for NoData
+	# Inputs:
+	#         Row, Col - upper left cell of the window
+	#         Rows, Cols - window size in cells
+	###################################################################################
+	def ReadWindow(self,Row,Col,Rows,Cols):
+		import arcpy
+		# the window is given by its lower left corner
+		Corner=arcpy.Point(self.XMin+Col*self.CellWidth,self.YMax-(Row+Rows)*self.CellHeight)
+		with self.Job.Geoprocessor():
+			if self.NoData is None:
+				Cells=arcpy.RasterToNumPyArray(self.InRaster,Corner,Cols,Rows)
+			else:
+				Cells=arcpy.RasterToNumPyArray(self.InRaster,Corner,Cols,Rows,self.NoData)
+		if Cells.ndim==3:
+			Cells=Cells[0]
+		Cells=numpy.array(Cells,dtype=numpy.float64)
+		if self.NoData is not None:
+			Cells[Cells==float(self.NoData)]=numpy.nan
+		return(Cells)
+
+################################################
+# Purpose: Open a raster for windowed reads
+# Input: InRaster - raster path and name as a string
+#        Job - JobContext for geoprocessor reads (None for the default job)
+# Output: TheRaster - BinaryRaster when the raster is an ESRI binary grid, otherwise
+#          GeoprocessorRaster
+def OpenRaster(InRaster,Job=None):
+	Extension=os.path.splitext(InRaster)[1].lower()
+	if Extension in (".flt",".bil") and os.path.isfile(os.path.splitext(InRaster)[0]+".hdr"):
+		return(BinaryRaster(InRaster))
+	if Job is None:
+		from JobContext import DefaultJob
+		Job=DefaultJob()
+	return(GeoprocessorRaster(InRaster,Job))
+
+###################################################################################
+# Class caching square blocks of a raster, least recently used first out
+###################################################################################
+class BlockCache:
+
+	###################################################################################
+	# Constructor for the block cache class
+	# Inputs:
+	#         Raster - BinaryRaster or GeoprocessorRaster
+	#         Size - block size in cells
+	#         Capacity - number of blocks kept
+	###################################################################################
+	def __init__(self,Raster,Size=BlockCells,Capacity=CacheBlocks):
+		self.Raster=Raster
+		self.Size=Size
+		self.Capacity=Capacity
+		self.Blocks=OrderedDict()
+		self.Reads=0
+
+	###################################################################################
+	# One block of cells, read on first use
+	# Inputs:
+	#         BlockRow, BlockCol - block numbers
+	###################################################################################
+	def Block(self,BlockRow,BlockCol):
+		Key=(BlockRow,BlockCol)
+		if Key in self.Blocks:
+			Cells=self.Blocks.pop(Key)
+		else:
+			Row=BlockRow*self.Size
+			Col=BlockCol*self.Size
+			Cells=self.Raster.ReadWindow(Row,Col,min(self.Size,self.Raster.NumRows-Row),
+			                             min(self.Size,self.Raster.NumCols-Col))
+			self.Reads+=1
+			if len(self.Blocks)>=self.Capacity:
+				self.Blocks.popitem(last=False)
+		self.Blocks[Key]=Cells
+		return(Cells)
+
+	###################################################################################
+	# Cells of any window, NaN outside the raster
+	# Inputs:
+	#         Row, Col - upper left cell of the window (may be outside the raster)
+	#         Rows, Cols - window size in cells
+	###################################################################################
+	def Window(self,Row,Col,Rows,Cols):
+		Cells=numpy.zeros((Rows,Cols))+numpy.nan
+		First=[max(Row,0),max(Col,0)]
+		Last=[min(Row+Rows,self.Raster.NumRows),min(Col+Cols,self.Raster.NumCols)]
+		if First[0]>=Last[0] or First[1]>=Last[1]:
+			return(Cells)
+		for BlockRow in range(First[0]//self.Size,(Last[0]-1)//self.Size+1):
+			for BlockCol in range(First[1]//self.Size,(Last[1]-1)//self.Size+1):
+				Block=self.Block(BlockRow,BlockCol)
+				# overlap of the block and the window in raster cells
+				R0=max(First[0],BlockRow*self.Size)
+				R1=min(Last[0],BlockRow*self.Size+Block.shape[0])
+				C0=max(First[1],BlockCol*self.Size)
+				C1=min(Last[1],BlockCol*self.Size+Block.shape[1])
+				Cells[R0-Row:R1-Row,C0-Col:C1-Col]=Block[R0-BlockRow*self.Size:R1-BlockRow*self.Size,
+				                                         C0-BlockCol*self.Size:C1-BlockCol*self.Size]
+		return(Cells)
+
+################################################
+# Purpose: Rasterize a polygon at cell centers (even-odd scanline fill)
+# Input: S0, S1 - (m,2) polygon edge start and end points
+#        X - (cols,) cell center x coordinates
+#        Y - (rows,) cell center y coordinates
+# Output: Mask - (rows,cols) boolean array, True for cells whose centers are inside
+def PolygonMask(S0,S1,X,Y):
+	Mask=numpy.zeros((Y.shape[0],X.shape[0]),dtype=bool)
+	for RowNum in range(Y.shape[0]):
+		Straddle=(S0[:,1]>Y[RowNum])!=(S1[:,1]>Y[RowNum])
+		if not Straddle.any():
+			continue
+		E0=S0[Straddle]
+		E1=S1[Straddle]
+		XCross=numpy.sort(E0[:,0]+(Y[RowNum]-E0[:,1])*(E1[:,0]-E0[:,0])/(E1[:,1]-E0[:,1]))
+		# a center is inside when an odd number of crossings lie to its left
+		Mask[RowNum]=(numpy.searchsorted(XCross,X,"right")%2)==1
+	return(Mask)
+
+################################################
+# Purpose: Slope in degrees by the 3x3 method of the Slope tool
+# Input: Cells - (rows,cols) elevations including a 1 cell border
+#        CellWidth, CellHeight - cell size
+#        ZFactor - multiplier converting Z units to XY units
+# Output: Degrees - (rows-2,cols-2) array, NaN where any neighbour is NaN
+def Slope(Cells,CellWidth,CellHeight,ZFactor):
+	Z=Cells*ZFactor
+	# neighbours a b c / d e f / g h i
+	A=Z[0:-2,0:-2]; B=Z[0:-2,1:-1]; C=Z[0:-2,2:]
+	D=Z[1:-1,0:-2]; F=Z[1:-1,2:]
+	G=Z[2:,0:-2]; H=Z[2:,1:-1]; I=Z[2:,2:]
+	DZDX=((C+2*F+I)-(A+2*D+G))/(8.0*CellWidth)
+	DZDY=((G+2*H+I)-(A+2*B+C))/(8.0*CellHeight)
+	return(numpy.degrees(numpy.arctan(numpy.sqrt(DZDX**2+DZDY**2))))
+
+################################################
+# Purpose: Elevation and slope of the cells under one polygon
+# Input: Cache - BlockCache of the DEM
+#        S0, S1 - (m,2) polygon edge start and end points
+#        Box - (Xmin,Ymin,Xmax,Ymax) of the polygon
+#        ZFactor - multiplier converting Z units to XY units
+# Output: [Elevations, Slopes] - values of the cells whose centers are inside
+def PolygonCells(Cache,S0,S1,Box,ZFactor):
+	Raster=Cache.Raster
+	Col0=max(int(math.floor((Box[0]-Raster.XMin)/Raster.CellWidth)),0)
+	Col1=min(int(math.ceil((Box[2]-Raster.XMin)/Raster.CellWidth)),Raster.NumCols)
+	Row0=max(int(math.floor((Raster.YMax-Box[3])/Raster.CellHeight)),0)
+	Row1=min(int(math.ceil((Raster.YMax-Box[1])/Raster.CellHeight)),Raster.NumRows)
+	if Col0>=Col1 or Row0>=Row1:
+		return([numpy.zeros(0),numpy.zeros(0)])
+	# window with a 1 cell border for the slope
+	Cells=Cache.Window(Row0-1,Col0-1,Row1-Row0+2,Col1-Col0+2)
+	X=Raster.XMin+(numpy.arange(Col0,Col1)+0.5)*Raster.CellWidth
+	Y=Raster.YMax-(numpy.arange(Row0,Row1)+0.5)*Raster.CellHeight
+	Mask=PolygonMask(S0,S1,X,Y)
+	return([Cells[1:-1,1:-1][Mask],Slope(Cells,Raster.CellWidth,Raster.CellHeight,ZFactor)[Mask]])
+
+################################################
+# Purpose: Mean, min, max and percentiles of values, ignoring NaN
+# Input: Values - array
+#        ThePercentiles - list of percentiles
+# Output: Statistics - list of floats (NaN when there are no values)
+def Statistics(Values,ThePercentiles):
+	Values=Values[~numpy.isnan(Values)]
+	if Values.shape[0]==0:
+		return([numpy.nan]*(3+len(ThePercentiles)))
+	return([float(Values.mean()),float(Values.min()),float(Values.max())]+
+	       [float(Value) for Value in numpy.percentile(Values,list(ThePercentiles))])
+
+################################################
+# Purpose: Fields of the statistics table
+# Input: ThePercentiles - list of percentiles
+# Output: Fields - list of (Name, Type, Length, Decimals)
+def ZonalFields(ThePercentiles):
+	Fields=[("CID","N",10,0),("Station","N",13,2),("CELLS","N",10,0)]
+	for Prefix in ("ELEV_","SLOPE_"):
+		Names=["MEAN","MIN","MAX"]+["P"+str(int(Percentile)) for Percentile in ThePercentiles]
+		Fields=Fields+[(Prefix+Name,"N",15,4) for Name in Names]
+	return(Fields)
+
+################################################
+# Purpose: Elevation and slope statistics of a DEM per station
+# Input: SegmentPolygons - segment polygon shapefile (_segmented.shp or _segmented_diss.shp)
+#                          with a CID (or NEAR_FID) field and a Station field
+#        InRaster - DEM raster path and name
+#        OutTable - output dBASE table path and name
+#        ThePercentiles - list of percentiles to report
+#        ZFactor - multiplier converting Z units to XY units for the slope
+#        Job - JobContext for geoprocessor raster reads (None for the default job)
+# Output: NumStations - number of table rows written
+def ZonalStatistics(SegmentPolygons,InRaster,OutTable,ThePercentiles=Percentiles,ZFactor=1.0,Job=None):
+	try:
+		Reader=ShapefileIO.ShapefileReader(SegmentPolygons)
+		if Reader.NumRecords==0:
+			# no polygons: an empty table
+			ShapefileIO.TableWriter(OutTable,ZonalFields(ThePercentiles)).Close()
+			return(0)
+		CIDs,Stations=SegmentNumbers(Reader)
+		Boxes=Reader.Boxes()
+		Cache=BlockCache(OpenRaster(InRaster,Job))
+		Writer=ShapefileIO.TableWriter(OutTable,ZonalFields(ThePercentiles))
+
+		try:
+			# polygons in station order; the parts of a station (SINGLE_PART dissolve) form one row
+			Key=numpy.where(numpy.isnan(Stations),CIDs,Stations)
+			Order=numpy.lexsort((CIDs,Key))
+			Starts=numpy.flatnonzero(numpy.concatenate([[True],(Key[Order][1:]!=Key[Order][0:-1])|
+			                                            (CIDs[Order][1:]!=CIDs[Order][0:-1])]))
+			Ends=numpy.append(Starts[1:],Order.shape[0])
+			for First,Last in zip(Starts,Ends):
+				Elevations=[]
+				Slopes=[]
+				for FID in Order[First:Last]:
+					if numpy.isnan(Boxes[FID]).any():
+						continue
+					S0,S1,EdgeOffsets=SpatialIndex.PolygonEdges(Reader,[FID])
+					PolygonElevations,PolygonSlopes=PolygonCells(Cache,S0,S1,Boxes[FID],ZFactor)
+					Elevations.append(PolygonElevations)
+					Slopes.append(PolygonSlopes)
+				Elevations=numpy.concatenate(Elevations+[numpy.zeros(0)])
+				Slopes=numpy.concatenate(Slopes+[numpy.zeros(0)])
+				FID=Order[First]
+				Writer.Write([CIDs[FID],Stations[FID],int((~numpy.isnan(Elevations)).sum())]+
+				             Statistics(Elevations,ThePercentiles)+Statistics(Slopes,ThePercentiles))
+		finally:
+			# a failed zone still leaves a table with a valid header
+			Writer.Close()
+		return(Writer.NumRecords)
+	except Exception as err:
+		raise RuntimeError("** Error: ZonalStatistics Failed ("+str(err)+")")
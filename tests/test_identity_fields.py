@@ -0,0 +1,69 @@
+#######################################################################
+# test_identity_fields
+#
+# Purpose: The gap selection after Identity must find the identity features' FID_
+#          field when the input's and the identity shapefile's FID_ names clash once cut
+#          to 10 characters (sandy_creek and sandy_creek_segmented)
+#
+# Command line:
+#         python -m pytest tests
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import sys
+import shutil
+import tempfile
+import types
+import unittest
+import numpy
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+	import arcpy
+except ImportError:
+	# ShapefileProperties imports arcpy; the geometry arrays read here do not use it
+	sys.modules["arcpy"]=types.ModuleType("arcpy")
+import ShapefileIO
+import NativeAnalysis
+
+################################################
+# Purpose: Write a polygon shapefile of clockwise squares with an Id field
+# Input: ShapefileName - output shapefile path and name
+#        Squares - list of (Xmin,Ymin,Size)
+def WriteSquares(ShapefileName,Squares):
+	Fields=[("Id","N",6,0)]
+	Contents=[]
+	for X,Y,Size in Squares:
+		Ring=numpy.array([[X,Y],[X,Y+Size],[X+Size,Y+Size],[X+Size,Y],[X,Y]],dtype=float)
+		Contents.append(ShapefileIO.PolyContent(ShapefileIO.PolygonShape,[Ring],[None]))
+	ShapefileIO.WriteRecords(ShapefileName,ShapefileIO.PolygonShape,Contents,ShapefileIO.NewDbfHeader(Fields,len(Squares)),
+	                         [ShapefileIO.NewDbfRow(Fields,[Number]) for Number in range(len(Squares))],"")
+
+class IdentityFieldTest(unittest.TestCase):
+
+	def setUp(self):
+		self.Folder=tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.Folder)
+
+	def test_long_input_name(self):
+		InShapefile=os.path.join(self.Folder,"sandy_creek.shp")
+		BufferShp=os.path.join(self.Folder,"sandy_creek_segmented.shp")
+		IDPolygons=os.path.join(self.Folder,"sandy_creek_segmented_ID.shp")
+		WriteSquares(InShapefile,[(0,0,10)])
+		# two segments leaving a gap between x=4 and x=6
+		WriteSquares(BufferShp,[(0,0,4),(6,0,4)])
+		self.assertTrue(NativeAnalysis.Identity(InShapefile,BufferShp,IDPolygons,"ALL"))
+
+		Reader=ShapefileIO.ShapefileReader(IDPolygons)
+		self.assertEqual([Name.upper() for Name in Reader.FieldNames()],["FID","FID_SANDY_","ID","FID_SAND_1","ID_1"])
+		IDField=NativeAnalysis.IdentityFIDField(IDPolygons,InShapefile)
+		self.assertEqual(IDField,"FID_SAND_1")
+		# the gap is the one piece outside both segments; the input FID field is never -1
+		self.assertEqual(list(Reader.Column(IDField)).count(-1),1)
+		self.assertEqual(list(Reader.Column("FID_SANDY_")).count(-1),0)
+
+if __name__=="__main__":
+	unittest.main()
@@ -0,0 +1,53 @@
+#######################################################################
+# test_segment_metrics
+#
+# Purpose: The first and last segments get an AREA where the centerline runs past the
+#          ends of the side lines, or ends where they meet
+#
+# Command line:
+#         python -m pytest tests
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import sys
+import unittest
+import numpy
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import SegmentMetrics
+
+class SegmentMetricsTest(unittest.TestCase):
+
+	def test_centerline_past_side_line_ends(self):
+		# channel 20 wide from x=0 to x=100, centerline from x=-5 to x=105
+		XY=numpy.array([[-5.0,0.0],[105.0,0.0]])
+		Chains=[numpy.array([[0.0,10.0],[100.0,10.0]]),numpy.array([[100.0,-10.0],[0.0,-10.0]])]
+		Metrics=SegmentMetrics.StationMetrics(XY,10.0,Chains,50.0)
+		self.assertEqual(Metrics["CID"].shape[0],11)
+		self.assertFalse(numpy.isnan(Metrics["AREA"]).any())
+		self.assertAlmostEqual(Metrics["AREA"][0],5*20.0)
+		self.assertAlmostEqual(Metrics["AREA"][-1],5*20.0)
+		self.assertTrue(numpy.allclose(Metrics["AREA"][1:-1],10*20.0))
+		self.assertAlmostEqual(Metrics["AREA"].sum(),100*20.0)
+
+	def test_side_lines_meet_at_centerline_ends(self):
+		# channel tapering to points at both centerline ends
+		XY=numpy.array([[0.0,0.0],[100.0,0.0]])
+		Chains=[numpy.array([[0.0,0.0],[10.0,10.0],[90.0,10.0],[100.0,0.0]]),
+		        numpy.array([[0.0,0.0],[10.0,-10.0],[90.0,-10.0],[100.0,0.0]])]
+		Metrics=SegmentMetrics.StationMetrics(XY,10.0,Chains,50.0)
+		self.assertFalse(numpy.isnan(Metrics["AREA"]).any())
+		self.assertAlmostEqual(Metrics["AREA"][0],10*10.0)
+		self.assertAlmostEqual(Metrics["AREA"][-1],10*10.0)
+		self.assertAlmostEqual(Metrics["AREA"].sum(),80*20.0+2*10*10.0)
+
+	def test_far_side_line_ends_stay_blank(self):
+		# side lines ending farther than the transect length from the centerline ends
+		XY=numpy.array([[-55.0,0.0],[100.0,0.0]])
+		Chains=[numpy.array([[0.0,10.0],[100.0,10.0]]),numpy.array([[0.0,-10.0],[100.0,-10.0]])]
+		Metrics=SegmentMetrics.StationMetrics(XY,100.0,Chains,50.0)
+		self.assertTrue(numpy.isnan(Metrics["AREA"][0]))
+
+if __name__=="__main__":
+	unittest.main()
@@ -0,0 +1,107 @@
+#######################################################################
+# test_segment_transects
+#
+# Purpose: Segment polygons between transects follow the segments' own vertices, and
+#          on bends tighter than the buffer distance every polygon kept is simple and
+#          overlaps no other; the others are flagged for the flat ended buffer
+#
+# Command line:
+#         python -m pytest tests
+#
+# Modified: 10/19/2026
+#######################################################################
+import os
+import sys
+import unittest
+import numpy
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import SpatialIndex
+import SegmentTransects
+
+################################################
+# Purpose: Segments of a sine wave centerline, with the centerline's vertices inside them
+# Input: Amplitude, Wavelength - of the sine wave
+#        SplitLength - segment length
+#        Reverse - True to cut the segments from the line end
+# Output: [Points, SegmentXY, SegmentOffsets] - as for SegmentTransects.TransectRings
+def SineSegments(Amplitude,Wavelength,SplitLength,Reverse=False):
+	X=numpy.arange(0,1000.5,1.0)
+	XY=numpy.column_stack([X,Amplitude*numpy.sin(2*numpy.pi*X/Wavelength)])
+	if Reverse:
+		XY=XY[::-1]
+	Measures=numpy.concatenate([[0],numpy.cumsum(numpy.hypot(*(XY[1:]-XY[0:-1]).T))])
+	Stations=numpy.append(numpy.arange(0,Measures[-1],SplitLength),Measures[-1])
+	Points=numpy.column_stack([numpy.interp(Stations,Measures,XY[:,0]),numpy.interp(Stations,Measures,XY[:,1])])
+	Segments=[numpy.vstack([Points[i],XY[(Measures>Stations[i])&(Measures<Stations[i+1])],Points[i+1]])
+	          for i in range(Stations.shape[0]-1)]
+	SegmentOffsets=numpy.concatenate([[0],numpy.cumsum([Segment.shape[0] for Segment in Segments])])
+	return([Points,numpy.vstack(Segments),SegmentOffsets])
+
+################################################
+# Purpose: Whether a closed ring's edges meet only their neighbours (every pair checked)
+# Input: Ring - (k,2) closed ring
+# Output: True when the ring is simple
+def SimpleRing(Ring):
+	NumEdges=Ring.shape[0]-1
+	A,B=numpy.triu_indices(NumEdges,2)
+	Keep=~((A==0)&(B==NumEdges-1))
+	A,B=A[Keep],B[Keep]
+	return(not (SpatialIndex.SegmentDistances(Ring[A],Ring[A+1],Ring[B],Ring[B+1])==0).any())
+
+class SegmentTransectsTest(unittest.TestCase):
+
+	def assertKeptRingsClean(self,Rings,Conflicts):
+		Kept=[Ring for Ring,Conflict in zip(Rings,Conflicts) if not Conflict]
+		for Ring in Kept:
+			self.assertTrue(SimpleRing(Ring))
+		# grid points (off the shared edges) inside at most one kept ring
+		AllPoints=numpy.vstack(Kept)
+		X,Y=numpy.meshgrid(numpy.arange(AllPoints[:,0].min(),AllPoints[:,0].max(),2.0)+0.37,
+		                   numpy.arange(AllPoints[:,1].min(),AllPoints[:,1].max(),2.0)+0.29)
+		Grid=numpy.column_stack([X.ravel(),Y.ravel()])
+		Cover=numpy.zeros(Grid.shape[0],dtype=numpy.int64)
+		for Ring in Kept:
+			InBox=numpy.flatnonzero((Grid>=Ring.min(axis=0)).all(axis=1)&(Grid<=Ring.max(axis=0)).all(axis=1))
+			Cover[InBox]+=SpatialIndex.PointsInPolygon(Grid[InBox],Ring[0:-1],Ring[1:])
+		self.assertLessEqual(Cover.max(),1)
+
+	def test_gentle_bend_follows_vertices(self):
+		# cut from either end, so some vertices lie just next to a cut
+		for Reverse in (False,True):
+			Points,SegmentXY,SegmentOffsets=SineSegments(20.0,600.0,20.0,Reverse)
+			Rings,Conflicts=SegmentTransects.SegmentRings(Points,30.0,SegmentXY,SegmentOffsets)
+			self.assertFalse(Conflicts.any())
+			self.assertKeptRingsClean(Rings,Conflicts)
+			# every ring stays between its transects (straight on a gentle bend)
+			Left,Right=SegmentTransects.DecrossTransects(Points,30.0)
+			Across=Left-Right
+			for i in range(len(Rings)):
+				for End,Sign in ((i,1.0),(i+1,-1.0)):
+					Cross=Across[End,0]*(Rings[i][:,1]-Right[End,1])-Across[End,1]*(Rings[i][:,0]-Right[End,0])
+					self.assertLessEqual((Sign*Cross).max(),1e-6)
+			# the sides pass the segments' interior vertices at the buffer distance (those
+			#  next to a cut may be left out)
+			for i in range(len(Rings)):
+				Segment=SegmentXY[SegmentOffsets[i]:SegmentOffsets[i+1]]
+				Inner=Segment[1:-1]
+				self.assertGreater(Inner.shape[0],0)
+				self.assertLessEqual(Rings[i].shape[0],7+2*Inner.shape[0])
+				for Vertex in Inner:
+					if min(numpy.hypot(*(Segment[[0,-1]]-Vertex).T))<1.0:
+						continue
+					Distances=numpy.hypot(*(Rings[i]-Vertex).T)
+					self.assertEqual((numpy.abs(Distances-30.0)<1e-9).sum(),2)
+
+	def test_sharp_bend_falls_back(self):
+		# bends of radius about 7 with a buffer distance of 90
+		for SplitLength in (10.0,20.0):
+			for Segments in (SineSegments(150.0,200.0,SplitLength),SineSegments(150.0,200.0,SplitLength)[0:1]):
+				Rings,Conflicts=SegmentTransects.SegmentRings(Segments[0],90.0,*Segments[1:])
+				self.assertEqual(len(Rings),Segments[0].shape[0]-1)
+				self.assertTrue(Conflicts.any())
+				if not Conflicts.all():
+					self.assertKeptRingsClean(Rings,Conflicts)
+
+if __name__=="__main__":
+	unittest.main()